@@ -0,0 +1,160 @@
+import json
+import platform
+import sys
+import click
+from .game import GameBenchmarkResult, benchmark_game
+from .replay import ReplayBenchmarkResult, benchmark_replay
+
+# const
+DEFAULT_N_PLAYERS: tuple[int, ...] = (4, 8, 16, 32, 64)
+DEFAULT_BASELINE: str = 'benchmarks/baseline.json'
+# NOTE: the metrics compared with the baseline. The smaller, the better.
+#       the allocated blocks are only reported because they vary too much between runs  # noqa
+GATED_METRICS: tuple[str, ...] = (
+    'game_seconds',
+    'day_seconds',
+    'peak_memory_bytes',
+    'supersteps_per_day',
+)
+
+
+def compare_with_baseline(
+    results: list[GameBenchmarkResult],
+    baseline: list[GameBenchmarkResult],
+    max_regression: float,
+) -> list[str]:
+    """Compare the results with the baseline
+
+    The results are compared only with the baseline of the same settings, i.e. the number of players, the seed and the flags.
+
+    Args:
+        results (list[GameBenchmarkResult]): the current results
+        baseline (list[GameBenchmarkResult]): the baseline results
+        max_regression (float): the allowed relative regression, e.g. 0.2 means 20% worse than the baseline
+
+    Returns:
+        list[str]: the descriptions of the regressions
+    """  # noqa
+    baseline_by_settings = {result.settings: result for result in baseline}
+    regressions: list[str] = []
+    for result in results:
+        base = baseline_by_settings.get(result.settings)
+        if base is None:
+            continue
+        for metric in GATED_METRICS:
+            current, previous = getattr(result, metric), getattr(base, metric)
+            if previous > 0 and current > previous * (1 + max_regression):
+                regressions.append(f'n_players={result.n_players} {metric}: {previous:.4g} -> {current:.4g} ({current / previous - 1:+.1%})')  # noqa
+    return regressions
+
+
+def _format_table(results: list[GameBenchmarkResult]) -> str:
+    header = f'{"players":>8} {"days":>6} {"game[s]":>9} {"day[s]":>8} {"steps/day":>10} {"peak[MiB]":>10} {"blocks":>9} {"gc":>6}'  # noqa
+    rows = [
+        f'{result.n_players:>8} {result.n_days:>6.1f} {result.game_seconds:>9.3f} {result.day_seconds:>8.3f} {result.supersteps_per_day:>10.1f} {result.peak_memory_bytes / 2 ** 20:>10.1f} {result.allocated_blocks:>9} {result.gc_collections:>6}'  # noqa
+        for result in results
+    ]
+    return '\n'.join([header] + rows)
+
+
+def _format_replay_table(results: list[ReplayBenchmarkResult]) -> str:
+    header = f'{"players":>8} {"days":>6} {"game[s]":>9} {"games/min":>10} {"diverged":>9}  path'  # noqa
+    rows = [
+        f'{result.n_players:>8} {result.n_days:>6} {result.game_seconds:>9.3f} {result.games_per_minute:>10.1f} {result.divergences:>9}  {result.path}'  # noqa
+        for result in results
+    ]
+    return '\n'.join([header] + rows)
+
+
+@click.command()
+@click.option('-n', '--n-players', multiple=True, type=int, default=DEFAULT_N_PLAYERS, help=f'The numbers of players. Defaults to {list(DEFAULT_N_PLAYERS)}.')  # noqa
+@click.option('-r', '--repeat', default=3, help='The number of timed games per number of players. Defaults to 3.')  # noqa
+@click.option('--seed', default=0, help='The random seed of the first game. Defaults to 0.')  # noqa
+@click.option('-o', '--output', default='', help='The file to save the results as JSON. Defaults to "".')  # noqa
+@click.option('--baseline', default=DEFAULT_BASELINE, help=f'The baseline JSON file. Defaults to "{DEFAULT_BASELINE}".')  # noqa
+@click.option('--max-regression', default=0.25, help='The allowed relative regression against the baseline. Defaults to 0.25.')  # noqa
+@click.option('--optimize-graph', is_flag=True, help='Optimize the game graph, i.e. flatten the subgraphs and remove the no-op nodes.')  # noqa
+@click.option('--fast', is_flag=True, help='Run the games in the fast mode without the runtime validation of the models built internally.')  # noqa
+@click.option('--echo', is_flag=True, help='Add the echo nodes displaying nothing, as the game without the headless mode.')  # noqa
+@click.option('--replay', multiple=True, help='The replay logs recorded with `--replay-log` of the game CLI. The recorded games are replayed without any LLM instead of the scripted games and the benchmark fails if a replay diverges.')  # noqa
+@click.option('--update-baseline', is_flag=True, help='Overwrite the baseline of the same settings with the results instead of comparing them.')  # noqa
+def cli(
+    n_players: tuple[int, ...],
+    repeat: int,
+    seed: int,
+    output: str,
+    baseline: str,
+    max_regression: float,
+    optimize_graph: bool,
+    fast: bool,
+    echo: bool,
+    replay: tuple[str, ...],
+    update_baseline: bool,
+) -> None:
+    if replay:
+        replay_results: list[ReplayBenchmarkResult] = []
+        for path in replay:
+            click.echo(f'Replaying {path} {repeat} times...', err=True)
+            replay_results.append(benchmark_replay(path, repeat=repeat, optimize=optimize_graph, fast=fast, echo=echo))  # noqa
+        click.echo(_format_replay_table(replay_results))
+        if output:
+            with open(output, 'w') as f:
+                json.dump({
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'replays': [result.model_dump() for result in replay_results],  # noqa
+                }, f, indent=4)
+        if any(result.divergences for result in replay_results):
+            click.echo('The replays diverged from the recorded games.', err=True)  # noqa
+            sys.exit(1)
+        return
+    results: list[GameBenchmarkResult] = []
+    for n in n_players:
+        click.echo(f'Running {repeat} games with {n} players...', err=True)
+        results.append(benchmark_game(n, repeat=repeat, seed=seed, optimize=optimize_graph, fast=fast, echo=echo))  # noqa
+    click.echo(_format_table(results))
+
+    dumped = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [result.model_dump() for result in results],
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(dumped, f, indent=4)
+    try:
+        with open(baseline) as f:
+            baseline_results = [GameBenchmarkResult(**result) for result in json.load(f)['results']]  # noqa
+    except FileNotFoundError:
+        baseline_results = []
+    if update_baseline:
+        # NOTE: the baselines of the other settings are kept
+        settings = {result.settings for result in results}
+        merged = sorted(
+            [result for result in baseline_results if result.settings not in settings] + results,  # noqa
+            key=lambda result: result.settings,
+        )
+        with open(baseline, 'w') as f:
+            json.dump(dumped | {'results': [result.model_dump() for result in merged]}, f, indent=4)  # noqa
+        click.echo(f'Updated the baseline: {baseline}', err=True)
+        return
+    if not baseline_results:
+        click.echo(f'No baseline found: {baseline}', err=True)
+        return
+    baseline_settings = {result.settings for result in baseline_results}
+    for result in results:
+        if result.settings not in baseline_settings:
+            click.echo(f'No baseline with the same settings: n_players={result.n_players} seed={result.seed} optimize={result.optimize} fast={result.fast} echo={result.echo}', err=True)  # noqa
+    if all(result.settings not in baseline_settings for result in results):
+        return
+    regressions = compare_with_baseline(results, baseline_results, max_regression)  # noqa
+    if regressions:
+        click.echo('Regressions against the baseline:', err=True)
+        for regression in regressions:
+            click.echo(f'  {regression}', err=True)
+        sys.exit(1)
+    click.echo('No regression against the baseline.', err=True)
+
+
+if __name__ == '__main__':
+    cli()
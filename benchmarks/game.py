@@ -0,0 +1,238 @@
+from collections import defaultdict
+from datetime import datetime
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any
+from pydantic import BaseModel, Field
+from langchain_werewolf.enums import ESystemOutputType
+from langchain_werewolf.game.main import create_game_graph
+from langchain_werewolf.models.general import fast_mode
+from langchain_werewolf.models.state import StateModel
+from langchain_werewolf.rng import GameRandom
+from langchain_werewolf.setup import create_echo_runnable
+from .players import create_scripted_players, create_scripted_runnable
+
+# const
+RECURSION_LIMIT: int = 100000
+
+
+class GameBenchmarkResult(BaseModel):
+    n_players: int = Field(..., title="the number of players")
+    n_games: int = Field(..., title="the number of timed games")
+    n_days: float = Field(..., title="the mean number of days per game")
+    game_seconds: float = Field(..., title="the median wall time per game")
+    day_seconds: float = Field(..., title="the median wall time per day")
+    node_seconds: dict[str, float] = Field(default_factory=dict, title="the mean wall time per call of each top-level node")  # noqa
+    node_calls: dict[str, float] = Field(default_factory=dict, title="the mean number of calls per game of each top-level node")  # noqa
+    peak_memory_bytes: int = Field(..., title="the peak memory traced by tracemalloc during one game")  # noqa
+    allocated_blocks: int = Field(..., title="the number of memory blocks allocated during one game and still alive at its end")  # noqa
+    gc_collections: int = Field(..., title="the number of garbage collections during one game, a proxy of the object allocations")  # noqa
+    supersteps_per_day: float = Field(default=0.0, title="the number of the supersteps per day including the supersteps of the subgraphs")  # noqa
+    seed: int = Field(default=0, title="the random seed of the first game")
+    optimize: bool = Field(default=False, title="whether the game graph is optimized")  # noqa
+    fast: bool = Field(default=False, title="whether the games run in the fast mode")  # noqa
+    echo: bool = Field(default=False, title="whether the game graph has the echo nodes")  # noqa
+
+    @property
+    def settings(self) -> tuple[int, int, bool, bool, bool]:
+        """The settings of the benchmark which the results are comparable only when they are the same"""  # noqa
+        return (self.n_players, self.seed, self.optimize, self.fast, self.echo)
+
+
+def _create_workflow(
+    n_players: int,
+    seed: int = 0,
+    optimize: bool = False,
+    fast: bool = False,
+    echo: bool = False,
+) -> tuple[Any, list[str]]:
+    players = create_scripted_players(n_players, seed=seed)
+    workflow = create_game_graph(
+        players,
+        vote_kwargs={'chat_model': create_scripted_runnable(seed)},
+        optimize=optimize,
+        validation=not fast,
+        rng=GameRandom(seed),
+        # NOTE: the same echo as the game with the system output off
+        echo=create_echo_runnable(lambda _: None, ESystemOutputType.off, players) if echo else None,  # noqa
+    )
+    return workflow, [player.name for player in players]
+
+
+def run_game(
+    n_players: int,
+    seed: int = 0,
+    optimize: bool = False,
+    fast: bool = False,
+    echo: bool = False,
+) -> tuple[StateModel, float, dict[str, list[float]]]:
+    """Run a game with scripted players
+
+    Args:
+        n_players (int): the number of players
+        seed (int, optional): the random seed. Defaults to 0.
+        optimize (bool, optional): whether the game graph is optimized. Defaults to False.
+        fast (bool, optional): whether the game runs in the fast mode without the runtime validation. Defaults to False.
+        echo (bool, optional): whether the game graph has the echo nodes displaying nothing, as the game without the headless mode. Defaults to False.
+
+    Returns:
+        tuple[StateModel, float, dict[str, list[float]]]: the final state, the wall time and the wall times of each top-level node
+    """  # noqa
+    workflow, names = _create_workflow(n_players, seed=seed, optimize=optimize, fast=fast, echo=echo)  # noqa
+    started: dict[str, datetime] = {}
+    node_seconds: dict[str, list[float]] = defaultdict(list)
+    values: dict[str, Any] = {}
+    event: Any
+    start = time.perf_counter()
+    # NOTE: the debug events have the timestamps when each task starts and finishes  # noqa
+    with fast_mode(fast):
+        for mode, event in workflow.stream(
+            StateModel(alive_players_names=names),
+            config={'recursion_limit': RECURSION_LIMIT},
+            stream_mode=['debug', 'values'],
+        ):
+            if mode == 'values':
+                values = event
+            elif event['type'] == 'task':
+                started[event['payload']['id']] = datetime.fromisoformat(event['timestamp'])  # noqa
+            elif event['type'] == 'task_result':
+                node_seconds[event['payload']['name']].append(
+                    (datetime.fromisoformat(event['timestamp']) - started.pop(event['payload']['id'])).total_seconds()  # noqa
+                )
+    elapsed = time.perf_counter() - start
+    return StateModel(**values), elapsed, dict(node_seconds)
+
+
+def count_supersteps(
+    n_players: int,
+    seed: int = 0,
+    optimize: bool = False,
+    fast: bool = False,
+    echo: bool = False,
+) -> tuple[int, int]:
+    """Count the supersteps of a game including the supersteps of the subgraphs
+
+    Args:
+        n_players (int): the number of players
+        seed (int, optional): the random seed. Defaults to 0.
+        optimize (bool, optional): whether the game graph is optimized. Defaults to False.
+        fast (bool, optional): whether the game runs in the fast mode without the runtime validation. Defaults to False.
+        echo (bool, optional): whether the game graph has the echo nodes displaying nothing, as the game without the headless mode. Defaults to False.
+
+    Returns:
+        tuple[int, int]: the number of the supersteps and the number of the days
+    """  # noqa
+    workflow, names = _create_workflow(n_players, seed=seed, optimize=optimize, fast=fast, echo=echo)  # noqa
+    steps: set[tuple[tuple[str, ...], int]] = set()
+    values: dict[str, Any] = {}
+    namespace: tuple[str, ...]
+    event: Any
+    # NOTE: each graph, i.e. the game graph or a run of a subgraph, has its own namespace  # noqa
+    with fast_mode(fast):
+        for namespace, mode, event in workflow.stream(
+            StateModel(alive_players_names=names),
+            config={'recursion_limit': RECURSION_LIMIT},
+            stream_mode=['debug', 'values'],
+            subgraphs=True,
+        ):
+            if mode == 'values' and not namespace:
+                values = event
+            elif mode == 'debug' and event['type'] == 'task':
+                steps.add((namespace, event['step']))
+    return len(steps), StateModel(**values).day
+
+
+def measure_memory(
+    n_players: int,
+    seed: int = 0,
+    optimize: bool = False,
+    fast: bool = False,
+    echo: bool = False,
+) -> tuple[int, int, int]:
+    """Measure the memory usage of a game
+
+    Args:
+        n_players (int): the number of players
+        seed (int, optional): the random seed. Defaults to 0.
+        optimize (bool, optional): whether the game graph is optimized. Defaults to False.
+        fast (bool, optional): whether the game runs in the fast mode without the runtime validation. Defaults to False.
+        echo (bool, optional): whether the game graph has the echo nodes displaying nothing, as the game without the headless mode. Defaults to False.
+
+    Returns:
+        tuple[int, int, int]: the peak traced memory in bytes, the number of the allocated blocks alive at the end and the number of garbage collections
+    """  # noqa
+    gc.collect()
+    n_collections = sum(stats['collections'] for stats in gc.get_stats())
+    n_blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        # NOTE: the state is kept alive until the blocks are counted
+        state, _, _ = run_game(n_players, seed=seed, optimize=optimize, fast=fast, echo=echo)  # noqa
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    allocated_blocks = sys.getallocatedblocks() - n_blocks
+    del state
+    return (
+        peak,
+        allocated_blocks,
+        sum(stats['collections'] for stats in gc.get_stats()) - n_collections,
+    )
+
+
+def benchmark_game(
+    n_players: int,
+    repeat: int = 3,
+    seed: int = 0,
+    optimize: bool = False,
+    fast: bool = False,
+    echo: bool = False,
+) -> GameBenchmarkResult:
+    """Benchmark the game engine with scripted players
+
+    Note: the wall times are measured without tracemalloc and the memory is measured in a separate game with the same seed.
+
+    Args:
+        n_players (int): the number of players
+        repeat (int, optional): the number of timed games. Defaults to 3.
+        seed (int, optional): the random seed of the first game. Defaults to 0.
+        optimize (bool, optional): whether the game graph is optimized. Defaults to False.
+        fast (bool, optional): whether the game runs in the fast mode without the runtime validation. Defaults to False.
+        echo (bool, optional): whether the game graph has the echo nodes displaying nothing, as the game without the headless mode. Defaults to False.
+
+    Returns:
+        GameBenchmarkResult: the result
+    """  # noqa
+    game_seconds: list[float] = []
+    day_seconds: list[float] = []
+    n_days: list[int] = []
+    node_seconds: dict[str, list[float]] = defaultdict(list)
+    for i in range(repeat):
+        state, elapsed, seconds = run_game(n_players, seed=seed + i, optimize=optimize, fast=fast, echo=echo)  # noqa
+        game_seconds.append(elapsed)
+        day_seconds.append(elapsed / max(state.day, 1))
+        n_days.append(state.day)
+        for name, values in seconds.items():
+            node_seconds[name].extend(values)
+    peak_memory_bytes, allocated_blocks, gc_collections = measure_memory(n_players, seed=seed, optimize=optimize, fast=fast, echo=echo)  # noqa
+    n_supersteps, n_supersteps_days = count_supersteps(n_players, seed=seed, optimize=optimize, fast=fast, echo=echo)  # noqa
+    return GameBenchmarkResult(
+        n_players=n_players,
+        n_games=repeat,
+        n_days=statistics.mean(n_days),
+        game_seconds=statistics.median(game_seconds),
+        day_seconds=statistics.median(day_seconds),
+        node_seconds={name: statistics.mean(values) for name, values in sorted(node_seconds.items())},  # noqa
+        node_calls={name: len(values) / repeat for name, values in sorted(node_seconds.items())},  # noqa
+        peak_memory_bytes=peak_memory_bytes,
+        allocated_blocks=allocated_blocks,
+        gc_collections=gc_collections,
+        supersteps_per_day=n_supersteps / max(n_supersteps_days, 1),
+        seed=seed,
+        optimize=optimize,
+        fast=fast,
+        echo=echo,
+    )
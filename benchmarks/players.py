@@ -0,0 +1,72 @@
+import random
+import re
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_werewolf.game_players import (
+    BaseGamePlayerRole,
+    PlayerRoleRegistry,
+    PlayerSideRegistry,
+    generate_game_player_runnable,
+)
+from langchain_werewolf.game_players.player_roles import (
+    FortuneTeller,
+    Knight,
+    Villager,
+    Werewolf,
+)
+
+PlayerRoleRegistry.initialize()
+PlayerSideRegistry.initialize()
+
+# const
+PLAYER_NAME_TEMPLATE: str = 'Player{i}'
+_PLAYER_NAME_PATTERN: re.Pattern = re.compile(r'Player\d+')
+
+
+def create_scripted_runnable(seed: int) -> Runnable[str, str]:
+    """Create a zero-latency runnable which answers one of the player names in the prompt
+
+    The answer depends only on the seed and the prompt, so the runnable shared by the players, e.g. the vote extractor,
+    answers the same even if the players call it concurrently in a different order.
+
+    Args:
+        seed (int): the random seed
+
+    Returns:
+        Runnable[str, str]: the runnable
+    """  # noqa
+
+    def answer(prompt: str) -> str:
+        names = sorted(set(_PLAYER_NAME_PATTERN.findall(prompt)))
+        # NOTE: a string seed is hashed by SHA-512, which does not depend on PYTHONHASHSEED  # noqa
+        return random.Random(f'{seed}/{prompt}').choice(names) if names else PLAYER_NAME_TEMPLATE.format(i=0)  # noqa
+
+    return RunnableLambda(answer).with_types(input_type=str, output_type=str)
+
+
+def create_scripted_players(
+    n_players: int,
+    seed: int = 0,
+) -> list[BaseGamePlayerRole]:
+    """Create the players who answer with create_scripted_runnable
+
+    Note: a quarter of the players are werewolves and there are one knight and one fortune teller.
+
+    Args:
+        n_players (int): the number of players. It should be 4 or more.
+        seed (int, optional): the random seed. Defaults to 0.
+
+    Returns:
+        list[BaseGamePlayerRole]: the players
+    """  # noqa
+    rng = random.Random(seed)
+    roles = [Werewolf.role] * max(1, n_players // 4) + [Knight.role, FortuneTeller.role]  # noqa
+    roles += [Villager.role] * (n_players - len(roles))
+    rng.shuffle(roles)
+    return [
+        PlayerRoleRegistry.create_player(
+            key=role,
+            name=PLAYER_NAME_TEMPLATE.format(i=i),
+            runnable=generate_game_player_runnable(create_scripted_runnable(seed + i)),  # noqa
+        )
+        for i, role in enumerate(roles)
+    ]
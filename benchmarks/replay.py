@@ -0,0 +1,61 @@
+import statistics
+from pydantic import BaseModel, Field
+from langchain_werewolf.enums import ESystemOutputType
+from langchain_werewolf.replay import load_replay_log, replay_game
+from langchain_werewolf.setup import create_echo_runnable
+from .game import RECURSION_LIMIT
+
+
+class ReplayBenchmarkResult(BaseModel):
+    path: str = Field(..., title="the replay log")
+    n_players: int = Field(..., title="the number of players")
+    n_games: int = Field(..., title="the number of timed replays")
+    n_days: int = Field(..., title="the number of days of the recorded game")
+    game_seconds: float = Field(..., title="the median wall time per replay")
+    games_per_minute: float = Field(..., title="the number of replays per minute at the median wall time")  # noqa
+    divergences: int = Field(..., title="the number of divergences from the recorded game in all replays")  # noqa
+
+
+def benchmark_replay(
+    path: str,
+    repeat: int = 3,
+    optimize: bool = False,
+    fast: bool = False,
+    echo: bool = False,
+) -> ReplayBenchmarkResult:
+    """Benchmark the game engine by replaying a recorded game without any LLM
+
+    Args:
+        path (str): the replay log recorded with `--replay-log`
+        repeat (int, optional): the number of timed replays. Defaults to 3.
+        optimize (bool, optional): whether the game graph is optimized. Defaults to False.
+        fast (bool, optional): whether the replay runs in the fast mode without the runtime validation. Defaults to False.
+        echo (bool, optional): whether the game graph has the echo nodes displaying nothing, as the game without the headless mode. Defaults to False.
+
+    Returns:
+        ReplayBenchmarkResult: the result
+    """  # noqa
+    log = load_replay_log(path)
+    game_seconds: list[float] = []
+    n_divergences = 0
+    for _ in range(repeat):
+        result = replay_game(
+            log,
+            optimize=optimize,
+            fast=fast,
+            # NOTE: the echo displaying nothing as in `run_game`
+            echo=create_echo_runnable(lambda _: None, ESystemOutputType.off, []) if echo else None,  # noqa
+            recursion_limit=RECURSION_LIMIT,
+        )
+        game_seconds.append(result.seconds)
+        n_divergences += len(result.divergences)
+    median = statistics.median(game_seconds)
+    return ReplayBenchmarkResult(
+        path=path,
+        n_players=len(log.players),
+        n_games=repeat,
+        n_days=log.state.day if log.state is not None else 0,
+        game_seconds=median,
+        games_per_minute=60 / median if median > 0 else 0.0,
+        divergences=n_divergences,
+    )
@@ -0,0 +1,437 @@
+from typing import Literal
+import warnings
+import numpy as np
+from pydantic import BaseModel, Field
+from .archive import NULL_CODE, GameArchive
+from .enums import EResult, ETimeSpan
+from .game_players import PlayerRoleRegistry, PlayerSideRegistry, WEREWOLF_SIDE
+
+PlayerRoleRegistry.initialize()
+PlayerSideRegistry.initialize()
+
+# const
+ALL_GROUP: str = 'all'
+_BOOTSTRAP_BATCH_SIZE: int = 100
+
+GroupBy = Literal['role', 'model']
+
+
+class MetricEstimate(BaseModel):
+    value: float = Field(..., title="the point estimate. NaN if no sample")
+    lower: float | None = Field(default=None, title="the lower bound of the bootstrap confidence interval")  # noqa
+    upper: float | None = Field(default=None, title="the upper bound of the bootstrap confidence interval")  # noqa
+    n: int = Field(..., title="the number of samples, e.g. players or votes")
+
+
+def create_vote_tensor(
+    archive: GameArchive,
+    timespan: ETimeSpan = ETimeSpan.day,
+) -> np.ndarray:
+    """Create the integer-encoded vote tensor of an archive
+
+    Args:
+        archive (GameArchive): the archive
+        timespan (ETimeSpan, optional): the timespan of the votes. Defaults to ETimeSpan.day.
+
+    Returns:
+        np.ndarray: the tensor of the shape (game, day, voter) whose values are the player codes of the targets. NULL_CODE if no vote. The day axis starts from the day 1.
+    """  # noqa
+    votes = archive['votes']
+    selected = votes['timespan'] == archive.encode('timespan', timespan.value)  # noqa
+    tensor = np.full(
+        (len(archive), _count_days(archive), len(archive.dictionaries['player'])),  # noqa
+        NULL_CODE,
+        dtype=np.int32,
+    )
+    tensor[
+        votes['game'][selected],
+        votes['day'][selected] - 1,
+        votes['voter'][selected],
+    ] = votes['target'][selected]
+    return tensor
+
+
+def create_elimination_matrix(
+    archive: GameArchive,
+    timespan: ETimeSpan = ETimeSpan.day,
+) -> np.ndarray:
+    """Create the integer-encoded elimination matrix of an archive
+
+    Args:
+        archive (GameArchive): the archive
+        timespan (ETimeSpan, optional): the timespan of the eliminations. Defaults to ETimeSpan.day.
+
+    Returns:
+        np.ndarray: the matrix of the shape (game, day) whose values are the player codes of the eliminated players. NULL_CODE if no one was eliminated.
+    """  # noqa
+    eliminations = archive['eliminations']
+    selected = eliminations['timespan'] == archive.encode('timespan', timespan.value)  # noqa
+    matrix = np.full((len(archive), _count_days(archive)), NULL_CODE, dtype=np.int32)  # noqa
+    matrix[
+        eliminations['game'][selected],
+        eliminations['day'][selected] - 1,
+    ] = eliminations['player'][selected]
+    return matrix
+
+
+def _count_days(archive: GameArchive) -> int:
+    return int(max(
+        archive['games']['n_days'].max(initial=0),
+        archive['votes']['day'].max(initial=0),
+        archive['eliminations']['day'].max(initial=0),
+    ))
+
+
+def _create_player_matrix(archive: GameArchive, column: str) -> np.ndarray:
+    # NOTE: the shape is (game, player) and NULL_CODE means the player did not join the game  # noqa
+    players = archive['players']
+    matrix = np.full((len(archive), len(archive.dictionaries['player'])), NULL_CODE, dtype=np.int32)  # noqa
+    matrix[players['game'], players['player']] = players[column]
+    return matrix
+
+
+def _is_werewolf_side(roles: np.ndarray) -> np.ndarray:
+    # NOTE: the last element corresponds to NULL_CODE
+    return np.asarray(
+        [PlayerRoleRegistry.get_class(role).side == WEREWOLF_SIDE for role in roles.tolist()] + [False],  # type: ignore # noqa
+        dtype=bool,
+    )
+
+
+def _count_by_group(
+    games: np.ndarray,
+    groups: np.ndarray,
+    weights: np.ndarray,
+    n_games: int,
+    n_groups: int,
+) -> np.ndarray:
+    valid = groups != NULL_CODE
+    return np.bincount(
+        games[valid] * n_groups + groups[valid],
+        weights=weights[valid],
+        minlength=n_games * n_groups,
+    ).reshape(n_games, n_groups)
+
+
+class _RatioCounts:
+    """Per-game numerators and denominators of a ratio metric by group"""
+
+    def __init__(self) -> None:
+        self.labels: list[str] = []
+        self._chunks: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def add(
+        self,
+        labels: np.ndarray,
+        numerators: np.ndarray,
+        denominators: np.ndarray,
+    ) -> None:
+        indices = {label: i for i, label in enumerate(self.labels)}
+        for label in labels.tolist():
+            if label not in indices:
+                indices[label] = len(self.labels)
+                self.labels.append(label)
+        columns = np.asarray([indices[label] for label in labels.tolist()], dtype=np.int64)  # noqa
+        self._chunks.append((columns, numerators, denominators))
+
+    def collect(self) -> tuple[np.ndarray, np.ndarray]:
+        # NOTE: the shape is (game, group)
+        n_games = sum(numerators.shape[0] for _, numerators, _ in self._chunks)  # noqa
+        numerators = np.zeros((n_games, len(self.labels)))
+        denominators = np.zeros((n_games, len(self.labels)))
+        offset = 0
+        for columns, chunk_numerators, chunk_denominators in self._chunks:
+            rows = slice(offset, offset + chunk_numerators.shape[0])
+            numerators[rows, columns] = chunk_numerators
+            denominators[rows, columns] = chunk_denominators
+            offset += chunk_numerators.shape[0]
+        return numerators, denominators
+
+
+def _ratio(numerators: np.ndarray, denominators: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominators > 0, numerators / denominators, np.nan)
+
+
+def _bootstrap_ratio(
+    numerators: np.ndarray,
+    denominators: np.ndarray,
+    n_resamples: int,
+    confidence: float,
+    seed: int | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # NOTE: games are resampled with replacement and the resampled counts are
+    #       computed as a product of the resampling weights and the per-game counts  # noqa
+    rng = np.random.default_rng(seed)
+    n_games = numerators.shape[0]
+    ratios: list[np.ndarray] = []
+    for start in range(0, n_resamples, _BOOTSTRAP_BATCH_SIZE):
+        size = min(_BOOTSTRAP_BATCH_SIZE, n_resamples - start)
+        weights = rng.multinomial(n_games, np.full(n_games, 1 / n_games), size=size)  # noqa
+        ratios.append(_ratio(weights @ numerators, weights @ denominators))
+    alpha = 1 - confidence
+    with warnings.catch_warnings():
+        # NOTE: the resamples without any sample are ignored
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lower, upper = np.nanquantile(np.concatenate(ratios), [alpha / 2, 1 - alpha / 2], axis=0)  # noqa
+    return lower, upper
+
+
+class GameStatistics:
+    """Batch statistics of archived games
+
+    The per-game counts are computed with vectorised operations when an archive is added,
+    so that new games can be added incrementally and the metrics are aggregated without Python loops over games.
+    """  # noqa
+
+    def __init__(self) -> None:
+        self.n_games: int = 0
+        self._counts: dict[tuple[str, str], _RatioCounts] = {}
+        self._survival: dict[str, list[tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}  # noqa
+
+    def update(self, archive: GameArchive) -> 'GameStatistics':
+        """Add the games of an archive
+
+        Args:
+            archive (GameArchive): the archive
+
+        Returns:
+            GameStatistics: self
+        """
+        if len(archive) == 0:
+            return self
+        n_games = len(archive)
+        players = archive['players']
+        is_werewolf_side = _is_werewolf_side(archive.dictionaries['role'])
+        roles = _create_player_matrix(archive, 'role')
+        is_werewolf = is_werewolf_side[roles]
+        is_villager = (roles != NULL_CODE) & ~is_werewolf
+        games_index = np.arange(n_games)
+
+        # the daytime votes
+        votes = create_vote_tensor(archive, ETimeSpan.day)
+        eliminations = create_elimination_matrix(archive, ETimeSpan.day)
+        voted = votes != NULL_CODE
+        targets = np.where(voted, votes, 0)
+        target_is_werewolf = is_werewolf[games_index[:, None, None], targets] & voted  # noqa
+        voter_is_villager = np.broadcast_to(is_villager[:, None, :], votes.shape) & voted  # noqa
+        target_is_eliminated = (votes == eliminations[:, :, None]) & voted
+        decided = voted & (eliminations != NULL_CODE)[:, :, None]
+
+        # the results
+        results = archive['games']['result']
+        winners_are_werewolves = results == archive.encode('result', EResult.WerewolvesWin.value)  # noqa
+        finished = results != archive.encode('result', 'None')
+        player_is_werewolf = is_werewolf[players['game'], players['player']]
+        won = (player_is_werewolf == winners_are_werewolves[players['game']]) & finished[players['game']]  # noqa
+        has_role = (players['role'] != NULL_CODE) & finished[players['game']]
+
+        for by in ('role', 'model'):
+            labels = archive.dictionaries[by]
+            groups = _create_player_matrix(archive, by)
+            voter_groups = np.broadcast_to(groups[:, None, :], votes.shape)
+            self._add_counts(
+                'win_rate', by, labels,
+                *[
+                    _count_by_group(players['game'], np.where(has_role, players[by], NULL_CODE), weights, n_games, len(labels))  # noqa
+                    for weights in (won.astype(float), has_role.astype(float))  # noqa
+                ],
+            )
+            self._add_counts(
+                'vote_accuracy', by, labels,
+                *[
+                    _count_by_group(np.broadcast_to(games_index[:, None, None], votes.shape).ravel(), np.where(voter_is_villager, voter_groups, NULL_CODE).ravel(), weights.ravel().astype(float), n_games, len(labels))  # noqa
+                    for weights in (target_is_werewolf, voter_is_villager)
+                ],
+            )
+            self._add_counts(
+                'vote_consistency', by, labels,
+                *[
+                    _count_by_group(np.broadcast_to(games_index[:, None, None], votes.shape).ravel(), np.where(decided, voter_groups, NULL_CODE).ravel(), weights.ravel().astype(float), n_games, len(labels))  # noqa
+                    for weights in (target_is_eliminated, decided)
+                ],
+            )
+            self._add_survival(archive, by, labels, n_games)
+
+        # the first elimination
+        has_elimination = (eliminations != NULL_CODE).any(axis=1)
+        first = (
+            eliminations[games_index, np.argmax(eliminations != NULL_CODE, axis=1)]  # noqa
+            if eliminations.shape[1] else
+            np.full(n_games, NULL_CODE)
+        )
+        first_is_werewolf = is_werewolf[games_index, np.where(has_elimination, first, 0)] & has_elimination  # noqa
+        self._add_counts(
+            'first_elimination_accuracy', ALL_GROUP, np.asarray([ALL_GROUP]),
+            first_is_werewolf.astype(float)[:, None],
+            has_elimination.astype(float)[:, None],
+        )
+        self.n_games += n_games
+        return self
+
+    def _add_counts(
+        self,
+        metric: str,
+        by: str,
+        labels: np.ndarray,
+        numerators: np.ndarray,
+        denominators: np.ndarray,
+    ) -> None:
+        self._counts.setdefault((metric, by), _RatioCounts()).add(labels, numerators, denominators)  # noqa
+
+    def _add_survival(
+        self,
+        archive: GameArchive,
+        by: str,
+        labels: np.ndarray,
+        n_games: int,
+    ) -> None:
+        # NOTE: the players who survived are censored at the last day
+        players = archive['players']
+        eliminated = players['eliminated_day'] != NULL_CODE
+        exit_days = np.where(eliminated, players['eliminated_day'], archive['games']['n_days'][players['game']])  # noqa
+        n_days = _count_days(archive) + 1
+        valid = players[by] != NULL_CODE
+        events = np.zeros((n_games, len(labels), n_days))
+        exits = np.zeros((n_games, len(labels), n_days))
+        np.add.at(events, (players['game'][valid & eliminated], players[by][valid & eliminated], exit_days[valid & eliminated]), 1)  # noqa
+        np.add.at(exits, (players['game'][valid], players[by][valid], exit_days[valid]), 1)  # noqa
+        # NOTE: the players at risk on a day are those who exit on the day or later  # noqa
+        at_risk = np.flip(np.cumsum(np.flip(exits, axis=2), axis=2), axis=2)
+        self._survival.setdefault(by, []).append((labels, events, at_risk))
+
+    def _estimate(
+        self,
+        metric: str,
+        by: str,
+        n_resamples: int,
+        confidence: float,
+        seed: int | None,
+    ) -> dict[str, MetricEstimate]:
+        counts = self._counts.get((metric, by))
+        if counts is None:
+            return {}
+        numerators, denominators = counts.collect()
+        values = _ratio(numerators.sum(axis=0), denominators.sum(axis=0))
+        lower: list[float | None] = [None] * len(counts.labels)
+        upper: list[float | None] = [None] * len(counts.labels)
+        if n_resamples > 0:
+            lower_, upper_ = _bootstrap_ratio(numerators, denominators, n_resamples, confidence, seed)  # noqa
+            lower, upper = lower_.tolist(), upper_.tolist()
+        return {
+            label: MetricEstimate(value=value, lower=low, upper=high, n=int(n))
+            for label, value, low, high, n in zip(counts.labels, values.tolist(), lower, upper, denominators.sum(axis=0).tolist())  # noqa
+            if n > 0
+        }
+
+    def win_rate(
+        self,
+        by: GroupBy = 'role',
+        n_resamples: int = 0,
+        confidence: float = 0.95,
+        seed: int | None = None,
+    ) -> dict[str, MetricEstimate]:
+        """The rate of the players who won the game
+
+        Args:
+            by (GroupBy, optional): the group of the players. Defaults to 'role'.
+            n_resamples (int, optional): the number of bootstrap resamples of games. 0 means no confidence interval. Defaults to 0.
+            confidence (float, optional): the confidence level. Defaults to 0.95.
+            seed (int | None, optional): the random seed of the bootstrap. Defaults to None.
+
+        Returns:
+            dict[str, MetricEstimate]: the estimates by group. The groups without any sample are omitted.
+        """  # noqa
+        return self._estimate('win_rate', by, n_resamples, confidence, seed)
+
+    def vote_accuracy(
+        self,
+        by: GroupBy = 'role',
+        n_resamples: int = 0,
+        confidence: float = 0.95,
+        seed: int | None = None,
+    ) -> dict[str, MetricEstimate]:
+        """The rate of the daytime votes of the villager side for werewolves
+
+        Args:
+            by (GroupBy, optional): the group of the voters. Defaults to 'role'.
+            n_resamples (int, optional): the number of bootstrap resamples of games. 0 means no confidence interval. Defaults to 0.
+            confidence (float, optional): the confidence level. Defaults to 0.95.
+            seed (int | None, optional): the random seed of the bootstrap. Defaults to None.
+
+        Returns:
+            dict[str, MetricEstimate]: the estimates by group. The groups without any sample are omitted.
+        """  # noqa
+        return self._estimate('vote_accuracy', by, n_resamples, confidence, seed)  # noqa
+
+    def vote_consistency(
+        self,
+        by: GroupBy = 'role',
+        n_resamples: int = 0,
+        confidence: float = 0.95,
+        seed: int | None = None,
+    ) -> dict[str, MetricEstimate]:
+        """The rate of the daytime votes for the player eliminated by the vote
+
+        Args:
+            by (GroupBy, optional): the group of the voters. Defaults to 'role'.
+            n_resamples (int, optional): the number of bootstrap resamples of games. 0 means no confidence interval. Defaults to 0.
+            confidence (float, optional): the confidence level. Defaults to 0.95.
+            seed (int | None, optional): the random seed of the bootstrap. Defaults to None.
+
+        Returns:
+            dict[str, MetricEstimate]: the estimates by group. The groups without any sample are omitted.
+        """  # noqa
+        return self._estimate('vote_consistency', by, n_resamples, confidence, seed)  # noqa
+
+    def first_elimination_accuracy(
+        self,
+        n_resamples: int = 0,
+        confidence: float = 0.95,
+        seed: int | None = None,
+    ) -> MetricEstimate | None:
+        """The rate of the games where the first player eliminated by the daytime vote is on the werewolf side
+
+        Args:
+            n_resamples (int, optional): the number of bootstrap resamples of games. 0 means no confidence interval. Defaults to 0.
+            confidence (float, optional): the confidence level. Defaults to 0.95.
+            seed (int | None, optional): the random seed of the bootstrap. Defaults to None.
+
+        Returns:
+            MetricEstimate | None: the estimate. None if no game is added.
+        """  # noqa
+        return self._estimate('first_elimination_accuracy', ALL_GROUP, n_resamples, confidence, seed).get(ALL_GROUP)  # noqa
+
+    def survival_curve(self, by: GroupBy = 'role') -> dict[str, np.ndarray]:
+        """The Kaplan-Meier survival curves of the players
+
+        Args:
+            by (GroupBy, optional): the group of the players. Defaults to 'role'.
+
+        Returns:
+            dict[str, np.ndarray]: the survival probabilities by group. The i-th value is the probability of surviving the day i.
+        """  # noqa
+        chunks = self._survival.get(by, [])
+        n_days = max((events.shape[2] for _, events, _ in chunks), default=0)
+        events_by_label: dict[str, np.ndarray] = {}
+        at_risk_by_label: dict[str, np.ndarray] = {}
+        for labels, events, at_risk in chunks:
+            for i, label in enumerate(labels.tolist()):
+                events_by_label.setdefault(label, np.zeros(n_days))[:events.shape[2]] += events[:, i].sum(axis=0)  # noqa
+                at_risk_by_label.setdefault(label, np.zeros(n_days))[:at_risk.shape[2]] += at_risk[:, i].sum(axis=0)  # noqa
+        return {
+            label: np.cumprod(1 - np.nan_to_num(_ratio(events, at_risk_by_label[label])))  # noqa
+            for label, events in events_by_label.items()
+        }
+
+
+def compute_game_statistics(archive: GameArchive) -> GameStatistics:
+    """Compute the statistics of the games in an archive
+
+    Args:
+        archive (GameArchive): the archive
+
+    Returns:
+        GameStatistics: the statistics
+    """
+    return GameStatistics().update(archive)
@@ -0,0 +1,415 @@
+from logging import getLogger, Logger
+import os
+from typing import Any, Iterable, Mapping
+import numpy as np
+import numpy.typing as npt
+from .const import SKIPPED_VOTE
+from .enums import EResult, ETimeSpan
+from .models.state import StateModel
+
+# const
+ARCHIVE_TABLES: tuple[str, ...] = ('games', 'players', 'messages', 'votes', 'eliminations')  # noqa
+# NOTE: the columns encoded with the shared dictionaries. key: column, value: dictionary  # noqa
+DICTIONARY_ENCODED_COLUMNS: dict[str, str] = {
+    'game': 'game',
+    'player': 'player',
+    'voter': 'player',
+    'target': 'player',
+    'sender': 'player',
+    'channel': 'channel',
+    'role': 'role',
+    'model': 'model',
+    'result': 'result',
+    'timespan': 'timespan',
+    'eliminated_timespan': 'timespan',
+}
+NULL_CODE: int = -1
+_RESULT_DICTIONARY: tuple[str, ...] = ('None',) + tuple(result.value for result in EResult)  # noqa
+_TIMESPAN_DICTIONARY: tuple[str, ...] = tuple(timespan.value for timespan in ETimeSpan)  # noqa
+_TEXT_COLUMNS: dict[str, tuple[str, ...]] = {'messages': ('text',)}
+_NPZ_SEPARATOR: str = '/'
+
+
+class _Dictionary:
+    """A dictionary to encode strings into integer codes"""
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: str | None) -> int:
+        if value is None:
+            return NULL_CODE
+        try:
+            return self._codes[value]
+        except KeyError:
+            self._codes[value] = len(self.values)
+            self.values.append(value)
+            return self._codes[value]
+
+
+class GameArchive:
+    """Columnar tables of finished games
+
+    Every table is a dict of equally long NumPy arrays.
+    The columns in DICTIONARY_ENCODED_COLUMNS hold int32 codes into `dictionaries`,
+    where NULL_CODE (-1) means no value, e.g. no one was eliminated.
+    """  # noqa
+
+    def __init__(
+        self,
+        tables: dict[str, dict[str, np.ndarray]],
+        dictionaries: dict[str, np.ndarray],
+    ) -> None:
+        self.tables = tables
+        self.dictionaries = dictionaries
+
+    def __len__(self) -> int:
+        return len(self.dictionaries['game'])
+
+    def __getitem__(self, table: str) -> dict[str, np.ndarray]:
+        return self.tables[table]
+
+    def decode(self, column: str, codes: npt.ArrayLike) -> np.ndarray:
+        """Decode the codes of a dictionary-encoded column
+
+        Args:
+            column (str): the column name, e.g. 'voter'
+            codes (npt.ArrayLike): the codes
+
+        Returns:
+            np.ndarray: the decoded values. None for NULL_CODE.
+        """
+        dictionary = self.dictionaries[DICTIONARY_ENCODED_COLUMNS[column]]
+        codes = np.asarray(codes)
+        values = np.asarray(dictionary.tolist() + [None], dtype=object)
+        # NOTE: NULL_CODE (-1) points to the appended None
+        decoded: np.ndarray = values[codes]
+        return decoded
+
+    def encode(self, column: str, value: str) -> int:
+        """Get the code of a value of a dictionary-encoded column
+
+        Args:
+            column (str): the column name, e.g. 'role'
+            value (str): the value
+
+        Returns:
+            int: the code. NULL_CODE when the value is not found.
+        """
+        dictionary = self.dictionaries[DICTIONARY_ENCODED_COLUMNS[column]]
+        found = np.flatnonzero(dictionary == value)
+        return int(found[0]) if len(found) else NULL_CODE
+
+
+class GameArchiveBuilder:
+    """A builder which flattens the states of finished games into a GameArchive"""  # noqa
+
+    def __init__(self) -> None:
+        self._dictionaries: dict[str, _Dictionary] = {
+            'game': _Dictionary(),
+            'player': _Dictionary(),
+            'channel': _Dictionary(),
+            'role': _Dictionary(),
+            'model': _Dictionary(),
+            'result': _Dictionary(_RESULT_DICTIONARY),
+            'timespan': _Dictionary(_TIMESPAN_DICTIONARY),
+        }
+        self._columns: dict[str, dict[str, list[Any]]] = {
+            'games': {'game': [], 'result': [], 'n_days': [], 'n_players': []},  # noqa
+            'players': {'game': [], 'player': [], 'role': [], 'model': [], 'survived': [], 'eliminated_day': [], 'eliminated_timespan': []},  # noqa
+            'messages': {'game': [], 'channel': [], 'sender': [], 'timestamp': [], 'text': []},  # noqa
+            'votes': {'game': [], 'day': [], 'timespan': [], 'voter': [], 'target': []},  # noqa
+            'eliminations': {'game': [], 'day': [], 'timespan': [], 'player': []},  # noqa
+        }
+
+    def __len__(self) -> int:
+        return len(self._dictionaries['game'].values)
+
+    def add(
+        self,
+        state: StateModel,
+        *,
+        game_id: str | None = None,
+        roles: Mapping[str, str] | None = None,
+        models: Mapping[str, str] | None = None,
+    ) -> int:
+        """Add a finished game
+
+        Args:
+            state (StateModel): the final state of the game
+            game_id (str | None, optional): the id of the game. Defaults to None, which means the index of the game.
+            roles (Mapping[str, str] | None, optional): the roles of the players. key: name, value: role. Defaults to None.
+            models (Mapping[str, str] | None, optional): the models of the players. key: name, value: model. Defaults to None.
+
+        Raises:
+            ValueError: game_id is already added
+
+        Returns:
+            int: the code of the game
+        """  # noqa
+        roles = roles or {}
+        models = models or {}
+        game_id = str(len(self)) if game_id is None else game_id
+        if game_id in self._dictionaries['game']._codes:
+            raise ValueError(f'The game {game_id} is already added.')
+        game = self._dictionaries['game'].encode(game_id)
+        encode_player = self._dictionaries['player'].encode
+        encode_timespan = self._dictionaries['timespan'].encode
+
+        # votes and eliminations
+        # NOTE: the i-th daytime/nighttime vote is held on the day i+1
+        eliminated: dict[str, tuple[int, int]] = {}
+        voters: set[str] = set()
+        for timespan, votes_history, result_history in (
+            (ETimeSpan.day, state.daytime_votes_history, state.daytime_vote_result_history),  # noqa
+            (ETimeSpan.night, state.nighttime_votes_history, state.nighttime_vote_result_history),  # noqa
+        ):
+            timespan_code = encode_timespan(timespan.value)
+            for day, votes in enumerate(votes_history, start=1):
+                for voter, target in votes.value.items():
+                    voters.add(voter)
+                    # NOTE: a skipped vote is recorded as no target
+                    self._append('votes', game=game, day=day, timespan=timespan_code, voter=encode_player(voter), target=encode_player(None if target == SKIPPED_VOTE else target))  # noqa
+            for day, result in enumerate(result_history, start=1):
+                self._append('eliminations', game=game, day=day, timespan=timespan_code, player=encode_player(result.value))  # noqa
+                if result.value is not None:
+                    eliminated[result.value] = (day, timespan_code)
+
+        # players
+        players_names = list(roles) or sorted(
+            set(state.alive_players_names) | set(eliminated) | voters
+        )
+        for name in players_names:
+            day, timespan_code = eliminated.get(name, (NULL_CODE, NULL_CODE))
+            self._append(
+                'players',
+                game=game,
+                player=encode_player(name),
+                role=self._dictionaries['role'].encode(roles.get(name)),
+                model=self._dictionaries['model'].encode(models.get(name)),
+                survived=name in state.alive_players_names,
+                eliminated_day=day,
+                eliminated_timespan=timespan_code,
+            )
+
+        # messages
+        for names, history in state.chat_state.items():
+            channel = self._dictionaries['channel'].encode('|'.join(sorted(names)))  # noqa
+            for message in history.messages:
+                self._append(
+                    'messages',
+                    game=game,
+                    channel=channel,
+                    sender=encode_player(message.value.name),
+                    timestamp=message.value.timestamp,
+                    text=message.value.message,
+                )
+
+        # game
+        self._append(
+            'games',
+            game=game,
+            result=self._dictionaries['result'].encode(state.result.value if state.result else 'None'),  # noqa
+            n_days=state.day,
+            n_players=len(players_names),
+        )
+        return game
+
+    def build(self) -> GameArchive:
+        """Build the archive of the added games
+
+        Returns:
+            GameArchive: the archive
+        """
+        return GameArchive(
+            tables={
+                table: {
+                    column: _to_array(table, column, values)
+                    for column, values in columns.items()
+                }
+                for table, columns in self._columns.items()
+            },
+            dictionaries={
+                key: np.asarray(dictionary.values, dtype=str)
+                for key, dictionary in self._dictionaries.items()
+            },
+        )
+
+    def _append(self, table: str, **values: Any) -> None:
+        columns = self._columns[table]
+        for column, value in values.items():
+            columns[column].append(value)
+
+
+def _to_array(table: str, column: str, values: list[Any]) -> np.ndarray:
+    if column in DICTIONARY_ENCODED_COLUMNS:
+        return np.asarray(values, dtype=np.int32)
+    if column in _TEXT_COLUMNS.get(table, ()):
+        return np.asarray(values, dtype=object)
+    if column == 'timestamp':
+        return np.asarray(values, dtype='datetime64[us]')
+    if column == 'survived':
+        return np.asarray(values, dtype=bool)
+    return np.asarray(values, dtype=np.int32)
+
+
+def create_game_archive(
+    states: Iterable[StateModel],
+    roles: Iterable[Mapping[str, str] | None] | None = None,
+    models: Iterable[Mapping[str, str] | None] | None = None,
+    game_ids: Iterable[str] | None = None,
+) -> GameArchive:
+    """Create the archive of finished games
+
+    Args:
+        states (Iterable[StateModel]): the final states of the games
+        roles (Iterable[Mapping[str, str] | None] | None, optional): the roles of the players of each game. Defaults to None.
+        models (Iterable[Mapping[str, str] | None] | None, optional): the models of the players of each game. Defaults to None.
+        game_ids (Iterable[str] | None, optional): the ids of the games. Defaults to None, which means the indices.
+
+    Returns:
+        GameArchive: the archive
+    """  # noqa
+    states = list(states)
+    builder = GameArchiveBuilder()
+    for state, roles_, models_, game_id in zip(
+        states,
+        roles if roles is not None else [None] * len(states),
+        models if models is not None else [None] * len(states),
+        game_ids if game_ids is not None else [None] * len(states),
+    ):
+        builder.add(state, game_id=game_id, roles=roles_, models=models_)
+    return builder.build()
+
+
+def _import_pyarrow():  # type: ignore
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.parquet  # type: ignore # noqa
+    except ImportError as e:
+        raise ImportError('`pyarrow` is required to read/write the game archive as Parquet. Install it with `pip install pyarrow` or use a path ending with ".npz".') from e  # noqa
+    return pyarrow
+
+
+def _save_npz(archive: GameArchive, path: str) -> None:
+    arrays: dict[str, np.ndarray] = {
+        _NPZ_SEPARATOR.join(('dictionaries', key)): dictionary
+        for key, dictionary in archive.dictionaries.items()
+    }
+    for table, columns in archive.tables.items():
+        for column, values in columns.items():
+            key = _NPZ_SEPARATOR.join(('tables', table, column))
+            if column in _TEXT_COLUMNS.get(table, ()):
+                # NOTE: texts are stored as UTF-8 bytes and offsets like Arrow
+                #       in order to avoid both pickling and fixed-width unicode arrays  # noqa
+                encoded = [text.encode('utf-8') for text in values]
+                arrays[key + '.offsets'] = np.cumsum([0] + [len(text) for text in encoded], dtype=np.int64)  # noqa
+                arrays[key + '.data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)  # noqa
+            else:
+                arrays[key] = values
+    np.savez_compressed(path, **arrays)  # type: ignore
+
+
+def _load_npz(path: str) -> GameArchive:
+    tables: dict[str, dict[str, np.ndarray]] = {table: {} for table in ARCHIVE_TABLES}  # noqa
+    dictionaries: dict[str, np.ndarray] = {}
+    with np.load(path, allow_pickle=False) as npz:
+        for key in npz.files:
+            kind, *names = key.split(_NPZ_SEPARATOR)
+            if kind == 'dictionaries':
+                dictionaries[names[0]] = npz[key]
+            elif key.endswith('.offsets'):
+                table, column = names[0], names[1].removesuffix('.offsets')
+                offsets = npz[key]
+                data = npz[key.removesuffix('.offsets') + '.data'].tobytes()
+                tables[table][column] = np.asarray(
+                    [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])],  # noqa
+                    dtype=object,
+                )
+            elif not key.endswith('.data'):
+                tables[names[0]][names[1]] = npz[key]
+    return GameArchive(tables=tables, dictionaries=dictionaries)
+
+
+def _save_parquet(archive: GameArchive, path: str) -> None:
+    pa = _import_pyarrow()
+    os.makedirs(path, exist_ok=True)
+    for table, columns in archive.tables.items():
+        arrays = {}
+        for column, values in columns.items():
+            if column in DICTIONARY_ENCODED_COLUMNS:
+                dictionary = archive.dictionaries[DICTIONARY_ENCODED_COLUMNS[column]]  # noqa
+                arrays[column] = pa.DictionaryArray.from_arrays(
+                    pa.array(values, mask=values == NULL_CODE),
+                    pa.array(dictionary.tolist(), type=pa.string()),
+                )
+            elif column in _TEXT_COLUMNS.get(table, ()):
+                arrays[column] = pa.array(values.tolist(), type=pa.string())
+            else:
+                arrays[column] = pa.array(values)
+        pa.parquet.write_table(pa.table(arrays), os.path.join(path, f'{table}.parquet'))  # noqa
+
+
+def _load_parquet(path: str) -> GameArchive:
+    pa = _import_pyarrow()
+    arrow_tables = {
+        table: pa.parquet.read_table(os.path.join(path, f'{table}.parquet'))
+        for table in ARCHIVE_TABLES
+    }
+    # NOTE: the dictionaries are rebuilt because parquet does not share them between files  # noqa
+    dictionaries: dict[str, _Dictionary] = {
+        key: _Dictionary(_RESULT_DICTIONARY if key == 'result' else _TIMESPAN_DICTIONARY if key == 'timespan' else ())  # noqa
+        for key in set(DICTIONARY_ENCODED_COLUMNS.values())
+    }
+    tables: dict[str, dict[str, np.ndarray]] = {}
+    for table, arrow_table in arrow_tables.items():
+        tables[table] = {}
+        for column in arrow_table.column_names:
+            values = arrow_table.column(column).to_pylist()
+            if column in DICTIONARY_ENCODED_COLUMNS:
+                encode = dictionaries[DICTIONARY_ENCODED_COLUMNS[column]].encode  # noqa
+                values = [encode(value) for value in values]
+            tables[table][column] = _to_array(table, column, values)
+    return GameArchive(
+        tables=tables,
+        dictionaries={
+            key: np.asarray(dictionary.values, dtype=str)
+            for key, dictionary in dictionaries.items()
+        },
+    )
+
+
+def save_game_archive(
+    archive: GameArchive,
+    path: str,
+    logger: Logger = getLogger(__name__),
+) -> None:
+    """Save a game archive
+
+    Args:
+        archive (GameArchive): the archive
+        path (str): a path ending with ".npz" for a NumPy archive, otherwise a directory for Parquet files of the tables
+        logger (Logger, optional): logger. Defaults to getLogger(__name__).
+    """  # noqa
+    if path.endswith('.npz'):
+        _save_npz(archive, path)
+    else:
+        _save_parquet(archive, path)
+    logger.info(f'Saved {len(archive)} games into {path}.')
+
+
+def load_game_archive(path: str) -> GameArchive:
+    """Load a game archive saved by save_game_archive
+
+    Args:
+        path (str): a path ending with ".npz" or a directory of Parquet files
+
+    Returns:
+        GameArchive: the archive
+    """
+    if path.endswith('.npz'):
+        return _load_npz(path)
+    return _load_parquet(path)
@@ -0,0 +1,333 @@
+from typing import Any, Iterable, Iterator, TypeVar
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from .const import GAME_MASTER_NAME, MODEL_PRICES
+from .enums import EBudgetLevel
+from .game_players.base import BaseGamePlayer, GamePlayerRunnableInputModel
+from .instrumentation import InstrumentationCallbackHandler, estimate_tokens
+from .models.state import TokenUsageModel
+
+# const
+TOTAL_USAGE_KEY: str = 'total'
+DEFAULT_DEGRADE_RATIOS: tuple[float, float, float] = (0.6, 0.75, 0.9)
+DEFAULT_HISTORY_WINDOW_TOKENS: int = 2000
+_OMISSION: str = '\n...\n'
+
+TPlayer = TypeVar('TPlayer', bound=BaseGamePlayer)
+
+
+class TokenBudgetExceededError(Exception):
+    """Raised when a game or a player uses up its token budget"""
+
+
+def estimate_cost(
+    model: str | None,
+    prompt_tokens: int,
+    completion_tokens: int,
+) -> float:
+    """Estimate the cost of an LLM call
+
+    Args:
+        model (str | None): the model name
+        prompt_tokens (int): the number of prompt tokens
+        completion_tokens (int): the number of completion tokens
+
+    Returns:
+        float: the cost in USD. 0 if the price of the model is unknown.
+    """
+    input_price, output_price = MODEL_PRICES.get(model or '', (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000  # noqa
+
+
+class TokenBudget(InstrumentationCallbackHandler):
+    """A callback handler which counts the tokens per player and decides how much the game should degrade.
+
+    The usage reported by the provider is used when available, otherwise it is estimated with a local tokenizer.
+    The calls which are not attributed to any player, e.g. the translations of the echo, are counted as GAME_MASTER_NAME.
+    As the usage approaches the budget, the level goes up
+    from `normal` to `short_history`, `cheap_model`, `no_translation` and finally `exceeded`.
+    """  # noqa
+
+    def __init__(
+        self,
+        player_names: Iterable[str] = tuple(),
+        max_tokens_per_game: int | None = None,
+        max_tokens_per_player: int | None = None,
+        degrade_ratios: tuple[float, float, float] = DEFAULT_DEGRADE_RATIOS,
+        history_window_tokens: int = DEFAULT_HISTORY_WINDOW_TOKENS,
+    ) -> None:
+        """Initialize the budget
+
+        Args:
+            player_names (Iterable[str], optional): the names of the players. Defaults to tuple().
+            max_tokens_per_game (int | None, optional): the maximum number of tokens of a game. None means unlimited. Defaults to None.
+            max_tokens_per_player (int | None, optional): the maximum number of tokens of each player. None means unlimited. Defaults to None.
+            degrade_ratios (tuple[float, float, float], optional): the ratios of the used tokens to the budget to shorten the history, to use the cheaper model and to skip the translation. Defaults to DEFAULT_DEGRADE_RATIOS.
+            history_window_tokens (int, optional): the maximum number of tokens of the system prompt when the history is shortened. Defaults to DEFAULT_HISTORY_WINDOW_TOKENS.
+        """  # noqa
+        super().__init__(player_names)
+        self.max_tokens_per_game = max_tokens_per_game
+        self.max_tokens_per_player = max_tokens_per_player
+        self.degrade_ratios = degrade_ratios
+        self.history_window_tokens = history_window_tokens
+        self._usage: dict[str, TokenUsageModel] = {}
+
+    def get_usage(self) -> dict[str, TokenUsageModel]:
+        """Get the token usage so far
+
+        Returns:
+            dict[str, TokenUsageModel]: the usage per player and the total usage with the key TOTAL_USAGE_KEY
+        """  # noqa
+        with self._lock:
+            usage = {name: item.model_copy() for name, item in self._usage.items()}  # noqa
+        total = TokenUsageModel()
+        for item in usage.values():
+            total.llm_calls += item.llm_calls
+            total.prompt_tokens += item.prompt_tokens
+            total.completion_tokens += item.completion_tokens
+            total.cost += item.cost
+        return usage | {TOTAL_USAGE_KEY: total}
+
+    def get_ratio(self, name: str | None = None) -> float:
+        """Get the ratio of the used tokens to the budget
+
+        Args:
+            name (str | None, optional): the player name. None means only the game budget is checked. Defaults to None.
+
+        Returns:
+            float: the larger ratio of the game and the player
+        """  # noqa
+        usage = self.get_usage()
+        ratios = [0.0]
+        if self.max_tokens_per_game:
+            ratios.append(usage[TOTAL_USAGE_KEY].total_tokens / self.max_tokens_per_game)  # noqa
+        if self.max_tokens_per_player and name in usage:
+            ratios.append(usage[name].total_tokens / self.max_tokens_per_player)  # noqa
+        return max(ratios)
+
+    def get_level(self, name: str | None = None) -> EBudgetLevel:
+        """Get how much the game should degrade
+
+        Args:
+            name (str | None, optional): the player name. Defaults to None.
+
+        Returns:
+            EBudgetLevel: the level
+        """
+        ratio = self.get_ratio(name)
+        if ratio >= 1.0:
+            return EBudgetLevel.exceeded
+        levels = (
+            EBudgetLevel.short_history,
+            EBudgetLevel.cheap_model,
+            EBudgetLevel.no_translation,
+        )
+        level = EBudgetLevel.normal
+        for threshold, next_level in zip(self.degrade_ratios, levels):
+            if ratio >= threshold:
+                level = next_level
+        return level
+
+    def check(self, name: str | None = None) -> EBudgetLevel:
+        """Get the level and raise an error if the budget is exceeded
+
+        Args:
+            name (str | None, optional): the player name. Defaults to None.
+
+        Raises:
+            TokenBudgetExceededError: the budget of the game or the player is exceeded
+
+        Returns:
+            EBudgetLevel: the level
+        """  # noqa
+        level = self.get_level(name)
+        if level == EBudgetLevel.exceeded:
+            usage = self.get_usage()
+            raise TokenBudgetExceededError(
+                f'The token budget is exceeded by {name or "the game"}: '
+                f'{usage[TOTAL_USAGE_KEY].total_tokens} tokens in the game (max: {self.max_tokens_per_game}), '  # noqa
+                f'{usage[name].total_tokens if name in usage else 0} tokens by {name} (max: {self.max_tokens_per_player}).'  # noqa
+            )
+        return level
+
+    def _record_llm_usage(
+        self,
+        player: str | None,
+        model: str | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        usage = self._usage.setdefault(player or GAME_MASTER_NAME, TokenUsageModel())  # noqa
+        usage.llm_calls += 1
+        usage.prompt_tokens += prompt_tokens
+        usage.completion_tokens += completion_tokens
+        usage.cost += estimate_cost(model, prompt_tokens, completion_tokens)
+
+
+def shorten_prompt(text: str, max_tokens: int) -> str:
+    """Shorten a prompt by omitting the oldest part of the history
+
+    The first paragraph, e.g. the name of the player, and the latest lines are kept.
+
+    Args:
+        text (str): the prompt
+        max_tokens (int): the maximum number of tokens
+
+    Returns:
+        str: the shortened prompt
+    """  # noqa
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    head, _, body = text.partition('\n\n')
+    remaining = max_tokens - estimate_tokens(head + _OMISSION)
+    lines: list[str] = []
+    for line in reversed(body.splitlines()):
+        remaining -= estimate_tokens(line + '\n')
+        if remaining < 0:
+            break
+        lines.append(line)
+    return head + _OMISSION + '\n'.join(reversed(lines))
+
+
+class _BudgetedPlayerRunnable(Runnable[GamePlayerRunnableInputModel | str, str]):  # noqa
+    """The runnable of players which degrades as the budget is used up"""
+
+    def __init__(
+        self,
+        runnable: Runnable[GamePlayerRunnableInputModel | str, str],
+        budget: TokenBudget,
+        name: str | None = None,
+        cheap_runnable: Runnable[GamePlayerRunnableInputModel | str, str] | None = None,  # noqa
+    ) -> None:
+        self.runnable = runnable
+        self.budget = budget
+        self.name = name
+        self.cheap_runnable = cheap_runnable
+
+    @property
+    def InputType(self) -> Any:  # noqa
+        return GamePlayerRunnableInputModel | str
+
+    @property
+    def OutputType(self) -> type[str]:  # noqa
+        return str
+
+    def _route(
+        self,
+        input_: GamePlayerRunnableInputModel | str,
+        config: RunnableConfig | None,
+    ) -> tuple[Runnable[GamePlayerRunnableInputModel | str, str], GamePlayerRunnableInputModel]:  # noqa
+        # NOTE: the runnable shared by the players is called with the player name as the run name  # noqa
+        level = self.budget.check(self.name or (config or {}).get('run_name'))  # noqa
+        if isinstance(input_, str):
+            input_ = GamePlayerRunnableInputModel(prompt=input_)
+        if level.value >= EBudgetLevel.short_history.value and input_.system_prompt:  # noqa
+            input_ = input_.model_copy(update={
+                'system_prompt': shorten_prompt(input_.system_prompt, self.budget.history_window_tokens),  # noqa
+            })
+        if level.value >= EBudgetLevel.cheap_model.value and self.cheap_runnable is not None:  # noqa
+            return self.cheap_runnable, input_
+        return self.runnable, input_
+
+    def invoke(
+        self,
+        input: GamePlayerRunnableInputModel | str,
+        config: RunnableConfig | None = None,
+        **kwargs: Any,
+    ) -> str:
+        runnable, input_ = self._route(input, config)
+        return runnable.invoke(input_, config, **kwargs)
+
+    def stream(
+        self,
+        input: GamePlayerRunnableInputModel | str,
+        config: RunnableConfig | None = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        runnable, input_ = self._route(input, config)
+        yield from runnable.stream(input_, config, **kwargs)
+
+
+def create_budgeted_player_runnable(
+    runnable: Runnable[GamePlayerRunnableInputModel | str, str],
+    budget: TokenBudget,
+    name: str | None = None,
+    cheap_runnable: Runnable[GamePlayerRunnableInputModel | str, str] | None = None,  # noqa
+) -> Runnable[GamePlayerRunnableInputModel | str, str]:
+    """Wrap the runnable of a player to degrade as the budget is used up
+
+    The config is passed through to the wrapped runnable, so the calls are still batched and streamed by it.
+
+    Args:
+        runnable (Runnable[GamePlayerRunnableInputModel | str, str]): the runnable of the player
+        budget (TokenBudget): the budget
+        name (str | None, optional): the player name. None means the name is taken from `run_name` of the config, i.e. the runnable is shared by the players. Defaults to None.
+        cheap_runnable (Runnable[GamePlayerRunnableInputModel | str, str] | None, optional): the runnable with a cheaper model. None means the model is not switched. Defaults to None.
+
+    Returns:
+        Runnable[GamePlayerRunnableInputModel | str, str]: the wrapped runnable
+
+    Note:
+        TokenBudgetExceededError is raised when the budget is exceeded.
+    """  # noqa
+    return _BudgetedPlayerRunnable(runnable, budget, name, cheap_runnable)
+
+
+def create_budgeted_translator_runnable(
+    translator: Runnable[str, str],
+    budget: TokenBudget,
+    name: str | None = None,
+) -> Runnable[str, str]:
+    """Wrap a translator to skip the translation when the budget is nearly used up
+
+    Args:
+        translator (Runnable[str, str]): the translator
+        budget (TokenBudget): the budget
+        name (str | None, optional): the player name whose budget is checked. None means only the game budget is checked. Defaults to None.
+
+    Returns:
+        Runnable[str, str]: the wrapped translator
+    """  # noqa
+
+    def _invoke(text: str, config: RunnableConfig) -> str:
+        if budget.get_level(name).value >= EBudgetLevel.no_translation.value:  # noqa
+            return text
+        return translator.invoke(text, config=config)
+
+    return RunnableLambda(_invoke).with_types(input_type=str, output_type=str)  # type: ignore # noqa
+
+
+def apply_token_budget(
+    players: Iterable[TPlayer],
+    budget: TokenBudget,
+    cheap_runnable: Runnable[GamePlayerRunnableInputModel | str, str] | None = None,  # noqa
+    skipped: Iterable[str] = tuple(),
+) -> list[TPlayer]:
+    """Wrap the runnables and the translators of the players with the budget
+
+    Args:
+        players (Iterable[TPlayer]): the players
+        budget (TokenBudget): the budget
+        cheap_runnable (Runnable[GamePlayerRunnableInputModel | str, str] | None, optional): the runnable with a cheaper model. Defaults to None.
+        skipped (Iterable[str], optional): the names of the players not to be wrapped, e.g. human players. Defaults to tuple().
+
+    Returns:
+        list[TPlayer]: the copied players
+    """  # noqa
+    skipped = set(skipped)
+    updated: list[TPlayer] = []
+    # NOTE: the players sharing a runnable, i.e. a model, keep sharing the wrapped one  # noqa
+    #       so that their calls are still batched. The budget of each call is checked by its run name  # noqa
+    runnables: dict[int, Runnable[GamePlayerRunnableInputModel | str, str]] = {}  # noqa
+    for player in players:
+        if player.name in skipped:
+            updated.append(player)
+            continue
+        if id(player.runnable) not in runnables:
+            runnables[id(player.runnable)] = create_budgeted_player_runnable(player.runnable, budget, cheap_runnable=cheap_runnable)  # noqa
+        update: dict[str, Any] = {
+            'runnable': runnables[id(player.runnable)],
+            'translator': create_budgeted_translator_runnable(player.translator, budget, player.name),  # noqa
+            'inv_translator': create_budgeted_translator_runnable(player.inv_translator, budget, player.name),  # noqa
+        }
+        updated.append(player.model_copy(update=update))
+    return updated
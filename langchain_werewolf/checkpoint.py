@@ -0,0 +1,477 @@
+import json
+from logging import getLogger, Logger
+import random
+import sqlite3
+import threading
+from typing import Any, Iterator, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.constants import TASKS
+from .models.general import IdentifiedModel
+from .models.state import ChatHistoryModel, MsgModel, StateModel
+
+# const
+CHAT_STATE_CHANNEL: str = 'chat_state'
+_STATE_MODEL_TYPE: str = 'state_model'
+_STATE_FIELD_TYPE: str = 'state_field'
+_CHAT_STATE_REF_TYPE: str = 'chat_state_ref'
+_EMPTY_TYPE: str = 'empty'
+# NOTE: below the limit of the host parameters of old SQLite versions, i.e. 999
+_MAX_SQL_VARIABLES: int = 500
+
+# NOTE: the global random module is left untouched in order to keep games reproducible  # noqa
+_version_random: random.Random = random.Random()
+
+_SCHEMA: tuple[str, ...] = (
+    '''CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT,
+        checkpoint BLOB,
+        metadata_type TEXT,
+        metadata BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS blobs (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        channel TEXT NOT NULL,
+        version TEXT NOT NULL,
+        type TEXT NOT NULL,
+        blob BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        blob BLOB,
+        task_path TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS messages (
+        thread_id TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        blob BLOB NOT NULL,
+        PRIMARY KEY (thread_id, message_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS runs (
+        thread_id TEXT NOT NULL PRIMARY KEY,
+        players TEXT NOT NULL
+    )''',
+)
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """A checkpointer which saves the checkpoints of games into a local SQLite file.
+
+    Each channel value is saved only when its version changes,
+    and the messages in `chat_state` are saved only once per thread
+    so that checkpointing after every node does not re-serialize the whole history.
+    """  # noqa
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        logger: Logger = getLogger(__name__),
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self._logger = logger
+        self._lock = threading.RLock()
+        # NOTE: nodes in the same superstep run in different threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        self._stored_message_ids: dict[str, set[str]] = {}
+        self._loaded_messages: dict[str, dict[str, IdentifiedModel[MsgModel]]] = {}  # noqa
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # runs
+    def save_players(self, thread_id: str, roles: dict[str, str]) -> None:
+        """Save the roles of the players of a game
+
+        Args:
+            thread_id (str): the id of the game
+            roles (dict[str, str]): the roles of the players. key: name, value: role
+        """  # noqa
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO runs (thread_id, players) VALUES (?, ?)',  # noqa
+                (thread_id, json.dumps(roles)),
+            )
+
+    def load_players(self, thread_id: str) -> dict[str, str]:
+        """Load the roles of the players of a game
+
+        Args:
+            thread_id (str): the id of the game
+
+        Raises:
+            KeyError: the game is not found
+
+        Returns:
+            dict[str, str]: the roles of the players. key: name, value: role
+        """  # noqa
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT players FROM runs WHERE thread_id = ?',
+                (thread_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f'The run {thread_id} is not found in {self.path}.')  # noqa
+        roles: dict[str, str] = json.loads(row[0])
+        return roles
+
+    # serialization
+    def _dumps(
+        self,
+        thread_id: str,
+        channel: str,
+        value: Any,
+    ) -> tuple[str, bytes]:
+        if isinstance(value, StateModel):
+            return _STATE_MODEL_TYPE, json.dumps(
+                value.model_dump(mode='json', exclude={CHAT_STATE_CHANNEL})
+                | {CHAT_STATE_CHANNEL: self._dump_chat_state(thread_id, value.chat_state)},  # noqa
+            ).encode()
+        if channel == CHAT_STATE_CHANNEL:
+            return _CHAT_STATE_REF_TYPE, json.dumps(
+                self._dump_chat_state(thread_id, value),
+            ).encode()
+        if channel in StateModel.model_fields:
+            # NOTE: use the serializers of StateModel, e.g. serialize_safe_players_names  # noqa
+            return _STATE_FIELD_TYPE, StateModel.model_construct(**{channel: value}).model_dump_json(include={channel}, warnings=False).encode()  # noqa
+        return self.serde.dumps_typed(value)
+
+    def _loads(
+        self,
+        thread_id: str,
+        channel: str,
+        type_: str,
+        blob: bytes,
+    ) -> Any:
+        if type_ == _STATE_MODEL_TYPE:
+            data = json.loads(blob)
+            return StateModel(**(
+                data
+                | {CHAT_STATE_CHANNEL: self._load_chat_state(thread_id, data[CHAT_STATE_CHANNEL])}  # noqa
+            ))
+        if type_ == _CHAT_STATE_REF_TYPE:
+            return self._load_chat_state(thread_id, json.loads(blob))
+        if type_ == _STATE_FIELD_TYPE:
+            # NOTE: validate only the field with the validators of StateModel
+            state = StateModel.__pydantic_validator__.validate_assignment(
+                StateModel.model_construct(),
+                channel,
+                json.loads(blob)[channel],
+            )
+            return getattr(state, channel)
+        return self.serde.loads_typed((type_, blob))
+
+    def _dump_chat_state(
+        self,
+        thread_id: str,
+        chat_state: dict[frozenset[str], ChatHistoryModel],
+    ) -> list[dict[str, list[str]]]:
+        # NOTE: each message is saved only once and chat_state refers to the message ids  # noqa
+        stored = self._get_stored_message_ids(thread_id)
+        new_messages = {
+            message.id: message.model_dump_json()
+            for chat_history in chat_state.values()
+            for message in chat_history.messages
+            if message.id not in stored
+        }
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO messages (thread_id, message_id, blob) VALUES (?, ?, ?)',  # noqa
+            [(thread_id, id_, blob) for id_, blob in new_messages.items()],
+        )
+        stored.update(new_messages.keys())
+        return [
+            {
+                'names': sorted(chat_history.names),
+                'message_ids': [message.id for message in chat_history.messages],  # noqa
+            }
+            for chat_history in chat_state.values()
+        ]
+
+    def _load_chat_state(
+        self,
+        thread_id: str,
+        refs: list[dict[str, list[str]]],
+    ) -> dict[frozenset[str], ChatHistoryModel]:
+        # NOTE: the messages are immutable, so each message is read and parsed once per thread  # noqa
+        messages = self._loaded_messages.setdefault(thread_id, {})
+        missing_ids = sorted({
+            i
+            for ref in refs
+            for i in ref['message_ids']
+            if i not in messages
+        })
+        for start in range(0, len(missing_ids), _MAX_SQL_VARIABLES):
+            chunk = missing_ids[start:start + _MAX_SQL_VARIABLES]
+            for message_id, message_blob in self._conn.execute(
+                f'SELECT message_id, blob FROM messages WHERE thread_id = ? AND message_id IN ({", ".join("?" * len(chunk))})',  # noqa
+                (thread_id, *chunk),
+            ):
+                messages[message_id] = IdentifiedModel[MsgModel].model_validate_json(message_blob)  # noqa
+        return {
+            frozenset(ref['names']): ChatHistoryModel(
+                names=frozenset(ref['names']),
+                messages=[messages[i] for i in ref['message_ids']],
+            )
+            for ref in refs
+        }
+
+    def _get_stored_message_ids(self, thread_id: str) -> set[str]:
+        if thread_id not in self._stored_message_ids:
+            self._stored_message_ids[thread_id] = {
+                row[0]
+                for row in self._conn.execute(
+                    'SELECT message_id FROM messages WHERE thread_id = ?',
+                    (thread_id,),
+                )
+            }
+        return self._stored_message_ids[thread_id]
+
+    def _load_blobs(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        versions: ChannelVersions,
+    ) -> dict[str, Any]:
+        channel_values: dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self._conn.execute(
+                'SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?',  # noqa
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == _EMPTY_TYPE:
+                continue
+            channel_values[channel] = self._loads(thread_id, channel, *row)
+        return channel_values
+
+    # BaseCheckpointSaver
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id: str = config['configurable']['thread_id']
+        checkpoint_ns: str = config['configurable'].get('checkpoint_ns', '')
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    'SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?',  # noqa
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    'SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1',  # noqa
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._create_checkpoint_tuple(thread_id, checkpoint_ns, *row)  # noqa
+
+    def _create_checkpoint_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        parent_checkpoint_id: str | None,
+        type_: str,
+        checkpoint_blob: bytes,
+        metadata_type: str,
+        metadata_blob: bytes,
+    ) -> CheckpointTuple:
+        writes = self._conn.execute(
+            'SELECT task_id, channel, type, blob FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx',  # noqa
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        sends = self._conn.execute(
+            'SELECT type, blob FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ? ORDER BY task_path, task_id, idx',  # noqa
+            (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+        ).fetchall() if parent_checkpoint_id else []
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_blob))  # noqa
+        return CheckpointTuple(
+            config={
+                'configurable': {
+                    'thread_id': thread_id,
+                    'checkpoint_ns': checkpoint_ns,
+                    'checkpoint_id': checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                'channel_values': self._load_blobs(thread_id, checkpoint_ns, checkpoint['channel_versions']),  # noqa
+                'pending_sends': [self.serde.loads_typed(send) for send in sends],  # noqa
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            pending_writes=[
+                (task_id, channel, self._loads(thread_id, channel, w_type, w_blob))  # noqa
+                for task_id, channel, w_type, w_blob in writes
+            ],
+            parent_config=(
+                {
+                    'configurable': {
+                        'thread_id': thread_id,
+                        'checkpoint_ns': checkpoint_ns,
+                        'checkpoint_id': parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id else
+                None
+            ),
+        )
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = 'SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints'  # noqa
+        conditions: list[str] = []
+        params: list[Any] = []
+        if config is not None:
+            conditions.append('thread_id = ?')
+            params.append(config['configurable']['thread_id'])
+            if (checkpoint_ns := config['configurable'].get('checkpoint_ns')) is not None:  # noqa
+                conditions.append('checkpoint_ns = ?')
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append('checkpoint_id = ?')
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            conditions.append('checkpoint_id < ?')
+            params.append(before_id)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY checkpoint_id DESC'
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                checkpoint_tuple = self._create_checkpoint_tuple(thread_id, checkpoint_ns, *row)  # noqa
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value  # type: ignore
+                for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id: str = config['configurable']['thread_id']
+        checkpoint_ns: str = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_ = checkpoint.copy()
+        checkpoint_.pop('pending_sends')  # type: ignore
+        values: dict[str, Any] = checkpoint_.pop('channel_values')  # type: ignore  # noqa
+        with self._lock, self._conn:
+            # NOTE: only the channels updated since the last checkpoint are saved  # noqa
+            for channel, version in new_versions.items():
+                type_, blob = (
+                    self._dumps(thread_id, channel, values[channel])
+                    if channel in values else
+                    (_EMPTY_TYPE, b'')
+                )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, ?, ?)',  # noqa
+                    (thread_id, checkpoint_ns, channel, str(version), type_, blob),  # noqa
+                )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',  # noqa
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint['id'],
+                    config['configurable'].get('checkpoint_id'),
+                    *self.serde.dumps_typed(checkpoint_),
+                    *self.serde.dumps_typed({
+                        # NOTE: 'writes' duplicates the writes table and may include chat_state which has frozenset keys  # noqa
+                        k: v
+                        for k, v in get_checkpoint_metadata(config, metadata).items()  # noqa
+                        if k != 'writes'
+                    }),
+                ),
+            )
+        return {
+            'configurable': {
+                'thread_id': thread_id,
+                'checkpoint_ns': checkpoint_ns,
+                'checkpoint_id': checkpoint['id'],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = '',
+    ) -> None:
+        thread_id: str = config['configurable']['thread_id']
+        checkpoint_ns: str = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_id: str = config['configurable']['checkpoint_id']
+        # NOTE: special writes like errors are overwritten but the others are not  # noqa
+        statement = (
+            'INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, blob, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'  # noqa
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes) else
+            'INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, blob, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'  # noqa
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                statement,
+                [
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        WRITES_IDX_MAP.get(channel, idx),
+                        channel,
+                        *self._dumps(thread_id, channel, value),
+                        task_path,
+                    )
+                    for idx, (channel, value) in enumerate(writes)
+                ],
+            )
+
+    def get_next_version(self, current: str | None, channel: Any) -> str:
+        # NOTE: the same format as langgraph.checkpoint.memory.InMemorySaver
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split('.')[0])
+        return f'{current_v + 1:032}.{_version_random.random():016}'
@@ -7,8 +7,13 @@ PACKAGE_NAME: str = package_name
 # general
 RESET: str = "_____RESET_____"
 GAME_MASTER_NAME: str = 'GameMaster'
+# NOTE: the vote of a player who could not name a valid target
+SKIPPED_VOTE: str = '(skipped)'
 BASE_LANGUAGE: ELanguage = ELanguage.English
 
+# graph
+FLATTENED_NODE_SEPARATOR: str = '/'
+
 # CLI
 CLI_PROMPT_SUFFIX: str = '>>> '
 CLI_PROMPT_COLOR: str = 'black'
@@ -58,6 +63,22 @@ MODEL_SERVICE_MAP: dict[str, EChatService] = {
     'mixtral-8x7b-32768': EChatService.Groq,
 }
 VALID_MODELS: tuple[str, ...] = tuple(MODEL_SERVICE_MAP.keys())
+# NOTE: USD per 1M tokens of (input, output). Check the latest prices of the providers.  # noqa
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    'gpt-3.5-turbo': (0.5, 1.5),
+    'gpt-4': (30.0, 60.0),
+    'gpt-4-turbo': (10.0, 30.0),
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gemini-1.5-flash': (0.075, 0.3),
+    'gemini-pro': (0.5, 1.5),
+    'gemma2-9b-it': (0.2, 0.2),
+    'llama-3.1-70b-versatile': (0.59, 0.79),
+    'llama-3.1-8b-instant': (0.05, 0.08),
+    'llama3-70b-8192': (0.59, 0.79),
+    'llama3-8b-8192': (0.05, 0.08),
+    'mixtral-8x7b-32768': (0.24, 0.24),
+}
 SERVICE_APIKEY_ENVVAR_MAP: dict[EChatService, str] = {
     EChatService.Google: 'GOOGLE_API_KEY',
     EChatService.Groq: 'GROQ_API_KEY',
@@ -18,6 +18,7 @@ class ELanguage(Enum):
 class ESpeakerSelectionMethod(Enum):
     round_robin = 'round_robin'
     random = 'random'
+    simultaneous = 'simultaneous'
 
 
 class EResult(Enum):
@@ -46,3 +47,22 @@ class EInputOutputType(Enum):
 class ETimeSpan(Enum):
     day = 'day'
     night = 'night'
+
+
+class EEventType(Enum):
+    start = 'start'
+    message = 'message'
+    vote = 'vote'
+    elimination = 'elimination'
+    result = 'result'
+    state = 'state'
+    end = 'end'
+
+
+class EBudgetLevel(Enum):
+    # NOTE: the larger, the more degraded
+    normal = 0
+    short_history = 1
+    cheap_model = 2
+    no_translation = 3
+    exceeded = 4
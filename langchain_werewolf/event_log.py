@@ -0,0 +1,337 @@
+from copy import deepcopy
+import gzip
+import io
+import json
+from logging import getLogger, Logger
+import os
+import time
+from types import TracebackType
+from typing import Any, BinaryIO, Iterable, Iterator, Mapping
+from .enums import EEventType
+from .models.state import StateModel
+
+# const
+EVENT_LOG_SUFFIXES: tuple[str, ...] = ('.jsonl', '.jsonl.gz', '.jsonl.zst')
+# NOTE: these fields are only appended by `reduce_list`,
+#       so only the new items are written into the event log.
+_APPENDED_FIELDS: frozenset[str] = frozenset({
+    'daytime_vote_result_history',
+    'daytime_votes_history',
+    'nighttime_vote_result_history',
+    'nighttime_votes_history',
+    'elimination_log',
+})
+_EVENT_TYPE_BY_FIELD: dict[str, EEventType] = {
+    'daytime_vote_result_history': EEventType.vote,
+    'daytime_votes_history': EEventType.vote,
+    'nighttime_vote_result_history': EEventType.vote,
+    'nighttime_votes_history': EEventType.vote,
+    'daytime_votes_current': EEventType.vote,
+    'nighttime_votes_current': EEventType.vote,
+    'alive_players_names': EEventType.elimination,
+    'elimination_log': EEventType.elimination,
+    'result': EEventType.result,
+}
+_UNTRACKED_FIELDS: frozenset[str] = frozenset({'frozen_fields', 'chat_state'})
+
+
+def is_event_log_path(path: str) -> bool:
+    """Check whether a path is the path of an event log
+
+    Args:
+        path (str): the path to check
+
+    Returns:
+        bool: True if the path ends with one of EVENT_LOG_SUFFIXES
+    """
+    return path.endswith(EVENT_LOG_SUFFIXES)
+
+
+def _import_zstandard():  # type: ignore
+    try:
+        import zstandard  # type: ignore
+    except ImportError as e:
+        raise ImportError('`zstandard` is required to read/write the event log with zstd compression. Install it with `pip install zstandard`.') from e  # noqa
+    return zstandard
+
+
+def _dumps_record(record: Mapping[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')  # noqa
+
+
+def _get_chat_key(names: Iterable[str]) -> str:
+    # NOTE: the same key as `StateModel.serialize_chat_state`
+    return '|'.join(sorted(names))
+
+
+class EventLogWriter:
+    """A writer which appends the events of a game to a JSONL file as they happen.
+
+    Each state streamed from the game graph is compared with the previous one
+    and only the differences are written as compact records:
+    a `start` record with the whole state, one `message` record per new message
+    and one record per changed group of fields (`vote`, `elimination`, `result` and `state`).
+    The file is compressed with gzip or zstd when the path ends with `.gz` or `.zst`.
+    """  # noqa
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        append: bool = False,
+        fsync_interval: float = 1.0,
+        logger: Logger = getLogger(__name__),
+    ) -> None:
+        """Initialize the writer
+
+        Args:
+            path (str): the path of the event log
+            append (bool, optional): whether to append the events to the existing file, e.g. when a game is resumed. Defaults to False.
+            fsync_interval (float, optional): the minimum interval in seconds between two fsync calls. Defaults to 1.0.
+            logger (Logger, optional): logger. Defaults to getLogger(__name__).
+        """  # noqa
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._logger = logger
+        self._raw: BinaryIO = open(path, 'ab' if append else 'wb')  # type: ignore # noqa
+        self._file: BinaryIO
+        if path.endswith('.gz'):
+            self._file = gzip.GzipFile(fileobj=self._raw, mode='wb')  # type: ignore # noqa
+        elif path.endswith('.zst'):
+            self._file = _import_zstandard().ZstdCompressor().stream_writer(self._raw, closefd=False)  # noqa
+        else:
+            self._file = self._raw
+        self._last_synced: float = time.monotonic()
+        self._previous: StateModel | None = None
+        self._message_ids: set[str] = set()
+
+    def __enter__(self) -> 'EventLogWriter':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write(self, state: StateModel | Mapping[str, Any]) -> int:
+        """Write the events which happened since the previous state
+
+        Args:
+            state (StateModel | Mapping[str, Any]): the current state. A mapping of the channel values streamed from the game graph is also accepted.
+
+        Returns:
+            int: the number of the written records
+        """  # noqa
+        if not isinstance(state, StateModel):
+            # NOTE: the values streamed from the graph have been already validated  # noqa
+            state = StateModel.model_construct(**state)
+        records = (
+            [self._create_start_record(state)]
+            if self._previous is None else
+            self._create_records(self._previous, state)
+        )
+        for record in records:
+            self._file.write(_dumps_record(record))
+        self._previous = state
+        self.flush(sync=time.monotonic() - self._last_synced >= self.fsync_interval)  # noqa
+        return len(records)
+
+    def end(self) -> None:
+        """Write the record which means that the game finished"""
+        self._file.write(_dumps_record({'type': EEventType.end.value}))
+        self.flush(sync=True)
+
+    def flush(self, sync: bool = False) -> None:
+        """Flush the written records
+
+        Args:
+            sync (bool, optional): whether to complete the compressed frame and fsync the file. Defaults to False.
+        """  # noqa
+        if sync:
+            if isinstance(self._file, gzip.GzipFile):
+                self._file.flush()
+            elif self._file is not self._raw:
+                # NOTE: each flushed frame can be decompressed independently
+                zstandard = _import_zstandard()
+                self._file.flush(zstandard.FLUSH_FRAME)  # type: ignore
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._last_synced = time.monotonic()
+        elif self._file is self._raw:
+            # NOTE: compressed files are flushed only when synced in order to keep the compression ratio  # noqa
+            self._raw.flush()
+
+    def close(self) -> None:
+        if self._raw.closed:
+            return
+        self.flush(sync=True)
+        if self._file is not self._raw:
+            self._file.close()
+        self._raw.close()
+
+    def _create_start_record(self, state: StateModel) -> dict[str, Any]:
+        self._message_ids = {
+            message.id
+            for history in state.chat_state.values()
+            for message in history.messages
+        }
+        return {
+            'type': EEventType.start.value,
+            'state': state.model_dump(mode='json', warnings=False),
+        }
+
+    def _create_records(
+        self,
+        previous: StateModel,
+        state: StateModel,
+    ) -> list[dict[str, Any]]:
+        records: list[dict[str, Any]] = []
+        # messages
+        new_messages = sorted(
+            (
+                (message, history.names)
+                for history in state.chat_state.values()
+                for message in history.messages
+                if message.id not in self._message_ids
+            ),
+            key=lambda message_names: message_names[0].value.timestamp,
+        )
+        for message, names in new_messages:
+            self._message_ids.add(message.id)
+            records.append({
+                'type': EEventType.message.value,
+                'names': sorted(names),
+                'message': message.model_dump(mode='json', warnings=False),
+            })
+        # the other fields
+        updates: dict[EEventType, dict[str, Any]] = {}
+        for field in StateModel.model_fields:
+            if field in _UNTRACKED_FIELDS:
+                continue
+            value = getattr(state, field)
+            previous_value = getattr(previous, field)
+            if value == previous_value:
+                continue
+            dumped: Any
+            if field in _APPENDED_FIELDS:
+                previous_ids = {item.id for item in previous_value}
+                dumped = [
+                    item.model_dump(mode='json', warnings=False)
+                    for item in value
+                    if item.id not in previous_ids
+                ]
+            else:
+                dumped = state.model_dump(mode='json', include={field}, warnings=False)[field]  # noqa
+            event_type = _EVENT_TYPE_BY_FIELD.get(field, EEventType.state)
+            updates.setdefault(event_type, {})[field] = dumped
+        for event_type, fields in updates.items():
+            records.append({'type': event_type.value, 'updates': fields})
+        return records
+
+
+def _open_binary_reader(path: str) -> BinaryIO:
+    raw = open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.GzipFile(fileobj=raw, mode='rb')  # type: ignore
+    if path.endswith('.zst'):
+        # NOTE: the writer flushes one frame per sync
+        return io.BufferedReader(_import_zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True))  # type: ignore # noqa
+    return raw
+
+
+def read_events(
+    path: str,
+    *,
+    follow: bool = False,
+    poll_interval: float = 0.5,
+) -> Iterator[dict[str, Any]]:
+    """Read the records of an event log
+
+    Note: The incomplete record at the end of the file, which is being written, is ignored.
+
+    Args:
+        path (str): the path of the event log
+        follow (bool, optional): whether to wait for new records until the game ends, like `tail -f`. Only uncompressed event logs are supported. Defaults to False.
+        poll_interval (float, optional): the interval in seconds to poll new records when follow=True. Defaults to 0.5.
+
+    Raises:
+        ValueError: follow=True with a compressed event log
+
+    Yields:
+        Iterator[dict[str, Any]]: the records
+    """  # noqa
+    if follow and path.endswith(('.gz', '.zst')):
+        raise ValueError(f'Following a compressed event log is not supported: {path}')  # noqa
+    with _open_binary_reader(path) as f:
+        buffer = b''
+        while True:
+            try:
+                line = f.readline()
+            except EOFError:
+                # NOTE: the compressed stream is not completed yet
+                line = b''
+            if not line and not buffer and not follow:
+                break
+            buffer += line
+            if not buffer.endswith(b'\n'):
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            record: dict[str, Any] = json.loads(buffer)
+            buffer = b''
+            yield record
+            if follow and record['type'] == EEventType.end.value:
+                break
+
+
+def reconstruct_state(records: Iterable[Mapping[str, Any]]) -> StateModel:
+    """Reconstruct the state of a game from the records of its event log
+
+    Args:
+        records (Iterable[Mapping[str, Any]]): the records
+
+    Raises:
+        ValueError: no `start` record is found
+
+    Returns:
+        StateModel: the state after the last record
+    """
+    data: dict[str, Any] | None = None
+    for record in records:
+        event_type = EEventType(record['type'])
+        if event_type == EEventType.start:
+            # NOTE: a resumed game writes the `start` record again
+            data = deepcopy(record['state'])
+            continue
+        if data is None:
+            raise ValueError('The event log does not start with a `start` record.')  # noqa
+        if event_type == EEventType.message:
+            data['chat_state'].setdefault(
+                _get_chat_key(record['names']),
+                {'names': record['names'], 'messages': []},
+            )['messages'].append(record['message'])
+        elif event_type != EEventType.end:
+            for field, value in record['updates'].items():
+                if field in _APPENDED_FIELDS:
+                    data[field].extend(value)
+                else:
+                    data[field] = value
+    if data is None:
+        raise ValueError('The event log does not start with a `start` record.')  # noqa
+    return StateModel.model_validate(data)
+
+
+def load_state_from_event_log(path: str) -> StateModel:
+    """Load the latest state of a game from its event log
+
+    Args:
+        path (str): the path of the event log
+
+    Returns:
+        StateModel: the latest state
+    """
+    return reconstruct_state(read_events(path))
@@ -1,24 +1,28 @@
 from functools import partial
 from itertools import cycle
-from typing import Callable, Generator, Iterable, Literal
+import random
+import threading
+from typing import Callable, Generator, Iterable, Iterator, Literal
 
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableLambda
 from langgraph.graph import END, START, Graph, StateGraph
 from pydantic import BaseModel, Field
 
 from ..const import GAME_MASTER_NAME
 from ..enums import ESpeakerSelectionMethod
 from ..game_players import (
+    BaseGamePlayer,
     BaseGamePlayerRole,
+    Roster,
     find_player_by_name,
-    is_werewolf_role,
 )
 from ..models.state import (
     ChatHistoryModel,
     StateModel,
     create_dict_to_record_chat,
-    create_dict_to_update_chat_remaining_number,
+    create_dict_to_record_chats,
     create_dict_to_update_current_speaker,
+    create_dict_to_update_speaker_schedule,
     get_related_messsages,
 )
 from ..utils import (
@@ -27,14 +31,20 @@ from ..utils import (
 from .prompts import (
     SYSTEM_PROMPT_TEMPLATE,
 )
-from .utils import create_message_history_prompt, add_echo_node  # noqa
+from .utils import (
+    MessageHistoryPromptBuilder,
+    add_echo_node,
+    create_message_history_prompt,
+)
 
 # const
 CHAT_TEARUP_NODE_NAME: str = 'tearup_chat'
 CHAT_TEARDOWN_NODE_NAME: str = 'teardown_chat'
-CHAT_SELECT_SPEAKER_NODE_NAME: str = 'select_speaker'
 CHAT_NODE_NAME: str = 'chat'
-UPDATE_N_CHAT_REMAINING_NODE_NAME: str = 'update_n_chat_remaining'
+# NOTE: deprecated aliases. each turn of the chat node selects the speaker from the schedule  # noqa
+#       and updates the number of chat remaining, i.e. the length of the schedule  # noqa
+CHAT_SELECT_SPEAKER_NODE_NAME: str = CHAT_NODE_NAME
+UPDATE_N_CHAT_REMAINING_NODE_NAME: str = CHAT_NODE_NAME
 
 DAYTIME_DISCUSSION_PROMPT_TEMPLATE: str = '''=== Day {day}: Daytime ===
 It is now noon. Werewolves are still in the village. Discussion begins to decide who to exclude from the game today.
@@ -74,6 +84,8 @@ speaker_selection_methods: dict[
 ] = {
     ESpeakerSelectionMethod.round_robin: cycle,  # type: ignore
     ESpeakerSelectionMethod.random: random_permutated_infinite_generator,
+    # NOTE: the players speak in the order of the players in each round
+    ESpeakerSelectionMethod.simultaneous: cycle,  # type: ignore
 }
 
 
@@ -87,49 +99,168 @@ class GenerateSystemPromptInputForChat(BaseModel):
     messages: str = Field(..., title="the message history of the player")  # noqa
 
 
+def _generate_speech(
+    state: StateModel,
+    player: BaseGamePlayer,
+    chat_participants: list[str],
+    generate_system_prompt: Callable[[GenerateSystemPromptInputForChat], str],
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
+) -> str:
+    # get the related chat histories
+    messages = (
+        prompt_builder.build(player.name, state)
+        if prompt_builder is not None else
+        create_message_history_prompt(get_related_messsages(player.name, state))  # noqa
+    )
+    # generate message
+    prompt = ASK_TO_PLAYER_TO_SPEAK_PROMPT_TEMPLATE.format(name=player.name)
+    system_prompt = generate_system_prompt(GenerateSystemPromptInputForChat(
+        name=player.name,
+        messages=messages,
+    ))
+    if token_echo is None:
+        return player.generate_message(prompt, system_prompt).message
+    # NOTE: the tokens are echoed as they arrive and the complete message is recorded  # noqa
+    message = player.generate_message_stream(
+        prompt,
+        system_prompt,
+        on_token=partial(token_echo, player.name, chat_participants),
+    ).message
+    token_echo(player.name, chat_participants, None)
+    return message
+
+
 def _player_speak(
     state: StateModel,
     players: Iterable[BaseGamePlayerRole],
     participants: Iterable[str],
     generate_system_prompt: Callable[[GenerateSystemPromptInputForChat], str],
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
 ) -> dict[str, dict[frozenset[str], ChatHistoryModel]]:
     # validation
     if state.current_speaker is None:
         raise ValueError("current_speaker must not be None.")
+    if state.current_speaker not in state.alive_players_set:
+        raise ValueError(f'The name {state.current_speaker} is not found.')
     # initialize
-    alive_players = [p for p in players if p.name in state.alive_players_names]  # noqa
-    player = find_player_by_name(state.current_speaker, alive_players)  # noqa
-    # get the related chat histories
-    messages = get_related_messsages(player.name, state)
-    # generate message
-    message = player.generate_message(
-        prompt=ASK_TO_PLAYER_TO_SPEAK_PROMPT_TEMPLATE.format(name=player.name),  # noqa
-        system_prompt=generate_system_prompt(GenerateSystemPromptInputForChat(
-            name=player.name,
-            messages=create_message_history_prompt(messages),
-        ))
-    ).message
+    player = find_player_by_name(state.current_speaker, players)
+    chat_participants = list(participants) + [GAME_MASTER_NAME]
     # create a new chat history
     return create_dict_to_record_chat(
         player.name,
-        list(participants)+[GAME_MASTER_NAME],
-        message,
+        chat_participants,
+        _generate_speech(
+            state,
+            player,
+            chat_participants,
+            generate_system_prompt,
+            prompt_builder,
+            token_echo,
+        ),
     )
 
 
-def _tearup_chat(
+def _create_buffered_token_echo(
+    token_echo: Callable[[str, Iterable[str], str | None], None],
+    lock: threading.Lock,
+) -> Callable[[str, Iterable[str], str | None], None]:
+    # NOTE: the tokens are held until the end of the message and flushed at once under the lock  # noqa
+    #       so that the tokens of the speeches generated concurrently are not interleaved  # noqa
+    buffer: list[tuple[str, Iterable[str], str | None]] = []
+
+    def _echo(sender: str, participants: Iterable[str], token: str | None) -> None:  # noqa
+        buffer.append((sender, participants, token))
+        if token is not None:
+            return
+        with lock:
+            for args in buffer:
+                token_echo(*args)
+        buffer.clear()
+    return _echo
+
+
+def _players_speak_simultaneously(
     state: StateModel,
+    speakers: list[str],
     players: Iterable[BaseGamePlayerRole],
+    participants: Iterable[str],
+    generate_system_prompt: Callable[[GenerateSystemPromptInputForChat], str],
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
+) -> dict[str, dict[frozenset[str], ChatHistoryModel]]:
+    # validation
+    not_found = [name for name in speakers if name not in state.alive_players_set]  # noqa
+    if not_found:
+        raise ValueError(f'The names {not_found} are not found.')
+    # initialize
+    chat_participants = list(participants) + [GAME_MASTER_NAME]
+    # generate messages
+    # NOTE: all the speakers see the same history and the messages are recorded in the order of the speakers,  # noqa
+    #       not in the order of completion
+    # NOTE: the tokens of each speech are echoed when the speech is complete
+    lock = threading.Lock()
+    messages = RunnableLambda(
+        lambda name: _generate_speech(
+            state,
+            find_player_by_name(name, players),
+            chat_participants,
+            generate_system_prompt,
+            prompt_builder,
+            _create_buffered_token_echo(token_echo, lock) if token_echo is not None else None,  # noqa
+        ),
+    ).batch(speakers)
+    # create new chat histories
+    return create_dict_to_record_chats(
+        zip(speakers, messages),
+        chat_participants,
+    )
+
+
+def create_speaker_schedule(
+    speaker_generator: Iterator[str],
+    alive_players_names: Iterable[str],
+    n_turns: int,
+) -> list[str]:
+    """Draw the speakers of a discussion in advance
+
+    The names of the excluded players are skipped without counting as turns.
+
+    Args:
+        speaker_generator (Iterator[str]): the generator of the speakers' names, which is shared by the discussions of the game
+        alive_players_names (Iterable[str]): the names of the alive participants
+        n_turns (int): the number of turns per alive participant
+
+    Returns:
+        list[str]: the names of the speakers in order
+    """  # noqa
+    alive_players_names = set(alive_players_names)
+    n_speeches = len(alive_players_names) * n_turns
+    schedule: list[str] = []
+    for name in speaker_generator:
+        if len(schedule) >= n_speeches:
+            break
+        if name in alive_players_names:
+            schedule.append(name)
+    return schedule
+
+
+def _tearup_chat(
+    state: StateModel,
+    players: Roster[BaseGamePlayerRole],
     generate_prompt: Callable[[GeneratePromptInputForChat], str],
     n_turns_per_day: int,
+    speaker_generator: Iterator[str],
 ) -> dict[str, object]:  # type: ignore
+    # NOTE: the alive players do not change during a discussion
+    schedule = create_speaker_schedule(
+        speaker_generator,
+        state.alive_players_set.intersection(players.names),
+        n_turns_per_day,
+    )
     return (  # type: ignore
-        create_dict_to_update_chat_remaining_number(
-            len([
-                p for p in players
-                if p.name in state.alive_players_names
-            ]) * n_turns_per_day
-        )
+        create_dict_to_update_speaker_schedule(schedule)
         | create_dict_to_record_chat(
             sender=GAME_MASTER_NAME,
             participants=[GAME_MASTER_NAME]+[p.name for p in players],
@@ -138,10 +269,41 @@ def _tearup_chat(
                 alive_players_names=state.alive_players_names,
             )),
         )  # type: ignore
-        | create_dict_to_update_current_speaker(None)  # type: ignore
     )
 
 
+def _take_turn(
+    state: StateModel,
+    **kwargs,
+) -> dict[str, object]:
+    return (  # type: ignore
+        _player_speak(state, **kwargs)
+        | create_dict_to_update_speaker_schedule(state.speaker_schedule[1:])
+    )
+
+
+def _take_round(
+    state: StateModel,
+    players: Roster[BaseGamePlayerRole],
+    **kwargs,
+) -> dict[str, object]:
+    # NOTE: each alive participant speaks once per round
+    n_speakers = len(state.alive_players_set.intersection(players.names))
+    return (  # type: ignore
+        _players_speak_simultaneously(
+            state,
+            state.speaker_schedule[:n_speakers],
+            players,
+            **kwargs,
+        )
+        | create_dict_to_update_speaker_schedule(state.speaker_schedule[n_speakers:])  # noqa
+    )
+
+
+def _route_turn(state: StateModel) -> str:
+    return CHAT_NODE_NAME if state.speaker_schedule else CHAT_TEARDOWN_NODE_NAME  # noqa
+
+
 def create_run_chat_subbraph(
     players: Iterable[BaseGamePlayerRole],
     prompt: Callable[[GeneratePromptInputForChat], str] | str,
@@ -152,18 +314,27 @@ def create_run_chat_subbraph(
     echo_targets: list[Literal[  # type: ignore
         CHAT_TEARUP_NODE_NAME,  # type: ignore
         CHAT_TEARDOWN_NODE_NAME,  # type: ignore
-        CHAT_SELECT_SPEAKER_NODE_NAME,  # type: ignore
         CHAT_NODE_NAME,  # type: ignore
-        UPDATE_N_CHAT_REMAINING_NODE_NAME,  # type: ignore
     ] | str] = [
-        CHAT_SELECT_SPEAKER_NODE_NAME,
         CHAT_NODE_NAME,
     ],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
+    rng: random.Random | None = None,
 ) -> Graph:
 
+    players = Roster.of(players)
+    # NOTE: the builder is shared by the turns of the game to render each message once  # noqa
+    prompt_builder = prompt_builder or MessageHistoryPromptBuilder()
+    simultaneous = select_speaker == ESpeakerSelectionMethod.simultaneous
     if isinstance(select_speaker, ESpeakerSelectionMethod):
-        select_speaker = speaker_selection_methods[select_speaker]
+        # NOTE: the random order is drawn from the stream of the game if given  # noqa
+        select_speaker = (
+            partial(random_permutated_infinite_generator, rng=rng)
+            if select_speaker == ESpeakerSelectionMethod.random and rng is not None else  # noqa
+            speaker_selection_methods[select_speaker]
+        )
     speaker_generator = select_speaker([p.name for p in players])
 
     # define the graph
@@ -176,52 +347,37 @@ def create_run_chat_subbraph(
             players=players,
             generate_prompt=prompt if callable(prompt) else lambda m: prompt.format(**m.model_dump()),  # noqa
             n_turns_per_day=n_turns_per_day,
-        ),
-    )
-    workflow.add_node(
-        CHAT_SELECT_SPEAKER_NODE_NAME,
-        lambda _: create_dict_to_update_current_speaker(
-            speaker_generator.__next__(),
+            speaker_generator=speaker_generator,
         ),
     )
     workflow.add_node(
         CHAT_NODE_NAME,
         partial(
-            _player_speak,
+            _take_round if simultaneous else _take_turn,
             generate_system_prompt=(
                 system_prompt
                 if callable(system_prompt) else
                 lambda m: system_prompt.format(**m.model_dump())
             ),
-            participants=[player.name for player in players],
+            participants=list(players.names),
             players=players,
+            prompt_builder=prompt_builder,
+            token_echo=token_echo,
         )
     )
-    workflow.add_node(
-        UPDATE_N_CHAT_REMAINING_NODE_NAME,
-        lambda state: create_dict_to_update_chat_remaining_number(state.n_chat_remaining-1),  # noqa
-    )
     workflow.add_node(
         CHAT_TEARDOWN_NODE_NAME,
         lambda _: create_dict_to_update_current_speaker(None),
     )
     # define edges
+    # NOTE: the speakers are scheduled at the tearup so that each turn takes one step  # noqa
     workflow.add_edge(START, CHAT_TEARUP_NODE_NAME)
-    workflow.add_edge(CHAT_TEARUP_NODE_NAME, CHAT_SELECT_SPEAKER_NODE_NAME)
-    workflow.add_conditional_edges(
-        CHAT_SELECT_SPEAKER_NODE_NAME,
-        lambda state: (
-            CHAT_TEARDOWN_NODE_NAME
-            if state.n_chat_remaining <= 0 else (
-                CHAT_NODE_NAME
-                if state.current_speaker in state.alive_players_names else
-                CHAT_SELECT_SPEAKER_NODE_NAME
-            )
-        ),
-        [CHAT_NODE_NAME, CHAT_SELECT_SPEAKER_NODE_NAME, CHAT_TEARDOWN_NODE_NAME],  # noqa
-    )
-    workflow.add_edge(CHAT_NODE_NAME, UPDATE_N_CHAT_REMAINING_NODE_NAME)
-    workflow.add_edge(UPDATE_N_CHAT_REMAINING_NODE_NAME, CHAT_SELECT_SPEAKER_NODE_NAME)  # noqa
+    for source in [CHAT_TEARUP_NODE_NAME, CHAT_NODE_NAME]:
+        workflow.add_conditional_edges(
+            source,
+            _route_turn,
+            [CHAT_NODE_NAME, CHAT_TEARDOWN_NODE_NAME],
+        )
     workflow.add_edge(CHAT_TEARDOWN_NODE_NAME, END)
 
     # add display nodes
@@ -240,14 +396,14 @@ def create_run_daytime_chat_subgraph(
     display_targets: list[Literal[  # type: ignore
         CHAT_TEARUP_NODE_NAME,  # type: ignore
         CHAT_TEARDOWN_NODE_NAME,  # type: ignore
-        CHAT_SELECT_SPEAKER_NODE_NAME,  # type: ignore
         CHAT_NODE_NAME,  # type: ignore
-        UPDATE_N_CHAT_REMAINING_NODE_NAME,  # type: ignore
     ] | str] = [
-        CHAT_SELECT_SPEAKER_NODE_NAME,
         CHAT_NODE_NAME,
     ],
     display: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
+    rng: random.Random | None = None,
 ) -> Graph:
     return create_run_chat_subbraph(
         players,
@@ -257,6 +413,9 @@ def create_run_daytime_chat_subgraph(
         n_turns_per_day=n_turns_per_day,
         echo_targets=display_targets,
         echo=display,
+        prompt_builder=prompt_builder,
+        token_echo=token_echo,
+        rng=rng,
     )
 
 
@@ -270,17 +429,18 @@ def create_run_nighttime_chat_subgraph(
     display_targets: list[Literal[  # type: ignore
         CHAT_TEARUP_NODE_NAME,  # type: ignore
         CHAT_TEARDOWN_NODE_NAME,  # type: ignore
-        CHAT_SELECT_SPEAKER_NODE_NAME,  # type: ignore
         CHAT_NODE_NAME,  # type: ignore
-        UPDATE_N_CHAT_REMAINING_NODE_NAME,  # type: ignore
     ] | str] = [
-        CHAT_SELECT_SPEAKER_NODE_NAME,
         CHAT_NODE_NAME,
     ],
     display: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
+    rng: random.Random | None = None,
 ) -> Graph:
     # Check if `werewolves` contains only werewolf players
-    invalid_players = [player.name for player in werewolves if not is_werewolf_role(player)]  # noqa
+    werewolves = Roster.of(werewolves)
+    invalid_players = [name for name in werewolves.names if not werewolves.is_werewolf_role(name)]  # noqa
     if invalid_players:
         raise ValueError(f"The following players are not werewolves but participate in the nighttime chat: {', '.join(invalid_players)}.")  # noqa
 
@@ -292,4 +452,7 @@ def create_run_nighttime_chat_subgraph(
         n_turns_per_day=n_turns_per_day,
         echo_targets=display_targets,
         echo=display,
+        prompt_builder=prompt_builder,
+        token_echo=token_echo,
+        rng=rng,
     )
@@ -6,8 +6,9 @@ from ..const import GAME_MASTER_NAME
 from ..enums import EResult
 from ..game_players import (
     BaseGamePlayerRole,
+    Roster,
+    WEREWOLF_ROLE,
     is_player_with_side,
-    is_werewolf_role,
 )
 from ..models.state import (
     StateModel,
@@ -31,17 +32,30 @@ REVEAL_ALL_PLAYER_ROLES_MESSAGE_TEMPLATE: str = '''The roles of the players are
 '''  # noqa
 
 
+def _get_player_state(name: str, state: StateModel) -> str:
+    if name in state.alive_players_set:
+        return 'Alive'
+    elimination = state.get_elimination(name)
+    if elimination is not None:
+        return f'Excluded in Day {elimination.day} {elimination.timespan.value}time'  # noqa
+    # NOTE: the states saved before the elimination log was introduced
+    daytime_results = [v.value for v in state.daytime_vote_result_history]
+    if name in daytime_results:
+        return f'Excluded in Day {daytime_results.index(name)+1} daytime'
+    nighttime_results = [v.value for v in state.nighttime_vote_result_history]  # noqa
+    return f'Excluded in Day {nighttime_results.index(name)+1} nighttime'
+
+
 def check_victory_condition(
     state: StateModel,
     players: Iterable[BaseGamePlayerRole],
 ) -> dict[str, EResult | None]:
-    alive_players = [p for p in players if p.name in state.alive_players_names]  # noqa
+    roster = Roster.of(players)
     n_alive_players: int = len(state.alive_players_names)
-    n_werewolves: int = len([
-        player
-        for player in alive_players
-        if is_werewolf_role(player)
-    ])
+    n_werewolves: int = roster.count(
+        roster.to_mask(state.alive_players_names),
+        role=WEREWOLF_ROLE,
+    )
     n_villagers: int = n_alive_players - n_werewolves
     if n_werewolves == 0:
         return create_dict_to_update_result(EResult.VillagersWin)
@@ -66,6 +80,7 @@ def create_check_victory_condition_subgraph(
     ],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
 ) -> Graph:
+    players = Roster.of(players)
     # define the graph
     workflow: Graph = StateGraph(StateModel)
 
@@ -96,15 +111,7 @@ def create_check_victory_condition_subgraph(
                     PLAYER_ROLE_MESSAGE_TEMPLATE.format(
                         name=player.name,
                         role=player.role,
-                        state=(
-                            'Alive'
-                            if player.name in state.alive_players_names else
-                            'Excluded in ' + (
-                                f'Day {list(v.value for v in state.daytime_vote_result_history).index(player.name)+1} daytime'  # noqa
-                                if player.name in {v.value for v in state.daytime_vote_result_history} else  # noqa
-                                f'Day {list(v.value for v in state.nighttime_vote_result_history).index(player.name)+1} nighttime'  # noqa
-                            )
-                        ),
+                        state=_get_player_state(player.name, state),
                         side=is_player_with_side(player) and player.side,
                     )
                     for player in players
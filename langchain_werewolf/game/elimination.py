@@ -1,4 +1,6 @@
 from collections import Counter
+from functools import partial
+import random
 from typing import Iterable, Callable, Literal
 from langchain_core.runnables import Runnable
 from langgraph.graph import Graph, StateGraph, START, END
@@ -7,6 +9,7 @@ from ..enums import ETimeSpan
 from ..game_players import BaseGamePlayerRole
 from ..models.state import (
     StateModel,
+    create_dict_to_add_elimination,
     create_dict_to_record_chat,
     create_dict_to_update_alive_players,
     create_dict_to_update_daytime_vote_result_history,
@@ -29,6 +32,24 @@ Last votes are follows: {last_votes}.
 '''
 
 
+def select_randomly(
+    candidates: Iterable[str],
+    rng: random.Random,
+) -> str:
+    """Select one of the candidates with the same number of votes at random
+
+    The candidates are sorted first so that the result does not depend on the order in which the votes arrived.
+
+    Args:
+        candidates (Iterable[str]): the names of the candidates
+        rng (random.Random): the random number generator
+
+    Returns:
+        str: the selected name
+    """  # noqa
+    return rng.choice(sorted(candidates))
+
+
 def _eliminate_player(
     state: StateModel,
     select_from_same_votes: Callable[[Iterable[str]], str | None] = lambda x: list(x)[0],  # noqa
@@ -44,14 +65,15 @@ def _eliminate_player(
         latest_votes = state.nighttime_votes_history[-1].value
         create_dict_to_update_vote_result_history = create_dict_to_update_nighttime_vote_result_history  # type: ignore # noqa
     # filter out the invalid votes
+    alive_players = state.alive_players_set
     valid_votes = {
         voter: voted
         for voter, voted in latest_votes.items()
-        if all([
-            voter in state.alive_players_names,
-            voted in state.alive_players_names,
-            voted not in state.safe_players_names,
-        ])
+        if (
+            voter in alive_players
+            and voted in alive_players
+            and voted not in state.safe_players_names
+        )
     }
     if len(valid_votes) == 0:
         return create_dict_to_update_vote_result_history(None)
@@ -66,11 +88,14 @@ def _eliminate_player(
     ]
     # select the player to eliminate
     eliminated = select_from_same_votes(candidates)
+    if eliminated is None:
+        return create_dict_to_update_vote_result_history(None)
     return (
         create_dict_to_update_vote_result_history(eliminated)
         | create_dict_to_update_alive_players(
             [n for n in state.alive_players_names if n != eliminated]  # noqa
         )
+        | create_dict_to_add_elimination(eliminated, state.day, state.timespan)  # noqa
     )
 
 
@@ -87,13 +112,19 @@ def create_elimination_subgraph(
         ELIMINATE_NODE_NAME,
     ],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
+    rng: random.Random | None = None,
 ) -> Graph:
     # define the graph
     workflow: Graph = StateGraph(StateModel)
     # define nodes
     workflow.add_node(ELIMINATE_TEARUP_NODE_NAME, create_dict_without_state_updated)  # noqa
     workflow.add_node(ELIMINATE_TEARDOWN_NODE_NAME, create_dict_without_state_updated)  # noqa
-    workflow.add_node(ELIMINATE_NODE_NAME, _eliminate_player)
+    workflow.add_node(
+        ELIMINATE_NODE_NAME,
+        partial(_eliminate_player, select_from_same_votes=partial(select_randomly, rng=rng))  # noqa
+        if rng is not None else
+        _eliminate_player,
+    )
     workflow.add_node(
         ANNOUNCE_NODE_NAME_DAYTIME,
         lambda state: create_dict_to_record_chat(
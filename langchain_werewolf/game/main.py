@@ -1,12 +1,21 @@
 from operator import attrgetter
+import random
 from typing import Iterable, Callable
 from langchain_core.runnables import Runnable, RunnableLambda, RunnableParallel
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import Graph, StateGraph, START, END
 from langgraph.graph.graph import CompiledGraph
 from ..enums import ETimeSpan
 from ..game_players import (
     BaseGamePlayerRole,
-    is_werewolf_role,
+    Roster,
+    WEREWOLF_ROLE,
+)
+from ..rng import (
+    GameRandom,
+    DAYTIME_SPEAKERS_STREAM,
+    NIGHTTIME_SPEAKERS_STREAM,
+    TIES_STREAM,
 )
 from ..models.state import (
     StateModel,
@@ -19,9 +28,34 @@ from .chat import create_run_daytime_chat_subgraph, create_run_nighttime_chat_su
 from .check_result import create_check_victory_condition_subgraph
 from .elimination import create_elimination_subgraph
 from .night_action import create_villagers_night_action_subgraph
+from .optimizer import optimize_graph
 from .setup import create_game_preparation_graph
+from .utils import MessageHistoryPromptBuilder, restrict_state_update
 from .vote import create_vote_daytime_vote_subgraph, create_vote_night_vote_subgraph  # noqa
 
+# NOTE: the villagers' night actions and the werewolves' discussion run concurrently.  # noqa
+#       Each branch returns only the fields it owns so that the outputs of both branches  # noqa
+#       do not overwrite each other when they are merged.
+NIGHT_CHAT_UPDATED_FIELDS: tuple[str, ...] = (
+    'chat_state',
+    'current_speaker',
+    'n_chat_remaining',
+    'speaker_schedule',
+)
+NIGHT_VOTE_UPDATED_FIELDS: tuple[str, ...] = (
+    'chat_state',
+    'nighttime_votes_current',
+    'nighttime_votes_history',
+)
+VILLAGERS_NIGHT_ACTION_UPDATED_FIELDS: tuple[str, ...] = (
+    'chat_state',
+    'safe_players_names',
+)
+
+
+def _get_stream(rng: GameRandom | None, purpose: str) -> random.Random | None:
+    return rng.stream(purpose) if rng is not None else None
+
 
 def create_game_graph(
     players: Iterable[BaseGamePlayerRole],
@@ -40,13 +74,18 @@ def create_game_graph(
     elimination_after_daytime_vote_kwargs: dict[str, object] = {},
     elimination_after_night_vote_kwargs: dict[str, object] = {},
     echo: Runnable[StateModel, None] | Callable[[StateModel], None] | None = None,  # noqa
+    token_echo: Callable[[str, Iterable[str], str | None], None] | None = None,  # noqa
+    checkpointer: BaseCheckpointSaver | None = None,
+    optimize: bool = False,
+    validation: bool = True,
+    rng: GameRandom | None = None,
 ) -> CompiledGraph:
     # preparation
-    players = list(players)
-    werewolves = [
-        player for player in players
-        if is_werewolf_role(player)
-    ]
+    # NOTE: the roster is built once and shared by all subgraphs
+    players = Roster.of(players)
+    werewolves = Roster(players.get_players_by_role(WEREWOLF_ROLE))
+    # NOTE: the rendered message histories are shared by the chats and the votes  # noqa
+    prompt_builder = MessageHistoryPromptBuilder()
     # define the graph
     workflow: Graph = StateGraph(StateModel)
     # add nodes
@@ -102,15 +141,24 @@ def create_game_graph(
             players,
             **(chat_kwargs | daytime_chat_kwargs),  # type: ignore # noqa
             display=echo,
+            prompt_builder=prompt_builder,
+            token_echo=token_echo,
+            rng=_get_stream(rng, DAYTIME_SPEAKERS_STREAM),
         ).compile(),
     )
     workflow.add_node(
         'night_chat',
-        create_run_nighttime_chat_subgraph(
-            werewolves,
-            **(chat_kwargs | nighttime_chat_kwargs),  # type: ignore # noqa
-            display=echo,
-        ).compile(),
+        restrict_state_update(
+            create_run_nighttime_chat_subgraph(
+                werewolves,
+                **(chat_kwargs | nighttime_chat_kwargs),  # type: ignore # noqa
+                display=echo,
+                prompt_builder=prompt_builder,
+                token_echo=token_echo,
+                rng=_get_stream(rng, NIGHTTIME_SPEAKERS_STREAM),
+            ).compile(),
+            NIGHT_CHAT_UPDATED_FIELDS,
+        ),
     )
     workflow.add_node(
         'daytime_vote',
@@ -118,23 +166,32 @@ def create_game_graph(
             players,
             **(vote_kwargs | daytime_vote_kwargs),  # type: ignore # noqa
             echo=echo,
+            prompt_builder=prompt_builder,
         ).compile(),
     )
     workflow.add_node(
         'night_vote',
-        create_vote_night_vote_subgraph(
-            werewolves,
-            **(vote_kwargs | nighttime_vote_kwargs),  # type: ignore # noqa
-            echo=echo,
-        ).compile(),
+        restrict_state_update(
+            create_vote_night_vote_subgraph(
+                werewolves,
+                # NOTE: the common decided_vote_cutoff is applied only to the daytime vote  # noqa
+                **({k: v for k, v in vote_kwargs.items() if k != 'decided_vote_cutoff'} | nighttime_vote_kwargs),  # type: ignore # noqa
+                echo=echo,
+                prompt_builder=prompt_builder,
+            ).compile(),
+            NIGHT_VOTE_UPDATED_FIELDS,
+        ),
     )
     workflow.add_node(
         'villagers_night_action',
-        create_villagers_night_action_subgraph(
-            players,
-            **night_action_kwargs,  # type: ignore # noqa
-            echo=echo,
-        ).compile(),
+        restrict_state_update(
+            create_villagers_night_action_subgraph(
+                players,
+                **night_action_kwargs,  # type: ignore # noqa
+                echo=echo,
+            ).compile(),
+            VILLAGERS_NIGHT_ACTION_UPDATED_FIELDS,
+        ),
     )
     workflow.add_node(
         'elimination_after_daytime_vote',
@@ -142,6 +199,7 @@ def create_game_graph(
             players,
             **(elimination_kwargs | elimination_after_daytime_vote_kwargs),  # type: ignore # noqa
             echo=echo,
+            rng=_get_stream(rng, TIES_STREAM),
         ).compile(),
     )
     workflow.add_node(
@@ -150,15 +208,21 @@ def create_game_graph(
             players,
             **(elimination_kwargs | elimination_after_night_vote_kwargs),  # type: ignore # noqa
             echo=echo,
+            rng=_get_stream(rng, TIES_STREAM),
         ).compile(),
     )
+    # NOTE: without the validation, the nodes are kept as no-ops so that the checkpoints are compatible  # noqa
     workflow.add_node(
         'state_validation_before_daytime',
-        RunnableLambda(lambda state: StateModel.validate_state(state) and create_dict_without_state_updated(state)),  # noqa
+        RunnableLambda(lambda state: StateModel.validate_state(state) and create_dict_without_state_updated(state))  # noqa
+        if validation else
+        create_dict_without_state_updated,
     )
     workflow.add_node(
         'state_validation_before_nighttime',
-        RunnableLambda(lambda state: StateModel.validate_state(state) and create_dict_without_state_updated(state)),  # noqa
+        RunnableLambda(lambda state: StateModel.validate_state(state) and create_dict_without_state_updated(state))  # noqa
+        if validation else
+        create_dict_without_state_updated,
     )
 
     workflow.add_edge(START, 'game_preparation')
@@ -185,10 +249,15 @@ def create_game_graph(
         ['setup_nighttime', END],
     )
     workflow.add_edge('setup_nighttime', 'state_validation_before_nighttime')
+    # NOTE: villagers' night actions do not depend on the werewolves' discussion,  # noqa
+    #       so both branches run concurrently and join before the elimination.  # noqa
     workflow.add_edge('state_validation_before_nighttime', 'villagers_night_action')  # noqa
-    workflow.add_edge('villagers_night_action', 'night_chat')
+    workflow.add_edge('state_validation_before_nighttime', 'night_chat')
     workflow.add_edge('night_chat', 'night_vote')
-    workflow.add_edge('night_vote', 'elimination_after_night_vote')
+    workflow.add_edge(['villagers_night_action', 'night_vote'], 'elimination_after_night_vote')  # type: ignore # noqa
     workflow.add_edge('elimination_after_night_vote', 'check_victory_condition_before_daytime')  # noqa
 
-    return workflow.compile()
+    # NOTE: the node names and the checkpoints differ from the unoptimized graph  # noqa
+    if optimize:
+        optimize_graph(workflow)  # type: ignore
+    return workflow.compile(checkpointer=checkpointer)
@@ -6,6 +6,8 @@ from pydantic import BaseModel, Field
 from ..const import GAME_MASTER_NAME
 from ..game_players import (
     BaseGamePlayerRole,
+    Roster,
+    act_in_night_in_batch,
     filter_state_according_to_player,
     is_werewolf_role,
 )
@@ -15,6 +17,7 @@ from ..models.state import (
     create_dict_to_record_chat,
     create_dict_without_state_updated,
     get_related_messsages,
+    reduce_dicts_to_update_state,
 )
 from .utils import add_echo_node
 
@@ -24,6 +27,7 @@ NIGHT_ACTION_TEARDOWN_NODE_NAME: str = 'teardown_night_action'
 PASSTHROUGH_NODE_NAME_TEMPLATE: str = 'passthrough_{name}'
 MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE: str = 'game_master_ask_{name}_to_act_in_night'  # noqa
 ACTION_NODE_NAME_TEMPLATE: str = '{name}_night_action'
+BATCH_ACTION_NODE_NAME: str = 'batch_night_action'
 
 TEMPLATE_FOR_NIGHT_ACTION_TEMPLATE: str = '''
 Your role is {role}.
@@ -74,7 +78,22 @@ def _player_act_in_night(
     return create_dict_without_state_updated(state) | player.act_in_night(
         players,
         get_related_messsages(player.name, state),
-        filter_state_according_to_player(player, state),
+        filter_state_according_to_player(player, state, Roster.of(players)),
+    )
+
+
+def _players_act_in_night_in_batch(
+    state: StateModel,
+    players: Roster[BaseGamePlayerRole],
+) -> dict[str, object]:
+    # NOTE: the same players as the ones not skipped by _skip_player_act_in_night  # noqa
+    actors = [
+        player for player in players
+        if not players.is_werewolf_role(player.name)
+        and player.name in state.alive_players_set
+    ]
+    return create_dict_without_state_updated(state) | reduce_dicts_to_update_state(  # noqa
+        act_in_night_in_batch(actors, players, state),
     )
 
 
@@ -83,10 +102,15 @@ def _skip_player_act_in_night(
     player: BaseGamePlayerRole,
     not_skip_destination_node_namd: str,
     skip_destination_node_name: str,
+    roster: Roster[BaseGamePlayerRole] | None = None,
 ) -> str:
-    if is_werewolf_role(player):
+    if (
+        roster.is_werewolf_role(player.name)
+        if roster is not None else
+        is_werewolf_role(player)
+    ):
         return skip_destination_node_name
-    if player.name not in state.alive_players_names:
+    if player.name not in state.alive_players_set:
         return skip_destination_node_name
     return not_skip_destination_node_namd
 
@@ -104,8 +128,22 @@ def create_villagers_night_action_subgraph(
         MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE,
     ],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
+    batch: bool = False,
 ) -> Graph:
+    """Create the subgraph in which the villagers act in the night
+
+    Args:
+        players (Iterable[BaseGamePlayerRole]): all players
+        prompt (Callable[[GeneratePromptInputForNightAction], str] | str, optional): the prompt of the game master to ask a player to act. Defaults to TEMPLATE_FOR_NIGHT_ACTION_TEMPLATE.
+        echo_targets (list[str], optional): the nodes to be echoed. Defaults to [NIGHT_ACTION_TEARUP_NODE_NAME, MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE].
+        echo (Callable[[StateModel], None] | Runnable[StateModel, None] | None, optional): the echo. Defaults to None.
+        batch (bool, optional): whether the players act in one node so that the LLM calls sharing a model are batched. Defaults to False.
+
+    Returns:
+        Graph: the subgraph
+    """  # noqa
     # init
+    players = Roster.of(players)
     if MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE in echo_targets:
         echo_targets = list(echo_targets)
         echo_targets.extend([
@@ -142,10 +180,11 @@ def create_villagers_night_action_subgraph(
                 generate_prompt=prompt if callable(prompt) else lambda m: prompt.format(**m.model_dump()),  # noqa
             ),
         )
-        workflow.add_node(
-            ACTION_NODE_NAME_TEMPLATE.format(name=player.name),
-            partial(_player_act_in_night, player=player, players=players),
-        )
+        if not batch:
+            workflow.add_node(
+                ACTION_NODE_NAME_TEMPLATE.format(name=player.name),
+                partial(_player_act_in_night, player=player, players=players),  # noqa
+            )
         # define edges
         workflow.add_edge(
             NIGHT_ACTION_TEARUP_NODE_NAME,
@@ -158,17 +197,26 @@ def create_villagers_night_action_subgraph(
                 player=player,
                 not_skip_destination_node_namd=MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE.format(name=player.name),  # noqa
                 skip_destination_node_name=END,
+                roster=players,
             ),
             [MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE.format(name=player.name), END],  # noqa
         )
         workflow.add_edge(
             MASTER_ASK_PLAYER_TO_ACT_NODE_NAME_TEMPLATE.format(name=player.name),  # noqa
-            ACTION_NODE_NAME_TEMPLATE.format(name=player.name),
+            BATCH_ACTION_NODE_NAME if batch else ACTION_NODE_NAME_TEMPLATE.format(name=player.name),  # noqa
         )
-        workflow.add_edge(
-            ACTION_NODE_NAME_TEMPLATE.format(name=player.name),
-            END,
+        if not batch:
+            workflow.add_edge(
+                ACTION_NODE_NAME_TEMPLATE.format(name=player.name),
+                END,
+            )
+    if batch:
+        # NOTE: the node runs once after all the players are asked in the same step  # noqa
+        workflow.add_node(
+            BATCH_ACTION_NODE_NAME,
+            partial(_players_act_in_night_in_batch, players=players),
         )
+        workflow.add_edge(BATCH_ACTION_NODE_NAME, END)
     # add display nodes
     add_echo_node(workflow, echo_targets, echo)
     return workflow
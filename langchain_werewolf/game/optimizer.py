@@ -0,0 +1,322 @@
+from logging import getLogger, Logger
+from langchain_core.runnables import Runnable, RunnableSequence
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.branch import Branch
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.utils.runnable import RunnableCallable
+from pydantic import BaseModel, Field
+from ..const import FLATTENED_NODE_SEPARATOR
+from ..models.state import create_dict_without_state_updated
+from .utils import ECHO_NODE_NAME
+
+
+class GraphOptimizationReport(BaseModel):
+    nodes_before: int = Field(..., title="the number of the nodes including the nodes of the nested graphs before the optimization")  # noqa
+    nodes_after: int = Field(..., title="the number of the nodes including the nodes of the nested graphs after the optimization")  # noqa
+    graphs_before: int = Field(..., title="the number of the graphs including the nested graphs before the optimization")  # noqa
+    graphs_after: int = Field(..., title="the number of the graphs including the nested graphs after the optimization")  # noqa
+    flattened: list[str] = Field(default_factory=list, title="the nodes whose subgraphs are flattened into the parent graph")  # noqa
+    elided: list[str] = Field(default_factory=list, title="the no-op nodes removed from the graphs")  # noqa
+
+    def format(self) -> str:
+        return (
+            f'nodes: {self.nodes_before} -> {self.nodes_after}, '
+            f'graphs: {self.graphs_before} -> {self.graphs_after}, '
+            f'flattened: {len(self.flattened)}, elided: {len(self.elided)}'
+        )
+
+
+def _get_subgraph(runnable: Runnable) -> CompiledStateGraph | None:
+    # NOTE: the subgraph may be wrapped by `restrict_state_update`
+    if isinstance(runnable, RunnableSequence):
+        runnable = runnable.first
+    return runnable if isinstance(runnable, CompiledStateGraph) else None
+
+
+def _replace_subgraph(
+    runnable: Runnable,
+    subgraph: CompiledStateGraph,
+) -> Runnable:
+    if isinstance(runnable, RunnableSequence):
+        return RunnableSequence(subgraph, *runnable.middle, runnable.last)
+    return subgraph
+
+
+def count_nodes(workflow: StateGraph) -> tuple[int, int]:
+    """Count the nodes and the graphs including the nested graphs
+
+    Args:
+        workflow (StateGraph): the graph
+
+    Returns:
+        tuple[int, int]: the number of the nodes and the number of the graphs
+    """  # noqa
+    n_nodes, n_graphs = len(workflow.nodes), 1
+    for spec in workflow.nodes.values():
+        subgraph = _get_subgraph(spec.runnable)
+        if subgraph is not None:
+            n_nodes_, n_graphs_ = count_nodes(subgraph.builder)
+            n_nodes += n_nodes_
+            n_graphs += n_graphs_
+    return n_nodes, n_graphs
+
+
+def is_noop_node(workflow: StateGraph, name: str) -> bool:
+    """Check whether a node returns no state update, i.e. it is `create_dict_without_state_updated`
+
+    Args:
+        workflow (StateGraph): the graph
+        name (str): the node name
+
+    Returns:
+        bool: True if the node is a no-op
+    """  # noqa
+    runnable = workflow.nodes[name].runnable
+    return isinstance(runnable, RunnableCallable) and runnable.func is create_dict_without_state_updated  # noqa
+
+
+def _get_branch_sources(
+    workflow: StateGraph,
+    name: str,
+) -> list[tuple[str, str, Branch]]:
+    return [
+        (source, key, branch)
+        for source, branches in workflow.branches.items()
+        for key, branch in branches.items()
+        if branch.ends is not None and name in branch.ends.values()
+    ]
+
+
+def _is_rewirable(workflow: StateGraph, name: str) -> bool:
+    # NOTE: the destinations of a conditional edge without the path map are unknown  # noqa
+    return not any(
+        name in sources or name == target
+        for sources, target in workflow.waiting_edges
+    ) and all(
+        branch.ends is not None
+        for branches in workflow.branches.values()
+        for branch in branches.values()
+    )
+
+
+def _replace_branch_ends(
+    workflow: StateGraph,
+    source: str,
+    key: str,
+    mapping: dict[str, str],
+) -> None:
+    branch = workflow.branches[source][key]
+    workflow.branches[source][key] = branch._replace(ends={
+        k: mapping.get(v, v) for k, v in (branch.ends or {}).items()
+    })
+
+
+def elide_noop_node(workflow: StateGraph, name: str) -> bool:
+    """Remove a no-op node by connecting its predecessors to its successors
+
+    The node is kept when the rewiring is ambiguous,
+    e.g. a conditional edge leads to the node which has several successors.
+
+    Args:
+        workflow (StateGraph): the graph
+        name (str): the name of the no-op node
+
+    Returns:
+        bool: True if the node is removed
+    """  # noqa
+    if not _is_rewirable(workflow, name):
+        return False
+    sources = [source for source, target in workflow.edges if target == name]
+    targets = [target for source, target in workflow.edges if source == name]
+    branch_sources = _get_branch_sources(workflow, name)
+    branches = workflow.branches.get(name, {})
+    if branches:
+        # NOTE: the conditional edges are moved to the only predecessor,
+        #       which sees the same state because the node updates nothing
+        if targets or branch_sources or len(sources) != 1:
+            return False
+        workflow.branches[sources[0]].update({
+            f'{name}{FLATTENED_NODE_SEPARATOR}{key}': branch
+            for key, branch in branches.items()
+        })
+        del workflow.branches[name]
+    else:
+        if branch_sources and len(targets) != 1:
+            return False
+        if START in sources and END in targets:
+            return False
+        workflow.edges.update(
+            (source, target) for source in sources for target in targets
+        )
+        for source, key, _ in branch_sources:
+            _replace_branch_ends(workflow, source, key, {name: targets[0]})
+    workflow.edges = {
+        (source, target)
+        for source, target in workflow.edges
+        if name not in (source, target)
+    }
+    del workflow.nodes[name]
+    return True
+
+
+def _get_exit(workflow: StateGraph) -> str | None:
+    # NOTE: the echo nodes only display the state and are not the exit
+    exits = [
+        source for source, target in workflow.edges
+        if target == END and source != ECHO_NODE_NAME
+    ]
+    if len(exits) != 1 or exits[0] == START:
+        return None
+    if _get_branch_sources(workflow, END):
+        return None
+    if workflow.branches.get(exits[0]):
+        return None
+    return exits[0]
+
+
+def _get_entry(workflow: StateGraph) -> str | None:
+    entries = [target for source, target in workflow.edges if source == START]
+    if len(entries) != 1 or workflow.branches.get(START):
+        return None
+    return entries[0]
+
+
+def flatten_subgraph(workflow: StateGraph, name: str) -> bool:
+    """Replace a node of a compiled subgraph with the nodes of the subgraph
+
+    The nodes are renamed as "{name}/{node}".
+    Only the subgraph with one entry and one exit is flattened
+    so that the successors of the node run once after the subgraph as before.
+
+    Args:
+        workflow (StateGraph): the parent graph
+        name (str): the name of the node of the subgraph
+
+    Returns:
+        bool: True if the subgraph is flattened
+    """  # noqa
+    spec = workflow.nodes[name]
+    if not isinstance(spec.runnable, CompiledStateGraph):
+        return False
+    child: StateGraph = spec.runnable.builder
+    if child.schema is not workflow.schema or child.waiting_edges:
+        return False
+    if not _is_rewirable(workflow, name) or not _is_rewirable(child, END):
+        return False
+    entry, exit_ = _get_entry(child), _get_exit(child)
+    if entry is None or exit_ is None:
+        return False
+
+    def _rename(node: str) -> str:
+        return node if node in (START, END) else f'{name}{FLATTENED_NODE_SEPARATOR}{node}'  # noqa
+
+    # nodes
+    for node, node_spec in child.nodes.items():
+        workflow.nodes[_rename(node)] = node_spec
+    # edges of the subgraph
+    # NOTE: the echo node becomes a dead end because it updates nothing
+    workflow.edges.update(
+        (_rename(source), _rename(target))
+        for source, target in child.edges
+        if source != START and target != END
+    )
+    for source, branches in child.branches.items():
+        for key, branch in branches.items():
+            workflow.branches[_rename(source)][key] = branch._replace(ends={
+                k: _rename(v) for k, v in (branch.ends or {}).items()
+            })
+    # edges from and to the parent
+    for source, target in list(workflow.edges):
+        if target == name:
+            workflow.edges.add((source, _rename(entry)))
+        if source == name:
+            workflow.edges.add((_rename(exit_), target))
+    for source, key, _ in _get_branch_sources(workflow, name):
+        _replace_branch_ends(workflow, source, key, {name: _rename(entry)})
+    if name in workflow.branches:
+        workflow.branches[_rename(exit_)].update(workflow.branches.pop(name))
+    workflow.edges = {
+        (source, target)
+        for source, target in workflow.edges
+        if name not in (source, target)
+    }
+    del workflow.nodes[name]
+    return True
+
+
+def _optimize_graph(
+    workflow: StateGraph,
+    flatten: bool,
+    elide: bool,
+    prefix: str = '',
+) -> tuple[list[str], list[str]]:
+    flattened: list[str] = []
+    elided: list[str] = []
+    # NOTE: the flattened nodes may be subgraphs again
+    while flatten:
+        names = [name for name in list(workflow.nodes) if flatten_subgraph(workflow, name)]  # noqa
+        if not names:
+            break
+        flattened.extend(prefix + name for name in names)
+    for name, spec in list(workflow.nodes.items()):
+        subgraph = _get_subgraph(spec.runnable)
+        if subgraph is None:
+            continue
+        flattened_, elided_ = _optimize_graph(
+            subgraph.builder,
+            flatten,
+            elide,
+            prefix=f'{prefix}{name}{FLATTENED_NODE_SEPARATOR}',
+        )
+        if flattened_ or elided_:
+            workflow.nodes[name] = spec._replace(runnable=_replace_subgraph(
+                spec.runnable,
+                subgraph.builder.compile(checkpointer=subgraph.checkpointer),
+            ))
+        flattened.extend(flattened_)
+        elided.extend(elided_)
+    if elide:
+        elided.extend(
+            prefix + name
+            for name in list(workflow.nodes)
+            if is_noop_node(workflow, name) and elide_noop_node(workflow, name)  # noqa
+        )
+    return flattened, elided
+
+
+def optimize_graph(
+    workflow: StateGraph,
+    flatten: bool = True,
+    elide: bool = True,
+    logger: Logger = getLogger(__name__),
+) -> GraphOptimizationReport:
+    """Optimize a graph before it is compiled
+
+    The compiled subgraphs are flattened into the parent graph
+    and the no-op nodes, which return `create_dict_without_state_updated`, are removed,
+    so that the game runs with fewer supersteps, checkpoints and reductions of the state.
+    The subgraphs wrapped by `restrict_state_update` are not flattened because they run concurrently with the other nodes,
+    but they are optimized and compiled again.
+
+    Args:
+        workflow (StateGraph): the graph, which is modified in place
+        flatten (bool, optional): whether the subgraphs are flattened. Defaults to True.
+        elide (bool, optional): whether the no-op nodes are removed. Defaults to True.
+        logger (Logger, optional): the logger. Defaults to getLogger(__name__).
+
+    Returns:
+        GraphOptimizationReport: the numbers of the nodes and the graphs before and after the optimization
+    """  # noqa
+    nodes_before, graphs_before = count_nodes(workflow)
+    flattened, elided = _optimize_graph(workflow, flatten, elide)
+    nodes_after, graphs_after = count_nodes(workflow)
+    report = GraphOptimizationReport(
+        nodes_before=nodes_before,
+        nodes_after=nodes_after,
+        graphs_before=graphs_before,
+        graphs_after=graphs_after,
+        flattened=flattened,
+        elided=elided,
+    )
+    logger.info(f'Optimized the graph: {report.format()}')
+    return report
@@ -1,4 +1,10 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+import heapq
 from logging import getLogger, Logger
+from operator import itemgetter
+import threading
 from typing import Callable, Iterable
 from langchain_core.runnables import Runnable, RunnableLambda
 from langgraph.graph import Graph, END
@@ -6,8 +12,12 @@ from ..models.state import (
     MsgModel,
     StateModel,
     create_dict_without_state_updated,
+    get_related_chat_histories,
 )
 
+# const
+ECHO_NODE_NAME: str = '_echo_'
+
 
 def create_message_history_prompt(
     messages: list[MsgModel],
@@ -19,11 +29,159 @@ def create_message_history_prompt(
     ])
 
 
+@dataclass
+class _HistoryBuffer:
+    # NOTE: the entries are the timestamp, the id, the message and the rendered text sorted by the timestamp  # noqa
+    entries: list[tuple[datetime, str, MsgModel, str]] = field(default_factory=list)  # noqa
+    # NOTE: the number of the messages read from each chat and the id of the last one  # noqa
+    cursors: dict[frozenset[str], tuple[int, str]] = field(default_factory=dict)  # noqa
+
+
+class MessageHistoryPromptBuilder:
+    """Render the message histories of the players incrementally
+
+    Each message is rendered once for all the players and each player has a buffer of the rendered messages with a cursor per chat,
+    so building a history costs only the rendering and the merge of the new messages and a join.
+    The result is the same as `create_message_history_prompt` of `get_related_messsages`.
+    """  # noqa
+
+    def __init__(
+        self,
+        formatter: Callable[[MsgModel], str] = MsgModel.format,
+    ) -> None:
+        """Initialize the builder
+
+        Args:
+            formatter (Callable[[MsgModel], str], optional): the formatter of a message. Defaults to MsgModel.format.
+        """  # noqa
+        self._formatter = formatter
+        self._lock = threading.Lock()
+        self._rendered: dict[str, str] = {}
+        self._buffers: dict[str, _HistoryBuffer] = {}
+
+    @property
+    def formatter(self) -> Callable[[MsgModel], str]:
+        return self._formatter
+
+    @formatter.setter
+    def formatter(self, formatter: Callable[[MsgModel], str]) -> None:
+        with self._lock:
+            if formatter is not self._formatter:
+                # NOTE: the rendered messages are invalidated only by the formatter  # noqa
+                self._formatter = formatter
+                self._rendered.clear()
+                self._buffers.clear()
+
+    def _update(
+        self,
+        name: str,
+        state: StateModel,
+    ) -> tuple[list[MsgModel], list[str]]:
+        histories = get_related_chat_histories(name, state)
+        buffer = self._buffers.get(name) or _HistoryBuffer()
+        for names, (n_read, last_id) in buffer.cursors.items():
+            history = histories.get(names)
+            if history is None or len(history.messages) < n_read or history.messages[n_read - 1].id != last_id:  # noqa
+                # NOTE: the histories do not extend the buffer, e.g. resumed from another state  # noqa
+                buffer = _HistoryBuffer()
+                break
+        new_entries: list[tuple[datetime, str, MsgModel, str]] = []
+        for names, history in histories.items():
+            n_read, _ = buffer.cursors.get(names, (0, ''))
+            for message in history.messages[n_read:]:
+                text = self._rendered.get(message.id)
+                if text is None:
+                    text = self._rendered[message.id] = self._formatter(MsgModel(  # noqa
+                        name=message.value.name,
+                        timestamp=message.value.timestamp,
+                        message=message.value.message,
+                        participants=names,
+                    ))
+                new_entries.append((message.value.timestamp, message.id, message.value, text))  # noqa
+            if history.messages:
+                buffer.cursors[names] = (len(history.messages), history.messages[-1].id)  # noqa
+        new_entries.sort(key=itemgetter(0))
+        if new_entries and buffer.entries and new_entries[0][0] < buffer.entries[-1][0]:  # noqa
+            # NOTE: only the buffered entries newer than the new ones are merged again  # noqa
+            index = bisect_right(buffer.entries, new_entries[0][0], key=itemgetter(0))  # noqa
+            tail = buffer.entries[index:]
+            del buffer.entries[index:]
+            new_entries = list(heapq.merge(tail, new_entries, key=itemgetter(0)))  # noqa
+        buffer.entries.extend(new_entries)
+        self._buffers[name] = buffer
+        return (
+            [entry[2] for entry in buffer.entries],
+            [entry[3] for entry in buffer.entries],
+        )
+
+    def build(
+        self,
+        name: str,
+        state: StateModel,
+        exclude_latest: bool = False,
+    ) -> str:
+        """Build the message history prompt of a player
+
+        Args:
+            name (str): the name of the player
+            state (StateModel): the state
+            exclude_latest (bool, optional): whether the latest message is excluded, e.g. when it is given as the prompt. Defaults to False.
+
+        Returns:
+            str: the message history prompt
+        """  # noqa
+        with self._lock:
+            _, texts = self._update(name, state)
+            return '\n'.join(texts[:-1] if exclude_latest else texts)
+
+    def get_latest_message(
+        self,
+        name: str,
+        state: StateModel,
+    ) -> MsgModel | None:
+        """Get the latest message related to a player
+
+        Args:
+            name (str): the name of the player
+            state (StateModel): the state
+
+        Returns:
+            MsgModel | None: the latest message or None if there is no message
+        """  # noqa
+        with self._lock:
+            messages, _ = self._update(name, state)
+            return messages[-1] if messages else None
+
+
+def restrict_state_update(
+    runnable: Runnable[StateModel, dict[str, object]],
+    fields: Iterable[str],
+) -> Runnable[StateModel, dict[str, object]]:
+    """Restrict the state update returned by a runnable to the given fields
+
+    Args:
+        runnable (Runnable[StateModel, dict[str, object]]): a node like a compiled subgraph
+        fields (Iterable[str]): the names of the fields which the node is allowed to update
+
+    Returns:
+        Runnable[StateModel, dict[str, object]]: the runnable whose output contains only `fields`
+
+    Note:
+        A compiled subgraph returns all the fields of the state.
+        When nodes run in the same superstep, their outputs are merged by the reducers of StateModel,
+        so the fields which they do not own must not be returned in order not to overwrite each other.
+    """  # noqa
+    fields = frozenset(fields)
+    return runnable | RunnableLambda(
+        lambda dic: {k: v for k, v in dic.items() if k in fields},
+    )
+
+
 def add_echo_node(
     workflow: Graph,
     node: str | Iterable[str],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
-    echo_node_name: str = '_echo_',
+    echo_node_name: str = ECHO_NODE_NAME,
     next_node: str = END,
     logger: Logger = getLogger(__name__),
 ) -> Graph:
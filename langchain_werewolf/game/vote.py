@@ -1,14 +1,15 @@
+from collections import Counter
 from functools import partial
 from logging import getLogger, Logger
 from operator import attrgetter
-from typing import Callable, Iterable, Literal
+from typing import Callable, Iterable, Literal, Sequence
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.runnables import Runnable, RunnableBranch, RunnableLambda
 from langgraph.graph import END, START, Graph, StateGraph
 from pydantic import BaseModel, Field, field_validator
 
-from ..const import GAME_MASTER_NAME, DEFAULT_MODEL
+from ..const import GAME_MASTER_NAME, DEFAULT_MODEL, SKIPPED_VOTE
 from ..enums import ETimeSpan
 from ..game_players import (
     BaseGamePlayerRole,
@@ -19,6 +20,7 @@ from ..game_players import (
 )
 from ..llm_utils import extract_name
 from ..models.state import (
+    MsgModel,
     StateModel,
     create_dict_to_record_chat,
     create_dict_to_update_daytime_votes_current,
@@ -31,7 +33,11 @@ from ..models.state import (
 from .prompts import (
     SYSTEM_PROMPT_TEMPLATE,
 )
-from .utils import add_echo_node, create_message_history_prompt  # noqa
+from .utils import (
+    MessageHistoryPromptBuilder,
+    add_echo_node,
+    create_message_history_prompt,
+)
 
 # const
 VOTE_TEARUP_NODE_NAME: str = 'tearup_vote'
@@ -88,6 +94,46 @@ class GenerateSystemPromptInputForVote(BaseModel):
         = Field(..., title="the message history of the player")
 
 
+def is_vote_decided(
+    state: StateModel,
+    votes: dict[str, str],
+    voters: Iterable[str],
+) -> bool:
+    """Check whether the remaining voters can no longer change the player to eliminate
+
+    The votes are counted in the same way as the elimination, i.e. only the votes by and for the alive players who are not safe.
+    The result is decided when the leader has more votes than the runner-up even if all the remaining voters vote for the runner-up,
+    so a possible tie is never regarded as decided.
+
+    Args:
+        state (StateModel): the current state
+        votes (dict[str, str]): the votes so far
+        voters (Iterable[str]): the names of all the voters
+
+    Returns:
+        bool: True if the result is decided
+    """  # noqa
+    alive_players = state.alive_players_set
+    votes_count = Counter(
+        voted
+        for voter, voted in votes.items()
+        if (
+            voter in alive_players
+            and voted in alive_players
+            and voted not in state.safe_players_names
+        )
+    )
+    if len(votes_count) == 0:
+        return False
+    n_remaining = sum(
+        1 for voter in voters
+        if voter in alive_players and voter not in votes
+    )
+    (_, n_first), *rest = votes_count.most_common(2)
+    n_second = rest[0][1] if rest else 0
+    return n_first > n_second + n_remaining
+
+
 def _player_vote(
     state: StateModel,
     timespan: ETimeSpan,
@@ -95,11 +141,14 @@ def _player_vote(
     generate_system_prompt: Callable[[GenerateSystemPromptInputForVote], str],
     chat_model: BaseChatModel | str = DEFAULT_MODEL,
     seed: int | None = None,
+    escalation_chat_models: Sequence[BaseChatModel | str] = tuple(),
     logger: Logger = getLogger(__name__),
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    voters: Iterable[str] | None = None,
 ) -> dict[str, object]:  # type: ignore
 
     # Case: When the player has been already excluded, he/she cannot vote
-    if player.name not in state.alive_players_names:
+    if player.name not in state.alive_players_set:
         logger.info(f'{player.name} has been already excluded.')
         return create_dict_without_state_updated(state)
 
@@ -107,16 +156,33 @@ def _player_vote(
         ETimeSpan.day: create_dict_to_update_daytime_votes_current,
         ETimeSpan.night: create_dict_to_update_nighttime_votes_current,
     }[timespan]
+    votes_current: dict[str, str] = {
+        ETimeSpan.day: state.daytime_votes_current,
+        ETimeSpan.night: state.nighttime_votes_current,
+    }[state.timespan]
+
+    # Case: When the result is already decided, the vote is skipped
+    # NOTE: voters is given only when the votes are cast one by one
+    if voters is not None and is_vote_decided(state, votes_current, voters):
+        logger.info(f'The vote of {player.name} is skipped because the result is decided.')  # noqa
+        return update_votes_history(votes_current | {player.name: SKIPPED_VOTE})  # type: ignore # noqa
 
     # get the related chat histories
-    messages = get_related_messsages(player.name, state)
+    latest_message: MsgModel | None
+    if prompt_builder is not None:
+        latest_message = prompt_builder.get_latest_message(player.name, state)  # noqa
+        history = prompt_builder.build(player.name, state, exclude_latest=True)  # noqa
+    else:
+        messages = get_related_messsages(player.name, state)
+        latest_message = messages[-1] if messages else None
+        history = create_message_history_prompt(messages[:-1])
     # generate message
-    prompt = messages[-1].message if messages else ''
+    prompt = latest_message.message if latest_message else ''
     message = player.generate_message(
         prompt=prompt,
         system_prompt=generate_system_prompt(GenerateSystemPromptInputForVote(
             name=player.name,
-            messages=create_message_history_prompt(messages[:-1]),
+            messages=history,
         )),
     ).message
     name: str = extract_name(
@@ -125,12 +191,9 @@ def _player_vote(
         context=NAME_EXTRACTION_CONTEXT_PROMPT,
         chat_model=chat_model,
         seed=seed,
+        escalation_chat_models=escalation_chat_models,
     )
     # create a new chat history
-    votes_current: dict[str, str] = {
-        ETimeSpan.day: state.daytime_votes_current,
-        ETimeSpan.night: state.nighttime_votes_current,
-    }[state.timespan]
     return (  # type: ignore
         create_dict_to_record_chat(player.name, [GAME_MASTER_NAME], message)
         | update_votes_history(votes_current | {player.name: name})  # type: ignore # noqa
@@ -144,6 +207,7 @@ def _create_run_vote_subgraph(
     system_prompt: Callable[[GenerateSystemPromptInputForVote], str] | str = SYSTEM_PROMPT_TEMPLATE,  # noqa
     chat_model: BaseChatModel | str = DEFAULT_MODEL,
     seed: int | None = None,
+    escalation_chat_models: Sequence[BaseChatModel | str] = tuple(),
     *,
     echo_targets: list[Literal[  # type: ignore
         VOTE_TEARUP_NODE_NAME,  # type: ignore
@@ -151,6 +215,8 @@ def _create_run_vote_subgraph(
     ]] = [],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
     logger: Logger = getLogger(__name__),
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    decided_vote_cutoff: bool = False,
 ) -> Graph:
     # preprocess prompt
     prompt_func: Callable[[GeneratePromptInputForVote], str]
@@ -163,6 +229,8 @@ def _create_run_vote_subgraph(
         system_prompt_func = system_prompt
     else:
         def system_prompt_func(m): return system_prompt.format(**m.model_dump())  # noqa
+    # NOTE: the builder is shared by the votes of the game to render each message once  # noqa
+    prompt_builder = prompt_builder or MessageHistoryPromptBuilder()
     # define the graph
     workflow: Graph = StateGraph(StateModel)
     # define nodes and edges
@@ -198,6 +266,7 @@ def _create_run_vote_subgraph(
             lambda state: logger.error(f'Invalid timespan: {state.timespan}')
         ).with_types(input_type=StateModel, output_type=dict[str, object]),  # type: ignore # noqa
     )
+    voters: list[str] = [player.name for player in players]
     for player in players:
         workflow.add_node(
             VOTE_NODE_NAME_TEMPLATE.format(master=GAME_MASTER_NAME, name=player.name),  # noqa
@@ -208,10 +277,24 @@ def _create_run_vote_subgraph(
                 generate_system_prompt=system_prompt_func,
                 chat_model=chat_model,
                 seed=seed,
+                escalation_chat_models=escalation_chat_models,
+                prompt_builder=prompt_builder,
+                voters=voters if decided_vote_cutoff else None,
             ),
         )
-        workflow.add_edge(VOTE_TEARUP_NODE_NAME, VOTE_NODE_NAME_TEMPLATE.format(master=GAME_MASTER_NAME, name=player.name))  # noqa
-        workflow.add_edge(VOTE_NODE_NAME_TEMPLATE.format(master=GAME_MASTER_NAME, name=player.name), VOTE_TEARDOWN_NODE_NAME)  # noqa
+    if decided_vote_cutoff:
+        # NOTE: the votes are cast one by one to tally them incrementally
+        #       and the remaining votes are skipped once the result is decided  # noqa
+        node_names = [VOTE_TEARUP_NODE_NAME] + [
+            VOTE_NODE_NAME_TEMPLATE.format(master=GAME_MASTER_NAME, name=name)  # noqa
+            for name in voters
+        ] + [VOTE_TEARDOWN_NODE_NAME]
+        for source, target in zip(node_names[:-1], node_names[1:]):
+            workflow.add_edge(source, target)
+    else:
+        for name in voters:
+            workflow.add_edge(VOTE_TEARUP_NODE_NAME, VOTE_NODE_NAME_TEMPLATE.format(master=GAME_MASTER_NAME, name=name))  # noqa
+            workflow.add_edge(VOTE_NODE_NAME_TEMPLATE.format(master=GAME_MASTER_NAME, name=name), VOTE_TEARDOWN_NODE_NAME)  # noqa
     workflow.add_edge(START, VOTE_TEARUP_NODE_NAME)
     workflow.add_edge(VOTE_TEARDOWN_NODE_NAME, END)
     # add display nodes
@@ -225,6 +308,7 @@ def create_vote_daytime_vote_subgraph(
     system_prompt: Callable[[GenerateSystemPromptInputForVote], str] | str = SYSTEM_PROMPT_TEMPLATE,  # noqa
     chat_model: BaseChatModel | str = DEFAULT_MODEL,
     seed: int | None = None,
+    escalation_chat_models: Sequence[BaseChatModel | str] = tuple(),
     *,
     echo_targets: list[Literal[  # type: ignore
         VOTE_TEARUP_NODE_NAME,  # type: ignore
@@ -232,6 +316,8 @@ def create_vote_daytime_vote_subgraph(
     ]] = [],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
     logger: Logger = getLogger(__name__),
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    decided_vote_cutoff: bool = False,
 ) -> Graph:
     return _create_run_vote_subgraph(
         players,
@@ -240,9 +326,12 @@ def create_vote_daytime_vote_subgraph(
         system_prompt,
         chat_model,
         seed,
+        escalation_chat_models,
         echo_targets=echo_targets,
         echo=echo,
         logger=logger,
+        prompt_builder=prompt_builder,
+        decided_vote_cutoff=decided_vote_cutoff,
     )
 
 
@@ -252,6 +341,7 @@ def create_vote_night_vote_subgraph(
     system_prompt: Callable[[GenerateSystemPromptInputForVote], str] | str = SYSTEM_PROMPT_TEMPLATE,  # noqa
     chat_model: BaseChatModel | str = DEFAULT_MODEL,
     seed: int | None = None,
+    escalation_chat_models: Sequence[BaseChatModel | str] = tuple(),
     *,
     echo_targets: list[Literal[  # type: ignore
         VOTE_TEARUP_NODE_NAME,  # type: ignore
@@ -259,7 +349,13 @@ def create_vote_night_vote_subgraph(
     ]] = [],
     echo: Callable[[StateModel], None] | Runnable[StateModel, None] | None = None,  # noqa
     logger: Logger = getLogger(__name__),
+    prompt_builder: MessageHistoryPromptBuilder | None = None,
+    decided_vote_cutoff: bool = False,
 ) -> Graph:
+    # NOTE: the players saved by the night actions running concurrently are not in the state during the vote,  # noqa
+    #       so a result regarded as decided may be changed by a protection of the leader  # noqa
+    if decided_vote_cutoff:
+        raise ValueError('decided_vote_cutoff is not supported in the nighttime vote because the players saved in the night are not known during the vote.')  # noqa
     return _create_run_vote_subgraph(
         werewolves,
         ETimeSpan.night,
@@ -267,7 +363,9 @@ def create_vote_night_vote_subgraph(
         system_prompt,
         chat_model,
         seed,
+        escalation_chat_models,
         echo_targets=echo_targets,
         echo=echo,
         logger=logger,
+        prompt_builder=prompt_builder,
     )
@@ -6,7 +6,9 @@ from .const import (
     WEREWOLF_SIDE,
 )
 from .registry import PlayerSideRegistry, PlayerRoleRegistry
+from .roster import Roster
 from .utils import (
+    act_in_night_in_batch,
     filter_state_according_to_player,
     find_player_by_name,
     find_players_by_role,
@@ -17,6 +19,7 @@ from .utils import (
     is_werewolf_role,
     is_werewolf_side,
 )
+from .utils.context import create_night_action_context
 from .utils.runnable import generate_game_player_runnable
 
 
@@ -25,6 +28,9 @@ __all__ = [
     BaseGamePlayerRole.__name__,
     PlayerSideRegistry.__name__,
     PlayerRoleRegistry.__name__,
+    Roster.__name__,
+    act_in_night_in_batch.__name__,
+    create_night_action_context.__name__,
     filter_state_according_to_player.__name__,
     find_player_by_name.__name__,
     find_players_by_role.__name__,
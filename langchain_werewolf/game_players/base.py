@@ -1,5 +1,6 @@
 from typing import Callable, ClassVar, Iterable
 
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.runnables import (
     Runnable,
     RunnableLambda,
@@ -13,6 +14,7 @@ from pydantic import (
     ConfigDict,
 )
 
+from .const import NIGHT_ACTION_CONTEXT_MAX_TOKENS
 from ..models.state import (
     MsgModel,
     StateModel,
@@ -43,6 +45,11 @@ class BaseGamePlayer(BaseModel):
         title="the output function to display a message to the player",
         description="the output function to display a message to the player through a console",  # noqa
     )
+    token_output: SkipValidation[Runnable[str, None] | None] = Field(
+        default=None,
+        title="the output function to display the tokens of a message to the player while they are generated",  # noqa
+        description="the output function to display the tokens without line breaks. None means the player receives only the complete messages.",  # noqa
+    )
     formatter: Callable[[MsgModel], str] | str | None = Field(
         default=None,
         title="the formatter which will be used to format the message before output",  # noqa
@@ -57,6 +64,17 @@ class BaseGamePlayer(BaseModel):
         default=RunnablePassthrough(),
         title="the translator used to translate player's message to the game language",  # noqa
     )
+    # NOTE: the auxiliary tasks like the name extraction do not need the model for playing  # noqa
+    auxiliary_chat_models: SkipValidation[list[BaseChatModel | Runnable[str, str]]] = Field(  # noqa
+        default_factory=list,
+        title="the chat models for the auxiliary tasks like the name extraction",  # noqa
+        description="the chat models for the auxiliary tasks like the name extraction from the cheapest one. The next one is used only when the former one fails. When empty, the runnable of the player is used.",  # noqa
+    )
+
+    night_action_context_max_tokens: int = Field(
+        default=NIGHT_ACTION_CONTEXT_MAX_TOKENS,
+        title="the maximum number of tokens of the context to decide the night action",  # noqa
+    )
 
     @field_validator('output')
     @classmethod
@@ -117,11 +135,89 @@ class BaseGamePlayer(BaseModel):
         """  # noqa
         return MsgModel(
             name=self.name,
-            message=self.runnable.invoke(GamePlayerRunnableInputModel(
+            message=self.runnable.invoke(
+                GamePlayerRunnableInputModel(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                ),
+                # NOTE: callbacks attribute the run to the player by its name  # noqa
+                config={'run_name': self.name},
+            )
+        )
+
+    def generate_message_stream(
+        self,
+        prompt: str | MsgModel,
+        system_prompt: str | None = None,
+        on_token: Callable[[str], None] | None = None,
+    ) -> MsgModel:
+        """Generate a message while passing the tokens to a callback as they arrive
+
+        Args:
+            prompt (str | MsgModel): the prompt to generate the message
+            system_prompt (str | None, optional): the system prompt to generate the message. Defaults to None.
+            on_token (Callable[[str], None] | None, optional): the callback receiving each token. Defaults to None.
+
+        Returns:
+            MsgModel: the complete message
+
+        Note:
+            A runnable which does not support streaming, e.g. a human input, passes the whole message as one token.
+        """  # noqa
+        chunks: list[str] = []
+        for chunk in self.runnable.stream(
+            GamePlayerRunnableInputModel(
                 prompt=prompt,
                 system_prompt=system_prompt,
-            ))
-        )
+            ),
+            # NOTE: callbacks attribute the run to the player by its name  # noqa
+            config={'run_name': self.name},
+        ):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            if on_token is not None:
+                on_token(chunk)
+        return MsgModel(name=self.name, message=''.join(chunks))
+
+    def plan_night_action(
+        self,
+        players: Iterable["BaseGamePlayer"],
+        messages: Iterable[MsgModel],
+        state: StateModel,
+    ) -> GamePlayerRunnableInputModel | None:
+        """Prepare the input of the runnable to decide the action in the night
+
+        Args:
+            players (Iterable[BaseGamePlayer]): all players
+            messages (Iterable[MsgModel]): all messages
+            state (StateModel): the global state
+
+        Returns:
+            GamePlayerRunnableInputModel | None: the input of the runnable. None means the player does nothing in the night.
+
+        Note:
+            The inputs of several players are passed to `Runnable.batch` together by `act_in_night_in_batch`.
+        """  # noqa
+        return None
+
+    def resolve_night_action(
+        self,
+        players: Iterable["BaseGamePlayer"],
+        message: MsgModel,
+        state: StateModel,
+    ) -> dict[str, object]:
+        """Apply the output of the runnable to the state
+
+        Args:
+            players (Iterable[BaseGamePlayer]): all players
+            message (MsgModel): the message generated from the input of `plan_night_action`
+            state (StateModel): the global state
+
+        Returns:
+            dict[str, object]: dict to update the state
+        """  # noqa
+        return create_dict_without_state_updated(state)
 
     def act_in_night(
         self,
@@ -142,10 +238,18 @@ class BaseGamePlayer(BaseModel):
         Note:
             the argument 'messages' should be generated by `langchain_werewolf.models.state.get_related_messsages`
             the argument 'state' should be filtered according to the player role and side`
+            the action is `plan_night_action` and `resolve_night_action` with the runnable invoked in between
         """  # noqa
         # FIXME: players implement act_in_night to know anything about the game
         #        because the argument may include all players information, all messages, and the global state  # noqa
-        return create_dict_without_state_updated(state)
+        input_ = self.plan_night_action(players, messages, state)
+        if input_ is None:
+            return create_dict_without_state_updated(state)
+        return self.resolve_night_action(
+            players,
+            self.generate_message(input_.prompt, input_.system_prompt),
+            state,
+        )
 
 
 class BaseGamePlayerRole(BaseGamePlayer):
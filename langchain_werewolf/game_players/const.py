@@ -2,3 +2,4 @@ VILLAGER_ROLE: str = "villager"
 VILLAGER_SIDE: str = "VillagerSide"
 WEREWOLF_ROLE: str = "werewolf"
 WEREWOLF_SIDE: str = "WerewolfSide"
+NIGHT_ACTION_CONTEXT_MAX_TOKENS: int = 1000
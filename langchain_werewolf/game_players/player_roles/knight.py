@@ -1,12 +1,16 @@
-import json
 from typing import ClassVar, Iterable
 from langchain_core.exceptions import OutputParserException
 from pydantic import Field
-from ..base import BaseGamePlayer, BaseGamePlayerRole
+from ..base import (
+    BaseGamePlayer,
+    BaseGamePlayerRole,
+    GamePlayerRunnableInputModel,
+)
 from ...const import GAME_MASTER_NAME
 from ..player_sides import VillagerSideMixin
 from ..registry import PlayerRoleRegistry
 from ...llm_utils import extract_name
+from ..utils.context import create_night_action_context
 from ...models.state import (
     MsgModel,
     StateModel,
@@ -26,22 +30,37 @@ class Knight(BaseGamePlayerRole, VillagerSideMixin):
         title="the question to decide the night action of the player",
     )
 
-    def act_in_night(
+    def plan_night_action(
         self,
         players: Iterable[BaseGamePlayer],
         messages: Iterable[MsgModel],
         state: StateModel,
-    ) -> dict[str, object]:
-        target_player_name_raw = self.generate_message(
+    ) -> GamePlayerRunnableInputModel:
+        return GamePlayerRunnableInputModel(
             prompt=self.question_to_decide_night_action,
-            system_prompt=json.dumps([m.model_dump() for m in messages]),
+            system_prompt=create_night_action_context(
+                self.name,
+                messages,
+                state,
+                max_tokens=self.night_action_context_max_tokens,
+            ),
         )
+
+    def resolve_night_action(
+        self,
+        players: Iterable[BaseGamePlayer],
+        message: MsgModel,
+        state: StateModel,
+    ) -> dict[str, object]:
+        # NOTE: the stronger models are used only when the cheaper one fails
+        chat_models = self.auxiliary_chat_models or [self.runnable]
         try:
             target_player_name = extract_name(
-                target_player_name_raw.message,
-                [p.name for p in players if p.name in state.alive_players_names and p.name != self.name],  # noqa
+                message.message,
+                [p.name for p in players if p.name in state.alive_players_set and p.name != self.name],  # noqa
                 context=f'Extract the valid name of the player as the answer to "{self.question_to_decide_night_action}"',  # noqa
-                chat_model=self.runnable,
+                chat_model=chat_models[0],
+                escalation_chat_models=chat_models[1:],
             )
         except OutputParserException:
             return create_dict_to_record_chat(  # type: ignore # noqa
@@ -0,0 +1,261 @@
+from typing import Generic, Iterable, Iterator, TypeVar
+
+from .base import BaseGamePlayer, BaseGamePlayerRole, BasePlayerSideMixin
+from .const import WEREWOLF_ROLE
+from .registry import PlayerRoleRegistry, PlayerSideRegistry
+
+TPlayer = TypeVar('TPlayer', bound=BaseGamePlayer)
+
+
+class Roster(Generic[TPlayer]):
+    """The indexes of the players of a game built once per game.
+
+    The roster is an iterable of the players, so it can be passed wherever the players are expected.
+    The names, the roles and the sides are looked up in O(1)
+    and a set of players, e.g. the alive players, is represented as a bitset, i.e. an int whose i-th bit is the i-th player.
+    """  # noqa
+
+    def __init__(self, players: Iterable[TPlayer]) -> None:
+        """Initialize the roster
+
+        Args:
+            players (Iterable[TPlayer]): the players
+
+        Raises:
+            ValueError: the names of the players are not unique
+        """
+        self.players: tuple[TPlayer, ...] = tuple(players)
+        self.names: tuple[str, ...] = tuple(player.name for player in self.players)  # noqa
+        self._indexes: dict[str, int] = {
+            name: i for i, name in enumerate(self.names)
+        }
+        if len(self._indexes) != len(self.names):
+            duplicated = sorted({name for name in self.names if self.names.count(name) > 1})  # noqa
+            raise ValueError(f'The names {duplicated} are not unique.')
+        self._players: dict[str, TPlayer] = dict(zip(self.names, self.players))
+        self._roles: dict[str, str | None] = {
+            player.name: player.role if isinstance(player, BaseGamePlayerRole) else None  # noqa
+            for player in self.players
+        }
+        self._sides: dict[str, str | None] = {
+            player.name: player.side if isinstance(player, BasePlayerSideMixin) else None  # noqa
+            for player in self.players
+        }
+        # NOTE: the masks are built on demand because roles may be registered after the roster  # noqa
+        self._role_masks: dict[str, int] = {}
+        self._side_masks: dict[str, int] = {}
+
+    @classmethod
+    def of(cls, players: Iterable[TPlayer]) -> 'Roster[TPlayer]':
+        """Get the roster of the players
+
+        Args:
+            players (Iterable[TPlayer]): the players or a roster
+
+        Returns:
+            Roster[TPlayer]: the roster itself if a roster is given, otherwise a new roster
+        """  # noqa
+        if isinstance(players, Roster):
+            return players
+        return cls(players)
+
+    def __iter__(self) -> Iterator[TPlayer]:
+        return iter(self.players)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._indexes
+
+    def get_player(self, name: str) -> TPlayer:
+        """Get a player by name
+
+        Args:
+            name (str): the name of the player
+
+        Raises:
+            ValueError: player not found
+
+        Returns:
+            TPlayer: the player with the name
+        """
+        try:
+            return self._players[name]
+        except KeyError:
+            raise ValueError(f'The name {name} is not found.')
+
+    def get_role(self, name: str) -> str | None:
+        """Get the role of a player
+
+        Args:
+            name (str): the name of the player
+
+        Returns:
+            str | None: the role or None if the player has no role
+        """
+        return self._roles[name]
+
+    def get_side(self, name: str) -> str | None:
+        """Get the side of a player
+
+        Args:
+            name (str): the name of the player
+
+        Returns:
+            str | None: the side or None if the player has no side
+        """
+        return self._sides[name]
+
+    def index(self, name: str) -> int:
+        """Get the bit index of a player
+
+        Args:
+            name (str): the name of the player
+
+        Returns:
+            int: the index
+        """
+        return self._indexes[name]
+
+    def to_mask(self, names: Iterable[str]) -> int:
+        """Convert names into a bitset
+
+        Args:
+            names (Iterable[str]): the names. The names not in the roster are ignored.
+
+        Returns:
+            int: the bitset
+        """  # noqa
+        mask = 0
+        for name in names:
+            index = self._indexes.get(name)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def from_mask(self, mask: int) -> list[str]:
+        """Convert a bitset into names
+
+        Args:
+            mask (int): the bitset
+
+        Returns:
+            list[str]: the names in the order of the roster
+        """
+        return [name for i, name in enumerate(self.names) if mask >> i & 1]
+
+    def get_role_mask(self, role: str) -> int:
+        """Get the bitset of the players with a role, including the subclasses of the role
+
+        Args:
+            role (str): the role
+
+        Raises:
+            KeyError: the role is not registered
+
+        Returns:
+            int: the bitset
+        """  # noqa
+        if role not in self._role_masks:
+            role_cls = PlayerRoleRegistry.get_class(role)
+            self._role_masks[role] = self.to_mask(
+                player.name for player in self.players
+                if isinstance(player, role_cls)
+            )
+        return self._role_masks[role]
+
+    def get_side_mask(self, side: str) -> int:
+        """Get the bitset of the players with a side
+
+        Args:
+            side (str): the side
+
+        Raises:
+            KeyError: the side is not registered
+
+        Returns:
+            int: the bitset
+        """
+        if side not in self._side_masks:
+            side_cls = PlayerSideRegistry.get_class(side)
+            self._side_masks[side] = self.to_mask(
+                player.name for player in self.players
+                if isinstance(player, side_cls)
+            )
+        return self._side_masks[side]
+
+    def get_names_by_role(self, role: str) -> list[str]:
+        """Get the names of the players with a role
+
+        Args:
+            role (str): the role
+
+        Raises:
+            KeyError: the role is not registered
+
+        Returns:
+            list[str]: the names
+        """
+        return self.from_mask(self.get_role_mask(role))
+
+    def get_names_by_side(self, side: str) -> list[str]:
+        """Get the names of the players with a side
+
+        Args:
+            side (str): the side
+
+        Raises:
+            KeyError: the side is not registered
+
+        Returns:
+            list[str]: the names
+        """
+        return self.from_mask(self.get_side_mask(side))
+
+    def get_players_by_role(self, role: str) -> list[TPlayer]:
+        """Get the players with a role
+
+        Args:
+            role (str): the role
+
+        Raises:
+            KeyError: the role is not registered
+
+        Returns:
+            list[TPlayer]: the players, which may be empty
+        """
+        return [self._players[name] for name in self.get_names_by_role(role)]
+
+    def is_werewolf_role(self, name: str) -> bool:
+        """Check if a player is a werewolf role
+
+        Args:
+            name (str): the name of the player
+
+        Returns:
+            bool: True if the player is an instance of the werewolf role
+        """
+        return bool(self.get_role_mask(WEREWOLF_ROLE) >> self._indexes[name] & 1)  # noqa
+
+    def count(
+        self,
+        mask: int,
+        role: str | None = None,
+        side: str | None = None,
+    ) -> int:
+        """Count the players in a bitset
+
+        Args:
+            mask (int): the bitset, e.g. the alive players
+            role (str | None, optional): count only the players with the role. Defaults to None.
+            side (str | None, optional): count only the players with the side. Defaults to None.
+
+        Returns:
+            int: the number of the players
+        """  # noqa
+        if role is not None:
+            mask &= self.get_role_mask(role)
+        if side is not None:
+            mask &= self.get_side_mask(side)
+        return mask.bit_count()
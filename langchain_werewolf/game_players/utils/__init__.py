@@ -1,9 +1,17 @@
-from typing import Iterable, TypeGuard
+from typing import Iterable, Sequence, TypeGuard
+from langchain_core.runnables import RunnableConfig
 
 from ..base import BaseGamePlayer, BaseGamePlayerRole, BasePlayerSideMixin
 from ..const import WEREWOLF_ROLE, WEREWOLF_SIDE
-from ...models.state import StateModel, get_related_chat_histories
+from ...models.state import (
+    MsgModel,
+    StateModel,
+    create_dict_without_state_updated,
+    get_related_chat_histories,
+    get_related_messsages,
+)
 from ..registry import PlayerRoleRegistry, PlayerSideRegistry
+from ..roster import Roster
 from ...utils import assert_not_empty_deco
 
 
@@ -102,7 +110,7 @@ def find_player_by_name(
 
     Args:
         name (str): the name of the player
-        players (Iterable[BaseGamePlayer]): the list of players
+        players (Iterable[BaseGamePlayer]): the list of players. A Roster is looked up in O(1).
 
     Raises:
         ValueError: player not found
@@ -110,7 +118,14 @@ def find_player_by_name(
 
     Returns:
         BaseGamePlayer: the player with the name
-    """
+
+    Note:
+        The players given to `act_in_night` by the game are a Roster,
+        whose names are validated to be unique when it is created.
+    """  # noqa
+    if isinstance(players, Roster):
+        roster: Roster[BaseGamePlayer] = players
+        return roster.get_player(name)
     players = list(filter(lambda x: x.name == name, players))
     if len(players) == 0:
         raise ValueError(f'The name {name} is not found.')
@@ -137,6 +152,8 @@ def find_players_by_role(
         KeyError: if the role is not registered
         ValueError: if there are no players with the role
     """
+    if isinstance(players, Roster):
+        return players.get_players_by_role(role)  # type: ignore
     role_cls = PlayerRoleRegistry.get_class(role)
     return [
         player
@@ -163,6 +180,8 @@ def find_players_by_side(
         KeyError: the side is not registered
         ValueError: if there are no players with the side
     """
+    if isinstance(players, Roster):
+        return [players.get_player(name) for name in players.get_names_by_side(side)]  # type: ignore # noqa
     side_cls = PlayerSideRegistry.get_class(side)
     return [
         player
@@ -174,6 +193,7 @@ def find_players_by_side(
 def filter_state_according_to_player(
     player: BaseGamePlayer,
     state: StateModel,
+    roster: Roster | None = None,
 ) -> StateModel:
     return StateModel(
         # NOTE: get the chat histories related to the player
@@ -184,7 +204,11 @@ def filter_state_according_to_player(
         # NOTE: nighttime votes are only revealed to werewolves
         nighttime_votes_history=(
             state.nighttime_votes_history
-            if is_werewolf_role(player)
+            if (
+                roster.is_werewolf_role(player.name)
+                if roster is not None else
+                is_werewolf_role(player)
+            )
             else []
         ),
         result=state.result,
@@ -197,3 +221,64 @@ def filter_state_according_to_player(
             }
         ),
     )
+
+
+def act_in_night_in_batch(
+    actors: Sequence[BaseGamePlayer],
+    players: Iterable[BaseGamePlayer],
+    state: StateModel,
+) -> list[dict[str, object]]:
+    """Let the players act in the night with the LLM calls grouped
+
+    The inputs planned by `plan_night_action` are passed to one `Runnable.batch` call per runnable,
+    so the players sharing a runnable, i.e. a model, take one round trip together.
+    The outputs are resolved by `resolve_night_action` in the order of the actors.
+
+    Args:
+        actors (Sequence[BaseGamePlayer]): the players to act in the night
+        players (Iterable[BaseGamePlayer]): all players
+        state (StateModel): the global state
+
+    Returns:
+        list[dict[str, object]]: dicts to update the state in the order of the actors
+
+    Note:
+        The players overriding `act_in_night` itself act one by one as before.
+    """  # noqa
+    roster = Roster.of(players)
+    messages = [get_related_messsages(actor.name, state) for actor in actors]
+    states = [filter_state_according_to_player(actor, state, roster) for actor in actors]  # noqa
+    # plan
+    inputs = [
+        None
+        if type(actor).act_in_night is not BaseGamePlayer.act_in_night
+        else actor.plan_night_action(players, messages_, state_)
+        for actor, messages_, state_ in zip(actors, messages, states)
+    ]
+    groups: dict[int, list[int]] = {}
+    for i, (actor, input_) in enumerate(zip(actors, inputs)):
+        if input_ is not None:
+            groups.setdefault(id(actor.runnable), []).append(i)
+    # batch
+    outputs: dict[int, str] = {}
+    for indexes in groups.values():
+        results = actors[indexes[0]].runnable.batch(
+            [inputs[i] for i in indexes],  # type: ignore
+            # NOTE: callbacks attribute the runs to the players by their names  # noqa
+            config=[RunnableConfig(run_name=actors[i].name) for i in indexes],
+        )
+        outputs.update(zip(indexes, results))
+    # resolve
+    updates: list[dict[str, object]] = []
+    for i, (actor, messages_, state_) in enumerate(zip(actors, messages, states)):  # noqa
+        if type(actor).act_in_night is not BaseGamePlayer.act_in_night:
+            updates.append(actor.act_in_night(players, messages_, state_))
+        elif i in outputs:
+            updates.append(actor.resolve_night_action(
+                players,
+                MsgModel(name=actor.name, message=outputs[i]),
+                state_,
+            ))
+        else:
+            updates.append(create_dict_without_state_updated(state_))
+    return updates
@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Iterable
+from ..const import NIGHT_ACTION_CONTEXT_MAX_TOKENS
+from ...const import GAME_MASTER_NAME
+from ...instrumentation import estimate_tokens
+from ...models.state import MsgModel, StateModel
+
+# const
+_DISCUSSION_HEADER: str = '\nRecent discussion:\n'
+
+
+def create_night_action_context(
+    name: str,
+    messages: Iterable[MsgModel],
+    state: StateModel,
+    max_tokens: int = NIGHT_ACTION_CONTEXT_MAX_TOKENS,
+) -> str:
+    """Create a compact digest of what a player needs to decide the night action
+
+    The digest consists of the alive players, the excluded players, the player's own past night actions
+    and the latest discussion within the token budget.
+    Unlike the dump of the messages, the timestamps, the participants and the templates are dropped
+    and the consecutive duplicated messages are merged.
+
+    Args:
+        name (str): the name of the player
+        messages (Iterable[MsgModel]): the messages related to the player
+        state (StateModel): the state filtered according to the player
+        max_tokens (int, optional): the maximum number of tokens of the digest. Defaults to NIGHT_ACTION_CONTEXT_MAX_TOKENS.
+
+    Returns:
+        str: the digest
+
+    Note:
+        The digest is cached, so the same player in the same night gets it without being rebuilt.
+    """  # noqa
+    private_participants = frozenset({name, GAME_MASTER_NAME})
+    notes: list[str] = []
+    discussion: list[tuple[str, str]] = []
+    for message in messages:
+        if message.name == GAME_MASTER_NAME:
+            # NOTE: the announcements of the game master are summarized by the state  # noqa
+            continue
+        if message.name == name and message.participants == private_participants:  # noqa
+            notes.append(message.message)
+        elif not discussion or discussion[-1] != (message.name, message.message):  # noqa
+            discussion.append((message.name, message.message))
+    return _create_night_action_context(
+        name,
+        state.day,
+        tuple(state.alive_players_names),
+        tuple(
+            f'{item.value.name} (Day {item.value.day} {item.value.timespan.value}time)'  # noqa
+            for item in state.elimination_log
+        ),
+        tuple(notes),
+        tuple(discussion),
+        max_tokens,
+    )
+
+
+@lru_cache(maxsize=256)
+def _create_night_action_context(
+    name: str,
+    day: int,
+    alive_players_names: tuple[str, ...],
+    eliminations: tuple[str, ...],
+    notes: tuple[str, ...],
+    discussion: tuple[tuple[str, str], ...],
+    max_tokens: int,
+) -> str:
+    lines = [
+        f'You are {name}. It is the night of Day {day}.',
+        f'Alive players: {", ".join(alive_players_names)}',
+    ]
+    if eliminations:
+        lines.append(f'Excluded players: {", ".join(eliminations)}')
+    if notes:
+        lines.append('Your past night actions:')
+        lines.extend(f'- {note}' for note in notes)
+    context = '\n'.join(lines)
+    # NOTE: the latest discussion is kept within the remaining budget
+    remaining = max_tokens - estimate_tokens(context + _DISCUSSION_HEADER)
+    window: list[str] = []
+    for sender, message in reversed(discussion):
+        line = f'{sender}: {message}'
+        remaining -= estimate_tokens(line + '\n')
+        if remaining < 0:
+            break
+        window.append(line)
+    if window:
+        context += _DISCUSSION_HEADER + '\n'.join(reversed(window))
+    return context
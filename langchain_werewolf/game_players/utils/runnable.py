@@ -1,9 +1,11 @@
 from operator import attrgetter
+from typing import Any, Iterator
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.runnables import (
     Runnable,
     RunnableBranch,
+    RunnableGenerator,
     RunnableLambda,
     RunnablePassthrough,
 )
@@ -26,6 +28,11 @@ _runnable_routing_by_input_type: Runnable[
 )
 
 
+def _yield_content(chunks: Iterator[Any]) -> Iterator[str]:
+    for chunk in chunks:
+        yield chunk.content
+
+
 def _generate_game_player_runnable_based_on_chat_model(
     chat_model: BaseChatModel,
 ) -> Runnable[GamePlayerRunnableInputModel, str]:
@@ -35,7 +42,8 @@ def _generate_game_player_runnable_based_on_chat_model(
             HumanMessage(content=input.prompt if isinstance(input.prompt, str) else input.prompt.message),  # noqa
         ])
         | chat_model
-        | RunnableLambda(attrgetter('content'))
+        # NOTE: a generator passes the tokens through when the runnable is streamed  # noqa
+        | RunnableGenerator(_yield_content)
     ).with_types(
         input_type=GamePlayerRunnableInputModel,
         output_type=str,
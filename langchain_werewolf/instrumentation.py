@@ -0,0 +1,540 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+import json
+from logging import getLogger, Logger
+import re
+import threading
+import time
+from typing import Any, Callable, Iterable, Mapping, Sequence
+from uuid import UUID
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from pydantic import BaseModel, Field
+from .const import FLATTENED_NODE_SEPARATOR
+
+# const
+EXTRACT_NAME_RUN_NAME: str = 'extract_name'
+TRANSLATOR_RUN_NAME: str = 'translator'
+ECHO_RUN_NAME: str = 'echo'
+COMPONENT_RUN_NAMES: tuple[str, ...] = (
+    EXTRACT_NAME_RUN_NAME,
+    TRANSLATOR_RUN_NAME,
+    ECHO_RUN_NAME,
+)
+METRICS_SUMMARY: str = 'summary'
+JSONL_SUFFIXES: tuple[str, ...] = ('.jsonl',)
+OPENMETRICS_SUFFIXES: tuple[str, ...] = ('.prom', '.om', '.txt')
+OPENMETRICS_PREFIX: str = 'werewolf'
+# NOTE: the encoding of tiktoken for the models unknown to tiktoken
+DEFAULT_ENCODING: str = 'o200k_base'
+METRIC_LABELS: tuple[str, ...] = ('phase', 'node', 'player', 'day')
+
+
+class NodeMetrics(BaseModel):
+    phase: str = Field(..., title="the top-level node of the game graph")
+    node: str = Field(..., title="the node of the game graph or its subgraphs")  # noqa
+    player: str | None = Field(default=None, title="the player who was running")  # noqa
+    day: int | None = Field(default=None, title="the day of the game")
+    calls: int = Field(default=0, title="the number of calls of the node")
+    seconds: float = Field(default=0.0, title="the wall time of the node in seconds")  # noqa
+    llm_calls: int = Field(default=0, title="the number of LLM calls")
+    llm_seconds: float = Field(default=0.0, title="the wall time of the LLM calls in seconds")  # noqa
+    prompt_tokens: int = Field(default=0, title="the number of prompt tokens")
+    completion_tokens: int = Field(default=0, title="the number of completion tokens")  # noqa
+    retries: int = Field(default=0, title="the number of retries of `extract_name`")  # noqa
+    cache_hits: int = Field(default=0, title="the number of LLM cache hits")
+    extract_name_seconds: float = Field(default=0.0, title="the wall time of `extract_name` in seconds")  # noqa
+    translator_seconds: float = Field(default=0.0, title="the wall time of the translations in seconds")  # noqa
+    echo_seconds: float = Field(default=0.0, title="the wall time of the echo in seconds")  # noqa
+
+
+METRIC_VALUES: tuple[str, ...] = tuple(
+    name for name in NodeMetrics.model_fields if name not in METRIC_LABELS
+)
+
+
+@dataclass
+class _RunContext:
+    phase: str = ''
+    node: str = ''
+    player: str | None = None
+    day: int | None = None
+    # NOTE: the run of `extract_name` which the run belongs to
+    extractor: '_RunContext | None' = None
+    component: str | None = None
+    is_node: bool = False
+    llm_calls: int = 0
+    # NOTE: only for the LLM runs
+    model: str | None = None
+    prompt: str = ''
+    started: float = field(default_factory=time.perf_counter)
+
+
+def get_phase(metadata: Mapping[str, Any] | None) -> str | None:
+    """Get the phase, i.e. the top-level node of the game graph, from the metadata of a run
+
+    Args:
+        metadata (Mapping[str, Any] | None): the metadata passed to the callbacks
+
+    Returns:
+        str | None: the phase or None if the run is not in the game graph
+    """  # noqa
+    # NOTE: the checkpoint namespace is like "daytime_chat:<task id>|chat:<task id>"  # noqa
+    #       or "daytime_chat/chat:<task id>" when the subgraph is flattened
+    namespace = (metadata or {}).get('langgraph_checkpoint_ns')
+    return str(namespace).split('|')[0].split(':')[0].split(FLATTENED_NODE_SEPARATOR)[0] or None if namespace else None  # noqa
+
+
+def _get_day(inputs: Any) -> int | None:
+    day = inputs.get('day') if isinstance(inputs, Mapping) else getattr(inputs, 'day', None)  # noqa
+    return day if isinstance(day, int) else None
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str | None) -> Any:
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model or '')
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        # NOTE: tiktoken is not installed or cannot download the encoding
+        return None
+
+
+def estimate_tokens(text: str, model: str | None = None) -> int:
+    """Estimate the number of tokens of a text with a local tokenizer
+
+    Args:
+        text (str): the text
+        model (str | None, optional): the model name to choose the tokenizer. Defaults to None.
+
+    Returns:
+        int: the estimated number of tokens. When tiktoken is not available, about 4 characters per token.
+    """  # noqa
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def get_token_usage(response: LLMResult) -> tuple[int, int]:
+    """Get the token usage reported by the provider
+
+    Args:
+        response (LLMResult): the response of an LLM call
+
+    Returns:
+        tuple[int, int]: the number of the prompt tokens and the completion tokens. (0, 0) if not reported.
+    """  # noqa
+    prompt_tokens, completion_tokens = 0, 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)  # noqa
+            if usage:
+                prompt_tokens += usage.get('input_tokens', 0)
+                completion_tokens += usage.get('output_tokens', 0)
+    if (prompt_tokens or completion_tokens) or not response.llm_output:
+        return prompt_tokens, completion_tokens
+    # NOTE: some models report the usage only in llm_output
+    usage = response.llm_output.get('token_usage') or response.llm_output.get('usage') or {}  # noqa
+    return (
+        usage.get('prompt_tokens', usage.get('input_tokens', 0)) or 0,
+        usage.get('completion_tokens', usage.get('output_tokens', 0)) or 0,
+    )
+
+
+class InstrumentationCallbackHandler(BaseCallbackHandler):
+    """A callback handler which measures the game graph per node, per player and per day.
+
+    The handler is passed to the game graph as a callback, e.g. `workflow.invoke(state, config={'callbacks': [handler]})`.
+    Each run inherits the phase (the top-level node), the node, the player and the day from its parent run,
+    so that the LLM calls, the retries of `extract_name`, the translations and the echo are attributed
+    to the node and the player which caused them.
+    Nothing is measured unless the handler is passed.
+    """  # noqa
+
+    run_inline: bool = True
+
+    def __init__(self, player_names: Iterable[str] = tuple()) -> None:
+        """Initialize the handler
+
+        Args:
+            player_names (Iterable[str], optional): the names of the players to find in the run names. Defaults to tuple().
+        """  # noqa
+        super().__init__()
+        # NOTE: the longest name first so that "Player10" is not matched as "Player1"  # noqa
+        self.player_names: list[str] = sorted(player_names, key=len, reverse=True)  # noqa
+        self._player_pattern: re.Pattern | None = (
+            re.compile('(?<![0-9A-Za-z])(' + '|'.join(map(re.escape, self.player_names)) + ')(?![0-9A-Za-z])')  # noqa
+            if self.player_names else
+            None
+        )
+        self._runs: dict[UUID, _RunContext] = {}
+        self._metrics: dict[tuple[str, str, str | None, int | None], NodeMetrics] = {}  # noqa
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_metrics(self) -> list[NodeMetrics]:
+        """Get the metrics measured so far
+
+        Returns:
+            list[NodeMetrics]: the metrics per phase, node, player and day
+        """
+        with self._lock:
+            return [metrics.model_copy() for metrics in self._metrics.values()]  # noqa
+
+    def record_cache_hit(self) -> None:
+        """Count a cache hit of the LLM call running in the current thread"""  # noqa
+        context = getattr(self._local, 'llm_context', None)
+        if context is None:
+            return
+        with self._lock:
+            self._get_metrics(context).cache_hits += 1
+
+    def _find_player(self, name: str) -> str | None:
+        if self._player_pattern is None:
+            return None
+        matched = self._player_pattern.search(name)
+        return matched.group(1) if matched else None
+
+    def _get_metrics(self, context: _RunContext) -> NodeMetrics:
+        key = (context.phase, context.node, context.player, context.day)
+        if key not in self._metrics:
+            self._metrics[key] = NodeMetrics(**dict(zip(METRIC_LABELS, key)))  # type: ignore # noqa
+        return self._metrics[key]
+
+    def _start_run(
+        self,
+        run_id: UUID,
+        parent_run_id: UUID | None,
+        name: str,
+        metadata: dict[str, Any] | None,
+        inputs: Any = None,
+    ) -> _RunContext:
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id is not None else None  # noqa
+        context = (
+            _RunContext(
+                phase=parent.phase,
+                node=parent.node,
+                player=parent.player,
+                day=parent.day,
+                extractor=parent.extractor,
+            )
+            if parent is not None else
+            _RunContext()
+        )
+        metadata = metadata or {}
+        if metadata.get('langgraph_node') == name and (parent is None or not (parent.is_node and parent.node == name)):  # noqa
+            context.is_node = True
+            context.node = name
+            context.phase = get_phase(metadata) or name
+            context.player = self._find_player(name) or context.player
+            day = _get_day(inputs)
+            context.day = day if day is not None else context.day
+        elif name in COMPONENT_RUN_NAMES:
+            context.component = name
+            if name == EXTRACT_NAME_RUN_NAME:
+                context.extractor = context
+        elif name in self.player_names:
+            context.player = name
+        with self._lock:
+            self._runs[run_id] = context
+        return context
+
+    def _end_run(self, run_id: UUID) -> None:
+        with self._lock:
+            context = self._runs.pop(run_id, None)
+            if context is None:
+                return
+            elapsed = time.perf_counter() - context.started
+            if context.is_node:
+                metrics = self._get_metrics(context)
+                metrics.calls += 1
+                metrics.seconds += elapsed
+            if context.component is not None:
+                metrics = self._get_metrics(context)
+                setattr(
+                    metrics,
+                    f'{context.component}_seconds',
+                    getattr(metrics, f'{context.component}_seconds') + elapsed,  # noqa
+                )
+                if context.extractor is context:
+                    # NOTE: the first LLM call of `extract_name` is not a retry  # noqa
+                    metrics.retries += max(context.llm_calls - 1, 0)
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get('name') or (serialized or {}).get('name') or ''
+        self._start_run(run_id, parent_run_id, name, metadata, inputs)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:  # noqa
+        self._end_run(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa
+        self._end_run(run_id)
+
+    def _on_llm_start(
+        self,
+        run_id: UUID,
+        parent_run_id: UUID | None,
+        metadata: dict[str, Any] | None,
+        serialized: dict[str, Any] | None,
+        prompt: str,
+    ) -> None:
+        context = self._start_run(run_id, parent_run_id, '', metadata)
+        kwargs = (serialized or {}).get('kwargs') or {}
+        context.model = (metadata or {}).get('ls_model_name') or kwargs.get('model_name') or kwargs.get('model')  # noqa
+        context.prompt = prompt
+        self._local.llm_context = context
+
+    def on_llm_start(
+        self,
+        serialized: dict[str, Any],
+        prompts: list[str],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._on_llm_start(run_id, parent_run_id, metadata, serialized, '\n'.join(prompts))  # noqa
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[Any]],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._on_llm_start(
+            run_id,
+            parent_run_id,
+            metadata,
+            serialized,
+            '\n'.join(str(message.content) for batch in messages for message in batch),  # noqa
+        )
+
+    def _on_llm_end(self, run_id: UUID, response: LLMResult | None) -> None:
+        self._local.llm_context = None
+        with self._lock:
+            context = self._runs.pop(run_id, None)
+        if context is None:
+            return
+        prompt_tokens, completion_tokens = get_token_usage(response) if response is not None else (0, 0)  # noqa
+        if response is not None and not (prompt_tokens or completion_tokens):
+            # NOTE: the usage is estimated when the provider does not report it  # noqa
+            prompt_tokens = estimate_tokens(context.prompt, context.model)
+            completion_tokens = sum(
+                estimate_tokens(generation.text, context.model)
+                for generations in response.generations
+                for generation in generations
+            )
+        with self._lock:
+            metrics = self._get_metrics(context)
+            metrics.llm_calls += 1
+            metrics.llm_seconds += time.perf_counter() - context.started
+            metrics.prompt_tokens += prompt_tokens
+            metrics.completion_tokens += completion_tokens
+            if context.extractor is not None:
+                context.extractor.llm_calls += 1
+            self._record_llm_usage(context.player, context.model, prompt_tokens, completion_tokens)  # noqa
+
+    def _record_llm_usage(
+        self,
+        player: str | None,
+        model: str | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        # NOTE: a hook for the subclasses, called with the lock held
+        pass
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:  # noqa
+        self._on_llm_end(run_id, response)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa
+        self._on_llm_end(run_id, None)
+
+
+class CacheHitCounter(BaseCache):
+    """An LLM cache which counts its hits with `InstrumentationCallbackHandler` and delegates everything else to the wrapped cache."""  # noqa
+
+    def __init__(
+        self,
+        cache: BaseCache,
+        handler: InstrumentationCallbackHandler,
+    ) -> None:
+        self.cache = cache
+        self.handler = handler
+
+    def lookup(self, prompt: str, llm_string: str) -> Any:
+        value = self.cache.lookup(prompt, llm_string)
+        if value is not None:
+            self.handler.record_cache_hit()
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: Any) -> None:
+        self.cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear(**kwargs)
+
+
+def summarize_metrics(
+    metrics: Iterable[NodeMetrics],
+    by: Sequence[str] = ('phase', 'node'),
+) -> list[NodeMetrics]:
+    """Sum up the metrics by some of the labels
+
+    Args:
+        metrics (Iterable[NodeMetrics]): the metrics
+        by (Sequence[str], optional): the labels to group by, some of METRIC_LABELS. The other labels are dropped. Defaults to ('phase', 'node').
+
+    Raises:
+        ValueError: an unknown label
+
+    Returns:
+        list[NodeMetrics]: the summed metrics sorted by the labels
+    """  # noqa
+    for label in by:
+        if label not in METRIC_LABELS:
+            raise ValueError(f'Unknown label: {label}. Valid labels are {list(METRIC_LABELS)}.')  # noqa
+    summed: dict[tuple, NodeMetrics] = {}
+    for item in metrics:
+        key = tuple(getattr(item, label) for label in by)
+        if key not in summed:
+            summed[key] = NodeMetrics(**{
+                'phase': '',
+                'node': '',
+                **{label: getattr(item, label) for label in by},
+            })
+        for name in METRIC_VALUES:
+            setattr(summed[key], name, getattr(summed[key], name) + getattr(item, name))  # noqa
+    return [
+        summed[key]
+        for key in sorted(summed, key=lambda key: tuple((value is not None, value) for value in key))  # noqa
+    ]
+
+
+class BaseMetricsSink(ABC):
+    """The destination of the metrics measured during a game"""
+
+    @abstractmethod
+    def write(self, metrics: Sequence[NodeMetrics]) -> None:
+        """Write the metrics
+
+        Args:
+            metrics (Sequence[NodeMetrics]): the metrics
+        """
+        ...
+
+
+class SummaryTableSink(BaseMetricsSink):
+    """A sink which outputs a summary table per phase and node"""
+
+    def __init__(
+        self,
+        output_func: Callable[[str], None] | None = None,
+        by: Sequence[str] = ('phase', 'node'),
+        logger: Logger = getLogger(__name__),
+    ) -> None:
+        self.output_func = output_func or logger.info
+        self.by = by
+
+    def write(self, metrics: Sequence[NodeMetrics]) -> None:
+        rows = summarize_metrics(metrics, by=self.by)
+        widths = {
+            label: max([len(label)] + [len(str(getattr(row, label))) for row in rows])  # noqa
+            for label in self.by
+        }
+        header = ' '.join(f'{label:<{widths[label]}}' for label in self.by) + f' {"calls":>6} {"seconds":>9} {"llm":>5} {"llm[s]":>8} {"prompt":>8} {"compl.":>8} {"retry":>6} {"cache":>6} {"extract[s]":>10} {"transl.[s]":>10} {"echo[s]":>8}'  # noqa
+        lines = [header] + [
+            ' '.join(f'{str(getattr(row, label)):<{widths[label]}}' for label in self.by) + f' {row.calls:>6} {row.seconds:>9.3f} {row.llm_calls:>5} {row.llm_seconds:>8.3f} {row.prompt_tokens:>8} {row.completion_tokens:>8} {row.retries:>6} {row.cache_hits:>6} {row.extract_name_seconds:>10.3f} {row.translator_seconds:>10.3f} {row.echo_seconds:>8.3f}'  # noqa
+            for row in rows
+        ]
+        self.output_func('\n'.join(lines))
+
+
+class JsonlMetricsSink(BaseMetricsSink):
+    """A sink which writes one JSON line per phase, node, player and day"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def write(self, metrics: Sequence[NodeMetrics]) -> None:
+        with open(self.path, 'w') as f:
+            for item in summarize_metrics(metrics, by=METRIC_LABELS):
+                f.write(json.dumps(item.model_dump(), ensure_ascii=False) + '\n')  # noqa
+
+
+def _escape_label_value(value: object) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')  # noqa
+
+
+class OpenMetricsSink(BaseMetricsSink):
+    """A sink which writes the metrics as an OpenMetrics text file, e.g. for the textfile collector of the Prometheus node exporter"""  # noqa
+
+    def __init__(self, path: str, prefix: str = OPENMETRICS_PREFIX) -> None:
+        self.path = path
+        self.prefix = prefix
+
+    def write(self, metrics: Sequence[NodeMetrics]) -> None:
+        rows = summarize_metrics(metrics, by=METRIC_LABELS)
+        lines: list[str] = []
+        for name in METRIC_VALUES:
+            metric_name = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric_name} counter')
+            for row in rows:
+                labels = ','.join(
+                    f'{label}="{_escape_label_value(getattr(row, label))}"'
+                    for label in METRIC_LABELS
+                    if getattr(row, label) is not None
+                )
+                lines.append(f'{metric_name}_total{{{labels}}} {getattr(row, name)}')  # noqa
+        lines.append('# EOF')
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def create_metrics_sink(
+    target: str,
+    output_func: Callable[[str], None] | None = None,
+) -> BaseMetricsSink:
+    """Create a sink of the metrics from its target
+
+    Args:
+        target (str): "summary", a JSONL file ending with ".jsonl" or an OpenMetrics text file ending with ".prom", ".om" or ".txt"
+        output_func (Callable[[str], None] | None, optional): the output function of the summary table. Defaults to None.
+
+    Raises:
+        ValueError: an unknown target
+
+    Returns:
+        BaseMetricsSink: the sink
+    """  # noqa
+    if target == METRICS_SUMMARY:
+        return SummaryTableSink(output_func=output_func)
+    if target.endswith(JSONL_SUFFIXES):
+        return JsonlMetricsSink(target)
+    if target.endswith(OPENMETRICS_SUFFIXES):
+        return OpenMetricsSink(target)
+    raise ValueError(f'Unknown metrics sink: {target}. "{METRICS_SUMMARY}", {list(JSONL_SUFFIXES)} and {list(OPENMETRICS_SUFFIXES)} are valid.')  # noqa
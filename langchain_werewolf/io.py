@@ -40,6 +40,13 @@ _output_map: dict[EInputOutputType, Callable[[Any], None]] = {
 }
 
 
+_token_output_map: dict[EInputOutputType, Callable[[Any], None]] = {
+    EInputOutputType.none: lambda _: None,
+    EInputOutputType.standard: partial(print, end='', flush=True),
+    EInputOutputType.click: partial(click.echo, nl=False),
+}
+
+
 def create_input_runnable(
     input_func: Callable[[str], Any] | EInputOutputType = click.prompt,
     styler: Callable[[str], str] | None = None,
@@ -78,3 +85,27 @@ def create_output_runnable(
         input_type=str,
         output_type=None,
     )
+
+
+def create_token_output_runnable(
+    output_func: Callable[[Any], None] | EInputOutputType = click.echo,
+    styler: Callable[[Any], str] | None = None,
+) -> Runnable[str, None]:
+    """Create the output which writes the tokens of a message without line breaks
+
+    Args:
+        output_func (Callable[[Any], None] | EInputOutputType, optional): the output. A callable is expected to write a token as it is. Defaults to click.echo.
+        styler (Callable[[Any], str] | None, optional): the styler of a token. Defaults to None.
+
+    Raises:
+        ValueError: invalid output_func
+
+    Returns:
+        Runnable[str, None]: the output
+    """  # noqa
+    if isinstance(output_func, EInputOutputType):
+        try:
+            output_func = _token_output_map[output_func]
+        except KeyError:
+            raise ValueError(f'Invalid output_func: {output_func}')
+    return create_output_runnable(output_func, styler)
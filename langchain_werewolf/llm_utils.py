@@ -1,13 +1,17 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from enum import Enum
 from functools import lru_cache
 from logging import Logger, getLogger
 from operator import attrgetter
+from typing import Callable, Iterable, Iterator, Sequence
 from langchain.output_parsers import (
     EnumOutputParser,
     RetryWithErrorOutputParser,
 )
 
 from langchain.output_parsers.retry import NAIVE_RETRY_WITH_ERROR_PROMPT
+from langchain_core.exceptions import OutputParserException
 from langchain_core.prompts import PromptTemplate
 from langchain_core.prompt_values import StringPromptValue
 from langchain_core.runnables import (
@@ -24,6 +28,7 @@ from langchain_openai import ChatOpenAI
 
 from .const import DEFAULT_MODEL, MODEL_SERVICE_MAP, BASE_LANGUAGE
 from .enums import EChatService, ELanguage
+from .instrumentation import EXTRACT_NAME_RUN_NAME, TRANSLATOR_RUN_NAME
 
 
 _service2cls: dict[EChatService, type[BaseChatModel]] = {
@@ -31,6 +36,8 @@ _service2cls: dict[EChatService, type[BaseChatModel]] = {
     EChatService.Google: ChatGoogleGenerativeAI,
     EChatService.Groq: ChatGroq,
 }
+# NOTE: the replay substitutes the recorded names for the LLM calls of `extract_name`  # noqa
+_name_extraction_substitute: ContextVar[Callable[[str], str] | None] = ContextVar('name_extraction_substitute', default=None)  # noqa
 
 
 @lru_cache(maxsize=None)
@@ -73,6 +80,29 @@ def create_chat_model(
         return llm
 
 
+def create_model_cascade(
+    models: Iterable[BaseChatModel | str | None],
+    seed: int | None = None,
+) -> list[BaseChatModel]:
+    """Create the tiers of chat models from the cheapest to the strongest.
+
+    Args:
+        models (Iterable[BaseChatModel | str | None]): ChatModel instances or model names. None and empty names are skipped.
+        seed (int | None, optional): Random seed. Defaults to None.
+
+    Returns:
+        list[BaseChatModel]: ChatModel instances without duplicates
+    """  # noqa
+    cascade: list[BaseChatModel] = []
+    for model in models:
+        if not model:
+            continue
+        chat_model = create_chat_model(model, seed=seed)
+        if all(chat_model is not item for item in cascade):
+            cascade.append(chat_model)
+    return cascade
+
+
 def extract_name(
     message: str,
     valid_names: list[str],
@@ -80,6 +110,7 @@ def extract_name(
     chat_model: BaseChatModel | Runnable[str, str] | str | None = None,
     seed: int | None = None,
     max_retry: int = 5,
+    escalation_chat_models: Sequence[BaseChatModel | Runnable[str, str] | str] = tuple(),  # noqa
 ) -> str:
     """Extract a valid name from the message.
 
@@ -90,6 +121,7 @@ def extract_name(
         chat_model (BaseChatModel | Runnable[str, str] | str | None, optional): The chat model. Defaults to None.
         seed (int | None, optional): The random seed. Defaults to None.
         max_retry (int, optional): The maximum number of retries. Defaults to 5.
+        escalation_chat_models (Sequence[BaseChatModel | Runnable[str, str] | str], optional): The stronger chat models tried in order only when the former one fails to extract a valid name. Defaults to tuple().
 
     Returns:
         str: The extracted name.
@@ -97,6 +129,41 @@ def extract_name(
     Raises:
         langchain_core.exceptions.OutputParserException: If failed to parse the output.
     """  # noqa
+    if escalation_chat_models:
+        try:
+            return extract_name(
+                message,
+                valid_names,
+                context=context,
+                chat_model=chat_model,
+                seed=seed,
+                max_retry=max_retry,
+            )
+        except OutputParserException:
+            return extract_name(
+                message,
+                valid_names,
+                context=context,
+                chat_model=escalation_chat_models[0],
+                seed=seed,
+                max_retry=max_retry,
+                escalation_chat_models=escalation_chat_models[1:],
+            )
+    prompt = '\n'.join([
+        'You are the best at consolidating opinions and drawing conclusions.',  # noqa
+        f'Your task is to extract a valid name, where valid names are {valid_names}.',  # noqa
+        context or '',
+        'Extract the valid name from the following message:',
+        '```text',
+        message,
+        '```',
+        'Extract the valid name from the above message.',
+    ])
+    substitute = _name_extraction_substitute.get()
+    if substitute is not None:
+        # NOTE: the escalation above is kept so that the recorded failures are replayed in the same order  # noqa
+        return RunnableLambda(substitute, name=EXTRACT_NAME_RUN_NAME).invoke(prompt)  # type: ignore # noqa
+
     if chat_model is None:
         chat_model = ChatOpenAI(model='gpt-4o-mini')
     if isinstance(chat_model, str):
@@ -118,21 +185,36 @@ def extract_name(
         max_retries=max_retry,
     )
 
-    prompt = '\n'.join([
-        'You are the best at consolidating opinions and drawing conclusions.',  # noqa
-        f'Your task is to extract a valid name, where valid names are {valid_names}.',  # noqa
-        context or '',
-        'Extract the valid name from the following message:',
-        '```text',
-        message,
-        '```',
-        'Extract the valid name from the above message.',
-    ])
+    # NOTE: the named run groups the LLM calls of the retries for callbacks
+    return RunnableLambda(  # type: ignore
+        lambda prompt_: chain.parse_with_prompt(  # type: ignore
+            completion=prompt_,
+            prompt_value=StringPromptValue(text=message),
+        ).value,  # type: ignore
+        name=EXTRACT_NAME_RUN_NAME,
+    ).invoke(prompt)  # type: ignore
+
+
+@contextmanager
+def substitute_name_extraction(
+    substitute: Callable[[str], str],
+) -> Iterator[None]:
+    """Substitute a function for the LLM calls of `extract_name` in the context
 
-    return chain.parse_with_prompt(  # type: ignore
-        completion=prompt,
-        prompt_value=StringPromptValue(text=message),
-    ).value  # type: ignore
+    The function receives the prompt of the extraction and returns the name, or raises OutputParserException as the failed extraction.
+    The context is inherited by the nodes of the game graph and the threads of the batches.
+
+    Args:
+        substitute (Callable[[str], str]): the function
+
+    Yields:
+        Iterator[None]: the context
+    """  # noqa
+    token = _name_extraction_substitute.set(substitute)
+    try:
+        yield
+    finally:
+        _name_extraction_substitute.reset(token)
 
 
 def create_translator_runnable(
@@ -181,4 +263,4 @@ Output only the translated text.
         ),
         RunnablePassthrough(),
     )
-    return chain.with_types(input_type=str, output_type=str)
+    return chain.with_types(input_type=str, output_type=str).with_config(run_name=TRANSLATOR_RUN_NAME)  # noqa
@@ -1,22 +1,57 @@
+from collections import Counter
+from functools import partial
 from itertools import cycle
 import logging
-import random
+import os
 from typing import Callable, Iterable
+import uuid
 import click
 from dotenv import load_dotenv
-from langchain.globals import set_verbose, set_debug
+from langchain.globals import (
+    get_llm_cache,
+    set_debug,
+    set_llm_cache,
+    set_verbose,
+)
 import pydantic
+from .budget import TOTAL_USAGE_KEY, TokenBudget, apply_token_budget
+from .checkpoint import SqliteCheckpointSaver
 from .const import BASE_LANGUAGE, CLI_PROMPT_COLOR, CLI_ECHO_COLORS
 from .enums import ESystemOutputType, EInputOutputType, ELanguage
+from .event_log import EVENT_LOG_SUFFIXES, EventLogWriter, is_event_log_path
 from .game.main import create_game_graph
 from .game_players import (
+    generate_game_player_runnable,
     PlayerRoleRegistry,
+    Roster,
     PlayerSideRegistry,
     WEREWOLF_ROLE,
 )
-from .models.config import Config,  GeneralConfig
-from .models.state import StateModel, MsgModel
-from .setup import generate_players, create_echo_runnable
+from .io import create_token_output_runnable
+from .instrumentation import (
+    BaseMetricsSink,
+    CacheHitCounter,
+    InstrumentationCallbackHandler,
+    METRICS_SUMMARY,
+    create_metrics_sink,
+)
+from .models.config import Config, GeneralConfig, PlayerConfig
+from .models.general import get_fast_mode, set_fast_mode
+from .llm_utils import create_chat_model, create_model_cascade
+from .models.state import (
+    StateModel,
+    MsgModel,
+    create_dict_to_update_token_usage,
+)
+from .replay import ReplayRecorder
+from .rng import GameRandom, ROLES_STREAM
+from .profiling import (
+    DEFAULT_PROFILE_INTERVAL,
+    SamplingProfiler,
+    format_phase_profiles,
+)
+from .setup import generate_players, create_echo_runnable, is_headless
+from .streaming import TokenStreamEcho
 from .utils import (
     load_json,
     remove_none_values,
@@ -33,6 +68,14 @@ DEFAULT_CONFIG = Config(
             WEREWOLF_ROLE: 1,
         },
         output='',
+        checkpoint='',
+        metrics='',
+        max_tokens_per_game=0,
+        max_tokens_per_player=0,
+        fallback_model='',
+        profile='',
+        profile_interval=DEFAULT_PROFILE_INTERVAL,
+        replay_log='',
         system_output_level=ESystemOutputType.all,
         system_output_interface=EInputOutputType.standard,
         system_language=BASE_LANGUAGE,
@@ -41,7 +84,13 @@ DEFAULT_CONFIG = Config(
         player_font_colors=cycle(CLI_ECHO_COLORS),
         seed=-1,
         model='gpt-4o-mini',
+        auxiliary_model=None,
+        escalation_model='',
         recursion_limit=1000,
+        optimize_graph=False,
+        stream=False,
+        fast=False,
+        headless=False,
         debug=False,
         verbose=False,
     )
@@ -49,10 +98,44 @@ DEFAULT_CONFIG = Config(
 DEFAULT_GENERAL_CONFIG = DEFAULT_CONFIG.general
 
 
+def _restore_player_configs(
+    roles: dict[str, str],
+    players: list[PlayerConfig],
+    model: str,
+) -> list[PlayerConfig]:
+    """Restore the player configurations of a checkpointed game
+
+    Args:
+        roles (dict[str, str]): the roles of the players. key: name, value: role
+        players (list[PlayerConfig]): the player configurations specified by a user
+        model (str): the model used for the players not specified by a user
+
+    Returns:
+        list[PlayerConfig]: the player configurations with the saved names and roles
+    """  # noqa
+    players_by_name = {player.name: player for player in players}
+    return [
+        (
+            players_by_name[name].model_copy(update={'role': role})
+            if name in players_by_name else
+            PlayerConfig(name=name, role=role, model=model)
+        )
+        for name, role in roles.items()
+    ]
+
+
 def main(
     n_players: int = DEFAULT_GENERAL_CONFIG.n_players,  # type: ignore # noqa
     n_players_by_role: dict[str, int] = DEFAULT_GENERAL_CONFIG.n_players_by_role,  # type: ignore # noqa
     output: str = DEFAULT_GENERAL_CONFIG.output,  # type: ignore # noqa
+    checkpoint: str = DEFAULT_GENERAL_CONFIG.checkpoint,  # type: ignore # noqa
+    metrics: str = DEFAULT_GENERAL_CONFIG.metrics,  # type: ignore # noqa
+    max_tokens_per_game: int = DEFAULT_GENERAL_CONFIG.max_tokens_per_game,  # type: ignore # noqa
+    max_tokens_per_player: int = DEFAULT_GENERAL_CONFIG.max_tokens_per_player,  # type: ignore # noqa
+    fallback_model: str = DEFAULT_GENERAL_CONFIG.fallback_model,  # type: ignore # noqa
+    profile: str = DEFAULT_GENERAL_CONFIG.profile,  # type: ignore # noqa
+    profile_interval: float = DEFAULT_GENERAL_CONFIG.profile_interval,  # type: ignore # noqa
+    replay_log: str = DEFAULT_GENERAL_CONFIG.replay_log,  # type: ignore # noqa
     system_output_level:  ESystemOutputType | str = DEFAULT_GENERAL_CONFIG.system_output_level,  # type: ignore # noqa
     system_output_interface: Callable[[str], None] | EInputOutputType = DEFAULT_GENERAL_CONFIG.system_output_interface,  # type: ignore # noqa
     system_language: ELanguage | None = DEFAULT_GENERAL_CONFIG.system_language,  # type: ignore # noqa
@@ -60,9 +143,16 @@ def main(
     system_font_color: str | None = DEFAULT_GENERAL_CONFIG.system_font_color,  # type: ignore # noqa
     player_font_colors: Iterable[str] | str | None = DEFAULT_GENERAL_CONFIG.player_font_colors,  # type: ignore # noqa
     config: Config | str | None = None,
+    resume: str | None = None,
     seed: int = DEFAULT_GENERAL_CONFIG.seed,  # type: ignore # noqa
     model: str = DEFAULT_GENERAL_CONFIG.model,  # type: ignore # noqa
+    auxiliary_model: str | None = DEFAULT_GENERAL_CONFIG.auxiliary_model,  # type: ignore # noqa
+    escalation_model: str = DEFAULT_GENERAL_CONFIG.escalation_model,  # type: ignore # noqa
     recursion_limit: int = DEFAULT_GENERAL_CONFIG.recursion_limit,  # type: ignore # noqa
+    optimize_graph: bool = DEFAULT_GENERAL_CONFIG.optimize_graph,  # type: ignore # noqa
+    stream: bool = DEFAULT_GENERAL_CONFIG.stream,  # type: ignore # noqa
+    fast: bool = DEFAULT_GENERAL_CONFIG.fast,  # type: ignore # noqa
+    headless: bool = DEFAULT_GENERAL_CONFIG.headless,  # type: ignore # noqa
     debug: bool = False,
     verbose: bool = False,
     logger: logging.Logger = logging.getLogger(__name__),
@@ -86,6 +176,14 @@ def main(
             n_players=config.general.n_players if (config is not None and config.general.n_players is not None) else n_players,  # noqa
             n_players_by_role=config.general.n_players_by_role if (config is not None and config.general.n_players_by_role is not None) else n_players_by_role,  # noqa
             output=config.general.output if (config is not None and config.general.output is not None) else output,  # noqa
+            checkpoint=config.general.checkpoint if (config is not None and config.general.checkpoint is not None) else checkpoint,  # noqa
+            metrics=config.general.metrics if (config is not None and config.general.metrics is not None) else metrics,  # noqa
+            max_tokens_per_game=config.general.max_tokens_per_game if (config is not None and config.general.max_tokens_per_game is not None) else max_tokens_per_game,  # noqa
+            max_tokens_per_player=config.general.max_tokens_per_player if (config is not None and config.general.max_tokens_per_player is not None) else max_tokens_per_player,  # noqa
+            fallback_model=config.general.fallback_model if (config is not None and config.general.fallback_model is not None) else fallback_model,  # noqa
+            profile=config.general.profile if (config is not None and config.general.profile is not None) else profile,  # noqa
+            profile_interval=config.general.profile_interval if (config is not None and config.general.profile_interval is not None) else profile_interval,  # noqa
+            replay_log=config.general.replay_log if (config is not None and config.general.replay_log is not None) else replay_log,  # noqa
             system_output_level=config.general.system_output_level if (config is not None and config.general.system_output_level is not None) else system_output_level,  # noqa
             system_output_interface=config.general.system_output_interface if (config is not None and config.general.system_output_interface is not None) else system_output_interface,  # noqa
             system_language=config.general.system_language if (config is not None and config.general.system_language is not None) else system_language,  # noqa
@@ -94,7 +192,13 @@ def main(
             player_font_colors=config.general.player_font_colors if (config is not None and config.general.player_font_colors is not None) else player_font_colors,  # noqa
             seed=config.general.seed if (config is not None and config.general.seed is not None) else seed,  # noqa
             model=config.general.model if (config is not None and config.general.model is not None) else model,  # noqa
+            auxiliary_model=config.general.auxiliary_model if (config is not None and config.general.auxiliary_model is not None) else auxiliary_model,  # noqa
+            escalation_model=config.general.escalation_model if (config is not None and config.general.escalation_model is not None) else escalation_model,  # noqa
             recursion_limit=config.general.recursion_limit if (config is not None and config.general.recursion_limit is not None) else recursion_limit,  # noqa
+            optimize_graph=config.general.optimize_graph if (config is not None and config.general.optimize_graph is not None) else optimize_graph,  # noqa
+            stream=config.general.stream if (config is not None and config.general.stream is not None) else stream,  # noqa
+            fast=config.general.fast if (config is not None and config.general.fast is not None) else fast,  # noqa
+            headless=config.general.headless if (config is not None and config.general.headless is not None) else headless,  # noqa
             debug=config.general.debug if (config is not None and config.general.debug is not None) else debug,  # noqa
             verbose=config.general.verbose if (config is not None and config.general.verbose is not None) else verbose,  # noqa
         ),
@@ -106,48 +210,239 @@ def main(
     load_dotenv(override=True)
     set_verbose(config_used.general.verbose)  # type: ignore
     set_debug(config_used.general.debug)  # type: ignore
-    if config_used.general.seed >= 0:    # type: ignore
-        random.seed(config_used.general.seed)
+    # NOTE: the randomness of the game is drawn from its own streams instead of the global random module  # noqa
+    rng = GameRandom(config_used.general.seed if config_used.general.seed >= 0 else None)  # type: ignore # noqa
+
+    # prepare checkpoint
+    checkpointer: SqliteCheckpointSaver | None = None
+    run_id: str = resume or str(uuid.uuid4())
+    if resume and not config_used.general.checkpoint:
+        raise ValueError('The checkpoint file must be specified to resume a game.')  # noqa
+    if resume and config_used.general.replay_log:
+        raise ValueError('A resumed game cannot be recorded for the replay.')  # noqa
+    if config_used.general.checkpoint:
+        checkpointer = SqliteCheckpointSaver(config_used.general.checkpoint)  # type: ignore # noqa
+        logger.info(f"Save checkpoints of the run {run_id} into {config_used.general.checkpoint}.")  # noqa
 
     # create players
+    n_players_used: int = config_used.general.n_players  # type: ignore
+    n_players_by_role_used: dict[str, int] = config_used.general.n_players_by_role  # type: ignore # noqa
+    custom_players: list[PlayerConfig] = config_used.players
+    if resume and checkpointer is not None:
+        # NOTE: the players are restored with the same names and roles
+        roles = checkpointer.load_players(resume)
+        n_players_used = len(roles)
+        n_players_by_role_used = dict(Counter(roles.values()))
+        custom_players = _restore_player_configs(roles, custom_players, config_used.general.model)  # type: ignore # noqa
     players = generate_players(
-        config_used.general.n_players,  # type: ignore
-        config_used.general.n_players_by_role,
+        n_players_used,
+        n_players_by_role_used,
         model=config_used.general.model,
         seed=config_used.general.seed,  # type: ignore
-        custom_players=config_used.players,
+        custom_players=custom_players,
+        auxiliary_model=config_used.general.auxiliary_model,
+        escalation_model=config_used.general.escalation_model,
+        rng=rng.stream(ROLES_STREAM),
+    )
+    if checkpointer is not None and not resume:
+        checkpointer.save_players(run_id, {player.name: player.role for player in players})  # noqa
+
+    # prepare token budget
+    # NOTE: the players degrade as their tokens approach the budget
+    budget: TokenBudget | None = None
+    if config_used.general.max_tokens_per_game or config_used.general.max_tokens_per_player:  # noqa
+        budget = TokenBudget(
+            [player.name for player in players],
+            max_tokens_per_game=config_used.general.max_tokens_per_game or None,  # noqa
+            max_tokens_per_player=config_used.general.max_tokens_per_player or None,  # noqa
+        )
+        players = Roster(apply_token_budget(
+            players,
+            budget,
+            cheap_runnable=(
+                generate_game_player_runnable(create_chat_model(
+                    config_used.general.fallback_model,
+                    seed=config_used.general.seed if config_used.general.seed >= 0 else None,  # type: ignore # noqa
+                ))
+                if config_used.general.fallback_model else
+                None
+            ),
+            # NOTE: human players are not limited
+            skipped=[player.name for player in custom_players if player.player_input_interface is not None],  # noqa
+        ))
+
+    # prepare display
+    # NOTE: nothing is displayed in the headless mode, so neither the echo nor the token streaming is built  # noqa
+    headless = bool(config_used.general.headless) or is_headless(
+        config_used.general.system_output_level,  # type: ignore
+        players,
+    )
+    if headless:
+        logger.info('Run the game in the headless mode.')
+    # NOTE: the tokens are not translated, so the system output receives them only in the game language  # noqa
+    stream_echo: TokenStreamEcho | None = (
+        TokenStreamEcho(
+            (
+                create_token_output_runnable(config_used.general.system_output_interface)  # type: ignore # noqa
+                if (config_used.general.system_language or BASE_LANGUAGE) == BASE_LANGUAGE else  # noqa
+                None
+            ),
+            config_used.general.system_output_level,  # type: ignore
+            players,
+        )
+        if config_used.general.stream and not headless else
+        None
     )
 
     # create game workflow
+    game_kwargs: dict[str, dict[str, object]] = {
+        k: remove_none_values(dic)
+        for k, dic in config_used.game.model_dump().items()
+    }
+    if config_used.general.auxiliary_model:
+        # NOTE: the votes are extracted by the small model and escalated only when it fails  # noqa
+        chat_models = create_model_cascade(
+            [
+                config_used.general.auxiliary_model,
+                config_used.general.escalation_model or config_used.general.model,  # noqa
+            ],
+            seed=config_used.general.seed if config_used.general.seed >= 0 else None,  # type: ignore # noqa
+        )
+        game_kwargs['vote_kwargs'] = {
+            'chat_model': chat_models[0],
+            'escalation_chat_models': chat_models[1:],
+        } | game_kwargs['vote_kwargs']
     workflow = create_game_graph(
         players,
-        **{
-            k: remove_none_values(dic)
-            for k, dic in config_used.game.model_dump().items()
-        },
+        **game_kwargs,  # type: ignore
         echo=create_echo_runnable(
             config_used.general.system_output_interface,  # type: ignore # noqa,
             config_used.general.system_output_level,  # type: ignore # noqa
             players=players,
             model=config_used.general.model,  # type: ignore
+            auxiliary_model=config_used.general.auxiliary_model,
             system_formatter=config_used.general.system_formatter,  # type: ignore # noqa
             system_color=config_used.general.system_font_color,  # type: ignore # noqa
             player_colors=config_used.general.player_font_colors,  # type: ignore # noqa
             seed=config_used.general.seed,  # type: ignore
             language=config_used.general.system_language,  # type: ignore
-        ),
+            budget=budget,
+            stream_echo=stream_echo,
+        ) if not headless else None,
+        token_echo=stream_echo,
+        checkpointer=checkpointer,
+        optimize=config_used.general.optimize_graph,  # type: ignore
+        validation=not config_used.general.fast,
+        rng=rng,
+    )
+
+    # prepare instrumentation
+    # NOTE: nothing is measured unless the metrics are requested
+    instrumentation: InstrumentationCallbackHandler | None = None
+    sinks: list[BaseMetricsSink] = []
+    llm_cache = get_llm_cache()
+    if config_used.general.metrics:
+        sinks = [
+            create_metrics_sink(target.strip(), output_func=partial(click.echo, err=True))  # noqa
+            for target in config_used.general.metrics.split(',')  # type: ignore # noqa
+            if target.strip()
+        ]
+        instrumentation = InstrumentationCallbackHandler([player.name for player in players])  # noqa
+        if llm_cache is not None:
+            set_llm_cache(CacheHitCounter(llm_cache, instrumentation))
+
+    # prepare profiler
+    profiler: SamplingProfiler | None = (
+        SamplingProfiler(interval=config_used.general.profile_interval)  # type: ignore # noqa
+        if config_used.general.profile else
+        None
+    )
+
+    # prepare replay log
+    # NOTE: the replay reproduces the random streams from the root seed even if the game is unseeded  # noqa
+    recorder: ReplayRecorder | None = (
+        ReplayRecorder(
+            config_used.general.replay_log,  # type: ignore
+            players,
+            rng.root_seed,
+            config_used.game,
+        )
+        if config_used.general.replay_log else
+        None
     )
 
     # run
-    raw_state: dict[str, object] = workflow.invoke(
-        StateModel(alive_players_names=[player.name for player in players]),
-        config={"recursion_limit": config_used.general.recursion_limit},  # type: ignore  # noqa
-        debug=config_used.general.debug,
+    # NOTE: the events are written as they happen when the output is an event log  # noqa
+    event_log: EventLogWriter | None = (
+        EventLogWriter(config_used.general.output, append=bool(resume))  # type: ignore # noqa
+        if config_used.general.output and is_event_log_path(config_used.general.output) else  # noqa
+        None
+    )
+    raw_state: dict[str, object] = {}
+    # NOTE: the models are built without the validation only while the game runs  # noqa
+    previous_fast_mode = get_fast_mode()
+    set_fast_mode(bool(config_used.general.fast))
+    if profiler is not None:
+        profiler.start()
+    try:
+        for raw_state in workflow.stream(
+            # NOTE: None means resuming from the latest checkpoint
+            None if resume else StateModel(alive_players_names=[player.name for player in players]),  # noqa
+            config={
+                "recursion_limit": config_used.general.recursion_limit,  # type: ignore  # noqa
+                "configurable": {"thread_id": run_id},
+                "callbacks": [
+                    handler
+                    for handler in (instrumentation, budget, recorder)
+                    if handler is not None
+                ] or None,
+            },
+            stream_mode='values',
+            debug=config_used.general.debug,
+        ):
+            if event_log is not None:
+                event_log.write(raw_state)
+        if budget is not None:
+            raw_state = dict(raw_state) | create_dict_to_update_token_usage(budget.get_usage())  # noqa
+            if event_log is not None:
+                event_log.write(raw_state)
+        if event_log is not None:
+            event_log.end()
+        if recorder is not None:
+            recorder.end(raw_state)
+    except Exception:
+        if budget is not None:
+            logger.error(f'Token usage: {budget.get_usage()[TOTAL_USAGE_KEY]}')  # noqa
+        if checkpointer is not None:
+            logger.error(f'The game was interrupted. Resume it with `--checkpoint {config_used.general.checkpoint} --resume {run_id}`.')  # noqa
+        raise
+    finally:
+        set_fast_mode(previous_fast_mode)
+        if checkpointer is not None:
+            checkpointer.close()
+        if event_log is not None:
+            event_log.close()
+        if recorder is not None:
+            recorder.close()
+        if instrumentation is not None:
+            set_llm_cache(llm_cache)
+            for sink in sinks:
+                sink.write(instrumentation.get_metrics())
+        if profiler is not None:
+            profiler.stop()
+            profiler.write_collapsed(config_used.general.profile)  # type: ignore # noqa
+            summary = format_phase_profiles(profiler.summarize())
+            with open(f'{os.path.splitext(config_used.general.profile)[0]}.summary.txt', 'w') as f:  # type: ignore # noqa
+                f.write(summary + '\n')
+            click.echo(summary, err=True)
+    state: StateModel = (
+        StateModel.model_construct(**raw_state)  # type: ignore
+        if config_used.general.fast else
+        StateModel(**raw_state)  # type: ignore
     )
-    state: StateModel = StateModel(**raw_state)  # type: ignore
 
     # save
-    if config_used.general.output:
+    if config_used.general.output and event_log is None:
         with open(config_used.general.output, 'w') as f:  # type: ignore
             f.write(state.model_dump_json(indent=4))
 
@@ -174,27 +469,57 @@ def attach_n_players_by_role_options(
 @click.command()
 @click.option('-n', '--n-players', default=DEFAULT_GENERAL_CONFIG.n_players, help=f'The number of players. Default is {DEFAULT_GENERAL_CONFIG.n_players}.')  # noqa
 @attach_n_players_by_role_options
-@click.option('-o', '--output', default=DEFAULT_GENERAL_CONFIG.output, help=f'The output file. Defaults to "{DEFAULT_GENERAL_CONFIG.output}".')  # noqa
+@click.option('-o', '--output', default=DEFAULT_GENERAL_CONFIG.output, help=f'The output file. The events are streamed into it as JSONL when it ends with {list(EVENT_LOG_SUFFIXES)}. Defaults to "{DEFAULT_GENERAL_CONFIG.output}".')  # noqa
+@click.option('--checkpoint', default=DEFAULT_GENERAL_CONFIG.checkpoint, help=f'The SQLite file to save the checkpoints of the game. Defaults to "{DEFAULT_GENERAL_CONFIG.checkpoint}".')  # noqa
+@click.option('--metrics', default=DEFAULT_GENERAL_CONFIG.metrics, help=f'The comma-separated sinks of the metrics per node, player and day. "{METRICS_SUMMARY}" prints a table at the end of the game, a file ending with .jsonl is written as JSONL and a file ending with .prom is written as OpenMetrics text. Defaults to "{DEFAULT_GENERAL_CONFIG.metrics}".')  # noqa
+@click.option('--max-tokens-per-game', default=DEFAULT_GENERAL_CONFIG.max_tokens_per_game, help=f'The token budget of the game. The players degrade, i.e. shorter history, the fallback model and no translation, as the tokens approach the budget and the game is aborted when it is exceeded. 0 means unlimited. Defaults to {DEFAULT_GENERAL_CONFIG.max_tokens_per_game}.')  # noqa
+@click.option('--max-tokens-per-player', default=DEFAULT_GENERAL_CONFIG.max_tokens_per_player, help=f'The token budget of each player. 0 means unlimited. Defaults to {DEFAULT_GENERAL_CONFIG.max_tokens_per_player}.')  # noqa
+@click.option('--fallback-model', default=DEFAULT_GENERAL_CONFIG.fallback_model, help=f'The cheaper model used by the players near their token budget. Defaults to "{DEFAULT_GENERAL_CONFIG.fallback_model}".')  # noqa
+@click.option('--profile', default=DEFAULT_GENERAL_CONFIG.profile, help=f'The file to write the samples of a sampling profiler as collapsed stacks for flame graphs. A summary per game phase is written next to it as *.summary.txt. Defaults to "{DEFAULT_GENERAL_CONFIG.profile}".')  # noqa
+@click.option('--profile-interval', default=DEFAULT_GENERAL_CONFIG.profile_interval, help=f'The sampling interval of the profiler in seconds. Defaults to {DEFAULT_GENERAL_CONFIG.profile_interval}.')  # noqa
+@click.option('--replay-log', default=DEFAULT_GENERAL_CONFIG.replay_log, help=f'The JSONL file to record the outputs of the players and of the name extraction, which replays the game without any LLM by `langchain_werewolf.replay.replay_game`. Defaults to "{DEFAULT_GENERAL_CONFIG.replay_log}".')  # noqa
+@click.option('--resume', default=None, help='The run id of the game to resume from the checkpoint file specified by --checkpoint.')  # noqa
 @click.option('-l', '--system-output-level', default=DEFAULT_GENERAL_CONFIG.system_output_level.name if isinstance(DEFAULT_GENERAL_CONFIG.system_output_level, ESystemOutputType) else DEFAULT_GENERAL_CONFIG.system_output_level, help=f'The output type of the CLI. {list(ESystemOutputType.__members__.keys())} and player names are valid. Default is All.')  # noqa
 @click.option('--system-output-interface', default=DEFAULT_GENERAL_CONFIG.system_output_interface.name if isinstance(DEFAULT_GENERAL_CONFIG.system_output_interface, EInputOutputType) else DEFAULT_GENERAL_CONFIG.system_output_interface, help=f'The system interface. Default is {DEFAULT_GENERAL_CONFIG.system_output_interface}.')  # noqa
 @click.option('--system-formatter', default=DEFAULT_GENERAL_CONFIG.system_formatter, help=f'The system formatter. The format should not include anything other than ' + ', '.join('"{'+k+'}"' for k in MsgModel.model_fields.keys()) + '.')  # noqa
 @click.option('-c', '--config', default='', help='The configuration file. Defaults to "". Note that you can specify CLI arguments in this config file but the config file overwrite the CLI arguments.')  # noqa
 @click.option('--seed', default=DEFAULT_GENERAL_CONFIG.seed, help=f'The random seed. Defaults to {DEFAULT_GENERAL_CONFIG.seed}.')  # noqa
 @click.option('--model', default=DEFAULT_GENERAL_CONFIG.model, help=f'The model to use. Default is {DEFAULT_GENERAL_CONFIG.model}.')  # noqa
+@click.option('--auxiliary-model', default=DEFAULT_GENERAL_CONFIG.auxiliary_model, help='The small model for the auxiliary tasks, i.e. the name extraction and the translation. Defaults to the model of each player.')  # noqa
+@click.option('--escalation-model', default=DEFAULT_GENERAL_CONFIG.escalation_model, help=f'The stronger model used only when the auxiliary model fails to extract a valid name. An empty string means the model of each player. Default is "{DEFAULT_GENERAL_CONFIG.escalation_model}".')  # noqa
 @click.option('--recursion-limit', default=DEFAULT_GENERAL_CONFIG.recursion_limit, help=f'The recursion limit. Default is {DEFAULT_GENERAL_CONFIG.recursion_limit}.')  # noqa
+@click.option('--optimize-graph', is_flag=True, help='Flatten the subgraphs and remove the no-op nodes of the game graph to run with fewer supersteps. The checkpoints are not compatible with the unoptimized graph.')  # noqa
+@click.option('--stream', is_flag=True, help='Stream the tokens of the players\' messages to the outputs while they are generated. In the simultaneous discussion, each message is written at once when it is complete.')  # noqa
+@click.option('--fast', is_flag=True, help='Skip the runtime validation of the models built internally and of the state during the game. The config and the inputs are still validated.')  # noqa
+@click.option('--headless', is_flag=True, help='Run the game without displaying anything. The echo nodes are not added to the game graph. It is implied when the system output is off and no player has an output interface.')  # noqa
 @click.option('--debug', is_flag=True, help='Enable debug mode.')
 @click.option('--verbose', is_flag=True, help='Enable verbose mode.')
 def cli(
     *,
     n_players: int = DEFAULT_GENERAL_CONFIG.n_players,  # type: ignore # noqa
     output: str = DEFAULT_GENERAL_CONFIG.output,  # type: ignore # noqa
+    checkpoint: str = DEFAULT_GENERAL_CONFIG.checkpoint,  # type: ignore # noqa
+    metrics: str = DEFAULT_GENERAL_CONFIG.metrics,  # type: ignore # noqa
+    max_tokens_per_game: int = DEFAULT_GENERAL_CONFIG.max_tokens_per_game,  # type: ignore # noqa
+    max_tokens_per_player: int = DEFAULT_GENERAL_CONFIG.max_tokens_per_player,  # type: ignore # noqa
+    fallback_model: str = DEFAULT_GENERAL_CONFIG.fallback_model,  # type: ignore # noqa
+    profile: str = DEFAULT_GENERAL_CONFIG.profile,  # type: ignore # noqa
+    profile_interval: float = DEFAULT_GENERAL_CONFIG.profile_interval,  # type: ignore # noqa
+    replay_log: str = DEFAULT_GENERAL_CONFIG.replay_log,  # type: ignore # noqa
+    resume: str | None = None,
     system_output_level:  str = DEFAULT_GENERAL_CONFIG.system_output_level.name,  # type: ignore # noqa
     system_output_interface: str = DEFAULT_GENERAL_CONFIG.system_output_interface.name,  # type: ignore # noqa
     system_formatter: str = DEFAULT_GENERAL_CONFIG.system_formatter,  # type: ignore # noqa
     config: str = '',  # type: ignore # noqa
     seed: int = DEFAULT_GENERAL_CONFIG.seed,  # type: ignore # noqa
     model: str = DEFAULT_GENERAL_CONFIG.model,  # type: ignore # noqa
+    auxiliary_model: str | None = DEFAULT_GENERAL_CONFIG.auxiliary_model,  # type: ignore # noqa
+    escalation_model: str = DEFAULT_GENERAL_CONFIG.escalation_model,  # type: ignore # noqa
     recursion_limit: int = DEFAULT_GENERAL_CONFIG.recursion_limit,  # type: ignore # noqa
+    optimize_graph: bool = False,  # type: ignore # noqa
+    stream: bool = False,  # type: ignore # noqa
+    fast: bool = False,  # type: ignore # noqa
+    headless: bool = False,  # type: ignore # noqa
     debug: bool = False,  # type: ignore # noqa
     verbose: bool = False,  # type: ignore # noqa
     logger: logging.Logger = logging.getLogger(__name__),  # type: ignore # noqa,
@@ -210,13 +535,28 @@ def cli(
         n_players=n_players,
         n_players_by_role={k.replace("n_", ""): int(v) for k, v in kwargs.items()},  # noqa
         output=output,
+        checkpoint=checkpoint,
+        metrics=metrics,
+        max_tokens_per_game=max_tokens_per_game,
+        max_tokens_per_player=max_tokens_per_player,
+        fallback_model=fallback_model,
+        profile=profile,
+        profile_interval=profile_interval,
+        replay_log=replay_log,
         system_output_level=system_output_level,
         system_output_interface=system_output_interface,  # type: ignore
         system_formatter=system_formatter,
         config=config,
+        resume=resume,
         seed=seed,
         model=model,
+        auxiliary_model=auxiliary_model,
+        escalation_model=escalation_model,
         recursion_limit=recursion_limit,
+        optimize_graph=optimize_graph,
+        stream=stream,
+        fast=fast,
+        headless=headless,
         debug=debug,
         verbose=verbose,
         logger=logger,
@@ -16,6 +16,14 @@ class GeneralConfig(BaseModel, frozen=True):
     n_players: int | None = Field(default=None, title="The number of players. Default is None.")  # noqa
     n_players_by_role: dict[str, int] = Field(title="The number of players by role. Default is None.", default_factory=dict)  # noqa
     output: str | None = Field(default=None, title='The output file. Defaults to None.')  # noqa
+    checkpoint: str | None = Field(default=None, title='The SQLite file to save the checkpoints of the game. Defaults to None.')  # noqa
+    metrics: str | None = Field(default=None, title='The comma-separated sinks of the metrics per node, player and day, e.g. "summary,metrics.jsonl,metrics.prom". Defaults to None.')  # noqa
+    max_tokens_per_game: int | None = Field(default=None, title='The token budget of the game. 0 means unlimited. Defaults to None.')  # noqa
+    max_tokens_per_player: int | None = Field(default=None, title='The token budget of each player. 0 means unlimited. Defaults to None.')  # noqa
+    fallback_model: str | None = Field(default=None, title='The cheaper model used by the players near their token budget. Defaults to None.')  # noqa
+    profile: str | None = Field(default=None, title='The file to write the samples of the profiler as collapsed stacks. Defaults to None.')  # noqa
+    replay_log: str | None = Field(default=None, title='The JSONL file to record the outputs of the players and of the name extraction to replay the game without any LLM. Defaults to None.')  # noqa
+    profile_interval: float | None = Field(default=None, title='The sampling interval of the profiler in seconds. Defaults to None.')  # noqa
     system_output_level: ESystemOutputType | str | None = Field(default=None, title=f"The output type of the CLI. {list(ESystemOutputType.__members__.keys())} and player names are valid. Default is None.")  # noqa
     system_output_interface: Callable[[str], None] | EInputOutputType | None = Field(default=None, title="The system output interface. Default is None.")  # noqa
     system_language: ELanguage | None = Field(default=None, title="The system language. Default is None.")  # noqa
@@ -24,7 +32,13 @@ class GeneralConfig(BaseModel, frozen=True):
     player_font_colors: Iterable | str | None = Field(default=None, title="The player font colors. Default is None.")  # noqa
     seed: int | None = Field(default=None, title="The random seed. Defaults to None.")  # noqa
     model: str | None = Field(default=None, title=f"The model to use. Default is None.")  # noqa
+    auxiliary_model: str | None = Field(default=None, title="The small model for the auxiliary tasks, i.e. the name extraction and the translation. Default is None.")  # noqa
+    escalation_model: str | None = Field(default=None, title="The stronger model used only when the auxiliary model fails to extract a valid name. Default is None.")  # noqa
     recursion_limit: int | None = Field(default=None, title="The recursion limit. Default is None.")  # noqa
+    optimize_graph: bool | None = Field(default=None, title="Flatten the subgraphs and remove the no-op nodes of the game graph. Default is None.")  # noqa
+    stream: bool | None = Field(default=None, title="Stream the tokens of the players' messages while they are generated. Default is None.")  # noqa
+    fast: bool | None = Field(default=None, title="Skip the runtime validation of the models built internally and of the state during the game. Default is None.")  # noqa
+    headless: bool | None = Field(default=None, title="Run the game without displaying anything, i.e. without the echo nodes. Default is None.")  # noqa
     debug: bool | None = Field(default=None, title="Enable debug mode.")  # noqa
     verbose: bool | None = Field(default=None, title="Enable verbose mode.")  # noqa
 
@@ -97,9 +111,11 @@ class GameConfig(BaseModel, frozen=True):
         system_prompt: str | None = Field(default=None, title="The system prompt of the vote")  # noqa
         chat_llm: str | None = Field(default=None, title="The chat LLM used to clean the vote")  # noqa
         seed: int | None = Field(default=None, title="The seed for chat_llm")  # noqa
+        decided_vote_cutoff: bool | None = Field(default=None, title="Whether the votes are cast one by one and the remaining votes are skipped once the result is decided. Only for the daytime vote")  # noqa
 
     class NightActionConfig(BaseModel, frozen=True):
         prompt: str | None = Field(default=None, title="The prompt of the night action")  # noqa
+        batch: bool | None = Field(default=None, title="Whether the LLM calls of the night actions sharing a model are batched")  # noqa
 
     class EliminationConfig(BaseModel, frozen=True):
         pass
@@ -1,8 +1,114 @@
-from typing import Annotated, Any, Generic, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+import copy
+from functools import partial
+from typing import Annotated, Any, Callable, Generic, Iterator, TypeVar
 import uuid
 from pydantic import BaseModel, Field, ConfigDict
 
 T = TypeVar('T')
+TModel = TypeVar('TModel', bound=BaseModel)
+
+# NOTE: the models built on the internal paths are not validated in the fast mode.  # noqa
+#       the mode is held per context so that the games running concurrently do not affect each other  # noqa
+_fast_mode: ContextVar[bool] = ContextVar('fast_mode', default=False)
+# NOTE: the defaults of the fields by class. None means the class is validated even in the fast mode  # noqa
+_field_defaults: dict[type[BaseModel], dict[str, Callable[[], Any]] | None] = {}  # noqa
+
+
+def set_fast_mode(enabled: bool) -> None:
+    """Enable or disable the fast mode in the current context
+
+    In the fast mode, the models built by `build_model` skip the validation.
+    The validation at the boundaries, e.g. loading the config, is not affected.
+    The nodes of a graph run in copies of the context of the caller, so they inherit the mode.
+
+    Args:
+        enabled (bool): True to enable the fast mode
+    """  # noqa
+    _fast_mode.set(enabled)
+
+
+def get_fast_mode() -> bool:
+    return _fast_mode.get()
+
+
+@contextmanager
+def fast_mode(enabled: bool = True) -> Iterator[None]:
+    """Enable or disable the fast mode in a context
+
+    Args:
+        enabled (bool, optional): True to enable the fast mode. Defaults to True.
+    """  # noqa
+    token = _fast_mode.set(enabled)
+    try:
+        yield
+    finally:
+        _fast_mode.reset(token)
+
+
+def _identity(value: T) -> T:
+    return value
+
+
+def _get_field_defaults(
+    cls: type[BaseModel],
+) -> dict[str, Callable[[], Any]] | None:
+    if cls in _field_defaults:
+        return _field_defaults[cls]
+    decorators = cls.__pydantic_decorators__
+    if (
+        decorators.field_validators
+        or decorators.model_validators
+        or decorators.root_validators
+        or decorators.validators
+    ):
+        # NOTE: the validators may transform the values, e.g. `ChatHistoryModel.preprocess_messages`  # noqa
+        _field_defaults[cls] = None
+        return None
+    defaults: dict[str, Callable[[], Any]] = {}
+    for name, field in cls.model_fields.items():
+        if field.default_factory is not None:
+            defaults[name] = field.default_factory  # type: ignore
+        elif not field.is_required():
+            default = field.default
+            if isinstance(default, (dict, list, set)):
+                # NOTE: the collections are copied like `model_construct`, but shallowly  # noqa
+                defaults[name] = partial(type(default), default)
+            elif copy.deepcopy(default) is default:
+                defaults[name] = partial(_identity, default)
+            else:
+                defaults[name] = partial(copy.deepcopy, default)
+    _field_defaults[cls] = defaults
+    return defaults
+
+
+def build_model(cls: type[TModel], **values: Any) -> TModel:
+    """Build a model on a trusted internal path
+
+    In the fast mode, the model is built by `model_construct` without the validation,
+    so the values must already have the types of the fields.
+    The defaults of the fields are looked up once per class and passed to `model_construct`,
+    which otherwise inspects the signature of each default factory per call.
+    The models with validators, which may transform the values, are still validated.
+
+    Args:
+        cls (type[TModel]): the model class
+        **values (Any): the values of the fields
+
+    Returns:
+        TModel: the model
+    """  # noqa
+    if not _fast_mode.get():
+        return cls(**values)
+    defaults = _get_field_defaults(cls)
+    if defaults is None:
+        return cls(**values)
+    fields_set = set(values)
+    for name, default in defaults.items():
+        if name not in fields_set:
+            values[name] = default()
+    return cls.model_construct(fields_set, **values)
 
 
 def overwrite_reducer(old: T, new: T) -> T:
@@ -66,7 +172,7 @@ def reduce_list(
     for orglst, newlst in [(old, old_), (new, new_)]:
         for val in orglst:
             if not isinstance(val, IdentifiedModel):
-                val = IdentifiedModel[type(val)](value=val)  # type: ignore
+                val = build_model(IdentifiedModel[type(val)], value=val)  # type: ignore # noqa
             newlst.append(val)  # type: ignore
 
     # merge
@@ -1,12 +1,13 @@
 from datetime import datetime
 from itertools import chain
-from typing import Annotated, Iterable, Literal, TypeVar
+from typing import Annotated, Iterable, Literal, Mapping, TypeVar
 from pydantic import BaseModel, Field, field_serializer, field_validator  # noqa
 from ..const import RESET
 from ..enums import EResult, ETimeSpan
 from .general import (
     IdentifiedModel,
     PartialFrozenModel,
+    build_model,
     constant_reducer,
     overwrite_reducer,
     reduce_dict,
@@ -80,6 +81,23 @@ class ChatHistoryModel(PartialFrozenModel):
         ]
 
 
+class EliminationModel(BaseModel):
+    name: str = Field(..., title="the name of the eliminated player")
+    day: int = Field(..., title="the day when the player was eliminated")
+    timespan: ETimeSpan = Field(..., title="the timespan when the player was eliminated")  # noqa
+
+
+class TokenUsageModel(BaseModel):
+    llm_calls: int = Field(default=0, title="the number of LLM calls")
+    prompt_tokens: int = Field(default=0, title="the number of prompt tokens")
+    completion_tokens: int = Field(default=0, title="the number of completion tokens")  # noqa
+    cost: float = Field(default=0.0, title="the estimated cost in USD")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
 def _reduce_chat_state(
     previous_chat_state: dict[frozenset[str], ChatHistoryModel] | None,
     new_chat_state: dict[frozenset[str], ChatHistoryModel] | None,
@@ -88,11 +106,19 @@ def _reduce_chat_state(
     previous_chat_state = previous_chat_state or {}
     new_chat_state = new_chat_state or {}
     # merge
+    # NOTE: the previous chat state is not updated in place
+    #       because it may be read by a node running concurrently, e.g. an echo  # noqa
+    chat_state = dict(previous_chat_state)
     for names, chat_history in new_chat_state.items():
-        prev_chat_history = previous_chat_state.get(names, ChatHistoryModel(names=names))  # noqa
-        prev_chat_history.messages = reduce_list(prev_chat_history.messages, chat_history.messages)  # type: ignore # noqa
-        previous_chat_state[names] = prev_chat_history
-    return previous_chat_state
+        prev_chat_history = previous_chat_state.get(names)
+        if prev_chat_history is None:
+            chat_state[names] = build_model(ChatHistoryModel, names=names, messages=reduce_list([], chat_history.messages))  # type: ignore # noqa
+            continue
+        # NOTE: the merged messages are already identified, so they are not validated again  # noqa
+        chat_state[names] = prev_chat_history.model_copy(update={
+            'messages': reduce_list(prev_chat_history.messages, chat_history.messages),  # type: ignore # noqa
+        })
+    return chat_state
 
 
 def _reduce_votes_current(
@@ -131,12 +157,16 @@ class StateModel(PartialFrozenModel):
         = Field(..., title="the names of the alive players")
     safe_players_names: Annotated[set[str], overwrite_reducer]\
         = Field(title="the names of the safe players", default_factory=set)  # noqa
+    elimination_log: Annotated[list[IdentifiedModel[EliminationModel]], reduce_list]\
+        = Field(title="the eliminated players in the order of elimination", default_factory=list)  # noqa
 
     # game chat information
     current_speaker: Annotated[str | None, overwrite_reducer]\
         = Field(default=None, title="the name of the current speaker")  # noqa
     n_chat_remaining: Annotated[int | None, overwrite_reducer]\
         = Field(default=None, title="the number of chat remaining")  # noqa
+    speaker_schedule: Annotated[list[str], overwrite_reducer]\
+        = Field(default_factory=list, title="the speakers of the current discussion who have not spoken yet, in order")  # noqa
 
     # vote information
     # TODO: modify the type of daytime_votes_history and nighttime_votes_history: dict to dict[str, str]  # noqa
@@ -153,6 +183,10 @@ class StateModel(PartialFrozenModel):
     nighttime_votes_current: Annotated[dict[str, str], _reduce_votes_current]\
         = Field(default_factory=dict, title="the current nighttime votes")
 
+    # usage information
+    token_usage: Annotated[dict[str, TokenUsageModel], overwrite_reducer]\
+        = Field(default_factory=dict, title="the token usage per player and in total, which is reported at the end of the game")  # noqa
+
     @field_serializer('chat_state')
     def serialize_chat_state(
         self,
@@ -173,6 +207,32 @@ class StateModel(PartialFrozenModel):
             return 'None'
         return value.value
 
+    @field_validator('chat_state', mode='before')
+    @classmethod
+    def preprocess_chat_state(
+        cls,
+        chat_state: dict[frozenset[str] | str, ChatHistoryModel | dict],
+    ) -> dict[frozenset[str], ChatHistoryModel | dict]:
+        # NOTE: the keys serialized by `serialize_chat_state` are restored from the names of each chat history  # noqa
+        return {
+            (
+                key
+                if isinstance(key, frozenset) else
+                frozenset(
+                    chat_history.names
+                    if isinstance(chat_history, ChatHistoryModel) else
+                    chat_history['names']
+                )
+            ): chat_history
+            for key, chat_history in chat_state.items()
+        }
+
+    @field_validator('result', mode='before')
+    @classmethod
+    def preprocess_result(cls, value: EResult | str | None) -> EResult | str | None:  # noqa
+        # NOTE: `serialize_result` serializes None as 'None'
+        return None if value == 'None' else value
+
     @field_validator('daytime_votes_history')
     @classmethod
     def preprocess_votes_history(
@@ -199,6 +259,38 @@ class StateModel(PartialFrozenModel):
             for votes in votes_history
         ]
 
+    @property
+    def alive_players_set(self) -> frozenset[str]:
+        """The names of the alive players as a set for O(1) membership tests
+
+        Note:
+            `alive_players_names` is kept as a list so that the serialized form and the order do not change.
+            The set is cached until the list is replaced.
+        """  # noqa
+        names = self.alive_players_names
+        # NOTE: the cache is not a field so that it is neither serialized nor a channel of the graph  # noqa
+        cached: tuple[list[str], int, frozenset[str]] | None = self.__dict__.get('_alive_players_set')  # noqa
+        if cached is None or cached[0] is not names or cached[1] != len(names):  # noqa
+            cached = (names, len(names), frozenset(names))
+            self.__dict__['_alive_players_set'] = cached
+        return cached[2]
+
+    def get_elimination(self, name: str) -> EliminationModel | None:
+        """Get when a player was eliminated
+
+        Args:
+            name (str): the name of the player
+
+        Returns:
+            EliminationModel | None: the elimination or None if the player has not been eliminated
+        """  # noqa
+        log = self.elimination_log
+        cached: tuple[list[IdentifiedModel[EliminationModel]], int, dict[str, EliminationModel]] | None = self.__dict__.get('_eliminations')  # noqa
+        if cached is None or cached[0] is not log or cached[1] != len(log):
+            cached = (log, len(log), {item.value.name: item.value for item in log})  # noqa
+            self.__dict__['_eliminations'] = cached
+        return cached[2].get(name)
+
     def validate_state(self, raise_exception: bool = True) -> bool:
         try:
             assert len(self.nighttime_vote_result_history) == len(self.nighttime_votes_history), f'assert len(self.nighttime_vote_result_history) == len(self.nighttime_votes_history) failed: {len(self.nighttime_vote_result_history)} != {len(self.nighttime_votes_history)}, nighttime_vote_result_history: {self.nighttime_vote_result_history}, nighttime_votes_history: {self.nighttime_votes_history}'  # noqa
@@ -215,6 +307,7 @@ def create_dict_to_reset_state(*args, **kwargs) -> dict[str, object]:
         'safe_players_names': set(),
         'current_speaker': None,
         'n_chat_remaining': None,
+        'speaker_schedule': [],
         'daytime_votes_current': {},
         'nighttime_votes_current': {},
     }
@@ -238,18 +331,48 @@ def create_dict_to_record_chat(
     participants = frozenset(chain([sender], participants))
     return {
         'chat_state': {
-            participants: ChatHistoryModel(
+            participants: build_model(
+                ChatHistoryModel,
                 names=participants,
-                messages=[IdentifiedModel[MsgModel](value=MsgModel(
-                    name=sender,
-                    message=message,
-                    participants=participants
-                ))],
+                messages=[build_model(
+                    IdentifiedModel[MsgModel],
+                    value=build_model(
+                        MsgModel,
+                        name=sender,
+                        message=message,
+                        participants=participants,
+                    ),
+                )],
             ),
         }
     }
 
 
+def create_dict_to_record_chats(
+    messages: Iterable[tuple[str, str]],
+    participants: Iterable[str],
+) -> dict[str, dict[frozenset[str], ChatHistoryModel]]:
+    """Generate a dictionary to record several messages at once in order
+
+    Args:
+        messages (Iterable[tuple[str, str]]): pairs of the sender and the message content
+        participants (Iterable[str]): receivers' names
+
+    Returns:
+        dict[str, dict[frozenset[str], ChatHistoryModel]]: dictionary to update the chat state attribute of StateModel
+    """  # noqa
+    participants = list(participants)
+    chat_state: dict[frozenset[str], ChatHistoryModel] = {}
+    for sender, message in messages:
+        chat_state = _reduce_chat_state(
+            chat_state,
+            create_dict_to_record_chat(sender, participants, message)['chat_state'],  # noqa
+        )
+    return {
+        'chat_state': chat_state,
+    }
+
+
 def create_dict_to_update_day(
     day: int,
 ) -> dict[str, int]:
@@ -286,11 +409,31 @@ def create_dict_to_update_chat_remaining_number(
     }
 
 
+def create_dict_to_update_speaker_schedule(
+    schedule: list[str],
+) -> dict[str, object]:
+    """Generate a dictionary to update the speakers who have not spoken yet
+
+    The current speaker and the number of chat remaining follow the schedule.
+
+    Args:
+        schedule (list[str]): the names of the speakers in order
+
+    Returns:
+        dict[str, object]: dictionary to update the state
+    """
+    return {
+        'speaker_schedule': schedule,
+        'current_speaker': schedule[0] if schedule else None,
+        'n_chat_remaining': len(schedule),
+    }
+
+
 def create_dict_to_update_daytime_vote_result_history(
     vote_result: str | None,
 ) -> dict[str, list[IdentifiedModel[str | None]]]:
     return {
-        'daytime_vote_result_history': [IdentifiedModel[str | None](value=vote_result)],  # noqa
+        'daytime_vote_result_history': [build_model(IdentifiedModel[str | None], value=vote_result)],  # noqa
     }
 
 
@@ -298,7 +441,7 @@ def create_dict_to_update_nighttime_vote_result_history(
     vote_result: str | None,
 ) -> dict[str, list[IdentifiedModel[str | None]]]:
     return {
-        'nighttime_vote_result_history': [IdentifiedModel[str | None](value=vote_result)],  # noqa
+        'nighttime_vote_result_history': [build_model(IdentifiedModel[str | None], value=vote_result)],  # noqa
     }
 
 
@@ -338,6 +481,16 @@ def create_dict_to_update_alive_players(
     }
 
 
+def create_dict_to_add_elimination(
+    name: str,
+    day: int,
+    timespan: ETimeSpan,
+) -> dict[str, list[IdentifiedModel[EliminationModel]]]:
+    return {
+        'elimination_log': [build_model(IdentifiedModel[EliminationModel], value=build_model(EliminationModel, name=name, day=day, timespan=timespan))],  # noqa
+    }
+
+
 def create_dict_to_update_result(
     result: EResult | None,
 ) -> dict[str, EResult | None]:
@@ -346,12 +499,46 @@ def create_dict_to_update_result(
     }
 
 
+def create_dict_to_update_token_usage(
+    token_usage: dict[str, TokenUsageModel],
+) -> dict[str, dict[str, TokenUsageModel]]:
+    return {
+        'token_usage': token_usage,
+    }
+
+
 def create_dict_without_state_updated(
     state: StateModel,
 ) -> dict[str, object]:
     return {'chat_state': {}}
 
 
+def reduce_dicts_to_update_state(
+    updates: Iterable[Mapping[str, object]],
+) -> dict[str, object]:
+    """Reduce the dictionaries to update StateModel into one with the reducers of the fields
+
+    Args:
+        updates (Iterable[Mapping[str, object]]): the dictionaries in the order to be applied
+
+    Returns:
+        dict[str, object]: the reduced dictionary
+
+    Note:
+        A node returns only one dictionary,
+        so the updates of several players in a node are reduced in advance as if they were returned by the nodes in order.
+    """  # noqa
+    reduced: dict[str, object] = {}
+    for update in updates:
+        for key, value in update.items():
+            if key not in reduced:
+                reduced[key] = value
+                continue
+            reducer = StateModel.model_fields[key].metadata[0]
+            reduced[key] = reducer(reduced[key], value)
+    return reduced
+
+
 def get_related_chat_histories(
     name: str,
     state: StateModel,
@@ -367,9 +554,11 @@ def _integrate_chat_histories(
     *chat_history: ChatHistoryModel,
 ) -> list[IdentifiedModel[MsgModel]]:
     return sorted([
-        IdentifiedModel[MsgModel](
+        build_model(
+            IdentifiedModel[MsgModel],
             id=message.id,
-            value=MsgModel(
+            value=build_model(
+                MsgModel,
                 name=message.value.name,
                 timestamp=message.value.timestamp,
                 message=message.value.message,
@@ -384,7 +573,7 @@ def _get_specific_chat(
     names: frozenset[str],
     state: StateModel,
 ) -> ChatHistoryModel:
-    return state.chat_state.get(names, ChatHistoryModel(names=names))
+    return state.chat_state.get(names) or build_model(ChatHistoryModel, names=names)  # noqa
 
 
 def get_related_messsages_with_id(
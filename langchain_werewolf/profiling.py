@@ -0,0 +1,247 @@
+from collections import Counter
+from contextvars import Context
+from functools import partial
+import os
+import sys
+import threading
+from types import FrameType, TracebackType
+from typing import Any
+from langchain_core.runnables.config import var_child_runnable_config
+from pydantic import BaseModel, Field
+from .instrumentation import get_phase
+
+# const
+DEFAULT_PROFILE_INTERVAL: float = 0.005
+UNTAGGED_PHASE: str = '(graph)'
+# NOTE: the running thread holds the GIL until the switch interval passes or it calls a blocking function,  # noqa
+#       so the samples are biased to the blocking functions like `os.urandom` unless the interval is short enough  # noqa
+PROFILE_SWITCH_INTERVAL: float = 0.00005
+# NOTE: the functions suspected to be the bottlenecks of the game engine
+WATCHED_FUNCTIONS: tuple[str, ...] = (
+    '_reduce_chat_state',
+    'filter_state_according_to_player',
+    'BaseModel.__init__',
+    'BaseModel.model_validate',
+    'BaseModel.model_copy',
+)
+# NOTE: the threads whose innermost frame is in these files are waiting for the others  # noqa
+_IDLE_FILES: frozenset[str] = frozenset({
+    'threading.py',
+    'selectors.py',
+    'queue.py',
+    '_base.py',
+})
+_WORKER_FILE: str = os.path.join('concurrent', 'futures', 'thread.py')
+
+
+class PhaseProfile(BaseModel):
+    phase: str = Field(..., title="the top-level node of the game graph")
+    samples: int = Field(..., title="the number of samples")
+    seconds: float = Field(..., title="the estimated CPU-bound wall time in seconds")  # noqa
+    ratio: float = Field(..., title="the ratio of the samples to all samples")  # noqa
+    functions: dict[str, float] = Field(default_factory=dict, title="the ratio of the samples in which each function is the innermost frame to the samples of the phase")  # noqa
+    watched: dict[str, float] = Field(default_factory=dict, title="the ratio of the samples in which each watched function is on the stack to the samples of the phase")  # noqa
+
+
+def _get_phase_from_work(fn: Any) -> str | None:  # noqa
+    # NOTE: the executors of LangChain and LangGraph run the functions in the copied contexts,  # noqa
+    #       which have the config of the runnable which submitted them
+    while isinstance(fn, partial):
+        for item in (fn.func, *fn.args):
+            context = getattr(item, '__self__', None)
+            if isinstance(context, Context):
+                phase = get_phase((context.get(var_child_runnable_config) or {}).get('metadata'))  # noqa
+                if phase is not None:
+                    return phase
+        fn = fn.func
+    return None
+
+
+def find_phase(frame: FrameType | None) -> str | None:
+    """Find the phase, i.e. the top-level node of the game graph, which a call stack is running
+
+    Args:
+        frame (FrameType | None): the innermost frame of the call stack
+
+    Returns:
+        str | None: the phase or None if the call stack is not running the game graph
+    """  # noqa
+    phase: str | None = None
+    # NOTE: the outermost frame with the phase wins
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'run_with_retry' and 'langgraph' in code.co_filename:  # noqa
+            task = frame.f_locals.get('task')
+            phase = get_phase(getattr(task, 'config', {}).get('metadata')) or phase  # noqa
+        elif code.co_name == 'run' and code.co_filename.endswith(_WORKER_FILE):  # noqa
+            phase = _get_phase_from_work(getattr(frame.f_locals.get('self'), 'fn', None)) or phase  # noqa
+        frame = frame.f_back
+    return phase
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (
+        os.path.basename(code.co_filename) in _IDLE_FILES
+        # NOTE: the worker of the thread pool waiting for a new work
+        or (code.co_name == '_worker' and code.co_filename.endswith(_WORKER_FILE))  # noqa
+    )
+
+
+def _get_frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    # NOTE: `co_qualname` is available on Python 3.11 or later
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'  # noqa
+
+
+def _get_stack(frame: FrameType | None) -> tuple[str, ...]:
+    labels: list[str] = []
+    while frame is not None:
+        labels.append(_get_frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class SamplingProfiler:
+    """A sampling profiler which samples the call stacks of all threads and tags them with the phase of the game graph.
+
+    Each sample is tagged with the phase found in the call stack, so no callback is needed.
+    The samples are written as collapsed stacks, i.e. one line per distinct stack like "phase;outer;...;inner count",
+    which `flamegraph.pl` and speedscope can render as a flame graph.
+    The threads waiting for the others are not sampled, so the samples estimate where the CPU-bound time goes.
+    """  # noqa
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_PROFILE_INTERVAL,
+    ) -> None:
+        """Initialize the profiler
+
+        Args:
+            interval (float, optional): the sampling interval in seconds. Defaults to DEFAULT_PROFILE_INTERVAL.
+        """  # noqa
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._switch_interval: float = sys.getswitchinterval()
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, PROFILE_SWITCH_INTERVAL))  # noqa
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)  # noqa
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            sys.setswitchinterval(self._switch_interval)
+
+    def sample(self) -> None:
+        """Sample the call stacks of all threads once"""
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or _is_idle(frame):
+                continue
+            phase = find_phase(frame) or UNTAGGED_PHASE
+            self.stacks[(phase,) + _get_stack(frame)] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def write_collapsed(self, path: str) -> None:
+        """Write the samples as collapsed stacks
+
+        Args:
+            path (str): the output file
+        """
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(';'.join(label.replace(';', ',') for label in stack) + f' {count}\n')  # noqa
+
+    def summarize(
+        self,
+        top: int = 5,
+        watched: tuple[str, ...] = WATCHED_FUNCTIONS,
+    ) -> list[PhaseProfile]:
+        """Summarize the samples per phase
+
+        Args:
+            top (int, optional): the number of the functions with the most self samples per phase. Defaults to 5.
+            watched (tuple[str, ...], optional): the qualified names of the functions whose inclusive ratios are reported. Defaults to WATCHED_FUNCTIONS.
+
+        Returns:
+            list[PhaseProfile]: the profiles sorted by the number of samples in descending order
+        """  # noqa
+        total = sum(self.stacks.values())
+        samples: Counter[str] = Counter()
+        leaves: dict[str, Counter[str]] = {}
+        includes: dict[str, Counter[str]] = {}
+        for stack, count in self.stacks.items():
+            phase = stack[0]
+            samples[phase] += count
+            leaves.setdefault(phase, Counter())[stack[-1]] += count
+            # NOTE: a recursive function is counted once per sample
+            qualnames = {label.split(' ', 1)[0] for label in stack[1:]}
+            includes.setdefault(phase, Counter()).update({
+                name: count for name in watched if name in qualnames
+            })
+        return [
+            PhaseProfile(
+                phase=phase,
+                samples=count,
+                seconds=count * self.interval,
+                ratio=count / total,
+                functions={
+                    label: n / count
+                    for label, n in leaves[phase].most_common(top)
+                },
+                watched={
+                    name: includes[phase][name] / count
+                    for name in watched
+                },
+            )
+            for phase, count in samples.most_common()
+        ]
+
+
+def format_phase_profiles(profiles: list[PhaseProfile]) -> str:
+    """Format the profiles per phase as a text table
+
+    Args:
+        profiles (list[PhaseProfile]): the profiles
+
+    Returns:
+        str: the formatted text
+    """
+    width = max([len('phase')] + [len(profile.phase) for profile in profiles])  # noqa
+    lines = [f'{"phase":<{width}} {"samples":>8} {"seconds":>9} {"ratio":>7}']  # noqa
+    for profile in profiles:
+        lines.append(f'{profile.phase:<{width}} {profile.samples:>8} {profile.seconds:>9.3f} {profile.ratio:>7.1%}')  # noqa
+        lines.extend(
+            f'    self {ratio:>7.1%} {label}'
+            for label, ratio in profile.functions.items()
+        )
+        lines.extend(
+            f'    incl {ratio:>7.1%} {name}'
+            for name, ratio in profile.watched.items()
+            if ratio > 0
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,508 @@
+import hashlib
+import json
+from logging import getLogger, Logger
+import re
+import threading
+import time
+from typing import Any, Callable, Iterable, Mapping
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import (
+    Runnable,
+    RunnableConfig,
+    RunnableLambda,
+    ensure_config,
+)
+from pydantic import BaseModel, Field, SkipValidation
+from .const import FLATTENED_NODE_SEPARATOR, GAME_MASTER_NAME
+from .game.main import create_game_graph
+from .game_players import (
+    BaseGamePlayerRole,
+    PlayerRoleRegistry,
+    PlayerSideRegistry,
+)
+from .game_players.base import GamePlayerRunnableInputModel
+from .instrumentation import EXTRACT_NAME_RUN_NAME, get_phase
+from .llm_utils import substitute_name_extraction
+from .models.config import GameConfig
+from .models.general import fast_mode
+from .models.state import MsgModel, StateModel
+from .rng import GameRandom
+from .utils import remove_none_values
+
+PlayerRoleRegistry.initialize()
+PlayerSideRegistry.initialize()
+
+# const
+REPLAY_START: str = 'start'
+REPLAY_CALL: str = 'call'
+REPLAY_END: str = 'end'
+# NOTE: the same format as `MsgModel.serialize_timestamp`
+_TIMESTAMP_PATTERN: re.Pattern = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6}')  # noqa
+# NOTE: the messages created by the concurrent branches, e.g. the night chat and the night actions,  # noqa
+#       are ordered by their timestamps, so the hash does not depend on the order of the messages  # noqa
+_MESSAGE_HEADER_PATTERN: re.Pattern = re.compile(r'^(?=\[\(\) )', re.MULTILINE)  # noqa
+# NOTE: the fields which differ between two runs of the same game
+_UNCOMPARED_KEYS: frozenset[str] = frozenset({'id', 'timestamp'})
+
+
+class ReplayCallModel(BaseModel):
+    node: str = Field(..., title="the node of the game graph which called the player or the name extraction")  # noqa
+    player: str = Field(..., title="the name of the player or GAME_MASTER_NAME for the name extraction")  # noqa
+    prompt_hash: str = Field(..., title="the hash of the prompt without the timestamps")  # noqa
+    output: str | None = Field(..., title="the output. None means the name extraction failed")  # noqa
+
+
+class ReplayLogModel(BaseModel):
+    players: dict[str, str] = Field(..., title="the roles of the players. key: name, value: role")  # noqa
+    seed: int = Field(..., title="the root seed of the random streams of the game")  # noqa
+    game: GameConfig = Field(default=GameConfig(), title="the game configuration")  # type: ignore # noqa
+    calls: list[ReplayCallModel] = Field(default_factory=list, title="the recorded calls in the order they finished")  # noqa
+    state: StateModel | None = Field(default=None, title="the final state. None means the game did not finish")  # noqa
+
+
+class ReplayDivergenceModel(BaseModel):
+    kind: str = Field(..., title="the kind of the divergence: prompt, missing, unused or state")  # noqa
+    node: str | None = Field(default=None, title="the node of the call")
+    player: str | None = Field(default=None, title="the player of the call")
+    detail: str = Field(default='', title="the description of the divergence")  # noqa
+
+
+class ReplayResultModel(BaseModel):
+    state: SkipValidation[StateModel] = Field(..., title="the final state of the replay")  # noqa
+    divergences: list[ReplayDivergenceModel] = Field(default_factory=list, title="the divergences from the recorded game")  # noqa
+    seconds: float = Field(default=0.0, title="the wall time of the replay in seconds")  # noqa
+
+    @property
+    def diverged(self) -> bool:
+        return bool(self.divergences)
+
+
+class ReplayDivergenceError(Exception):
+    pass
+
+
+def hash_prompt(inputs: GamePlayerRunnableInputModel | MsgModel | str | Any) -> str:  # noqa
+    """Hash the input of a player or of the name extraction
+
+    The timestamps are removed and the order of the messages in the histories is ignored
+    because they differ between the recorded game and its replay.
+
+    Args:
+        inputs (GamePlayerRunnableInputModel | MsgModel | str | Any): the input
+
+    Returns:
+        str: the hash
+    """  # noqa
+    if isinstance(inputs, GamePlayerRunnableInputModel):
+        prompt = inputs.prompt.message if isinstance(inputs.prompt, MsgModel) else inputs.prompt  # noqa
+        text = f'{prompt}\n{inputs.system_prompt}' if inputs.system_prompt else prompt  # noqa
+    elif isinstance(inputs, MsgModel):
+        text = inputs.message
+    else:
+        text = str(inputs)
+    blocks = sorted(_MESSAGE_HEADER_PATTERN.split(_TIMESTAMP_PATTERN.sub('', text)))  # noqa
+    return hashlib.sha256('\x00'.join(blocks).encode('utf-8')).hexdigest()[:16]  # noqa
+
+
+def get_replay_node(metadata: Mapping[str, Any] | None) -> str:
+    """Get the node of a call from the metadata of a run
+
+    The node is like "daytime_chat/chat" whether the subgraphs are flattened or not.
+
+    Args:
+        metadata (Mapping[str, Any] | None): the metadata passed to the callbacks
+
+    Returns:
+        str: the node
+    """  # noqa
+    node = str((metadata or {}).get('langgraph_node', '')).split(FLATTENED_NODE_SEPARATOR)[-1]  # noqa
+    phase = get_phase(metadata) or node
+    return node if node == phase else f'{phase}{FLATTENED_NODE_SEPARATOR}{node}'  # noqa
+
+
+class ReplayRecorder(BaseCallbackHandler):
+    """A callback handler which records the outputs of the players and of the name extraction into a replay log
+
+    The log is a JSONL file with a `start` record of the players, the seed and the game configuration,
+    one `call` record per finished call and an `end` record of the final state.
+    Only the runs named after the players, i.e. `BaseGamePlayer.generate_message`, and the runs of `extract_name` are recorded,
+    so the tokens are still streamed while the game is recorded.
+    """  # noqa
+
+    def __init__(
+        self,
+        path: str,
+        players: Iterable[BaseGamePlayerRole],
+        seed: int,
+        game: GameConfig = GameConfig(),  # type: ignore
+    ) -> None:
+        """Initialize the recorder
+
+        Args:
+            path (str): the path of the replay log
+            players (Iterable[BaseGamePlayerRole]): the players
+            seed (int): the root seed of the random streams of the game, i.e. `GameRandom.root_seed`
+            game (GameConfig, optional): the game configuration. Defaults to GameConfig().
+        """  # noqa
+        players = list(players)
+        self.path = path
+        self.player_names = frozenset(player.name for player in players)
+        self._lock = threading.Lock()
+        self._runs: dict[UUID, tuple[str, str, Any]] = {}
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write({
+            'type': REPLAY_START,
+            'players': {player.name: player.role for player in players},
+            'seed': seed,
+            'game': game.model_dump(mode='json'),
+        })
+
+    def _write(self, record: Mapping[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')  # noqa
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get('name') or (serialized or {}).get('name') or ''
+        if name in self.player_names:
+            player = name
+        elif name == EXTRACT_NAME_RUN_NAME:
+            player = GAME_MASTER_NAME
+        else:
+            return
+        with self._lock:
+            self._runs[run_id] = (get_replay_node(metadata), player, inputs)
+
+    def _end_run(self, run_id: UUID, output: str | None, inputs: Any) -> None:  # noqa
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        node, player, start_inputs = run
+        # NOTE: a streamed run receives its input only when it ends
+        self._write(ReplayCallModel(
+            node=node,
+            player=player,
+            prompt_hash=hash_prompt(inputs if inputs is not None else start_inputs),  # noqa
+            output=output,
+        ).model_dump() | {'type': REPLAY_CALL})
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:  # noqa
+        self._end_run(run_id, str(outputs), kwargs.get('inputs'))
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa
+        with self._lock:
+            run = self._runs.get(run_id)
+        # NOTE: the failed extraction is replayed, the failed player is not
+        if run is not None and run[1] == GAME_MASTER_NAME and isinstance(error, OutputParserException):  # noqa
+            self._end_run(run_id, None, kwargs.get('inputs'))
+            return
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def end(self, state: StateModel | Mapping[str, Any]) -> None:
+        """Write the final state of the game
+
+        Args:
+            state (StateModel | Mapping[str, Any]): the final state. A mapping of the channel values streamed from the game graph is also accepted.
+        """  # noqa
+        if not isinstance(state, StateModel):
+            # NOTE: the values streamed from the graph have been already validated  # noqa
+            state = StateModel.model_construct(**state)
+        self._write({
+            'type': REPLAY_END,
+            'state': state.model_dump(mode='json', warnings=False),
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def load_replay_log(path: str) -> ReplayLogModel:
+    """Load a replay log written by ReplayRecorder
+
+    Args:
+        path (str): the path of the replay log
+
+    Raises:
+        ValueError: the log does not start with a `start` record
+
+    Returns:
+        ReplayLogModel: the replay log
+    """  # noqa
+    data: dict[str, Any] | None = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record['type'] == REPLAY_START:
+                data = {k: v for k, v in record.items() if k != 'type'} | {'calls': []}  # noqa
+            elif data is None:
+                raise ValueError(f'The replay log does not start with a `{REPLAY_START}` record: {path}')  # noqa
+            elif record['type'] == REPLAY_CALL:
+                data['calls'].append(record)
+            elif record['type'] == REPLAY_END:
+                data['state'] = record['state']
+    if data is None:
+        raise ValueError(f'The replay log does not start with a `{REPLAY_START}` record: {path}')  # noqa
+    return ReplayLogModel.model_validate(data)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {
+            k: _normalize(v)
+            for k, v in value.items()
+            if k not in _UNCOMPARED_KEYS
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def diff_states(expected: StateModel, actual: StateModel) -> list[str]:
+    """Compare two states ignoring the ids and the timestamps
+
+    Args:
+        expected (StateModel): the expected state
+        actual (StateModel): the actual state
+
+    Returns:
+        list[str]: the different fields. The chat histories are reported as "chat_state[<names>]".
+    """  # noqa
+    # NOTE: the sets are compared as sets, which are dumped in an arbitrary order in JSON  # noqa
+    dumped_expected = expected.model_dump(warnings=False)
+    dumped_actual = actual.model_dump(warnings=False)
+    fields: list[str] = []
+    for field in StateModel.model_fields:
+        if field == 'chat_state':
+            fields.extend(
+                f'chat_state[{key}]'
+                for key in sorted(set(dumped_expected[field]) | set(dumped_actual[field]))  # noqa
+                if _normalize(dumped_expected[field].get(key)) != _normalize(dumped_actual[field].get(key))  # noqa
+            )
+        elif _normalize(dumped_expected[field]) != _normalize(dumped_actual[field]):  # noqa
+            fields.append(field)
+    return fields
+
+
+class GameReplayer:
+    """Substitute the recorded outputs for the players and the name extraction
+
+    Each call is answered by the first unused record of the same node, player and prompt hash.
+    When the prompt differs from the recorded game, the first unused record of the same node and player is used instead
+    and the divergence is reported, so that the replay goes on as far as possible.
+    """  # noqa
+
+    def __init__(
+        self,
+        log: ReplayLogModel,
+        strict: bool = False,
+        logger: Logger = getLogger(__name__),
+    ) -> None:
+        """Initialize the replayer
+
+        Args:
+            log (ReplayLogModel): the replay log
+            strict (bool, optional): whether to raise ReplayDivergenceError at the first divergence. Defaults to False.
+            logger (Logger, optional): logger. Defaults to getLogger(__name__).
+        """  # noqa
+        self.log = log
+        self.strict = strict
+        self.divergences: list[ReplayDivergenceModel] = []
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[str, str], list[ReplayCallModel]] = {}
+        for call in log.calls:
+            self._calls.setdefault((call.node, call.player), []).append(call)  # noqa
+
+    def _diverge(self, divergence: ReplayDivergenceModel) -> None:
+        self._logger.debug(f'Diverged from the recorded game: {divergence}')  # noqa
+        if self.strict:
+            raise ReplayDivergenceError(f'{divergence.kind} at {divergence.node} by {divergence.player}: {divergence.detail}')  # noqa
+        self.divergences.append(divergence)
+
+    def _pop(
+        self,
+        node: str,
+        player: str,
+        prompt_hash: str,
+        default: str | None,
+    ) -> str | None:
+        with self._lock:
+            calls = self._calls.get((node, player), [])
+            for i, call in enumerate(calls):
+                if call.prompt_hash == prompt_hash:
+                    return calls.pop(i).output
+            divergence = ReplayDivergenceModel(
+                kind='prompt' if calls else 'missing',
+                node=node,
+                player=player,
+                detail=f'prompt_hash={prompt_hash}',
+            )
+            output = calls.pop(0).output if calls else default
+            self._diverge(divergence)
+        return output
+
+    def create_runnable(
+        self,
+        name: str,
+    ) -> Runnable[GamePlayerRunnableInputModel | str, str]:
+        """Create the runnable of a player which answers the recorded outputs
+
+        Args:
+            name (str): the name of the player
+
+        Returns:
+            Runnable[GamePlayerRunnableInputModel | str, str]: the runnable
+        """  # noqa
+
+        def answer(
+            inputs: GamePlayerRunnableInputModel | str,
+            config: RunnableConfig,
+        ) -> str:
+            # NOTE: an empty message when the player was not called in the recorded game  # noqa
+            return self._pop(
+                get_replay_node(config.get('metadata')),
+                name,
+                hash_prompt(inputs),
+                '',
+            ) or ''
+
+        return RunnableLambda(answer).with_types(  # type: ignore
+            input_type=GamePlayerRunnableInputModel | str,  # type: ignore[arg-type] # noqa
+            output_type=str,
+        )
+
+    def extract_name(self, prompt: str) -> str:
+        """Answer the recorded name for the prompt of `extract_name`
+
+        Args:
+            prompt (str): the prompt of the name extraction
+
+        Raises:
+            OutputParserException: the extraction failed in the recorded game
+
+        Returns:
+            str: the name
+        """  # noqa
+        # NOTE: "None" means nobody when the extraction was not called in the recorded game  # noqa
+        output = self._pop(
+            get_replay_node(ensure_config().get('metadata')),
+            GAME_MASTER_NAME,
+            hash_prompt(prompt),
+            'None',
+        )
+        if output is None:
+            raise OutputParserException('The name extraction failed in the recorded game.')  # noqa
+        return output
+
+    def create_players(self) -> list[BaseGamePlayerRole]:
+        """Create the players of the recorded game with the runnables answering the recorded outputs
+
+        Returns:
+            list[BaseGamePlayerRole]: the players
+        """  # noqa
+        return [
+            PlayerRoleRegistry.create_player(
+                key=role,
+                name=name,
+                runnable=self.create_runnable(name),
+            )
+            for name, role in self.log.players.items()
+        ]
+
+    def get_unused_divergences(self) -> list[ReplayDivergenceModel]:
+        """Get the divergences of the recorded calls which were not replayed
+
+        Returns:
+            list[ReplayDivergenceModel]: the divergences, one per node and player
+        """  # noqa
+        with self._lock:
+            return [
+                ReplayDivergenceModel(
+                    kind='unused',
+                    node=node,
+                    player=player,
+                    detail=f'{len(calls)} calls',
+                )
+                for (node, player), calls in self._calls.items()
+                if calls
+            ]
+
+
+def replay_game(
+    log: ReplayLogModel | str,
+    *,
+    optimize: bool = False,
+    fast: bool = False,
+    strict: bool = False,
+    echo: Runnable[StateModel, None] | Callable[[StateModel], None] | None = None,  # noqa
+    recursion_limit: int = 1000,
+    logger: Logger = getLogger(__name__),
+) -> ReplayResultModel:
+    """Replay a recorded game through the game graph without any LLM
+
+    The players and the name extraction answer the recorded outputs
+    and the random streams of the game are derived from the recorded seed,
+    so the replay runs the same game at the speed of the engine.
+    The final state is compared with the recorded one.
+
+    Args:
+        log (ReplayLogModel | str): the replay log or its path
+        optimize (bool, optional): whether to optimize the game graph. Defaults to False.
+        fast (bool, optional): whether to run in the fast mode without the runtime validation. Defaults to False.
+        strict (bool, optional): whether to raise ReplayDivergenceError at the first divergence. Defaults to False.
+        echo (Runnable[StateModel, None] | Callable[[StateModel], None] | None, optional): the echo of the game graph. None means the headless mode. Defaults to None.
+        recursion_limit (int, optional): the recursion limit. Defaults to 1000.
+        logger (Logger, optional): logger. Defaults to getLogger(__name__).
+
+    Returns:
+        ReplayResultModel: the final state, the divergences and the wall time
+    """  # noqa
+    if isinstance(log, str):
+        log = load_replay_log(log)
+    replayer = GameReplayer(log, strict=strict, logger=logger)
+    players = replayer.create_players()
+    workflow = create_game_graph(
+        players,
+        **{k: remove_none_values(dic) for k, dic in log.game.model_dump().items()},  # type: ignore # noqa
+        echo=echo,
+        optimize=optimize,
+        validation=not fast,
+        rng=GameRandom(log.seed),
+    )
+    started = time.perf_counter()
+    with fast_mode(fast), substitute_name_extraction(replayer.extract_name):
+        raw_state = workflow.invoke(
+            StateModel(alive_players_names=[player.name for player in players]),  # noqa
+            config={'recursion_limit': recursion_limit},
+        )
+    seconds = time.perf_counter() - started
+    state: StateModel = (
+        StateModel.model_construct(**raw_state)
+        if fast else
+        StateModel(**raw_state)
+    )
+    divergences = replayer.divergences + replayer.get_unused_divergences()
+    if log.state is not None:
+        divergences.extend(
+            ReplayDivergenceModel(kind='state', detail=field)
+            for field in diff_states(log.state, state)
+        )
+    if divergences:
+        logger.warning(f'The replay diverged from the recorded game at {len(divergences)} points.')  # noqa
+    return ReplayResultModel(state=state, divergences=divergences, seconds=seconds)  # noqa
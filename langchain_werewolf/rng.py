@@ -0,0 +1,54 @@
+import random
+import threading
+
+# const
+ROLES_STREAM: str = 'roles'
+DAYTIME_SPEAKERS_STREAM: str = 'daytime_speakers'
+NIGHTTIME_SPEAKERS_STREAM: str = 'nighttime_speakers'
+TIES_STREAM: str = 'ties'
+
+
+class GameRandom:
+    """The random number generators of a game
+
+    Each purpose, e.g. the roles or the speaker order, draws from its own stream derived from the seed of the game,
+    so the draws of one purpose do not shift the others
+    and games running concurrently do not share any state, unlike the global `random` module.
+    """  # noqa
+
+    def __init__(self, seed: int | None = None) -> None:
+        """Initialize the generators
+
+        Args:
+            seed (int | None, optional): the seed of the game. None means a seed drawn from the OS entropy. Defaults to None.
+        """  # noqa
+        self.seed = seed
+        # NOTE: the streams of an unseeded game are still independent of each other  # noqa
+        self._root = seed if seed is not None else random.SystemRandom().getrandbits(64)  # noqa
+        self._lock = threading.Lock()
+        self._streams: dict[str, random.Random] = {}
+
+    @property
+    def root_seed(self) -> int:
+        """The seed which the streams are derived from
+
+        `GameRandom(root_seed)` reproduces the streams even if the game is unseeded.
+        """  # noqa
+        return self._root
+
+    def stream(self, purpose: str) -> random.Random:
+        """Get the stream of a purpose
+
+        The same purpose returns the same stream, whose sequence depends only on the seed and the purpose.
+
+        Args:
+            purpose (str): the purpose, e.g. ROLES_STREAM
+
+        Returns:
+            random.Random: the generator
+        """  # noqa
+        with self._lock:
+            if purpose not in self._streams:
+                # NOTE: a string seed is hashed by SHA-512, which does not depend on PYTHONHASHSEED  # noqa
+                self._streams[purpose] = random.Random(f'{self._root}/{purpose}')  # noqa
+            return self._streams[purpose]
@@ -14,6 +14,7 @@ from langchain_core.runnables import (
     RunnableParallel,
     RunnablePassthrough,
 )
+from .budget import TokenBudget, create_budgeted_translator_runnable
 from .const import (
     BASE_LANGUAGE,
     CLI_PROMPT_COLOR,
@@ -33,14 +34,25 @@ from .game_players import (
     BaseGamePlayer,
     BaseGamePlayerRole,
     PlayerRoleRegistry,
+    Roster,
     VILLAGER_ROLE,
     filter_state_according_to_player,
     generate_game_player_runnable,
     is_player_with_role,
     is_player_with_side,
 )
-from .io import create_input_runnable, create_output_runnable
-from .llm_utils import create_chat_model, create_translator_runnable
+from .game_players.base import GamePlayerRunnableInputModel
+from .io import (
+    create_input_runnable,
+    create_output_runnable,
+    create_token_output_runnable,
+)
+from .instrumentation import ECHO_RUN_NAME
+from .llm_utils import (
+    create_chat_model,
+    create_model_cascade,
+    create_translator_runnable,
+)
 from .models.config import PlayerConfig
 from .models.state import (
     IdentifiedModel,
@@ -48,6 +60,7 @@ from .models.state import (
     StateModel,
     get_related_messsages_with_id,
 )
+from .streaming import TokenStreamEcho
 from .utils import consecutive_string_generator
 
 
@@ -107,7 +120,10 @@ def generate_players(
     model: str | None = DEFAULT_MODEL,
     seed: int = -1,
     logger: Logger = getLogger(__name__),
-) -> list[BaseGamePlayerRole]:
+    auxiliary_model: str | None = None,
+    escalation_model: str | None = None,
+    rng: random.Random | None = None,
+) -> Roster[BaseGamePlayerRole]:
 
     logger.info(f"n_players: {n_players}")
     logger.info(f"n_players_per_role: {n_players_by_role}")
@@ -155,12 +171,14 @@ def generate_players(
         [role] * (num - counter.get(role, 0))
         for role, num in n_players_by_role.items()
     ], [])
-    random.shuffle(generated_roles)
+    # NOTE: the roles are shuffled by the stream of the game if given, otherwise by the global random module  # noqa
+    (rng.shuffle if rng is not None else random.shuffle)(generated_roles)
 
+    # NOTE: the auxiliary tasks use the small model and escalate to the model of the player  # noqa
     translators = [
         create_translator_runnable(
             to_language=player_cfg.language if player_cfg and player_cfg.language else BASE_LANGUAGE,  # noqa
-            chat_llm=_generate_base_runnable(getattr(player_cfg, 'model', model), seed=seed),  # noqa
+            chat_llm=_generate_base_runnable(auxiliary_model or getattr(player_cfg, 'model', model), seed=seed),  # noqa
         )
         for player_cfg in players_cfg
     ]
@@ -168,10 +186,33 @@ def generate_players(
         create_translator_runnable(
             to_language=BASE_LANGUAGE,
             from_language=player_cfg.language if player_cfg and player_cfg.language else BASE_LANGUAGE,  # noqa
-            chat_llm=_generate_base_runnable(getattr(player_cfg, 'model', model), seed=seed),  # noqa
+            chat_llm=_generate_base_runnable(auxiliary_model or getattr(player_cfg, 'model', model), seed=seed),  # noqa
         )
         for player_cfg in players_cfg
     ]
+    auxiliary_chat_models = [
+        create_model_cascade(
+            [auxiliary_model, escalation_model or getattr(player_cfg, 'model', model)],  # noqa
+            seed=seed if seed >= 0 else None,
+        )
+        if auxiliary_model else
+        []
+        for player_cfg in players_cfg
+    ]
+
+    # NOTE: the players with the same model share the runnable so that their night actions are batched  # noqa
+    base_runnables = [
+        _generate_base_runnable(
+            player_cfg.model if hasattr(player_cfg, 'model') else model,  # type: ignore # noqa
+            getattr(player_cfg, 'player_input_interface', None),
+            seed,
+        )
+        for player_cfg in players_cfg
+    ]
+    player_runnables: dict[int, Runnable[GamePlayerRunnableInputModel | str, str]] = {}  # noqa
+    for base_runnable in base_runnables:
+        if id(base_runnable) not in player_runnables:
+            player_runnables[id(base_runnable)] = generate_game_player_runnable(base_runnable)  # noqa
 
     # generate players
     name_generator = consecutive_string_generator(DEFAULT_PLAYER_PREFIX)
@@ -179,42 +220,53 @@ def generate_players(
         PlayerRoleRegistry.create_player(
             key=player_cfg.role if player_cfg and player_cfg.role else generated_roles.pop(),  # noqa
             name=player_cfg.name if player_cfg and player_cfg.name else name_generator.__next__(),  # noqa
-            runnable=generate_game_player_runnable(_generate_base_runnable(
-                player_cfg.model if hasattr(player_cfg, 'model') else model,  # type: ignore # noqa
-                getattr(player_cfg, 'player_input_interface', None),
-                seed,
-            )),
+            runnable=player_runnables[id(base_runnable)],
             output=(
                 create_output_runnable(player_cfg.player_output_interface)  # noqa
                 if player_cfg and player_cfg.player_output_interface
                 else None
             ),
+            # NOTE: the tokens are not translated, so only the players in the game language receive them  # noqa
+            token_output=(
+                create_token_output_runnable(player_cfg.player_output_interface)  # noqa
+                if player_cfg and player_cfg.player_output_interface and (player_cfg.language or BASE_LANGUAGE) == BASE_LANGUAGE  # noqa
+                else None
+            ),
             formatter=player_cfg.formatter if player_cfg and player_cfg.formatter else None,  # noqa
             translator=translator,
             inv_translator=inv_translator,
+            auxiliary_chat_models=auxiliary_chat_models_,
         )
-        for player_cfg, translator, inv_translator in zip(players_cfg, translators, inv_translators)  # noqa
+        for player_cfg, base_runnable, translator, inv_translator, auxiliary_chat_models_ in zip(players_cfg, base_runnables, translators, inv_translators, auxiliary_chat_models)  # noqa
     ]
     # Internal Error
     assert len(players) == n_players
     assert all(map(is_player_with_side, players))
     assert all(map(is_player_with_role, players))
-    return players
+    # NOTE: the names are validated to be unique once here so that the players are looked up by name in O(1)  # noqa
+    return Roster(players)
 
 
 def _create_echo_runnable_by_player(
     player: BaseGamePlayer,
     *,
     cache: set[str] | None = None,
+    stream_echo: TokenStreamEcho | None = None,
+    roster: Roster | None = None,
 ) -> Runnable[StateModel, None]:
     cache = cache or set()  # NOTE: if cache is None, cache does not work
     if player.output is None:
         return RunnableLambda(lambda _: None)
     # create runnable
     return (
-        RunnableLambda(lambda state: filter_state_according_to_player(player, state))  # noqa
+        RunnableLambda(lambda state: filter_state_according_to_player(player, state, roster))  # noqa
         | RunnableLambda(lambda state: get_related_messsages_with_id(player.name, state))  # noqa
         | RunnableBranch(
+            (
+                # NOTE: the message streamed to the player is not echoed again  # noqa
+                lambda msg: msg.id not in cache and stream_echo is not None and stream_echo.consume(player.name, msg.value),  # noqa
+                RunnableLambda(attrgetter('id')) | RunnableLambda(cache.add),  # noqa
+            ),
             (
                 lambda msg: msg.id not in cache,
                 RunnableParallel(
@@ -241,12 +293,15 @@ def _create_echo_runnable_by_system(
     level: ESystemOutputType | str,
     *,
     model: str = DEFAULT_MODEL,
+    auxiliary_model: str | None = None,
     player_names: list[str] | None = None,
     cache: set[str] | None = None,
     color: str | dict[str, str | None] | None = None,
     language: ELanguage = BASE_LANGUAGE,
     formatter: Callable[[MsgModel], str] | str | None = None,
     seed: int = -1,
+    budget: TokenBudget | None = None,
+    stream_echo: TokenStreamEcho | None = None,
 ) -> Runnable[StateModel, None]:
     # initialize
     player_names = player_names or []
@@ -289,8 +344,11 @@ def _create_echo_runnable_by_system(
     else:
         translator_runnable = create_translator_runnable(
             to_language=language,
-            chat_llm=create_chat_model(model, seed=seed),  # noqa
+            # NOTE: the translation is an auxiliary task
+            chat_llm=create_chat_model(auxiliary_model or model, seed=seed),
         )
+        if budget is not None:
+            translator_runnable = create_budgeted_translator_runnable(translator_runnable, budget)  # noqa
     formatter_runnable = (
         RunnableParallel(
             orig=RunnablePassthrough(),
@@ -303,6 +361,11 @@ def _create_echo_runnable_by_system(
     return (
         RunnableLambda(lambda state: get_related_messsages_with_id(system_related, state))  # noqa
         | RunnableBranch(
+            (
+                # NOTE: the message streamed to the system output is not echoed again  # noqa
+                lambda msg: msg.id not in cache and stream_echo is not None and stream_echo.consume(GAME_MASTER_NAME, msg.value),  # noqa
+                RunnableLambda(attrgetter('id')) | RunnableLambda(cache.add),  # noqa
+            ),
             (
                 lambda msg: msg.id not in cache,
                 RunnableParallel(
@@ -339,18 +402,41 @@ def _create_echo_runnable_by_system(
     )
 
 
+def is_headless(
+    system_output_level: ESystemOutputType | str,
+    players: Iterable[BaseGamePlayer] = tuple(),
+) -> bool:
+    """Check whether nothing of the game is displayed
+
+    Args:
+        system_output_level (ESystemOutputType | str): the output level of the system
+        players (Iterable[BaseGamePlayer], optional): the players. Defaults to tuple().
+
+    Returns:
+        bool: True if the system output is off and no player has an output
+    """  # noqa
+    return system_output_level == ESystemOutputType.off and all(
+        player.output is None and player.token_output is None
+        for player in players
+    )
+
+
 def create_echo_runnable(
     system_output_interface: Callable[[str], None] | EInputOutputType,
     system_output_level: ESystemOutputType | str,
     players: Iterable[BaseGamePlayer] = tuple(),
     model: str = DEFAULT_MODEL,
+    auxiliary_model: str | None = None,
     system_formatter: Callable[[MsgModel], str] | str | None = None,
     system_color: str | None = CLI_PROMPT_COLOR,
     player_colors: Iterable[str | None] | str | None = cycle(CLI_ECHO_COLORS),
     language: ELanguage = BASE_LANGUAGE,
     seed: int = -1,
+    budget: TokenBudget | None = None,
+    stream_echo: TokenStreamEcho | None = None,
 ) -> Runnable[StateModel, None]:
     # initialize
+    players = Roster.of(players)
     player_names: list[str] = [player.name for player in players]
     player_colors = player_colors or cycle([None])
     player_colors = [player_colors] if isinstance(player_colors, str) else player_colors  # noqa
@@ -368,6 +454,8 @@ def create_echo_runnable(
                 f'{DEFAULT_PLAYER_PREFIX}{i+1}': _create_echo_runnable_by_player(  # noqa
                     player=player,
                     cache=caches[player.name],
+                    stream_echo=stream_echo,
+                    roster=players,
                 )
                 for i, player in enumerate(players)
             },  # type: ignore
@@ -376,12 +464,15 @@ def create_echo_runnable(
                     output_func=system_output_interface,
                     level=system_output_level,
                     model=model,
+                    auxiliary_model=auxiliary_model,
                     player_names=player_names,
                     cache=caches[GAME_MASTER_NAME],
                     color=player_colors_ | {GAME_MASTER_NAME: system_color},
                     language=language,
                     formatter=system_formatter,
                     seed=seed,
+                    budget=budget,
+                    stream_echo=stream_echo,
                 ),
             },  # type: ignore
         )
@@ -389,4 +480,4 @@ def create_echo_runnable(
     ).with_types(
         input_type=StateModel,
         output_type=None,
-    )
+    ).with_config(run_name=ECHO_RUN_NAME)
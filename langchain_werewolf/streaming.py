@@ -0,0 +1,109 @@
+import threading
+from typing import Iterable
+from langchain_core.runnables import Runnable
+from .const import GAME_MASTER_NAME
+from .enums import ESystemOutputType
+from .game_players.base import BaseGamePlayer
+from .models.state import MsgModel
+
+
+class TokenStreamEcho:
+    """Echo the tokens of the players' messages while they are generated
+
+    The tokens are written to the system output and to the token outputs of the players who take part in the chat.
+    Once a message is complete, the outputs which received it are remembered
+    so that the echo of the graph does not display the committed message again.
+    """  # noqa
+
+    def __init__(
+        self,
+        system_output: Runnable[str, None] | None,
+        system_output_level: ESystemOutputType | str,
+        players: Iterable[BaseGamePlayer] = tuple(),
+    ) -> None:
+        """Initialize the echo
+
+        Args:
+            system_output (Runnable[str, None] | None): the output of the system writing the tokens without line breaks. None means the system output is not streamed.
+            system_output_level (ESystemOutputType | str): the output level of the system, which is the same as the echo of the graph.
+            players (Iterable[BaseGamePlayer], optional): the players. The players without `token_output` are not streamed. Defaults to tuple().
+        """  # noqa
+        self.system_output = system_output
+        self.system_output_level = system_output_level
+        self.players = list(players)
+        self._public_participants = frozenset([GAME_MASTER_NAME] + [player.name for player in self.players])  # noqa
+        self._lock = threading.Lock()
+        self._tokens: dict[str, list[str]] = {}
+        self._streamed: dict[str, set[tuple[str, str]]] = {}
+
+    def _is_visible_to_system(self, participants: frozenset[str]) -> bool:
+        # NOTE: the same as the messages echoed by the system
+        if self.system_output is None:
+            return False
+        if self.system_output_level == ESystemOutputType.off:
+            return False
+        if self.system_output_level == ESystemOutputType.all:
+            return GAME_MASTER_NAME in participants
+        if self.system_output_level == ESystemOutputType.public:
+            return participants == self._public_participants
+        return self.system_output_level in participants
+
+    def _get_targets(
+        self,
+        participants: frozenset[str],
+    ) -> list[tuple[str, Runnable[str, None]]]:
+        targets: list[tuple[str, Runnable[str, None]]] = [
+            (player.name, player.token_output)
+            for player in self.players
+            if player.token_output is not None and player.name in participants  # noqa
+        ]
+        if self._is_visible_to_system(participants):
+            targets.append((GAME_MASTER_NAME, self.system_output))  # type: ignore # noqa
+        return targets
+
+    def __call__(
+        self,
+        sender: str,
+        participants: Iterable[str],
+        token: str | None,
+    ) -> None:
+        """Echo a token
+
+        Args:
+            sender (str): the name of the player generating the message
+            participants (Iterable[str]): the names of the participants of the chat
+            token (str | None): the token. None means the end of the message.
+        """  # noqa
+        participants = frozenset(participants) | {sender}
+        targets = self._get_targets(participants)
+        with self._lock:
+            if token is None:
+                message = ''.join(self._tokens.pop(sender, []))
+                for name, output in targets:
+                    output.invoke('\n')
+                    self._streamed.setdefault(name, set()).add((sender, message))  # noqa
+                return
+            if sender not in self._tokens:
+                self._tokens[sender] = []
+                for _, output in targets:
+                    output.invoke(f'{sender}: ')
+            self._tokens[sender].append(token)
+            for _, output in targets:
+                output.invoke(token)
+
+    def consume(self, name: str, message: MsgModel) -> bool:
+        """Check whether a message has been streamed to an output and forget it
+
+        Args:
+            name (str): the name of the player or GAME_MASTER_NAME for the system output
+            message (MsgModel): the committed message
+
+        Returns:
+            bool: True if the message has been streamed to the output
+        """  # noqa
+        with self._lock:
+            streamed = self._streamed.get(name, set())
+            if (message.name, message.message) in streamed:
+                streamed.remove((message.name, message.message))
+                return True
+            return False
@@ -62,18 +62,21 @@ def consecutive_string_generator(
 
 def random_permutated_infinite_generator(
     objects: Iterable[T],
+    rng: random.Random | None = None,
 ) -> Generator[T, None, None]:
     """a generator to generate random permutated objects infinitely
 
     Args:
         objects (Iterable[T]): the objects to be permutated
+        rng (random.Random | None, optional): the random number generator. None means the global random module. Defaults to None.
 
     Yields:
         Generator[T, None, None]: infinite generator with random permutated objects
     """  # noqa
+    shuffle = rng.shuffle if rng is not None else random.shuffle
     lst_objects = deepcopy(list(objects))
     while True:
-        random.shuffle(lst_objects)
+        shuffle(lst_objects)
         for obj in lst_objects:
             yield obj
 
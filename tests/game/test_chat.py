@@ -1,14 +1,30 @@
-from langchain_core.runnables import RunnableLambda
+from itertools import cycle
+import time
+from typing import Iterator
+from langchain_core.runnables import RunnableGenerator, RunnableLambda
 import pytest
 from langchain_werewolf.const import GAME_MASTER_NAME
-from langchain_werewolf.game.chat import _player_speak
+from langchain_werewolf.enums import ESpeakerSelectionMethod
+from langchain_werewolf.game.chat import (
+    _player_speak,
+    _players_speak_simultaneously,
+    create_run_chat_subbraph,
+    create_speaker_schedule,
+)
 from langchain_werewolf.game.prompts import SYSTEM_PROMPT_TEMPLATE
+from langchain_werewolf.game.utils import MessageHistoryPromptBuilder
 from langchain_werewolf.game_players import VILLAGER_ROLE
 from langchain_werewolf.game_players.registry import PlayerRoleRegistry
 from langchain_werewolf.models.state import StateModel
 
 
-def test__player_speak() -> None:
+@pytest.mark.parametrize(
+    'prompt_builder',
+    [None, MessageHistoryPromptBuilder()],
+)
+def test__player_speak(
+    prompt_builder: MessageHistoryPromptBuilder | None,
+) -> None:
     # preparation
     sender = 'player'
     message = 'message'
@@ -28,6 +44,7 @@ def test__player_speak() -> None:
         [player],
         participants,
         generate_system_prompt=lambda m: SYSTEM_PROMPT_TEMPLATE.format(**m.model_dump()),  # noqa
+        prompt_builder=prompt_builder,
     )
     # assert
     assert actual['chat_state']
@@ -38,6 +55,80 @@ def test__player_speak() -> None:
     assert actual['chat_state'][participants].messages[0].value.participants == participants  # noqa
 
 
+def _generate_tokens(_: Iterator[object]) -> Iterator[str]:
+    yield from ['mes', 'sage']
+
+
+def test__player_speak_with_token_echo() -> None:
+    # preparation
+    sender = 'player'
+    state = StateModel(
+        alive_players_names=[sender],
+        current_speaker=sender,
+    )
+    player = PlayerRoleRegistry.create_player(
+        name=sender,
+        key=VILLAGER_ROLE,
+        runnable=RunnableGenerator(_generate_tokens),
+    )
+    participants = frozenset([sender, 'another', GAME_MASTER_NAME])
+    calls: list[tuple[str, frozenset[str], str | None]] = []
+    # execution
+    actual = _player_speak(
+        state,
+        [player],
+        participants,
+        generate_system_prompt=lambda m: SYSTEM_PROMPT_TEMPLATE.format(**m.model_dump()),  # noqa
+        token_echo=lambda name, names, token: calls.append((name, frozenset(names), token)),  # noqa
+    )
+    # assert
+    assert actual['chat_state'][participants].messages[0].value.message == 'message'  # noqa
+    assert calls == [
+        (sender, participants, 'mes'),
+        (sender, participants, 'sage'),
+        (sender, participants, None),
+    ]
+
+
+def _generate_tokens_slowly(_: Iterator[object]) -> Iterator[str]:
+    for token in ['mes', 'sage']:
+        # NOTE: the speeches are generated concurrently token by token
+        time.sleep(0.01)
+        yield token
+
+
+def test__players_speak_simultaneously_with_token_echo() -> None:
+    # preparation
+    speakers = ['A', 'B', 'C']
+    players = [
+        PlayerRoleRegistry.create_player(
+            name=name,
+            key=VILLAGER_ROLE,
+            runnable=RunnableGenerator(_generate_tokens_slowly),
+        )
+        for name in speakers
+    ]
+    calls: list[tuple[str, str | None]] = []
+    # execution
+    _players_speak_simultaneously(
+        StateModel(alive_players_names=speakers),
+        speakers,
+        players,
+        speakers,
+        generate_system_prompt=lambda m: SYSTEM_PROMPT_TEMPLATE.format(**m.model_dump()),  # noqa
+        token_echo=lambda name, _, token: calls.append((name, token)),
+    )
+    # assert
+    # NOTE: the tokens of each speaker are contiguous
+    assert sorted(
+        [calls[i:i+3] for i in range(0, len(calls), 3)],
+        key=lambda block: block[0][0],
+    ) == [
+        [(name, 'mes'), (name, 'sage'), (name, None)]
+        for name in speakers
+    ]
+
+
 @pytest.mark.parametrize(
     'current_speaker',
     [
@@ -69,3 +160,83 @@ def test__player_speak_without_current_speaker(
             participants,
             generate_system_prompt=lambda m: SYSTEM_PROMPT_TEMPLATE.format(**m.model_dump()),  # noqa
         )
+
+
+@pytest.mark.parametrize(
+    'alive_players_names, n_turns, expected',
+    [
+        (['A', 'B', 'C'], 1, [['A', 'B', 'C'], ['B', 'C', 'A']]),
+        (['A', 'C'], 2, [['A', 'C', 'A', 'C'], ['C', 'A', 'C', 'A']]),
+        (['B'], 1, [['B'], ['B']]),
+        ([], 1, [[], []]),
+    ],
+)
+def test_create_speaker_schedule(
+    alive_players_names: list[str],
+    n_turns: int,
+    expected: list[list[str]],
+) -> None:
+    # preparation
+    speaker_generator = cycle(['A', 'B', 'C'])
+    # execution
+    actual = [
+        create_speaker_schedule(speaker_generator, alive_players_names, n_turns)  # noqa
+        for _ in expected
+    ]
+    # assert
+    assert actual == expected
+
+
+def test_create_run_chat_subbraph() -> None:
+    # preparation
+    players = [
+        PlayerRoleRegistry.create_player(
+            name=name,
+            key=VILLAGER_ROLE,
+            runnable=RunnableLambda(lambda _, name=name: f'{name} speaks'),
+        )
+        for name in ['A', 'B', 'C']
+    ]
+    participants = frozenset(['A', 'B', 'C', GAME_MASTER_NAME])
+    spoken: list[tuple[str, int | None]] = []
+    workflow = create_run_chat_subbraph(
+        players,
+        prompt='day {day}',
+        n_turns_per_day=2,
+        echo=lambda state: spoken.append((state.chat_state[participants].messages[-1].value.name, state.n_chat_remaining)),  # noqa
+    ).compile()
+    # execution
+    actual = StateModel(**workflow.invoke(StateModel(alive_players_names=['A', 'C'])))  # noqa
+    # assert
+    assert [m.value.name for m in actual.chat_state[participants].messages] == [GAME_MASTER_NAME, 'A', 'C', 'A', 'C']  # noqa
+    assert spoken == [('A', 3), ('C', 2), ('A', 1), ('C', 0)]
+    assert actual.current_speaker is None
+    assert actual.speaker_schedule == []
+    assert actual.n_chat_remaining == 0
+
+
+def test_create_run_chat_subbraph_simultaneous() -> None:
+    # preparation
+    players = [
+        PlayerRoleRegistry.create_player(
+            name=name,
+            key=VILLAGER_ROLE,
+            # NOTE: each message counts the messages the speaker has seen
+            runnable=RunnableLambda(lambda x: f'{str(x).count("#")}#'),
+        )
+        for name in ['A', 'B', 'C']
+    ]
+    participants = frozenset(['A', 'B', 'C', GAME_MASTER_NAME])
+    workflow = create_run_chat_subbraph(
+        players,
+        prompt='day {day}',
+        select_speaker=ESpeakerSelectionMethod.simultaneous,
+        n_turns_per_day=2,
+    ).compile()
+    # execution
+    actual = StateModel(**workflow.invoke(StateModel(alive_players_names=['C', 'A'])))  # noqa
+    # assert
+    assert [(m.value.name, m.value.message) for m in actual.chat_state[participants].messages[1:]] == [  # noqa
+        ('A', '0#'), ('C', '0#'), ('A', '2#'), ('C', '2#'),
+    ]
+    assert actual.speaker_schedule == []
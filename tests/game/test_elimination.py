@@ -1,7 +1,9 @@
+import random
 import pytest
 from langchain_werewolf.enums import ETimeSpan
 from langchain_werewolf.game.elimination import (
     _eliminate_player,
+    select_randomly,
 )
 from langchain_werewolf.models.general import IdentifiedModel
 from langchain_werewolf.models.state import StateModel
@@ -47,6 +49,7 @@ def test__eliminate_player(
     actual = _eliminate_player(state)
     # assert
     assert actual['alive_players_names'] == [n for n in state.alive_players_names if n != expected]  # noqa
+    assert [(item.value.name, item.value.timespan) for item in actual['elimination_log']] == [(expected, timespan)]  # noqa
     if timespan == ETimeSpan.day:
         assert actual['daytime_vote_result_history'][-1].value == expected
     else:
@@ -134,3 +137,15 @@ def test__eliminate_player_with_top_saved(
         assert actual['daytime_vote_result_history'][-1].value is 'player1'  # noqa
     else:
         assert actual['nighttime_vote_result_history'][-1].value is 'player1'  # noqa
+
+
+def test_select_randomly() -> None:
+    # preparation
+    candidates = ['player3', 'player1', 'player2']
+    # execution
+    actual = [select_randomly(candidates, random.Random(i)) for i in range(20)]  # noqa
+    # assert
+    # NOTE: the order of the candidates does not matter
+    assert actual == [select_randomly(reversed(candidates), random.Random(i)) for i in range(20)]  # noqa
+    assert set(actual) <= set(candidates)
+    assert len(set(actual)) > 1
@@ -0,0 +1,58 @@
+from typing import Any
+from langchain_core.runnables import RunnableLambda
+from pytest_mock import MockerFixture
+from langchain_werewolf.const import GAME_MASTER_NAME
+from langchain_werewolf.game.main import create_game_graph
+from langchain_werewolf.game_players import VILLAGER_ROLE, WEREWOLF_ROLE
+from langchain_werewolf.game_players.registry import PlayerRoleRegistry
+from langchain_werewolf.models.state import StateModel
+
+
+def test_create_game_graph_night_branches(mocker: MockerFixture) -> None:
+    # mock
+    for module in ('langchain_werewolf.game.vote', 'langchain_werewolf.game_players.player_roles.knight'):  # noqa
+        mocker.patch(f'{module}.extract_name', side_effect=lambda message, *args, **kwargs: message)  # noqa
+    # preparation
+    # NOTE: V2 is excluded in the daytime and the knight saves V1, the target of the werewolves  # noqa
+    players = [
+        PlayerRoleRegistry.create_player(key=WEREWOLF_ROLE, name=name, runnable=RunnableLambda(lambda _: 'V1'))  # noqa
+        for name in ['W1', 'W2']
+    ] + [
+        PlayerRoleRegistry.create_player(key='knight', name='K', runnable=RunnableLambda(lambda x: 'V1' if 'save' in str(x) else 'V2')),  # noqa
+    ] + [
+        PlayerRoleRegistry.create_player(key=VILLAGER_ROLE, name=name, runnable=RunnableLambda(lambda _: 'V2'))  # noqa
+        for name in ['V1', 'V2', 'V3']
+    ]
+    workflow = create_game_graph(players)
+    steps: dict[str, int] = {}
+    n_tasks: dict[str, int] = {}
+    state: dict[str, Any] = {}
+    event: Any
+    # execution
+    for mode, event in workflow.stream(
+        StateModel(alive_players_names=[player.name for player in players]),
+        config={'recursion_limit': 1000},
+        stream_mode=['debug', 'values'],
+    ):
+        if mode == 'values':
+            state = event
+            if 'elimination_after_night_vote' in steps:
+                break
+        elif event['type'] == 'task':
+            name = event['payload']['name']
+            steps.setdefault(name, event['step'])
+            n_tasks[name] = n_tasks.get(name, 0) + 1
+    actual = StateModel(**state)
+    # assert
+    # NOTE: the branches start in the same superstep and join once
+    assert steps['villagers_night_action'] == steps['night_chat']
+    assert steps['night_vote'] == steps['night_chat'] + 1
+    assert steps['elimination_after_night_vote'] == steps['night_vote'] + 1
+    assert n_tasks['elimination_after_night_vote'] == 1
+    # NOTE: the writes of both branches are merged
+    assert actual.safe_players_names == {'V1'}
+    assert actual.nighttime_votes_history[-1].value == {'W1': 'V1', 'W2': 'V1'}  # noqa
+    assert actual.nighttime_vote_result_history[-1].value is None
+    assert actual.alive_players_names == ['W1', 'W2', 'K', 'V1', 'V3']
+    assert actual.chat_state[frozenset({'K', GAME_MASTER_NAME})].messages[-1].value.message == 'I decided to save V1 in this night.'  # noqa
+    assert [m.value.name for m in actual.chat_state[frozenset({'W1', 'W2', GAME_MASTER_NAME})].messages].count('W1') >= 1  # noqa
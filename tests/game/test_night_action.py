@@ -4,11 +4,13 @@ from pytest_mock import MockerFixture
 from langchain_werewolf.const import GAME_MASTER_NAME
 from langchain_werewolf.game.night_action import (
     _master_ask_player_to_act_in_night,
+    _players_act_in_night_in_batch,
     _skip_player_act_in_night,
     _player_act_in_night,
     GeneratePromptInputForNightAction,
+    create_villagers_night_action_subgraph,
 )
-from langchain_werewolf.game_players import BaseGamePlayerRole
+from langchain_werewolf.game_players import BaseGamePlayerRole, Roster
 from langchain_werewolf.game_players.player_roles import (
     FortuneTeller,
     Knight,
@@ -140,3 +142,50 @@ def test__skip_player_act_in_night(
     )
     # assert
     assert actual == expected
+
+
+def test__players_act_in_night_in_batch(mocker: MockerFixture) -> None:
+    # mock
+    act_in_night_in_batch_mock = mocker.patch(
+        'langchain_werewolf.game.night_action.act_in_night_in_batch',
+        mocker.Mock(return_value=[{'safe_players_names': {'Alice'}}, {'safe_players_names': {'Dave'}}]),  # noqa
+    )
+    # preparation
+    players = Roster([
+        Knight(name='Alice', runnable=RunnableLambda(str)),
+        Werewolf(name='Bob', runnable=RunnableLambda(str)),
+        Knight(name='Charlie', runnable=RunnableLambda(str)),
+        Villager(name='Dave', runnable=RunnableLambda(str)),
+    ])
+    state = StateModel(alive_players_names=['Alice', 'Bob', 'Dave'])
+    # execution
+    actual = _players_act_in_night_in_batch(state, players)
+    # assert
+    assert [p.name for p in act_in_night_in_batch_mock.call_args.args[0]] == ['Alice', 'Dave']  # noqa
+    assert actual['safe_players_names'] == {'Dave'}
+
+
+def test_create_villagers_night_action_subgraph_with_batch(
+    mocker: MockerFixture,
+) -> None:
+    # mock
+    mocker.patch(
+        'langchain_werewolf.game_players.player_roles.knight.extract_name',
+        mocker.Mock(side_effect=lambda msg, *args, **kwargs: msg),
+    )
+    # preparation
+    shared = RunnableLambda(lambda _: 'Dave')
+    batch_spy = mocker.spy(shared, 'batch')
+    players = [
+        Knight(name='Alice', runnable=shared),
+        Knight(name='Bob', runnable=shared),
+        Villager(name='Dave', runnable=RunnableLambda(str)),
+        Werewolf(name='Eve', runnable=RunnableLambda(str)),
+    ]
+    graph = create_villagers_night_action_subgraph(players, batch=True).compile()  # noqa
+    # execution
+    actual = graph.invoke(StateModel(alive_players_names=[p.name for p in players]))  # noqa
+    # assert
+    assert batch_spy.call_count == 1
+    assert actual['safe_players_names'] == {'Dave'}
+    assert actual['chat_state'][frozenset({'Bob', GAME_MASTER_NAME})].messages[-1].value.message == 'I decided to save Dave in this night.'  # noqa
@@ -0,0 +1,104 @@
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, START, StateGraph
+from langchain_werewolf.game.main import create_game_graph
+from langchain_werewolf.game.optimizer import (
+    count_nodes,
+    elide_noop_node,
+    flatten_subgraph,
+    is_noop_node,
+    optimize_graph,
+)
+from langchain_werewolf.game.utils import ECHO_NODE_NAME
+from langchain_werewolf.game_players import VILLAGER_ROLE, WEREWOLF_ROLE
+from langchain_werewolf.game_players.registry import PlayerRoleRegistry
+from langchain_werewolf.models.state import (
+    StateModel,
+    create_dict_to_update_day,
+    create_dict_without_state_updated,
+)
+
+
+def _add_day(state: StateModel) -> dict[str, int]:
+    return create_dict_to_update_day(state.day + 1)
+
+
+def _create_child() -> StateGraph:
+    child = StateGraph(StateModel)
+    child.add_node('tearup', create_dict_without_state_updated)
+    child.add_node('add_day', _add_day)
+    child.add_node(ECHO_NODE_NAME, create_dict_without_state_updated)
+    child.add_edge(START, 'tearup')
+    child.add_edge('tearup', 'add_day')
+    child.add_edge('add_day', ECHO_NODE_NAME)
+    child.add_edge('add_day', END)
+    child.add_edge(ECHO_NODE_NAME, END)
+    return child
+
+
+def test_elide_noop_node() -> None:
+    # preparation
+    workflow = _create_child()
+    # execution
+    actual = elide_noop_node(workflow, 'tearup')
+    # assert
+    assert actual
+    assert 'tearup' not in workflow.nodes
+    assert (START, 'add_day') in workflow.edges
+    assert is_noop_node(workflow, ECHO_NODE_NAME)
+    assert not is_noop_node(workflow, 'add_day')
+    assert workflow.compile().invoke(StateModel(alive_players_names=[]))['day'] == 1  # noqa
+
+
+def test_elide_noop_node_with_conditional_edges() -> None:
+    # preparation
+    workflow = StateGraph(StateModel)
+    workflow.add_node('add_day', _add_day)
+    workflow.add_node('passthrough', create_dict_without_state_updated)
+    workflow.add_edge(START, 'add_day')
+    workflow.add_edge('add_day', 'passthrough')
+    workflow.add_conditional_edges(
+        'passthrough',
+        lambda state: 'add_day' if state.day < 3 else END,
+        ['add_day', END],
+    )
+    # execution
+    actual = elide_noop_node(workflow, 'passthrough')
+    # assert
+    assert actual
+    assert workflow.compile().invoke(StateModel(alive_players_names=[]))['day'] == 3  # noqa
+
+
+def test_flatten_subgraph() -> None:
+    # preparation
+    workflow = StateGraph(StateModel)
+    workflow.add_node('child', _create_child().compile())
+    workflow.add_node('add_day', _add_day)
+    workflow.add_edge(START, 'child')
+    workflow.add_edge('child', 'add_day')
+    workflow.add_edge('add_day', END)
+    # execution
+    actual = flatten_subgraph(workflow, 'child')
+    # assert
+    assert actual
+    assert set(workflow.nodes) == {'child/tearup', 'child/add_day', f'child/{ECHO_NODE_NAME}', 'add_day'}  # noqa
+    assert ('child/add_day', 'add_day') in workflow.edges
+    assert workflow.compile().invoke(StateModel(alive_players_names=[]))['day'] == 2  # noqa
+
+
+def test_optimize_graph() -> None:
+    # preparation
+    players = [
+        PlayerRoleRegistry.create_player(key=role, name=name, runnable=RunnableLambda(str))  # noqa
+        for name, role in [('A', WEREWOLF_ROLE), ('B', VILLAGER_ROLE), ('C', VILLAGER_ROLE)]  # noqa
+    ]
+    workflow: StateGraph = create_game_graph(players).builder  # type: ignore
+    # execution
+    actual = optimize_graph(workflow)
+    # assert
+    assert (actual.nodes_after, actual.graphs_after) == count_nodes(workflow)
+    assert actual.nodes_after < actual.nodes_before
+    assert actual.graphs_after < actual.graphs_before
+    assert 'daytime_chat' in actual.flattened
+    assert 'game_preparation' not in actual.flattened
+    assert 'villagers_night_action/passthrough_A' in actual.elided
+    workflow.compile()
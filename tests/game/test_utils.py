@@ -7,10 +7,18 @@ from langchain_core.runnables import (
 )
 import pytest
 from pytest_mock import MockerFixture
-from langchain_werewolf.models.state import MsgModel, StateModel
+from langchain_werewolf.models.state import (
+    MsgModel,
+    StateModel,
+    _reduce_chat_state,
+    create_dict_to_record_chat,
+    get_related_messsages,
+)
 from langchain_werewolf.game.utils import (
+    MessageHistoryPromptBuilder,
     add_echo_node,
     create_message_history_prompt,
+    restrict_state_update,
 )
 
 
@@ -142,3 +150,99 @@ def test_add_echo_node_with_node_not_found() -> None:
     # execution
     graph_with_echo = add_echo_node(graph, ['node1', 'node2'], echo=lambda x: print(x)).compile()  # noqa
     graph_with_echo.invoke(StateModel(alive_players_names=[]))
+
+
+def test_restrict_state_update() -> None:
+    # preparation
+    update: dict[str, object] = {
+        'chat_state': {},
+        'safe_players_names': {'player1'},
+        'current_speaker': 'player2',
+    }
+    runnable: RunnableLambda[StateModel, dict[str, object]] = RunnableLambda(lambda _: update)  # noqa
+    # execution
+    actual = restrict_state_update(
+        runnable,
+        ['chat_state', 'safe_players_names'],
+    ).invoke(StateModel(alive_players_names=[]))
+    # assert
+    assert actual == {'chat_state': {}, 'safe_players_names': {'player1'}}
+
+
+def _record_chat(state: StateModel, sender: str, participants: list[str], message: str) -> StateModel:  # noqa
+    state = state.model_copy(deep=True)
+    return state.model_copy(update={
+        'chat_state': _reduce_chat_state(
+            state.chat_state,
+            create_dict_to_record_chat(sender, participants, message)['chat_state'],  # noqa
+        ),
+    })
+
+
+def test_MessageHistoryPromptBuilder(mocker: MockerFixture) -> None:
+    # preparation
+    formatter = mocker.Mock(side_effect=MsgModel.format)
+    builder = MessageHistoryPromptBuilder(formatter)
+    state = StateModel(alive_players_names=['Alice', 'Bob'])
+    state = _record_chat(state, 'Alice', ['Bob'], 'hello')
+    state = _record_chat(state, 'Bob', ['Alice'], 'hi')
+    # execution
+    first = builder.build('Alice', state)
+    first_bob = builder.build('Bob', state)
+    state = _record_chat(state, 'Bob', ['Charlie'], 'secret')
+    second = builder.build('Bob', state, exclude_latest=True)
+    latest = builder.get_latest_message('Bob', state)
+    # assert
+    assert first == create_message_history_prompt(get_related_messsages('Alice', state))  # noqa
+    assert first_bob == first
+    assert second == first
+    assert latest is not None and latest.message == 'secret'
+    assert formatter.call_count == 3
+    assert builder.get_latest_message('Charlie', StateModel(alive_players_names=[])) is None  # noqa
+
+
+def test_MessageHistoryPromptBuilder_with_another_history() -> None:
+    # preparation
+    builder = MessageHistoryPromptBuilder()
+    state = _record_chat(StateModel(alive_players_names=[]), 'Alice', ['Bob'], 'hello')  # noqa
+    another = _record_chat(StateModel(alive_players_names=[]), 'Alice', ['Bob'], 'bye')  # noqa
+    # execution
+    builder.build('Alice', state)
+    actual = builder.build('Alice', another)
+    # assert
+    assert actual == create_message_history_prompt(get_related_messsages('Alice', another))  # noqa
+
+
+def test_MessageHistoryPromptBuilder_merge_new_messages() -> None:
+    # preparation
+    builder = MessageHistoryPromptBuilder()
+    state = StateModel(alive_players_names=['Alice', 'Bob', 'Charlie'])
+    # NOTE: the older message of another chat is recorded later, e.g. by a concurrent branch  # noqa
+    older = create_dict_to_record_chat('Alice', ['Charlie'], 'older')['chat_state']  # noqa
+    state = _record_chat(state, 'Alice', ['Bob'], 'hello')
+    state = _record_chat(state, 'Bob', ['Alice'], 'hi')
+    first = builder.build('Alice', state)
+    # execution
+    state = state.model_copy(update={'chat_state': _reduce_chat_state(state.chat_state, older)})  # noqa
+    state = _record_chat(state, 'Alice', ['Bob'], 'bye')
+    actual = builder.build('Alice', state)
+    # assert
+    assert 'older' not in first
+    assert actual == create_message_history_prompt(get_related_messsages('Alice', state))  # noqa
+    assert [message.message for message in get_related_messsages('Alice', state)] == ['older', 'hello', 'hi', 'bye']  # noqa
+    assert set(builder._buffers['Alice'].cursors.values()) == {
+        (len(history.messages), history.messages[-1].id)
+        for history in state.chat_state.values()
+    }
+
+
+def test_MessageHistoryPromptBuilder_formatter() -> None:
+    # preparation
+    builder = MessageHistoryPromptBuilder()
+    state = _record_chat(StateModel(alive_players_names=[]), 'Alice', ['Bob'], 'hello')  # noqa
+    builder.build('Alice', state)
+    # execution
+    builder.formatter = str
+    actual = builder.build('Alice', state)
+    # assert
+    assert actual == create_message_history_prompt(get_related_messsages('Alice', state), formatter=str)  # noqa
@@ -1,11 +1,20 @@
+from langchain_core.runnables import RunnableLambda
 import pytest
 from pytest_mock import MockerFixture
 from langchain_werewolf.const import GAME_MASTER_NAME
 from langchain_werewolf.enums import ETimeSpan
+from langchain_werewolf.game.elimination import _eliminate_player
+from langchain_werewolf.game.utils import MessageHistoryPromptBuilder
 from langchain_werewolf.game.vote import (
+    SKIPPED_VOTE,
     _player_vote,
+    create_vote_daytime_vote_subgraph,
+    create_vote_night_vote_subgraph,
+    is_vote_decided,
 )
+from langchain_werewolf.game_players import VILLAGER_ROLE, WEREWOLF_ROLE
 from langchain_werewolf.game_players.base import BaseGamePlayer
+from langchain_werewolf.game_players.registry import PlayerRoleRegistry
 from langchain_werewolf.models.state import MsgModel, StateModel
 
 
@@ -16,8 +25,13 @@ from langchain_werewolf.models.state import MsgModel, StateModel
         ETimeSpan.night,
     ],
 )
+@pytest.mark.parametrize(
+    'prompt_builder',
+    [None, MessageHistoryPromptBuilder()],
+)
 def test__player_vote(
     timespan: ETimeSpan,
+    prompt_builder: MessageHistoryPromptBuilder | None,
     mocker: MockerFixture,
 ) -> None:
     # preparation
@@ -29,7 +43,7 @@ def test__player_vote(
     mocker.patch('langchain_werewolf.game.vote.extract_name', return_value=expected2)  # noqa
     state = StateModel(alive_players_names=[player.name, expected2])
     # execution
-    actual = _player_vote(state, timespan, player, generate_system_prompt=str)
+    actual = _player_vote(state, timespan, player, generate_system_prompt=str, prompt_builder=prompt_builder)  # noqa
     # assert
     print(actual)
     print(state)
@@ -53,3 +67,110 @@ def test__player_vote_with_excluded_player(
     actual = _player_vote(state, ETimeSpan.day, player,  generate_system_prompt=str)  # noqa
     # assert
     assert actual['chat_state'] == {}
+
+
+@pytest.mark.parametrize(
+    'votes, voters, safe_players_names, expected',
+    [
+        ({}, ['A', 'B', 'C'], set(), False),
+        ({'A': 'C', 'B': 'C'}, ['A', 'B', 'C'], set(), True),
+        ({'A': 'C'}, ['A', 'B', 'C'], set(), False),
+        ({'A': 'C', 'B': 'A'}, ['A', 'B', 'C'], set(), False),
+        ({'A': 'C', 'B': 'C'}, ['A', 'B', 'C'], {'C'}, False),
+        ({'A': 'C', 'B': 'C', 'C': SKIPPED_VOTE}, ['A', 'B', 'C'], set(), True),  # noqa
+    ],
+)
+def test_is_vote_decided(
+    votes: dict[str, str],
+    voters: list[str],
+    safe_players_names: set[str],
+    expected: bool,
+) -> None:
+    # preparation
+    state = StateModel(
+        alive_players_names=['A', 'B', 'C'],
+        safe_players_names=safe_players_names,
+    )
+    # execution
+    actual = is_vote_decided(state, votes, voters)
+    # assert
+    assert actual == expected
+
+
+def test__player_vote_skipped_when_decided(
+    mocker: MockerFixture,
+) -> None:
+    # preparation
+    player = mocker.MagicMock(spec=BaseGamePlayer)
+    player.name = 'C'
+    state = StateModel(
+        alive_players_names=['A', 'B', 'C'],
+        daytime_votes_current={'A': 'C', 'B': 'C'},
+    )
+    # execution
+    actual = _player_vote(state, ETimeSpan.day, player, generate_system_prompt=str, voters=['A', 'B', 'C'])  # noqa
+    # assert
+    player.generate_message.assert_not_called()
+    assert actual['daytime_votes_current'] == {'A': 'C', 'B': 'C', 'C': SKIPPED_VOTE}  # noqa
+
+
+def test_create_vote_daytime_vote_subgraph_with_decided_vote_cutoff(
+    mocker: MockerFixture,
+) -> None:
+    # preparation
+    mocker.patch('langchain_werewolf.game.vote.extract_name', side_effect=lambda message, **_: message)  # noqa
+    players = [
+        PlayerRoleRegistry.create_player(
+            key=VILLAGER_ROLE,
+            name=name,
+            runnable=RunnableLambda(lambda _: 'C'),
+        )
+        for name in ['A', 'B', 'C']
+    ]
+    graph = create_vote_daytime_vote_subgraph(players, decided_vote_cutoff=True).compile()  # noqa
+    # execution
+    actual = StateModel(**graph.invoke(StateModel(alive_players_names=['A', 'B', 'C'])))  # noqa
+    # assert
+    assert actual.daytime_votes_history[-1].value == {'A': 'C', 'B': 'C', 'C': SKIPPED_VOTE}  # noqa
+
+
+def test_create_vote_night_vote_subgraph_with_decided_vote_cutoff() -> None:
+    # preparation
+    werewolves = [
+        PlayerRoleRegistry.create_player(
+            key=WEREWOLF_ROLE,
+            name=name,
+            runnable=RunnableLambda(lambda _: 'A'),
+        )
+        for name in ['W1', 'W2', 'W3']
+    ]
+    # execution & assert
+    with pytest.raises(ValueError):
+        create_vote_night_vote_subgraph(werewolves, decided_vote_cutoff=True)  # noqa
+
+
+def test_create_vote_night_vote_subgraph_with_protected_leader(
+    mocker: MockerFixture,
+) -> None:
+    # preparation
+    mocker.patch('langchain_werewolf.game.vote.extract_name', side_effect=lambda message, **_: message)  # noqa
+    werewolves = [
+        PlayerRoleRegistry.create_player(
+            key=WEREWOLF_ROLE,
+            name=name,
+            runnable=RunnableLambda(lambda _, voted=voted: voted),
+        )
+        for name, voted in [('W1', 'A'), ('W2', 'A'), ('W3', 'B')]
+    ]
+    graph = create_vote_night_vote_subgraph(werewolves).compile()
+    # execution
+    actual = StateModel(**graph.invoke(StateModel(
+        alive_players_names=['W1', 'W2', 'W3', 'A', 'B'],
+        timespan=ETimeSpan.night,
+    )))
+    # NOTE: the knight saves the leader of the vote concurrently
+    actual.safe_players_names = {'A'}
+    eliminated = _eliminate_player(actual)['nighttime_vote_result_history']
+    # assert
+    assert actual.nighttime_votes_history[-1].value == {'W1': 'A', 'W2': 'A', 'W3': 'B'}  # noqa
+    assert eliminated[-1].value == 'B'
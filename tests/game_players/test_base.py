@@ -1,6 +1,6 @@
 from operator import attrgetter
-from typing import Callable, ClassVar
-from langchain_core.runnables import Runnable
+from typing import Callable, ClassVar, Iterator
+from langchain_core.runnables import Runnable, RunnableGenerator
 from pydantic import ValidationError
 import pytest
 from pytest_mock import MockerFixture
@@ -157,3 +157,21 @@ def test_BasePlayerSideMixin_enforce_attributes_implementation() -> None:
         class WithInvalidPlayerSideWithVictoryCondition(BasePlayerSideMixin):
             side: ClassVar[int] = 1  # type: ignore
             victory_condition: ClassVar[str] = 'victory_condition'
+
+
+def _generate_tokens(_: Iterator[object]) -> Iterator[str]:
+    yield from ['hello', '', ' ', 'world']
+
+
+def test_BaseGamePlayer_generate_message_stream() -> None:
+    # preparation
+    player = BaseGamePlayer(
+        name='name',
+        runnable=RunnableGenerator(_generate_tokens),
+    )
+    tokens: list[str] = []
+    # execution
+    actual = player.generate_message_stream('prompt', on_token=tokens.append)  # noqa
+    # assert
+    assert (actual.name, actual.message) == ('name', 'hello world')
+    assert tokens == ['hello', ' ', 'world']
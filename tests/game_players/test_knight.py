@@ -46,6 +46,7 @@ def test_knight_act_in_night(mocker: MockerFixture) -> None:
         [p.name for p in players if p.name in state.alive_players_names and p in players],  # noqa
         context=f'Extract the valid name of the player as the answer to "{player.question_to_decide_night_action}"',  # noqa
         chat_model=player.runnable,
+        escalation_chat_models=[],
     )
 
 
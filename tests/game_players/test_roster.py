@@ -0,0 +1,97 @@
+from langchain_core.runnables import RunnableLambda
+import pytest
+
+from langchain_werewolf.game_players.base import BaseGamePlayer
+from langchain_werewolf.game_players.const import (
+    VILLAGER_ROLE,
+    VILLAGER_SIDE,
+    WEREWOLF_ROLE,
+    WEREWOLF_SIDE,
+)
+from langchain_werewolf.game_players.player_roles import (
+    FortuneTeller,
+    Villager,
+    Werewolf,
+)
+from langchain_werewolf.game_players.roster import Roster
+
+
+def _create_roster() -> Roster[BaseGamePlayer]:
+    return Roster([
+        Villager(name='Alice', runnable=RunnableLambda(str)),
+        Werewolf(name='Bob', runnable=RunnableLambda(str)),
+        FortuneTeller(name='Charlie', runnable=RunnableLambda(str)),
+        type('InheritedWerewolf', (Werewolf,), {})(name='Dave', runnable=RunnableLambda(str)),  # noqa
+        BaseGamePlayer(name='Eve', runnable=RunnableLambda(str)),
+    ])
+
+
+def test_Roster() -> None:
+    # execution
+    roster = _create_roster()
+    # assert
+    assert len(roster) == 5
+    assert [player.name for player in roster] == list(roster.names)
+    assert 'Alice' in roster
+    assert 'Frank' not in roster
+    assert roster.get_player('Bob').name == 'Bob'
+    assert roster.get_role('Charlie') == FortuneTeller.role
+    assert roster.get_role('Eve') is None
+    assert roster.get_side('Bob') == WEREWOLF_SIDE
+    assert roster.get_side('Eve') is None
+    assert roster.index('Charlie') == 2
+
+
+def test_Roster_duplicated_names() -> None:
+    with pytest.raises(ValueError):
+        Roster([
+            Villager(name='Alice', runnable=RunnableLambda(str)),
+            Werewolf(name='Alice', runnable=RunnableLambda(str)),
+        ])
+
+
+def test_Roster_get_player_not_found() -> None:
+    with pytest.raises(ValueError):
+        _create_roster().get_player('Frank')
+
+
+def test_Roster_of() -> None:
+    # preparation
+    roster = _create_roster()
+    # execution & assert
+    assert Roster.of(roster) is roster
+    assert Roster.of(list(roster)).names == roster.names
+
+
+def test_Roster_mask() -> None:
+    # preparation
+    roster = _create_roster()
+    # execution
+    actual = roster.to_mask(['Dave', 'Alice', 'Frank'])
+    # assert
+    assert actual == 0b01001
+    assert roster.from_mask(actual) == ['Alice', 'Dave']
+
+
+def test_Roster_by_role_and_side() -> None:
+    # preparation
+    roster = _create_roster()
+    # execution & assert
+    assert roster.get_names_by_role(WEREWOLF_ROLE) == ['Bob', 'Dave']
+    assert roster.get_names_by_role(VILLAGER_ROLE) == ['Alice']
+    assert roster.get_names_by_side(VILLAGER_SIDE) == ['Alice', 'Charlie']
+    assert [p.name for p in roster.get_players_by_role(WEREWOLF_ROLE)] == ['Bob', 'Dave']  # noqa
+    assert roster.is_werewolf_role('Dave')
+    assert not roster.is_werewolf_role('Charlie')
+    with pytest.raises(KeyError):
+        roster.get_names_by_role('unknown')
+
+
+def test_Roster_count() -> None:
+    # preparation
+    roster = _create_roster()
+    alive = roster.to_mask(['Alice', 'Bob', 'Charlie'])
+    # execution & assert
+    assert roster.count(alive) == 3
+    assert roster.count(alive, role=WEREWOLF_ROLE) == 1
+    assert roster.count(alive, side=VILLAGER_SIDE) == 2
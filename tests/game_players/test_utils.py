@@ -1,27 +1,39 @@
 from langchain_core.runnables import RunnableLambda
 import pytest
+from pytest_mock import MockerFixture
 
+import langchain_werewolf.game_players.utils
+from langchain_werewolf.const import GAME_MASTER_NAME
 from langchain_werewolf.game_players.base import (
     BaseGamePlayer,
     BaseGamePlayerRole,
     BasePlayerSideMixin,
 )
 from langchain_werewolf.game_players.registry import PlayerRoleRegistry
-from langchain_werewolf.game_players.player_roles import Villager, Werewolf
+from langchain_werewolf.game_players.roster import Roster
+from langchain_werewolf.game_players.player_roles import (
+    FortuneTeller,
+    Knight,
+    Villager,
+    Werewolf,
+)
 from langchain_werewolf.game_players.player_sides import (
     VillagerSideMixin,
     WerewolfSideMixin,
 )
 from langchain_werewolf.game_players.utils import (
+    act_in_night_in_batch,
     find_player_by_name,
     find_players_by_role,
     find_players_by_side,
+    filter_state_according_to_player,
     is_player_with_role,
     is_player_with_side,
     is_werewolf_side,
     is_werewolf_role,
     is_valid_game_player,
 )
+from langchain_werewolf.models.state import IdentifiedModel, StateModel
 
 
 @pytest.mark.parametrize(
@@ -183,6 +195,19 @@ def test_find_player_by_name_not_found():
         find_player_by_name('Alice', [])
 
 
+def test_find_player_by_name_with_roster():
+    # preparation
+    players = [
+        PlayerRoleRegistry.create_player(key=Villager.role, name=f'Player{i}', runnable=RunnableLambda(str))  # noqa
+        for i in range(10)
+    ]
+    roster = Roster(players)
+    # execution & assert
+    assert find_player_by_name('Player3', roster) is players[3]
+    with pytest.raises(ValueError):
+        find_player_by_name('Alice', roster)
+
+
 def test_find_player_by_name_not_unique():
     with pytest.raises(ValueError):
         find_player_by_name(
@@ -349,3 +374,56 @@ def test_find_players_by_side(
 def test_find_players_by_side_not_found():
     with pytest.raises(ValueError):
         find_players_by_side(Villager.side, [])
+
+
+def test_act_in_night_in_batch(mocker: MockerFixture) -> None:
+    # mock
+    for module in ('knight', 'fortune_teller'):
+        mocker.patch(
+            f'langchain_werewolf.game_players.player_roles.{module}.extract_name',  # noqa
+            mocker.Mock(side_effect=lambda msg, *args, **kwargs: msg),
+        )
+    # preparation
+    shared = RunnableLambda(lambda _: 'Dave')
+    batch_spy = mocker.spy(shared, 'batch')
+    players = Roster([
+        Knight(name='Alice', runnable=shared),
+        Knight(name='Bob', runnable=shared),
+        FortuneTeller(name='Charlie', runnable=RunnableLambda(lambda _: 'Eve')),  # noqa
+        Villager(name='Dave', runnable=RunnableLambda(str)),
+        Werewolf(name='Eve', runnable=RunnableLambda(str)),
+    ])
+    state = StateModel(alive_players_names=list(players.names))
+    actors = [players.get_player(name) for name in ('Bob', 'Charlie', 'Alice', 'Dave')]  # noqa
+    # execution
+    actual = act_in_night_in_batch(actors, players, state)
+    # assert
+    assert batch_spy.call_count == 1
+    assert [config['run_name'] for config in batch_spy.call_args.kwargs['config']] == ['Bob', 'Alice']  # noqa
+    assert [update.get('safe_players_names') for update in actual] == [{'Dave'}, None, {'Dave'}, None]  # noqa
+    assert actual[1]['chat_state'][frozenset({'Charlie', GAME_MASTER_NAME})].messages[0].value.message == 'Eve is a werewolf'  # type: ignore # noqa
+
+
+@pytest.mark.parametrize('with_roster', [False, True])
+def test_filter_state_according_to_player(
+    mocker: MockerFixture,
+    with_roster: bool,
+) -> None:
+    # preparation
+    players = Roster([
+        Villager(name='Alice', runnable=RunnableLambda(str)),
+        Werewolf(name='Eve', runnable=RunnableLambda(str)),
+    ])
+    state = StateModel(
+        alive_players_names=['Alice', 'Eve'],
+        nighttime_votes_history=[IdentifiedModel[dict](value={'Eve': 'Alice'})],  # noqa
+    )
+    is_werewolf_role_spy = mocker.spy(langchain_werewolf.game_players.utils, 'is_werewolf_role')  # noqa
+    roster = players if with_roster else None
+    # execution
+    actual_villager = filter_state_according_to_player(players.get_player('Alice'), state, roster)  # noqa
+    actual_werewolf = filter_state_according_to_player(players.get_player('Eve'), state, roster)  # noqa
+    # assert
+    assert actual_villager.nighttime_votes_history == []
+    assert actual_werewolf.nighttime_votes_history == state.nighttime_votes_history  # noqa
+    assert is_werewolf_role_spy.call_count == (0 if with_roster else 2)
@@ -0,0 +1,55 @@
+from langchain_werewolf.const import GAME_MASTER_NAME
+from langchain_werewolf.enums import ETimeSpan
+from langchain_werewolf.game_players.utils.context import (
+    create_night_action_context,
+)
+from langchain_werewolf.models.state import (
+    MsgModel,
+    StateModel,
+    create_dict_to_add_elimination,
+)
+
+
+def test_create_night_action_context() -> None:
+    # preparation
+    state = StateModel(
+        day=2,
+        alive_players_names=['Alice', 'Bob', 'Charlie'],
+        **create_dict_to_add_elimination('Dave', 1, ETimeSpan.day),  # type: ignore # noqa
+    )
+    messages = [
+        MsgModel(name=GAME_MASTER_NAME, message='The rule of the game is ...', participants=frozenset({'Alice', 'Bob'})),  # noqa
+        MsgModel(name='Alice', message='I decided to save Bob in this night.', participants=frozenset({'Alice', GAME_MASTER_NAME})),  # noqa
+        MsgModel(name='Bob', message='Dave is suspicious.', participants=frozenset({'Alice', 'Bob'})),  # noqa
+        MsgModel(name='Bob', message='Dave is suspicious.', participants=frozenset({'Alice', 'Bob'})),  # noqa
+        MsgModel(name='Charlie', message='I agree.', participants=frozenset({'Alice', 'Bob'})),  # noqa
+    ]
+    # execution
+    actual = create_night_action_context('Alice', messages, state)
+    # assert
+    assert actual == '\n'.join([
+        'You are Alice. It is the night of Day 2.',
+        'Alive players: Alice, Bob, Charlie',
+        'Excluded players: Dave (Day 1 daytime)',
+        'Your past night actions:',
+        '- I decided to save Bob in this night.',
+        'Recent discussion:',
+        'Bob: Dave is suspicious.',
+        'Charlie: I agree.',
+    ])
+    assert create_night_action_context('Alice', messages, state) is actual
+
+
+def test_create_night_action_context_with_max_tokens() -> None:
+    # preparation
+    state = StateModel(alive_players_names=['Alice', 'Bob'])
+    messages = [
+        MsgModel(name='Bob', message=f'message {i}', participants=frozenset({'Alice', 'Bob'}))  # noqa
+        for i in range(100)
+    ]
+    # execution
+    actual = create_night_action_context('Alice', messages, state, max_tokens=50)  # noqa
+    # assert
+    assert actual.endswith('Bob: message 99')
+    assert 'Bob: message 0\n' not in actual
+    assert len(actual) < len(create_night_action_context('Alice', messages, state))  # noqa
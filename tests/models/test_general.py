@@ -1,13 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
 from typing import Generator
 import pytest
 from pytest_mock import MockerFixture
+from pydantic import BaseModel, ValidationError, field_validator
 from langchain_werewolf.models.general import (
     IdentifiedModel,
     PartialFrozenModel,
+    build_model,
     constant_reducer,
+    fast_mode,
+    get_fast_mode,
     overwrite_reducer,
     reduce_dict,
     reduce_list,
+    set_fast_mode,
     _generate_unique_string,
 )
 
@@ -192,3 +199,60 @@ def test_reduce_list(
     actual: list = reduce_list(old, new)  # type: ignore
     # assert
     assert actual == expected
+
+
+class _IntModel(BaseModel):
+    value: int
+
+
+def test_build_model() -> None:
+    # execution & assert
+    assert build_model(_IntModel, value=1) == _IntModel(value=1)
+    with pytest.raises(ValidationError):
+        build_model(_IntModel, value='x')
+    with fast_mode():
+        assert get_fast_mode()
+        assert build_model(_IntModel, value=1) == _IntModel(value=1)
+        # NOTE: the values are trusted without the validation
+        assert build_model(_IntModel, value='x').value == 'x'
+        actual = build_model(IdentifiedModel[str], value='a')
+        assert actual.id
+        assert actual.frozen_fields == {'frozen_fields', 'id'}
+        assert actual.frozen_fields is not build_model(IdentifiedModel[str], value='b').frozen_fields  # noqa
+        with pytest.raises(TypeError):
+            actual.id = 'b'
+    assert not get_fast_mode()
+
+
+class _UpperModel(BaseModel):
+    value: str
+
+    @field_validator('value')
+    @classmethod
+    def upper(cls, value: str) -> str:
+        return value.upper()
+
+
+def test_build_model_with_validator() -> None:
+    # execution & assert
+    # NOTE: the validator transforming the values is applied even in the fast mode  # noqa
+    with fast_mode():
+        assert build_model(_UpperModel, value='a').value == 'A'
+
+
+def test_fast_mode_per_thread() -> None:
+    # preparation
+    barrier = threading.Barrier(2)
+
+    def _run(enabled: bool) -> bool:
+        set_fast_mode(enabled)
+        # NOTE: both threads have set the mode before reading it
+        barrier.wait()
+        return get_fast_mode()
+
+    # execution
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        actual = list(executor.map(_run, [True, False]))
+    # assert
+    assert actual == [True, False]
+    assert not get_fast_mode()
@@ -1,8 +1,9 @@
 from datetime import datetime as dt
 from typing import Generator
 import pytest
+from langchain_werewolf.const import GAME_MASTER_NAME
 from langchain_werewolf.enums import EResult, ETimeSpan
-from langchain_werewolf.models.general import IdentifiedModel
+from langchain_werewolf.models.general import IdentifiedModel, fast_mode
 from langchain_werewolf.models.state import (
     ChatHistoryModel,
     MsgModel,
@@ -11,13 +12,16 @@ from langchain_werewolf.models.state import (
     _integrate_chat_histories,
     _reduce_chat_state,
     _reduce_votes_current,
+    create_dict_to_add_elimination,
     create_dict_to_add_safe_player,
     create_dict_to_reset_state,
     create_dict_to_update_alive_players,
     create_dict_to_update_day,
     create_dict_to_record_chat,
+    create_dict_to_record_chats,
     create_dict_to_update_chat_remaining_number,
     create_dict_to_update_current_speaker,
+    create_dict_to_update_speaker_schedule,
     create_dict_to_update_daytime_vote_result_history,
     create_dict_to_update_daytime_votes_current,
     create_dict_to_update_daytime_votes_history,
@@ -29,6 +33,7 @@ from langchain_werewolf.models.state import (
     create_dict_without_state_updated,
     get_related_chat_histories,
     get_related_messsages,
+    reduce_dicts_to_update_state,
     get_related_messsages_with_id,
 )
 
@@ -194,6 +199,35 @@ def test_create_dict_to_record_chat() -> None:
     assert actual['chat_state'][frozenset(participants)].messages[0].value.message == message  # noqa
 
 
+def test_create_dict_to_record_chat_in_fast_mode() -> None:
+    # preparation
+    participants = ['Alice', 'Bob']
+    expected = create_dict_to_record_chat('Alice', participants, 'hello')
+    # execution
+    with fast_mode():
+        actual = create_dict_to_record_chat('Alice', participants, 'hello')
+    # assert
+    expected_history = expected['chat_state'][frozenset(participants)]
+    actual_history = actual['chat_state'][frozenset(participants)]
+    assert actual_history.names == expected_history.names
+    assert actual_history.messages[0].value.model_dump(exclude={'timestamp'}) == expected_history.messages[0].value.model_dump(exclude={'timestamp'})  # noqa
+    assert StateModel(alive_players_names=[], chat_state=actual['chat_state']).model_dump_json()  # noqa
+
+
+def test_create_dict_to_record_chats() -> None:
+    # preparation
+    participants = ['Alice', 'Bob', 'Carol']
+    messages = [('Bob', 'hello'), ('Alice', 'hi'), ('Carol', 'hey')]
+    # execution
+    actual = create_dict_to_record_chats(messages, participants)
+    # assert
+    assert list(actual['chat_state']) == [frozenset(participants)]
+    history = actual['chat_state'][frozenset(participants)].messages
+    assert [(m.value.name, m.value.message) for m in history] == messages
+    assert [m.value.timestamp for m in history] == sorted(m.value.timestamp for m in history)  # noqa
+    assert create_dict_to_record_chats([], participants) == {'chat_state': {}}  # noqa
+
+
 def test__reduce_chat_state() -> None:
     # preparation
     previous_chat_state = {
@@ -333,6 +367,25 @@ def test__reduce_chat_state() -> None:
     assert actual == expected
 
 
+def test__reduce_chat_state_not_in_place() -> None:
+    # preparation
+    names = frozenset({'Alice', 'Bob'})
+    previous_history = ChatHistoryModel(
+        names=names,
+        messages=[IdentifiedModel[MsgModel](value=MsgModel(name='Alice', message='hello', participants=names))],  # noqa
+    )
+    previous_chat_state = {names: previous_history}
+    # execution
+    actual = _reduce_chat_state(
+        previous_chat_state,
+        {names: ChatHistoryModel(names=names, messages=[IdentifiedModel[MsgModel](value=MsgModel(name='Bob', message='hi', participants=names))])},  # noqa
+    )
+    # assert
+    assert [m.value.message for m in actual[names].messages] == ['hello', 'hi']  # noqa
+    assert previous_chat_state == {names: previous_history}
+    assert [m.value.message for m in previous_history.messages] == ['hello']
+
+
 def test_create_dict_to_reset_temporal_state(
     state_fixture: StateModel,
 ) -> None:
@@ -341,6 +394,7 @@ def test_create_dict_to_reset_temporal_state(
         'safe_players_names': set(),
         'current_speaker': None,
         'n_chat_remaining': None,
+        'speaker_schedule': [],
         'daytime_votes_current': {},
         'nighttime_votes_current': {},
     }
@@ -379,6 +433,31 @@ def test_StateModel_serialize_result(
     assert actual == expected
 
 
+def test_StateModel_model_validate_json(state_fixture: StateModel) -> None:  # noqa
+    # preparation
+    state_fixture.result = EResult.WerewolvesWin
+    # execution
+    actual = StateModel.model_validate_json(state_fixture.model_dump_json())
+    # assert
+    assert actual == state_fixture
+
+
+def test_StateModel_preprocess_result() -> None:
+    # execution
+    actual = StateModel.preprocess_result('None')
+    # assert
+    assert actual is None
+
+
+def test_StateModel_preprocess_chat_state(state_fixture: StateModel) -> None:  # noqa
+    # preparation
+    expected = state_fixture.chat_state
+    # execution
+    actual = StateModel.preprocess_chat_state(state_fixture.model_dump()['chat_state'])  # noqa
+    # assert
+    assert set(actual.keys()) == set(expected.keys())
+
+
 @pytest.mark.parametrize(
     'previous_votes,new_votes,expected',
     [
@@ -480,6 +559,26 @@ def test_create_dict_to_update_chat_remaining_number() -> None:
     assert actual == {'n_chat_remaining': n_chat_remaining}
 
 
+@pytest.mark.parametrize(
+    'schedule, expected',
+    [
+        (
+            ['Alice', 'Bob'],
+            {'speaker_schedule': ['Alice', 'Bob'], 'current_speaker': 'Alice', 'n_chat_remaining': 2},  # noqa
+        ),
+        (
+            [],
+            {'speaker_schedule': [], 'current_speaker': None, 'n_chat_remaining': 0},  # noqa
+        ),
+    ],
+)
+def test_create_dict_to_update_speaker_schedule(
+    schedule: list[str],
+    expected: dict[str, object],
+) -> None:
+    assert create_dict_to_update_speaker_schedule(schedule) == expected
+
+
 def test_create_dict_to_update_daytime_vote_result_history() -> None:
     # preparation
     result = 'x'
@@ -544,6 +643,41 @@ def test_create_dict_to_update_nighttime_votes_history() -> None:
     assert actual == {'nighttime_votes_history': [votes_history]}
 
 
+def test_create_dict_to_add_elimination() -> None:
+    # execution
+    actual = create_dict_to_add_elimination('Alice', 2, ETimeSpan.night)
+    # assert
+    assert [item.value.model_dump() for item in actual['elimination_log']] == [  # noqa
+        {'name': 'Alice', 'day': 2, 'timespan': ETimeSpan.night},
+    ]
+
+
+def test_StateModel_alive_players_set() -> None:
+    # preparation
+    state = StateModel(alive_players_names=['Alice', 'Bob'])
+    # execution
+    actual = state.alive_players_set
+    # assert
+    assert actual == {'Alice', 'Bob'}
+    assert state.alive_players_set is actual  # check cache
+    assert 'alive_players_set' not in state.model_dump()
+    assert state.model_copy(update={'alive_players_names': ['Bob']}).alive_players_set == {'Bob'}  # noqa
+    state.alive_players_names = ['Alice']
+    assert state.alive_players_set == {'Alice'}
+
+
+def test_StateModel_get_elimination() -> None:
+    # preparation
+    state = StateModel(
+        alive_players_names=['Alice'],
+        **create_dict_to_add_elimination('Bob', 1, ETimeSpan.day),  # type: ignore # noqa
+    )
+    # execution & assert
+    assert state.get_elimination('Bob').day == 1  # type: ignore
+    assert state.get_elimination('Alice') is None
+    assert StateModel.model_validate(state.model_dump()).get_elimination('Bob') is not None  # noqa
+
+
 def test_create_dict_to_update_alive_players() -> None:
     # preparation
     alive_players_names = ['Alice', 'Bob']
@@ -575,6 +709,21 @@ def test_create_dict_without_state_updated() -> None:
     assert create_dict_without_state_updated(StateModel(alive_players_names=['dummy'])) == {'chat_state': {}}  # noqa
 
 
+def test_reduce_dicts_to_update_state() -> None:
+    # execution
+    actual = reduce_dicts_to_update_state([
+        create_dict_to_record_chat('Alice', [GAME_MASTER_NAME], 'hello'),
+        create_dict_to_add_safe_player('Alice'),
+        create_dict_to_record_chat('Bob', [GAME_MASTER_NAME], 'hi'),
+        create_dict_to_record_chat('Alice', [GAME_MASTER_NAME], 'bye'),
+        create_dict_to_add_safe_player('Bob'),
+    ])
+    # assert
+    assert [m.value.message for m in actual['chat_state'][frozenset({'Alice', GAME_MASTER_NAME})].messages] == ['hello', 'bye']  # type: ignore # noqa
+    assert [m.value.message for m in actual['chat_state'][frozenset({'Bob', GAME_MASTER_NAME})].messages] == ['hi']  # type: ignore # noqa
+    assert actual['safe_players_names'] == {'Bob'}
+
+
 def test_get_related_chat_histories(state_fixture: StateModel) -> None:
     # preparation
     name: str = 'Alice'
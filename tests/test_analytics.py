@@ -0,0 +1,175 @@
+import numpy as np
+import pytest
+from langchain_werewolf.analytics import (
+    GameStatistics,
+    compute_game_statistics,
+    create_elimination_matrix,
+    create_vote_tensor,
+)
+from langchain_werewolf.archive import NULL_CODE, GameArchive, create_game_archive  # noqa
+from langchain_werewolf.const import SKIPPED_VOTE
+from langchain_werewolf.enums import EResult, ETimeSpan
+from langchain_werewolf.models.general import IdentifiedModel
+from langchain_werewolf.models.state import StateModel
+
+ROLES: dict[str, str] = {
+    'Alice': 'villager',
+    'Bob': 'knight',
+    'Charlie': 'werewolf',
+    'Dave': 'villager',
+}
+MODELS: dict[str, str] = {
+    'Alice': 'gpt-4o-mini',
+    'Bob': 'gpt-4o-mini',
+    'Charlie': 'gpt-4o',
+    'Dave': 'gpt-4o',
+}
+
+
+def _create_state(
+    daytime_votes: list[dict[str, str]],
+    daytime_results: list[str | None],
+    nighttime_votes: list[dict[str, str]],
+    nighttime_results: list[str | None],
+    result: EResult,
+) -> StateModel:
+    eliminated = set(daytime_results) | set(nighttime_results)
+    return StateModel(
+        day=len(daytime_votes),
+        result=result,
+        alive_players_names=[name for name in ROLES if name not in eliminated],  # noqa
+        daytime_votes_history=[IdentifiedModel[dict](value=votes) for votes in daytime_votes],  # noqa
+        daytime_vote_result_history=[IdentifiedModel[str | None](value=name) for name in daytime_results],  # type: ignore # noqa
+        nighttime_votes_history=[IdentifiedModel[dict](value=votes) for votes in nighttime_votes],  # noqa
+        nighttime_vote_result_history=[IdentifiedModel[str | None](value=name) for name in nighttime_results],  # type: ignore # noqa
+    )
+
+
+@pytest.fixture
+def archive() -> GameArchive:
+    states = [
+        # villagers find the werewolf on the day 1
+        _create_state(
+            [{'Alice': 'Charlie', 'Bob': 'Charlie', 'Charlie': 'Alice', 'Dave': 'Alice'}],  # noqa
+            ['Charlie'],
+            [],
+            [],
+            EResult.VillagersWin,
+        ),
+        # villagers fail on the day 1 and the werewolf wins on the night 1
+        _create_state(
+            [{'Alice': 'Dave', 'Bob': 'Charlie', 'Charlie': 'Dave', 'Dave': 'Charlie'}],  # noqa
+            ['Dave'],
+            [{'Charlie': 'Alice'}],
+            ['Alice'],
+            EResult.WerewolvesWin,
+        ),
+    ]
+    return create_game_archive(states, roles=[ROLES, ROLES], models=[MODELS, MODELS])  # noqa
+
+
+def test_create_vote_tensor(archive: GameArchive) -> None:
+    # execution
+    actual = create_vote_tensor(archive, ETimeSpan.night)
+    # assert
+    assert actual.shape == (2, 1, 4)
+    assert archive.decode('target', actual[1, 0]).tolist() == [  # type: ignore # noqa
+        'Alice' if archive.dictionaries['player'][i] == 'Charlie' else None
+        for i in range(4)
+    ]
+    assert (actual[0] == NULL_CODE).all()
+
+
+def test_create_elimination_matrix(archive: GameArchive) -> None:
+    # execution
+    actual = create_elimination_matrix(archive, ETimeSpan.day)
+    # assert
+    assert archive.decode('player', actual.ravel()).tolist() == ['Charlie', 'Dave']  # noqa
+
+
+def test_GameStatistics_win_rate(archive: GameArchive) -> None:
+    # execution
+    actual = compute_game_statistics(archive).win_rate(by='role')
+    # assert
+    assert {role: estimate.value for role, estimate in actual.items()} == {
+        'villager': 0.5,
+        'knight': 0.5,
+        'werewolf': 0.5,
+    }
+    assert actual['villager'].n == 4
+    assert actual['villager'].lower is None
+
+
+def test_GameStatistics_vote_accuracy(archive: GameArchive) -> None:
+    # execution
+    actual = compute_game_statistics(archive).vote_accuracy(by='model')
+    # assert
+    # NOTE: the votes of the werewolf are not counted
+    assert actual['gpt-4o-mini'].value == 3 / 4
+    assert actual['gpt-4o'].value == 1 / 2
+
+
+def test_GameStatistics_vote_consistency(archive: GameArchive) -> None:
+    # execution
+    actual = compute_game_statistics(archive).vote_consistency(by='role')
+    # assert
+    assert actual['werewolf'].value == 1 / 2
+    assert actual['villager'].value == 2 / 4
+
+
+def test_GameStatistics_with_skipped_votes() -> None:
+    # preparation
+    votes = {'Alice': 'Charlie', 'Bob': 'Charlie', 'Charlie': 'Alice'}
+    archives = [
+        create_game_archive(
+            [_create_state([votes | skipped], ['Charlie'], [], [], EResult.VillagersWin)],  # noqa
+            roles=[ROLES],
+            models=[MODELS],
+        )
+        for skipped in ({'Dave': SKIPPED_VOTE}, {})
+    ]
+    # execution
+    actual, expected = (compute_game_statistics(archive) for archive in archives)  # noqa
+    # assert
+    assert 'Dave' in archives[0].decode('voter', archives[0]['votes']['voter']).tolist()  # type: ignore # noqa
+    assert SKIPPED_VOTE not in archives[0].dictionaries['player']
+    assert (create_vote_tensor(archives[0], ETimeSpan.day) == create_vote_tensor(archives[1], ETimeSpan.day)).all()  # noqa
+    assert {model: estimate.value for model, estimate in actual.vote_accuracy(by='model').items()} == {model: estimate.value for model, estimate in expected.vote_accuracy(by='model').items()}  # noqa
+    assert {role: estimate.value for role, estimate in actual.vote_consistency(by='role').items()} == {role: estimate.value for role, estimate in expected.vote_consistency(by='role').items()}  # noqa
+
+
+def test_GameStatistics_first_elimination_accuracy(archive: GameArchive) -> None:  # noqa
+    # execution
+    actual = compute_game_statistics(archive).first_elimination_accuracy()
+    # assert
+    assert actual is not None
+    assert actual.value == 1 / 2
+
+
+def test_GameStatistics_survival_curve(archive: GameArchive) -> None:
+    # execution
+    actual = compute_game_statistics(archive).survival_curve(by='role')
+    # assert
+    np.testing.assert_allclose(actual['werewolf'], [1.0, 0.5])
+    np.testing.assert_allclose(actual['villager'], [1.0, 0.5])
+    np.testing.assert_allclose(actual['knight'], [1.0, 1.0])
+
+
+def test_GameStatistics_update(archive: GameArchive) -> None:
+    # preparation
+    expected = compute_game_statistics(archive)
+    # execution
+    actual = GameStatistics().update(archive).update(archive)
+    # assert
+    assert actual.n_games == 2 * expected.n_games
+    assert {role: estimate.value for role, estimate in actual.win_rate().items()} == {role: estimate.value for role, estimate in expected.win_rate().items()}  # noqa
+    np.testing.assert_allclose(actual.survival_curve()['villager'], expected.survival_curve()['villager'])  # noqa
+
+
+def test_GameStatistics_bootstrap(archive: GameArchive) -> None:
+    # execution
+    actual = compute_game_statistics(archive).win_rate(by='role', n_resamples=200, seed=0)  # noqa
+    # assert
+    for estimate in actual.values():
+        assert estimate.lower is not None and estimate.upper is not None
+        assert 0 <= estimate.lower <= estimate.value <= estimate.upper <= 1
@@ -0,0 +1,98 @@
+from pathlib import Path
+import numpy as np
+import pytest
+from langchain_werewolf.archive import (
+    ARCHIVE_TABLES,
+    DICTIONARY_ENCODED_COLUMNS,
+    NULL_CODE,
+    GameArchive,
+    GameArchiveBuilder,
+    create_game_archive,
+    load_game_archive,
+    save_game_archive,
+)
+from langchain_werewolf.enums import EResult, ETimeSpan
+from langchain_werewolf.models.general import IdentifiedModel
+from langchain_werewolf.models.state import (
+    StateModel,
+    create_dict_to_record_chat,
+)
+
+
+def _create_state() -> StateModel:
+    return StateModel(
+        day=1,
+        result=EResult.VillagersWin,
+        alive_players_names=['Alice', 'Bob'],
+        chat_state=create_dict_to_record_chat('Alice', ['Bob', 'Charlie'], 'hello')['chat_state'],  # noqa
+        daytime_votes_history=[IdentifiedModel[dict](value={'Alice': 'Charlie', 'Bob': 'Charlie', 'Charlie': 'Alice'})],  # noqa
+        daytime_vote_result_history=[IdentifiedModel[str | None](value='Charlie')],  # type: ignore # noqa
+        nighttime_votes_history=[],
+        nighttime_vote_result_history=[],
+    )
+
+
+def test_GameArchiveBuilder_add() -> None:
+    # preparation
+    builder = GameArchiveBuilder()
+    roles = {'Alice': 'villager', 'Bob': 'knight', 'Charlie': 'werewolf'}
+    # execution
+    game = builder.add(_create_state(), game_id='game', roles=roles)
+    actual = builder.build()
+    # assert
+    assert game == 0
+    assert len(actual) == 1
+    assert actual.decode('result', actual['games']['result']).tolist() == [EResult.VillagersWin.value]  # noqa
+    assert actual.decode('player', actual['players']['player']).tolist() == ['Alice', 'Bob', 'Charlie']  # noqa
+    assert actual['players']['survived'].tolist() == [True, True, False]
+    assert actual['players']['eliminated_day'].tolist() == [NULL_CODE, NULL_CODE, 1]  # noqa
+    assert actual.decode('eliminated_timespan', actual['players']['eliminated_timespan']).tolist() == [None, None, ETimeSpan.day.value]  # noqa
+    assert actual['players']['model'].tolist() == [NULL_CODE] * 3
+    assert actual.decode('target', actual['votes']['target']).tolist() == ['Charlie', 'Charlie', 'Alice']  # noqa
+    assert actual.decode('player', actual['eliminations']['player']).tolist() == ['Charlie']  # noqa
+    assert actual['messages']['text'].tolist() == ['hello']
+    assert actual.decode('channel', actual['messages']['channel']).tolist() == ['Alice|Bob|Charlie']  # noqa
+
+
+def test_GameArchiveBuilder_add_duplicated_game_id() -> None:
+    # preparation
+    builder = GameArchiveBuilder()
+    builder.add(_create_state(), game_id='game')
+    # execution & assert
+    with pytest.raises(ValueError):
+        builder.add(_create_state(), game_id='game')
+
+
+def test_GameArchive_encode() -> None:
+    # preparation
+    archive = create_game_archive([_create_state()])
+    # execution & assert
+    assert archive.decode('voter', [archive.encode('voter', 'Bob')]).tolist() == ['Bob']  # noqa
+    assert archive.encode('voter', 'Dave') == NULL_CODE
+
+
+def _assert_archive_equal(actual: GameArchive, expected: GameArchive) -> None:
+    for table in ARCHIVE_TABLES:
+        for column, values in expected[table].items():
+            if column in DICTIONARY_ENCODED_COLUMNS:
+                assert actual.decode(column, actual[table][column]).tolist() == expected.decode(column, values).tolist()  # noqa
+            else:
+                assert np.array_equal(actual[table][column], values)
+
+
+@pytest.mark.parametrize('filename', ['archive.npz', 'archive'])
+def test_save_game_archive(filename: str, tmp_path: Path) -> None:
+    # preparation
+    if not filename.endswith('.npz'):
+        pytest.importorskip('pyarrow')
+    path = str(tmp_path / filename)
+    expected = create_game_archive(
+        [_create_state(), _create_state()],
+        roles=[{'Alice': 'villager', 'Bob': 'knight', 'Charlie': 'werewolf'}, None],  # noqa
+        models=[{'Alice': 'gpt-4o-mini'}, None],
+    )
+    # execution
+    save_game_archive(expected, path)
+    actual = load_game_archive(path)
+    # assert
+    _assert_archive_equal(actual, expected)
@@ -0,0 +1,210 @@
+from typing import Any, Iterator
+import pytest
+from pytest_mock import MockerFixture
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableGenerator, RunnableLambda
+from langchain_werewolf.budget import (
+    TOTAL_USAGE_KEY,
+    TokenBudget,
+    TokenBudgetExceededError,
+    apply_token_budget,
+    create_budgeted_player_runnable,
+    create_budgeted_translator_runnable,
+    estimate_cost,
+    shorten_prompt,
+)
+from langchain_werewolf.const import GAME_MASTER_NAME
+from langchain_werewolf.enums import EBudgetLevel
+from langchain_werewolf.game_players.base import GamePlayerRunnableInputModel
+from langchain_werewolf.game_players.player_roles import Knight, Villager
+from langchain_werewolf.game_players.utils import act_in_night_in_batch
+from langchain_werewolf.models.state import StateModel
+
+
+def _create_chat_model(*contents: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([
+        AIMessage(content=content, usage_metadata={'input_tokens': 10, 'output_tokens': 2, 'total_tokens': 12})  # noqa
+        for content in contents
+    ]))
+
+
+def _record(budget: TokenBudget, name: str | None, tokens: int) -> None:
+    with budget._lock:
+        budget._record_llm_usage(name, 'gpt-4o-mini', tokens, 0)
+
+
+def test_estimate_cost() -> None:
+    assert estimate_cost('gpt-4o', 1_000_000, 1_000_000) == 12.5
+    assert estimate_cost('unknown', 1_000_000, 1_000_000) == 0.0
+    assert estimate_cost(None, 10, 10) == 0.0
+
+
+def test_TokenBudget_get_usage() -> None:
+    # preparation
+    budget = TokenBudget(['Player1'])
+    player = (RunnableLambda(lambda x: x) | _create_chat_model('hello')).with_config(run_name='Player1')  # noqa
+    # execution
+    player.invoke('hi', config={'callbacks': [budget]})
+    _create_chat_model('hello').invoke('hi', config={'callbacks': [budget]})  # noqa
+    actual = budget.get_usage()
+    # assert
+    assert actual['Player1'].llm_calls == 1
+    assert actual['Player1'].total_tokens == 12
+    assert actual[GAME_MASTER_NAME].total_tokens == 12
+    assert actual[TOTAL_USAGE_KEY].llm_calls == 2
+    assert actual[TOTAL_USAGE_KEY].total_tokens == 24
+
+
+@pytest.mark.parametrize(
+    'tokens, expected',
+    [
+        (0, EBudgetLevel.normal),
+        (59, EBudgetLevel.normal),
+        (60, EBudgetLevel.short_history),
+        (75, EBudgetLevel.cheap_model),
+        (90, EBudgetLevel.no_translation),
+        (100, EBudgetLevel.exceeded),
+    ],
+)
+def test_TokenBudget_get_level(tokens: int, expected: EBudgetLevel) -> None:
+    # preparation
+    budget = TokenBudget(['Player1'], max_tokens_per_game=100)
+    _record(budget, 'Player1', tokens)
+    # execution
+    actual = budget.get_level('Player1')
+    # assert
+    assert actual == expected
+
+
+def test_TokenBudget_get_level_per_player() -> None:
+    # preparation
+    budget = TokenBudget(['Player1', 'Player2'], max_tokens_per_player=10)
+    _record(budget, 'Player1', 10)
+    # execution
+    actual = (budget.get_level('Player1'), budget.get_level('Player2'))
+    # assert
+    assert actual == (EBudgetLevel.exceeded, EBudgetLevel.normal)
+
+
+def test_TokenBudget_check() -> None:
+    # preparation
+    budget = TokenBudget(['Player1'], max_tokens_per_game=10)
+    _record(budget, 'Player1', 10)
+    # execution & assert
+    with pytest.raises(TokenBudgetExceededError):
+        budget.check('Player1')
+
+
+def test_shorten_prompt() -> None:
+    # preparation
+    text = '**Your Name is Player1**\n\n' + '\n'.join(f'message {i}' for i in range(100))  # noqa
+    # execution
+    actual = shorten_prompt(text, 20)
+    # assert
+    assert actual.startswith('**Your Name is Player1**\n...\n')
+    assert actual.endswith('message 99')
+    assert 'message 0\n' not in actual
+    assert shorten_prompt('short', 20) == 'short'
+
+
+def test_create_budgeted_player_runnable() -> None:
+    # preparation
+    budget = TokenBudget(['Player1'], max_tokens_per_game=100, history_window_tokens=20)  # noqa
+    inputs: list[tuple[str, GamePlayerRunnableInputModel]] = []
+    runnable = create_budgeted_player_runnable(
+        RunnableLambda(lambda x: inputs.append(('main', x)) or 'main'),  # type: ignore # noqa
+        budget,
+        'Player1',
+        cheap_runnable=RunnableLambda(lambda x: inputs.append(('cheap', x)) or 'cheap'),  # type: ignore # noqa
+    )
+    system_prompt = 'head\n\n' + '\n'.join(f'message {i}' for i in range(100))  # noqa
+    input_ = GamePlayerRunnableInputModel(prompt='hi', system_prompt=system_prompt)  # noqa
+    # execution
+    first = runnable.invoke(input_)
+    _record(budget, 'Player1', 80)
+    second = runnable.invoke(input_)
+    _record(budget, 'Player1', 20)
+    with pytest.raises(TokenBudgetExceededError):
+        runnable.invoke(input_)
+    # assert
+    assert (first, second) == ('main', 'cheap')
+    assert inputs[0][1].system_prompt == system_prompt
+    assert inputs[1][1].system_prompt == shorten_prompt(system_prompt, 20)
+
+
+def test_create_budgeted_translator_runnable() -> None:
+    # preparation
+    budget = TokenBudget(max_tokens_per_game=100)
+    translator = create_budgeted_translator_runnable(RunnableLambda(lambda x: f'translated {x}'), budget)  # noqa
+    # execution
+    first = translator.invoke('hello')
+    _record(budget, None, 90)
+    second = translator.invoke('hello')
+    # assert
+    assert (first, second) == ('translated hello', 'hello')
+
+
+def test_apply_token_budget() -> None:
+    # preparation
+    budget = TokenBudget(['Player1', 'Player2'], max_tokens_per_player=10)
+    players = [
+        Villager(name=name, runnable=RunnableLambda(lambda x: 'hello'))
+        for name in ('Player1', 'Player2')
+    ]
+    _record(budget, 'Player1', 10)
+    _record(budget, 'Player2', 10)
+    # execution
+    actual = apply_token_budget(players, budget, skipped=['Player2'])
+    # assert
+    assert actual[1] is players[1]
+    assert actual[1].runnable.invoke('hi') == 'hello'
+    with pytest.raises(TokenBudgetExceededError):
+        actual[0].runnable.invoke('hi', config={'run_name': 'Player1'})
+
+
+def test_create_budgeted_player_runnable_stream() -> None:
+    # preparation
+    def _generate(inputs: Iterator[Any]) -> Iterator[str]:
+        for _ in inputs:
+            yield from ('hel', 'lo')
+
+    budget = TokenBudget(['Player1', 'Player2'], max_tokens_per_player=10)
+    runnable = create_budgeted_player_runnable(RunnableGenerator(_generate), budget)  # noqa
+    _record(budget, 'Player2', 10)
+    # execution
+    actual = list(runnable.stream('hi', config={'run_name': 'Player1'}))
+    # assert
+    assert actual == ['hel', 'lo']
+    with pytest.raises(TokenBudgetExceededError):
+        list(runnable.stream('hi', config={'run_name': 'Player2'}))
+
+
+def test_apply_token_budget_with_night_batch(mocker: MockerFixture) -> None:
+    # mock
+    mocker.patch(
+        'langchain_werewolf.game_players.player_roles.knight.extract_name',
+        mocker.Mock(side_effect=lambda msg, *args, **kwargs: msg),
+    )
+    # preparation
+    budget = TokenBudget(['Alice', 'Bob', 'Charlie'], max_tokens_per_player=10)  # noqa
+    shared = RunnableLambda(lambda _: 'Charlie')
+    players = apply_token_budget(
+        [
+            Knight(name='Alice', runnable=shared),
+            Knight(name='Bob', runnable=shared),
+            Villager(name='Charlie', runnable=RunnableLambda(str)),
+        ],
+        budget,
+    )
+    batch_spy = mocker.spy(players[0].runnable, 'batch')
+    state = StateModel(alive_players_names=[player.name for player in players])  # noqa
+    # execution
+    actual = act_in_night_in_batch(players[:2], players, state)
+    _record(budget, 'Bob', 10)
+    # assert
+    assert players[0].runnable is players[1].runnable
+    assert batch_spy.call_count == 1
+    assert [update.get('safe_players_names') for update in actual] == [{'Charlie'}, {'Charlie'}]  # noqa
+    with pytest.raises(TokenBudgetExceededError):
+        act_in_night_in_batch(players[:2], players, state)
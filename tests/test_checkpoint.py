@@ -0,0 +1,113 @@
+from pathlib import Path
+import sqlite3
+import pytest
+from langgraph.graph import StateGraph, START, END
+from langchain_werewolf.checkpoint import SqliteCheckpointSaver
+from langchain_werewolf.enums import EResult
+from langchain_werewolf.models.state import (
+    StateModel,
+    _reduce_chat_state,
+    create_dict_to_record_chat,
+    create_dict_to_update_result,
+)
+
+
+def _create_graph(saver: SqliteCheckpointSaver, fail: bool = False):  # type: ignore # noqa
+    def _fail(state: StateModel) -> dict[str, EResult | None]:
+        if fail:
+            raise RuntimeError('interrupted')
+        return create_dict_to_update_result(EResult.VillagersWin)
+
+    workflow = StateGraph(StateModel)
+    workflow.add_node('chat1', lambda _: create_dict_to_record_chat('Alice', ['Bob'], 'hello'))  # noqa
+    workflow.add_node('chat2', lambda _: create_dict_to_record_chat('Bob', ['Alice'], 'hi'))  # noqa
+    workflow.add_node('finish', _fail)
+    workflow.add_edge(START, 'chat1')
+    workflow.add_edge('chat1', 'chat2')
+    workflow.add_edge('chat2', 'finish')
+    workflow.add_edge('finish', END)
+    return workflow.compile(checkpointer=saver)
+
+
+def test_SqliteCheckpointSaver_save_players(tmp_path: Path) -> None:
+    # preparation
+    saver = SqliteCheckpointSaver(str(tmp_path / 'checkpoint.sqlite'))
+    roles = {'Alice': 'werewolf', 'Bob': 'villager'}
+    # execution
+    saver.save_players('run', roles)
+    actual = saver.load_players('run')
+    # assert
+    assert actual == roles
+
+
+def test_SqliteCheckpointSaver_load_players_not_found(tmp_path: Path) -> None:  # noqa
+    # preparation
+    saver = SqliteCheckpointSaver(str(tmp_path / 'checkpoint.sqlite'))
+    # execution & assert
+    with pytest.raises(KeyError):
+        saver.load_players('run')
+
+
+def test_SqliteCheckpointSaver_get_tuple(tmp_path: Path) -> None:
+    # preparation
+    saver = SqliteCheckpointSaver(str(tmp_path / 'checkpoint.sqlite'))
+    config = {'configurable': {'thread_id': 'run'}}
+    graph = _create_graph(saver)
+    # execution
+    expected = StateModel(**graph.invoke(StateModel(alive_players_names=['Alice', 'Bob']), config=config))  # type: ignore # noqa
+    actual = StateModel(**graph.get_state(config).values)  # type: ignore
+    # assert
+    assert actual == expected
+    assert actual.result == EResult.VillagersWin
+    assert len(list(saver.list(config))) > 1  # type: ignore
+
+
+def test_SqliteCheckpointSaver_deduplicate_messages(tmp_path: Path) -> None:  # noqa
+    # preparation
+    path = tmp_path / 'checkpoint.sqlite'
+    saver = SqliteCheckpointSaver(str(path))
+    graph = _create_graph(saver)
+    # execution
+    state = StateModel(**graph.invoke(StateModel(alive_players_names=['Alice', 'Bob']), config={'configurable': {'thread_id': 'run'}}))  # type: ignore # noqa
+    saver.close()
+    with sqlite3.connect(path) as conn:
+        n_messages = conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]  # noqa
+    # assert
+    assert n_messages == sum(len(history.messages) for history in state.chat_state.values())  # noqa
+
+
+def test_SqliteCheckpointSaver_resume(tmp_path: Path) -> None:
+    # preparation
+    path = str(tmp_path / 'checkpoint.sqlite')
+    config = {'configurable': {'thread_id': 'run'}}
+    with pytest.raises(RuntimeError):
+        _create_graph(SqliteCheckpointSaver(path), fail=True).invoke(
+            StateModel(alive_players_names=['Alice', 'Bob']),
+            config=config,  # type: ignore
+        )
+    # execution
+    actual = StateModel(**_create_graph(SqliteCheckpointSaver(path)).invoke(None, config=config))  # type: ignore # noqa
+    # assert
+    assert actual.result == EResult.VillagersWin
+    assert sum(len(history.messages) for history in actual.chat_state.values()) == 2  # noqa
+
+
+def test_SqliteCheckpointSaver_load_only_referred_messages(tmp_path: Path) -> None:  # noqa
+    # preparation
+    path = str(tmp_path / 'checkpoint.sqlite')
+    saver = SqliteCheckpointSaver(path)
+    chat_state: dict = {}
+    for i in range(1200):
+        chat_state = _reduce_chat_state(chat_state, create_dict_to_record_chat('Alice', [f'P{i % 2}'], f'message {i}')['chat_state'])  # type: ignore # noqa
+    refs = saver._dump_chat_state('run', chat_state)
+    saver._conn.commit()
+    saver.close()
+    # NOTE: only the first history, i.e. more messages than one query can take  # noqa
+    refs = refs[:1]
+    loader = SqliteCheckpointSaver(path)
+    # execution
+    actual = loader._load_chat_state('run', refs)
+    # assert
+    assert len(refs[0]['message_ids']) == 600
+    assert [m.id for m in actual[frozenset(refs[0]['names'])].messages] == refs[0]['message_ids']  # noqa
+    assert set(loader._loaded_messages['run']) == set(refs[0]['message_ids'])  # noqa
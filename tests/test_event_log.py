@@ -0,0 +1,121 @@
+from pathlib import Path
+import pytest
+from langchain_werewolf.enums import EEventType, EResult
+from langchain_werewolf.event_log import (
+    EventLogWriter,
+    is_event_log_path,
+    load_state_from_event_log,
+    read_events,
+    reconstruct_state,
+)
+from langchain_werewolf.models.state import (
+    StateModel,
+    create_dict_to_record_chat,
+)
+
+
+def _create_states() -> list[StateModel]:
+    state0 = StateModel(alive_players_names=['Alice', 'Bob', 'Charlie'])
+    state1 = state0.model_copy(update={
+        'day': 1,
+        'chat_state': create_dict_to_record_chat('Alice', ['Bob', 'Charlie'], 'hello')['chat_state'],  # noqa
+    })
+    state2 = state1.model_copy(update={
+        'daytime_votes_current': {'Alice': 'Charlie', 'Bob': 'Charlie'},
+    })
+    state3 = state2.model_copy(update={
+        'alive_players_names': ['Alice', 'Bob'],
+        'result': EResult.VillagersWin,
+    })
+    return [state0, state1, state2, state3]
+
+
+@pytest.mark.parametrize(
+    'path, expected',
+    [
+        ('game.jsonl', True),
+        ('game.jsonl.gz', True),
+        ('game.jsonl.zst', True),
+        ('game.json', False),
+        ('game.gz', False),
+    ],
+)
+def test_is_event_log_path(path: str, expected: bool) -> None:
+    assert is_event_log_path(path) == expected
+
+
+def test_EventLogWriter_write(tmp_path: Path) -> None:
+    # preparation
+    path = str(tmp_path / 'game.jsonl')
+    expected = [
+        EEventType.start.value,
+        EEventType.state.value,
+        EEventType.message.value,
+        EEventType.vote.value,
+        EEventType.elimination.value,
+        EEventType.result.value,
+        EEventType.end.value,
+    ]
+    # execution
+    with EventLogWriter(path) as writer:
+        for state in _create_states():
+            writer.write(state)
+        writer.end()
+    actual = [record['type'] for record in read_events(path)]
+    # assert
+    assert sorted(actual) == sorted(expected)
+    assert actual[0] == EEventType.start.value
+    assert actual[-1] == EEventType.end.value
+
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.jsonl.gz', '.jsonl.zst'])
+def test_load_state_from_event_log(suffix: str, tmp_path: Path) -> None:
+    # preparation
+    if suffix.endswith('.zst'):
+        pytest.importorskip('zstandard')
+    path = str(tmp_path / f'game{suffix}')
+    states = _create_states()
+    # execution
+    with EventLogWriter(path) as writer:
+        for state in states:
+            writer.write(dict(state))
+    actual = load_state_from_event_log(path)
+    # assert
+    assert actual == states[-1]
+
+
+def test_read_events_while_writing(tmp_path: Path) -> None:
+    # preparation
+    path = str(tmp_path / 'game.jsonl.gz')
+    states = _create_states()
+    writer = EventLogWriter(path, fsync_interval=0)
+    # execution
+    for state in states[:2]:
+        writer.write(state)
+    actual = reconstruct_state(read_events(path))
+    writer.close()
+    # assert
+    assert actual == states[1]
+
+
+def test_read_events_ignore_incomplete_record(tmp_path: Path) -> None:
+    # preparation
+    path = tmp_path / 'game.jsonl'
+    with EventLogWriter(str(path)) as writer:
+        writer.write(_create_states()[0])
+    with open(path, 'a') as f:
+        f.write('{"type": "sta')
+    # execution
+    actual = list(read_events(str(path)))
+    # assert
+    assert [record['type'] for record in actual] == [EEventType.start.value]
+
+
+def test_read_events_follow_compressed(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        list(read_events(str(tmp_path / 'game.jsonl.gz'), follow=True))
+
+
+def test_reconstruct_state_without_start() -> None:
+    with pytest.raises(ValueError):
+        reconstruct_state([{'type': EEventType.end.value}])
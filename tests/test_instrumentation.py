@@ -0,0 +1,185 @@
+import json
+from pathlib import Path
+from typing import Any
+import pytest
+from langchain_core.caches import InMemoryCache
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
+from langchain_werewolf.instrumentation import (
+    CacheHitCounter,
+    InstrumentationCallbackHandler,
+    JsonlMetricsSink,
+    NodeMetrics,
+    OpenMetricsSink,
+    SummaryTableSink,
+    create_metrics_sink,
+    get_phase,
+    summarize_metrics,
+)
+from langchain_werewolf.llm_utils import extract_name
+from langchain_werewolf.models.state import StateModel
+
+
+def _create_chat_model(*contents: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([
+        AIMessage(content=content, usage_metadata={'input_tokens': 10, 'output_tokens': 2, 'total_tokens': 12})  # noqa
+        for content in contents
+    ]))
+
+
+def _create_graph(chat_model: GenericFakeChatModel):  # type: ignore
+    def _vote(state: StateModel) -> dict[str, Any]:
+        name = extract_name('I vote for Player10', ['Player1', 'Player10'], chat_model=chat_model)  # noqa
+        return {'daytime_votes_current': {'Player2': name}}
+
+    subgraph = StateGraph(StateModel)
+    subgraph.add_node('GameMaster_ask_Player2_to_vote', _vote)
+    subgraph.add_edge(START, 'GameMaster_ask_Player2_to_vote')
+    subgraph.add_edge('GameMaster_ask_Player2_to_vote', END)
+    workflow = StateGraph(StateModel)
+    workflow.add_node('tearup', lambda _: {'day': 1})
+    workflow.add_node('daytime_vote', subgraph.compile())
+    workflow.add_edge(START, 'tearup')
+    workflow.add_edge('tearup', 'daytime_vote')
+    workflow.add_edge('daytime_vote', END)
+    return workflow.compile()
+
+
+def test_InstrumentationCallbackHandler() -> None:
+    # preparation
+    handler = InstrumentationCallbackHandler(['Player1', 'Player2', 'Player10'])  # noqa
+    graph = _create_graph(_create_chat_model('Nobody knows', 'Player10'))
+    # execution
+    graph.invoke(
+        StateModel(alive_players_names=['Player1', 'Player2', 'Player10']),
+        config={'callbacks': [handler]},
+    )
+    actual = {(metrics.phase, metrics.node): metrics for metrics in handler.get_metrics()}  # noqa
+    # assert
+    vote = actual[('daytime_vote', 'GameMaster_ask_Player2_to_vote')]
+    assert vote.player == 'Player2'
+    assert vote.day == 1
+    assert vote.calls == 1
+    assert vote.llm_calls == 2
+    assert vote.retries == 1
+    assert vote.prompt_tokens == 20
+    assert vote.completion_tokens == 4
+    assert vote.extract_name_seconds > 0
+    assert actual[('daytime_vote', 'daytime_vote')].calls == 1
+    assert actual[('tearup', 'tearup')].calls == 1
+    assert actual[('tearup', 'tearup')].llm_calls == 0
+
+
+def test_InstrumentationCallbackHandler_player_run() -> None:
+    # preparation
+    handler = InstrumentationCallbackHandler(['Player1'])
+    chat_model = _create_chat_model('hello')
+    player = (RunnableLambda(lambda x: x) | chat_model).with_config(run_name='Player1')  # noqa
+    # execution
+    player.invoke('hi', config={'callbacks': [handler]})
+    actual = handler.get_metrics()
+    # assert
+    assert len(actual) == 1
+    assert actual[0].player == 'Player1'
+    assert actual[0].llm_calls == 1
+
+
+def test_CacheHitCounter() -> None:
+    # preparation
+    handler = InstrumentationCallbackHandler()
+    cache = CacheHitCounter(InMemoryCache(), handler)
+    chat_model = GenericFakeChatModel(messages=iter([AIMessage(content='hello')]), cache=cache)  # noqa
+    # execution
+    chat_model.invoke('hi', config={'callbacks': [handler]})
+    chat_model.invoke('hi', config={'callbacks': [handler]})
+    actual = handler.get_metrics()
+    # assert
+    assert len(actual) == 1
+    assert actual[0].llm_calls == 2
+    assert actual[0].cache_hits == 1
+
+
+def test_summarize_metrics() -> None:
+    # preparation
+    metrics = [
+        NodeMetrics(phase='daytime_vote', node='vote', player='Player1', day=1, calls=1, seconds=1.0),  # noqa
+        NodeMetrics(phase='daytime_vote', node='vote', player='Player2', day=1, calls=2, seconds=0.5),  # noqa
+        NodeMetrics(phase='daytime_chat', node='chat', player=None, day=1, calls=1, seconds=2.0),  # noqa
+    ]
+    # execution
+    actual = summarize_metrics(metrics, by=('phase',))
+    # assert
+    assert [(item.phase, item.calls, item.seconds) for item in actual] == [('daytime_chat', 1, 2.0), ('daytime_vote', 3, 1.5)]  # noqa
+
+
+def test_summarize_metrics_invalid_label() -> None:
+    with pytest.raises(ValueError):
+        summarize_metrics([], by=('unknown',))
+
+
+def test_JsonlMetricsSink(tmp_path: Path) -> None:
+    # preparation
+    path = tmp_path / 'metrics.jsonl'
+    metrics = [NodeMetrics(phase='daytime_chat', node='chat', player='Player1', day=1, calls=1)]  # noqa
+    # execution
+    JsonlMetricsSink(str(path)).write(metrics)
+    actual = [json.loads(line) for line in path.read_text().splitlines()]
+    # assert
+    assert actual == [metrics[0].model_dump()]
+
+
+def test_OpenMetricsSink(tmp_path: Path) -> None:
+    # preparation
+    path = tmp_path / 'metrics.prom'
+    metrics = [NodeMetrics(phase='daytime_chat', node='chat', player=None, day=1, calls=3)]  # noqa
+    # execution
+    OpenMetricsSink(str(path)).write(metrics)
+    actual = path.read_text().splitlines()
+    # assert
+    assert '# TYPE werewolf_calls counter' in actual
+    assert 'werewolf_calls_total{phase="daytime_chat",node="chat",day="1"} 3' in actual  # noqa
+    assert actual[-1] == '# EOF'
+
+
+def test_SummaryTableSink() -> None:
+    # preparation
+    outputs: list[str] = []
+    metrics = [NodeMetrics(phase='daytime_chat', node='chat', calls=3)]
+    # execution
+    SummaryTableSink(output_func=outputs.append).write(metrics)
+    # assert
+    assert len(outputs) == 1
+    assert len(outputs[0].splitlines()) == 2
+    assert 'daytime_chat' in outputs[0]
+
+
+@pytest.mark.parametrize(
+    'target, expected',
+    [
+        ('summary', SummaryTableSink),
+        ('metrics.jsonl', JsonlMetricsSink),
+        ('metrics.prom', OpenMetricsSink),
+    ],
+)
+def test_create_metrics_sink(target: str, expected: type) -> None:
+    assert isinstance(create_metrics_sink(target), expected)
+
+
+def test_create_metrics_sink_invalid() -> None:
+    with pytest.raises(ValueError):
+        create_metrics_sink('metrics.csv')
+
+
+@pytest.mark.parametrize(
+    'metadata, expected',
+    [
+        (None, None),
+        ({}, None),
+        ({'langgraph_checkpoint_ns': 'daytime_chat:1|chat:2'}, 'daytime_chat'),  # noqa
+        ({'langgraph_checkpoint_ns': 'daytime_chat/chat:1'}, 'daytime_chat'),  # noqa
+    ],
+)
+def test_get_phase(metadata: dict[str, Any] | None, expected: str | None) -> None:  # noqa
+    assert get_phase(metadata) == expected
@@ -6,6 +6,7 @@ from langchain_werewolf.enums import EInputOutputType
 from langchain_werewolf.io import (
     create_input_runnable,
     create_output_runnable,
+    create_token_output_runnable,
 )
 
 
@@ -149,3 +150,25 @@ def test_create_output_runnable_invalid_output_func(
     mocker.patch('langchain_werewolf.io._output_map', {})
     with pytest.raises(ValueError):
         create_output_runnable(EInputOutputType.standard)
+
+
+def test_create_token_output_runnable_for_einputoutputtype(
+    mocker: MockerFixture,
+) -> None:
+    # preparation
+    output_func_ = mocker.MagicMock(spec=Callable[[str], None])
+    mocker.patch('langchain_werewolf.io._token_output_map', defaultdict(lambda: output_func_))  # noqa
+    # run
+    runnable = create_token_output_runnable(EInputOutputType.standard)
+    for token in ['Hello', ', ', 'world']:
+        runnable.invoke(token)
+    # assert
+    assert output_func_.call_args_list == [(('Hello',),), ((', ',),), (('world',),)]  # noqa
+
+
+def test_create_token_output_runnable_invalid_output_func(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch('langchain_werewolf.io._token_output_map', {})
+    with pytest.raises(ValueError):
+        create_token_output_runnable(EInputOutputType.standard)
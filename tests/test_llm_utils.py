@@ -4,7 +4,9 @@ from typing import Generator
 from dotenv import load_dotenv
 from flaky import flaky
 import pytest
+from langchain_core.exceptions import OutputParserException
 from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
 from pytest_mock import MockerFixture
 from langchain_werewolf.const import (
@@ -14,8 +16,10 @@ from langchain_werewolf.const import (
 from langchain_werewolf.enums import ELanguage
 from langchain_werewolf.llm_utils import (
     create_chat_model,
+    create_model_cascade,
     extract_name,
     create_translator_runnable,
+    substitute_name_extraction,
 )
 
 load_dotenv()
@@ -86,6 +90,67 @@ def test_create_chat_model_with_unknown_model_name(
         create_chat_model(unknown_model_name)
 
 
+def test_create_model_cascade(
+    mocker: MockerFixture,
+) -> None:
+    # preparation
+    seed = generate_int()
+    mocker.patch('langchain_werewolf.llm_utils._service2cls', defaultdict(lambda: mocker.MagicMock))  # noqa
+    # execution
+    actual = create_model_cascade(['gpt-4o-mini', None, '', 'gpt-4o', 'gpt-4o-mini'], seed=seed)  # noqa
+    # assert
+    assert actual == [
+        create_chat_model('gpt-4o-mini', seed=seed),
+        create_chat_model('gpt-4o', seed=seed),
+    ]
+
+
+def test_extract_name_with_escalation() -> None:
+    # preparation
+    calls: list[str] = []
+    cheap_model = RunnableLambda(lambda _: calls.append('cheap') or 'I do not know').with_types(output_type=str)  # type: ignore # noqa
+    strong_model = RunnableLambda(lambda _: calls.append('strong') or 'Bob').with_types(output_type=str)  # type: ignore # noqa
+    # execution
+    actual = extract_name(
+        'Call Bob',
+        ['Alice', 'Bob'],
+        chat_model=cheap_model,
+        max_retry=1,
+        escalation_chat_models=[strong_model],
+    )
+    # assert
+    assert actual == 'Bob'
+    assert calls == ['cheap', 'strong']
+
+
+def test_extract_name_with_substitute() -> None:
+    # preparation
+    prompts: list[str] = []
+    outputs = iter([None, 'Bob'])
+
+    def substitute(prompt: str) -> str:
+        prompts.append(prompt)
+        output = next(outputs)
+        if output is None:
+            raise OutputParserException('failed')
+        return output
+
+    model = RunnableLambda(lambda _: pytest.fail('The model is called.')).with_types(output_type=str)  # type: ignore # noqa
+    # execution
+    with substitute_name_extraction(substitute):
+        actual = extract_name(
+            'Call Bob',
+            ['Alice', 'Bob'],
+            chat_model=model,
+            escalation_chat_models=[model],
+        )
+    # assert
+    # NOTE: the escalation is kept with the substitute
+    assert actual == 'Bob'
+    assert len(prompts) == 2
+    assert 'Call Bob' in prompts[0]
+
+
 @pytest.mark.integration
 @pytest.mark.skipif(
     'OPENAI_API_KEY' not in os.environ,
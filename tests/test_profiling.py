@@ -0,0 +1,98 @@
+from collections import Counter
+from pathlib import Path
+import sys
+from typing import Any
+from langchain_core.runnables import RunnableLambda, RunnableParallel
+from langgraph.graph import StateGraph, START, END
+from langchain_werewolf.models.state import StateModel
+from langchain_werewolf.profiling import (
+    PhaseProfile,
+    SamplingProfiler,
+    find_phase,
+    format_phase_profiles,
+)
+
+
+def test_find_phase() -> None:
+    # preparation
+    phases: list[str | None] = []
+
+    def _capture(_: Any) -> None:
+        phases.append(find_phase(sys._getframe()))
+
+    def _chat(state: StateModel) -> dict[str, Any]:
+        # NOTE: the runnables in parallel run in the other threads
+        RunnableParallel(a=RunnableLambda(_capture), b=RunnableLambda(_capture)).invoke(None)  # noqa
+        _capture(None)
+        return {}
+
+    subgraph = StateGraph(StateModel)
+    subgraph.add_node('chat', _chat)
+    subgraph.add_edge(START, 'chat')
+    subgraph.add_edge('chat', END)
+    workflow = StateGraph(StateModel)
+    workflow.add_node('daytime_chat', subgraph.compile())
+    workflow.add_edge(START, 'daytime_chat')
+    workflow.add_edge('daytime_chat', END)
+    # execution
+    workflow.compile().invoke(StateModel(alive_players_names=['Alice']))
+    _capture(None)
+    # assert
+    assert phases == ['daytime_chat'] * 3 + [None]
+
+
+def test_SamplingProfiler_start_stop() -> None:
+    # preparation
+    switch_interval = sys.getswitchinterval()
+    profiler = SamplingProfiler(interval=0.001)
+    # execution
+    with profiler:
+        assert sys.getswitchinterval() <= switch_interval
+        sum(i * i for i in range(10 ** 6))
+    # assert
+    assert sys.getswitchinterval() == switch_interval
+    assert sum(profiler.stacks.values()) > 0
+    assert all(stack[0] == '(graph)' for stack in profiler.stacks)
+
+
+def test_SamplingProfiler_summarize() -> None:
+    # preparation
+    profiler = SamplingProfiler(interval=0.01)
+    profiler.stacks = Counter({
+        ('daytime_chat', 'main (a.py:1)', '_reduce_chat_state (state.py:1)'): 3,  # noqa
+        ('daytime_chat', 'main (a.py:1)'): 1,
+        ('night_vote', 'main (a.py:1)', 'vote (b.py:1)'): 4,
+    })
+    # execution
+    actual = profiler.summarize(top=1, watched=('_reduce_chat_state',))
+    # assert
+    assert actual == [
+        PhaseProfile(
+            phase='daytime_chat',
+            samples=4,
+            seconds=0.04,
+            ratio=0.5,
+            functions={'_reduce_chat_state (state.py:1)': 0.75},
+            watched={'_reduce_chat_state': 0.75},
+        ),
+        PhaseProfile(
+            phase='night_vote',
+            samples=4,
+            seconds=0.04,
+            ratio=0.5,
+            functions={'vote (b.py:1)': 1.0},
+            watched={'_reduce_chat_state': 0.0},
+        ),
+    ]
+    assert 'daytime_chat' in format_phase_profiles(actual)
+
+
+def test_SamplingProfiler_write_collapsed(tmp_path: Path) -> None:
+    # preparation
+    path = tmp_path / 'profile.folded'
+    profiler = SamplingProfiler()
+    profiler.stacks = Counter({('daytime_chat', 'main (a.py:1)', 'f;g (b.py:2)'): 2})  # noqa
+    # execution
+    profiler.write_collapsed(str(path))
+    # assert
+    assert path.read_text() == 'daytime_chat;main (a.py:1);f,g (b.py:2) 2\n'
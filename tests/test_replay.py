@@ -0,0 +1,152 @@
+import json
+import random
+import re
+from pathlib import Path
+import pytest
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_werewolf.const import GAME_MASTER_NAME
+from langchain_werewolf.game.main import create_game_graph
+from langchain_werewolf.game_players import (
+    BaseGamePlayerRole,
+    PlayerRoleRegistry,
+    generate_game_player_runnable,
+)
+from langchain_werewolf.game_players.base import GamePlayerRunnableInputModel
+from langchain_werewolf.game_players.player_roles import (
+    FortuneTeller,
+    Knight,
+    Villager,
+    Werewolf,
+)
+from langchain_werewolf.models.state import StateModel
+from langchain_werewolf.replay import (
+    ReplayDivergenceError,
+    ReplayRecorder,
+    diff_states,
+    get_replay_node,
+    hash_prompt,
+    load_replay_log,
+    replay_game,
+)
+from langchain_werewolf.rng import GameRandom
+
+# const
+_NAME_PATTERN: re.Pattern = re.compile(r'Player\d+')
+
+
+def _create_scripted_runnable(seed: int) -> Runnable[str, str]:
+    rng = random.Random(seed)
+
+    def answer(prompt: str) -> str:
+        names = sorted(set(_NAME_PATTERN.findall(prompt)))
+        return rng.choice(names) if names else 'Player0'
+
+    return RunnableLambda(answer).with_types(input_type=str, output_type=str)  # noqa
+
+
+def _create_players() -> list[BaseGamePlayerRole]:
+    roles = [Werewolf.role, Knight.role, FortuneTeller.role, Villager.role, Villager.role]  # noqa
+    return [
+        PlayerRoleRegistry.create_player(
+            key=role,
+            name=f'Player{i}',
+            runnable=generate_game_player_runnable(_create_scripted_runnable(i)),  # noqa
+        )
+        for i, role in enumerate(roles)
+    ]
+
+
+@pytest.fixture(scope='module')
+def replay_log_path(tmp_path_factory: pytest.TempPathFactory) -> str:
+    path = str(tmp_path_factory.mktemp('replay') / 'replay.jsonl')
+    players = _create_players()
+    rng = GameRandom()
+    workflow = create_game_graph(
+        players,
+        vote_kwargs={'chat_model': _create_scripted_runnable(len(players))},
+        rng=rng,
+    )
+    recorder = ReplayRecorder(path, players, rng.root_seed)
+    state = workflow.invoke(
+        StateModel(alive_players_names=[player.name for player in players]),
+        config={'recursion_limit': 1000, 'callbacks': [recorder]},
+    )
+    recorder.end(state)
+    recorder.close()
+    return path
+
+
+def test_hash_prompt() -> None:
+    # preparation
+    first = '[(2024-01-01 00:00:00.000001) A spoke to [\'A\']]\nhello\n'
+    second = '[(2024-01-01 00:00:00.000002) B spoke to [\'B\']]\nbye\n'
+    # execution
+    actual = hash_prompt(GamePlayerRunnableInputModel(prompt='Speak', system_prompt=first + second))  # noqa
+    # assert
+    # NOTE: neither the timestamps nor the order of the messages matter
+    assert actual == hash_prompt(GamePlayerRunnableInputModel(prompt='Speak', system_prompt=second.replace('02)', '03)') + first))  # noqa
+    assert actual != hash_prompt(GamePlayerRunnableInputModel(prompt='Speak', system_prompt=first))  # noqa
+    assert hash_prompt('Speak') == hash_prompt(GamePlayerRunnableInputModel(prompt='Speak'))  # noqa
+
+
+@pytest.mark.parametrize(
+    'metadata, expected',
+    [
+        (
+            {'langgraph_node': 'chat', 'langgraph_checkpoint_ns': 'daytime_chat:1|chat:2'},  # noqa
+            'daytime_chat/chat',
+        ),
+        (
+            {'langgraph_node': 'daytime_chat/chat', 'langgraph_checkpoint_ns': 'daytime_chat/chat:1'},  # noqa
+            'daytime_chat/chat',
+        ),
+        (
+            {'langgraph_node': 'add_day', 'langgraph_checkpoint_ns': 'add_day:1'},  # noqa
+            'add_day',
+        ),
+    ],
+)
+def test_get_replay_node(metadata: dict[str, str], expected: str) -> None:
+    assert get_replay_node(metadata) == expected
+
+
+def test_load_replay_log(replay_log_path: str) -> None:
+    # execution
+    actual = load_replay_log(replay_log_path)
+    # assert
+    assert list(actual.players) == [f'Player{i}' for i in range(5)]
+    assert actual.state is not None and actual.state.result is not None
+    assert {call.player for call in actual.calls} >= {GAME_MASTER_NAME, 'Player0'}  # noqa
+    assert any(call.node == 'daytime_chat/chat' for call in actual.calls)
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+@pytest.mark.parametrize('fast', [False, True])
+def test_replay_game(replay_log_path: str, optimize: bool, fast: bool) -> None:  # noqa
+    # execution
+    actual = replay_game(replay_log_path, optimize=optimize, fast=fast, strict=True)  # noqa
+    # assert
+    assert not actual.diverged
+    assert diff_states(load_replay_log(replay_log_path).state, actual.state) == []  # type: ignore # noqa
+
+
+def test_replay_game_with_divergence(replay_log_path: str, tmp_path: Path) -> None:  # noqa
+    # preparation
+    with open(replay_log_path) as f:
+        records = [json.loads(line) for line in f]
+    index = next(
+        i for i, record in enumerate(records)
+        if record['type'] == 'call' and record['node'] == 'daytime_chat/chat'
+    )
+    records[index]['prompt_hash'] = '0' * 16
+    records[index]['output'] = 'Something different'
+    path = str(tmp_path / 'replay.jsonl')
+    with open(path, 'w') as f:
+        f.writelines(json.dumps(record) + '\n' for record in records)
+    # execution
+    actual = replay_game(path)
+    # assert
+    assert actual.diverged
+    assert {divergence.kind for divergence in actual.divergences} >= {'prompt', 'state'}  # noqa
+    with pytest.raises(ReplayDivergenceError):
+        replay_game(path, strict=True)
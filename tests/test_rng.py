@@ -0,0 +1,76 @@
+import random
+from langchain_werewolf.rng import (
+    GameRandom,
+    DAYTIME_SPEAKERS_STREAM,
+    ROLES_STREAM,
+    TIES_STREAM,
+)
+
+
+def test_game_random_with_same_seed() -> None:
+    # preparation
+    rng1 = GameRandom(0)
+    rng2 = GameRandom(0)
+    # execution
+    actual1 = [rng1.stream(ROLES_STREAM).random() for _ in range(5)]
+    actual2 = [rng2.stream(ROLES_STREAM).random() for _ in range(5)]
+    # assert
+    assert actual1 == actual2
+
+
+def test_game_random_with_different_purposes() -> None:
+    # preparation
+    rng = GameRandom(0)
+    # execution
+    actual1 = [rng.stream(ROLES_STREAM).random() for _ in range(5)]
+    actual2 = [rng.stream(TIES_STREAM).random() for _ in range(5)]
+    # assert
+    assert actual1 != actual2
+
+
+def test_game_random_streams_are_independent() -> None:
+    # preparation
+    rng1 = GameRandom(0)
+    rng2 = GameRandom(0)
+    # execution
+    # NOTE: the draws of one stream do not shift the others
+    [rng1.stream(DAYTIME_SPEAKERS_STREAM).random() for _ in range(10)]
+    actual1 = [rng1.stream(TIES_STREAM).random() for _ in range(5)]
+    actual2 = [rng2.stream(TIES_STREAM).random() for _ in range(5)]
+    # assert
+    assert actual1 == actual2
+    assert rng1.stream(TIES_STREAM) is rng1.stream(TIES_STREAM)
+
+
+def test_game_random_does_not_touch_global_random() -> None:
+    # preparation
+    random.seed(0)
+    expected = random.random()
+    random.seed(0)
+    # execution
+    GameRandom(1).stream(ROLES_STREAM).random()
+    # assert
+    assert random.random() == expected
+
+
+def test_game_random_without_seed() -> None:
+    # preparation
+    rng = GameRandom()
+    # execution
+    actual1 = [rng.stream(ROLES_STREAM).random() for _ in range(5)]
+    actual2 = [rng.stream(TIES_STREAM).random() for _ in range(5)]
+    # assert
+    assert rng.seed is None
+    assert actual1 != actual2
+
+
+def test_game_random_with_root_seed() -> None:
+    # preparation
+    rng = GameRandom()
+    expected = [rng.stream(TIES_STREAM).random() for _ in range(5)]
+    # execution
+    replayed = GameRandom(rng.root_seed)
+    actual = [replayed.stream(TIES_STREAM).random() for _ in range(5)]
+    # assert
+    assert actual == expected
+    assert GameRandom(0).root_seed == 0
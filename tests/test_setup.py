@@ -1,3 +1,4 @@
+import random
 from typing import Callable
 from unittest import mock
 from langchain_core.language_models import BaseChatModel
@@ -11,6 +12,7 @@ from langchain_werewolf.const import (
 )
 from langchain_werewolf.enums import (
     EInputOutputType,
+    ELanguage,
     ESystemOutputType,
     ETimeSpan,
 )
@@ -37,6 +39,7 @@ from langchain_werewolf.setup import (
     _generate_base_runnable,
     create_echo_runnable,
     generate_players,
+    is_headless,
 )
 
 
@@ -311,10 +314,71 @@ def test_generate_players(mocker: MockerFixture) -> None:
         custom_players=custom_players,
     )
     assert len(actual) == n_players
+    assert actual.get_player(custom_players[0].name).role == Werewolf.role
     assert sum([player.role == Werewolf.role for player in actual]) == n_werewolves  # noqa
     assert sum([player.role == Knight.role for player in actual]) == n_knights  # noqa
     assert sum([player.role == FortuneTeller.role for player in actual]) == n_fortune_tellers  # noqa
     assert sum([player.role == Villager.role for player in actual]) == n_players - n_werewolves - n_knights - n_fortune_tellers  # noqa
+    # NOTE: the players with the same base runnable share the runnable to batch their night actions  # noqa
+    assert len({id(player.runnable) for player in actual}) == 1
+
+
+def test_generate_players_with_rng(mocker: MockerFixture) -> None:
+    # preparation
+    mocker.patch(
+        'langchain_werewolf.setup._generate_base_runnable',
+        mocker.Mock(return_value=RunnableLambda(str).with_types(input_type=str, output_type=str)),  # noqa
+    )
+    shuffle = mocker.patch('random.shuffle')
+    n_players_by_role = {Werewolf.role: 3, Knight.role: 3, FortuneTeller.role: 3}  # noqa
+    # execution
+    actual = [
+        [player.role for player in generate_players(12, n_players_by_role, seed=0, rng=random.Random(i))]  # noqa
+        for i in (0, 0, 1)
+    ]
+    # assert
+    # NOTE: the roles depend only on the generator
+    assert actual[0] == actual[1]
+    assert actual[0] != actual[2]
+    shuffle.assert_not_called()
+
+
+def test_generate_players_with_duplicated_names(mocker: MockerFixture) -> None:  # noqa
+    # preparation
+    mocker.patch(
+        'langchain_werewolf.setup._generate_base_runnable',
+        mocker.Mock(return_value=RunnableLambda(str).with_types(input_type=str, output_type=str)),  # noqa
+    )
+    custom_players = [
+        PlayerConfig(name='Alice', role=Werewolf.role),
+        PlayerConfig(name='Alice', role=Villager.role),
+    ]
+    # execution & assert
+    with pytest.raises(ValueError):
+        generate_players(4, {Werewolf.role: 1}, custom_players=custom_players)  # noqa
+
+
+def test_generate_players_with_auxiliary_model(mocker: MockerFixture) -> None:  # noqa
+    # preparation
+    mocker.patch(
+        'langchain_werewolf.setup._generate_base_runnable',
+        mocker.Mock(return_value=RunnableLambda(str).with_types(input_type=str, output_type=str)),  # noqa
+    )
+    cascade = [mocker.Mock(BaseChatModel), mocker.Mock(BaseChatModel)]
+    create_model_cascade_mock = mocker.patch(
+        'langchain_werewolf.setup.create_model_cascade',
+        mocker.Mock(return_value=cascade),
+    )
+    # execution
+    actual = generate_players(
+        4,
+        {Werewolf.role: 1},
+        model='gpt-4o',
+        auxiliary_model='gpt-4o-mini',
+    )
+    # assert
+    assert all(player.auxiliary_chat_models == cascade for player in actual)
+    create_model_cascade_mock.assert_called_with(['gpt-4o-mini', 'gpt-4o'], seed=None)  # noqa
 
 
 def test_generate_players_with_custom_input_interface(mocker: MockerFixture) -> None:  # noqa
@@ -506,6 +570,40 @@ def test__create_echo_runnable_by_system_with_invalid_level() -> None:
         )
 
 
+@pytest.mark.parametrize(
+    'auxiliary_model, expected',
+    [
+        (None, 'gpt-4o'),
+        ('gpt-4o-mini', 'gpt-4o-mini'),
+    ],
+)
+def test__create_echo_runnable_by_system_with_auxiliary_model(
+    auxiliary_model: str | None,
+    expected: str,
+    mocker: MockerFixture,
+) -> None:
+    # mock
+    create_chat_model_mock = mocker.patch(
+        'langchain_werewolf.setup.create_chat_model',
+        mocker.Mock(return_value=mocker.Mock(BaseChatModel)),
+    )
+    mocker.patch(
+        'langchain_werewolf.setup.create_translator_runnable',
+        mocker.Mock(return_value=RunnableLambda(str)),
+    )
+    # execution
+    _create_echo_runnable_by_system(
+        output_func=mocker.Mock(),
+        level=ESystemOutputType.all,
+        model='gpt-4o',
+        auxiliary_model=auxiliary_model,
+        player_names=list(PLAYER_NAMES4TEST),
+        language=ELanguage.Japanese,
+    )
+    # assert
+    create_chat_model_mock.assert_called_once_with(expected, seed=-1)
+
+
 def test_create_echo_runnable(mocker: MockerFixture) -> None:
     # TODO: implement more detailed test
     # preparation
@@ -536,3 +634,39 @@ def test_create_echo_runnable(mocker: MockerFixture) -> None:
         system_output_level=ESystemOutputType.all,
         players=players,
     )
+
+
+@pytest.mark.parametrize(
+    'system_output_level, output, token_output, expected',
+    [
+        (ESystemOutputType.off, None, None, True),
+        (ESystemOutputType.all, None, None, False),
+        (ESystemOutputType.public, None, None, False),
+        ('Alice', None, None, False),
+        (ESystemOutputType.off, RunnableLambda(print), None, False),
+        (ESystemOutputType.off, None, RunnableLambda(print), False),
+    ],
+)
+def test_is_headless(
+    system_output_level: ESystemOutputType | str,
+    output: Runnable | None,
+    token_output: Runnable | None,
+    expected: bool,
+) -> None:
+    # preparation
+    players = [
+        PlayerRoleRegistry.create_player(
+            key=Villager.role,
+            name='Alice',
+            runnable=RunnableLambda(str),
+            output=output,
+            token_output=token_output,
+        ),
+        PlayerRoleRegistry.create_player(
+            key=Werewolf.role,
+            name='Bob',
+            runnable=RunnableLambda(str),
+        ),
+    ]
+    # execution & assert
+    assert is_headless(system_output_level, players) == expected
@@ -0,0 +1,73 @@
+from langchain_core.runnables import RunnableLambda
+import pytest
+from langchain_werewolf.const import GAME_MASTER_NAME
+from langchain_werewolf.enums import ESystemOutputType
+from langchain_werewolf.game_players.player_roles import Villager, Werewolf
+from langchain_werewolf.models.state import MsgModel
+from langchain_werewolf.streaming import TokenStreamEcho
+
+
+def _create_echo(
+    system_output_level: ESystemOutputType | str,
+) -> tuple[TokenStreamEcho, dict[str, list[str]]]:
+    outputs: dict[str, list[str]] = {
+        GAME_MASTER_NAME: [],
+        'Alice': [],
+    }
+    players = [
+        Villager(
+            name='Alice',
+            runnable=RunnableLambda(str),
+            token_output=RunnableLambda(outputs['Alice'].append),
+        ),
+        Werewolf(name='Bob', runnable=RunnableLambda(str)),
+    ]
+    echo = TokenStreamEcho(
+        RunnableLambda(outputs[GAME_MASTER_NAME].append),
+        system_output_level,
+        players,
+    )
+    return echo, outputs
+
+
+def test_TokenStreamEcho() -> None:
+    # preparation
+    echo, outputs = _create_echo(ESystemOutputType.all)
+    participants = [GAME_MASTER_NAME, 'Alice', 'Bob']
+    # execution
+    echo('Bob', participants, 'hel')
+    echo('Bob', participants, 'lo')
+    echo('Bob', participants, None)
+    # assert
+    assert ''.join(outputs['Alice']) == 'Bob: hello\n'
+    assert ''.join(outputs[GAME_MASTER_NAME]) == 'Bob: hello\n'
+    assert echo.consume('Alice', MsgModel(name='Bob', message='hello'))
+    assert not echo.consume('Alice', MsgModel(name='Bob', message='hello'))
+    assert not echo.consume('Bob', MsgModel(name='Bob', message='hello'))
+    assert echo.consume(GAME_MASTER_NAME, MsgModel(name='Bob', message='hello'))  # noqa
+
+
+@pytest.mark.parametrize(
+    'system_output_level, participants, expected',
+    [
+        (ESystemOutputType.off, [GAME_MASTER_NAME, 'Alice', 'Bob'], False),
+        (ESystemOutputType.all, [GAME_MASTER_NAME, 'Bob'], True),
+        (ESystemOutputType.public, [GAME_MASTER_NAME, 'Alice', 'Bob'], True),
+        (ESystemOutputType.public, [GAME_MASTER_NAME, 'Bob'], False),
+        ('Bob', [GAME_MASTER_NAME, 'Bob'], True),
+        ('Alice', [GAME_MASTER_NAME, 'Bob'], False),
+    ],
+)
+def test_TokenStreamEcho_system_visibility(
+    system_output_level: ESystemOutputType | str,
+    participants: list[str],
+    expected: bool,
+) -> None:
+    # preparation
+    echo, outputs = _create_echo(system_output_level)
+    # execution
+    echo('Bob', participants, 'hello')
+    echo('Bob', participants, None)
+    # assert
+    assert bool(outputs[GAME_MASTER_NAME]) == expected
+    assert bool(outputs['Alice']) == ('Alice' in participants)
@@ -1,3 +1,4 @@
+import random
 from typing import Callable, TypeVar
 import pytest
 from pytest_mock import MockerFixture
@@ -67,6 +68,18 @@ def test_random_permutated_infinite_generator(
     assert [next(generator) for _ in range(len(objects) * n_cycle)] == expected  # noqa
 
 
+def test_random_permutated_infinite_generator_with_rng(
+    mocker: MockerFixture,
+):
+    # NOTE: the global random module is not used with the generator
+    shuffle = mocker.patch('random.shuffle')
+    objects = list(range(10))
+    actual1 = random_permutated_infinite_generator(objects, rng=random.Random(0))  # noqa
+    actual2 = random_permutated_infinite_generator(objects, rng=random.Random(0))  # noqa
+    assert [next(actual1) for _ in range(30)] == [next(actual2) for _ in range(30)]  # noqa
+    shuffle.assert_not_called()
+
+
 @pytest.mark.parametrize(
     'd, expected',
     [